@@ -10,13 +10,13 @@ import time
 from typing import Optional
 
 # API Base URL (adjust if your server runs on different port)
-BASE_URL = "http://localhost:8000"
+BASE_URL = "http://localhost:5050/starship_ai/v1"
 
 def test_ciq_payload():
     """Test the CIQ payload schema endpoint."""
     print("🧪 Testing CIQ Payload Schema...")
     
-    url = f"{BASE_URL}/ciq_payload"
+    url = f"{BASE_URL}/ciq/payload"
     payload = {"input": "get schema"}
     
     try:
@@ -43,7 +43,7 @@ def test_ciq_chat_flow():
     """Test a complete CIQ chat conversation flow."""
     print("\n🧪 Testing CIQ Chat Flow...")
     
-    url = f"{BASE_URL}/ciq_chat"
+    url = f"{BASE_URL}/ciq/chat"
     session_id = None
     
     # Test messages to simulate a conversation
@@ -91,7 +91,7 @@ def test_session_progress(session_id: str):
     """Test session progress endpoint."""
     print(f"\n🧪 Testing Session Progress for {session_id[:8]}...")
     
-    url = f"{BASE_URL}/ciq_session/{session_id}/progress"
+    url = f"{BASE_URL}/ciq/session/{session_id}/progress"
     
     try:
         response = requests.get(url)
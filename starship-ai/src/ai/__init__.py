@@ -1,4 +1,5 @@
 #  Copyright (c) 2022 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import atexit
 import logging
 from logging.config import dictConfig
 
@@ -6,13 +7,16 @@ from logging.config import dictConfig
 import asgi_correlation_id  # noqa: F401
 from uvicorn.config import LOGGING_CONFIG
 
+from ai.logs import AccessJsonFormatter, JsonFormatter, LogQueue
+
 __version__ = '1.0.0'
 
 API_PREFIX = '/starship_ai'
 
 # Set the logging config ASAP so later initialization doesn't create default stuff we don't want.
 # We're altering the uvicorn logging config here as well as adding our own nwac logging config.
-# We're using a json format since these will need to be programmatically parsed later.
+# We're using a json format since these will need to be programmatically parsed later, and write
+# the logs from a background thread so that a slow stdout never holds up the event loop.
 
 DateFmt = "%Y-%m-%d %H:%M:%S %Z"
 # The correlation_id is used via middleware for FastAPI and ensures that all log messages for
@@ -26,34 +30,19 @@ LOGGING_CONFIG['filters'] = {
 
 # Unless otherwise specified, all loggers will use this.
 LOGGING_CONFIG['formatters']['default'] = {
-    '()': 'uvicorn.logging.DefaultFormatter',
-    'fmt': "{\"time\": \"%(asctime)s\", "
-           "\"lvl\": \"%(levelname)s\", "
-           "\"correlation_id\": \"%(correlation_id)s\", "
-           "\"from\": \"%(name)s\", "
-           "\"msg\": \"%(message)s\"}",
+    '()': JsonFormatter,
     'datefmt': DateFmt,
 }
 # Uvicorn's log format for requests
 LOGGING_CONFIG['formatters']['access'] = {
-    '()': 'uvicorn.logging.AccessFormatter',
-    'fmt': "{\"time\": \"%(asctime)s\", "
-           "\"lvl\": \"%(levelname)s\", "
-           "\"correlation_id\": \"%(correlation_id)s\", "
-           "\"from\": \"%(name)s\", "
-           "\"src\": \"%(client_addr)s\", "
-           "\"req\": \"%(request_line)s\", "
-           "\"status\": \"%(status_code)s\"}",
+    '()': AccessJsonFormatter,
     'datefmt': DateFmt,
 }
 # Our log format
 LOGGING_CONFIG['formatters']['nwac'] = {
-    'format': "{\"time\": \"%(asctime)s\", "
-              "\"lvl\": \"%(levelname)s\", "
-              "\"correlation_id\": \"%(correlation_id)s\", "
-              "\"from\": \"%(name)s.%(module)s.%(funcName)s\", "
-              "\"msg\": \"%(message)s\"}",
+    '()': JsonFormatter,
     'datefmt': DateFmt,
+    'detailed': True,
 }
 # Force all logs to use stdout and add the correlation ID filter to them.
 LOGGING_CONFIG['handlers']['default']['stream'] = 'ext://sys.stdout'
@@ -79,4 +68,9 @@ LOGGING_CONFIG['loggers'][''] = {'handlers': ['default'],
 
 dictConfig(LOGGING_CONFIG)
 
+LOG_QUEUE = LogQueue()
+LOG_QUEUE.attach('nwac', 'uvicorn', 'uvicorn.access', '')
+LOG_QUEUE.start()
+atexit.register(LOG_QUEUE.stop)
+
 LOG = logging.getLogger('nwac')
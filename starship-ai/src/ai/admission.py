@@ -0,0 +1,268 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Admission control for the routes that call an LLM.
+
+Each class of LLM-backed route (e.g. the CIQ chat) has a concurrency limit.  Requests over the
+limit wait in a bounded queue; once the queue is full, or a request has waited queue_timeout
+seconds, requests are turned away at once with a 503 and a Retry-After header rather than left
+to pile up behind a saturated upstream.  Routes that are not in a class (health and readiness
+probes, metrics, payload schemas, session documents) are never queued or shed.
+
+The limits adapt to the latency observed in the class, like a gradient controller: while
+requests take about as long as usual (within the tolerance of the long-term average) the limit
+grows by about its square root per request, and as latency rises above that it shrinks in
+proportion.  Requests failing with a server error shrink the limit too (multiplicative
+decrease), so the limit backs off when the upstream starts failing instead of slowing down.
+"""
+import asyncio
+import math
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional
+
+from starlette.responses import JSONResponse
+
+from ai import LOG
+from ai.metrics import ADMISSION_QUEUE_WAIT, ADMISSION_SHED
+from ai.tracing import span
+
+# Most seconds a Retry-After header asks clients to wait
+MAX_RETRY_AFTER = 60
+
+
+class Shed(Exception):
+    """The request was not admitted."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class GradientLimit(object):
+    """A concurrency limit adapting to latency."""
+
+    def __init__(self, initial: float = 20, min_limit: float = 1, max_limit: float = 200,
+                 tolerance: float = 2.0, smoothing: float = 0.2, backoff: float = 0.9,
+                 window: int = 100):
+        """
+        Create a limit.
+
+        :param initial: starting limit
+        :param min_limit: the limit never goes below this (at least 1)
+        :param max_limit: the limit never goes above this
+        :param tolerance: latency may reach this multiple of the long-term average before the
+                          limit shrinks
+        :param smoothing: weight of each new estimate in the limit (0 to 1)
+        :param backoff: factor applied to the limit when a request fails
+        :param window: number of requests the long-term average latency spans, roughly
+        """
+        self.min_limit = max(1.0, float(min_limit))
+        self.max_limit = max(self.min_limit, float(max_limit))
+        self.limit = min(max(float(initial), self.min_limit), self.max_limit)
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.window = window
+        # Long-term average latency, in seconds (None until the first request)
+        self.long_rtt: Optional[float] = None
+
+    def update(self, rtt: float, in_flight: int, failed: bool = False) -> float:
+        """Adjust the limit after a request that took rtt seconds; return the new limit."""
+        if failed:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            return self.limit
+        if self.long_rtt is None:
+            self.long_rtt = rtt
+        else:
+            self.long_rtt += (rtt - self.long_rtt) / self.window
+            # After a drop in latency, let the average catch up faster than the window would
+            if self.long_rtt > 2 * rtt:
+                self.long_rtt *= 0.95
+        if in_flight < self.limit / 2:
+            # Far from the limit, latency says nothing about whether it is right
+            return self.limit
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / rtt)) if rtt > 0 else 1.0
+        estimate = self.limit * gradient + math.sqrt(self.limit)
+        self.limit = self.limit * (1 - self.smoothing) + estimate * self.smoothing
+        self.limit = min(max(self.limit, self.min_limit), self.max_limit)
+        return self.limit
+
+
+class RouteClass(object):
+    """The requests of one class of route: those in progress and those waiting."""
+
+    def __init__(self, name: str, limit: GradientLimit, max_queue: int = 50,
+                 queue_timeout: float = 10.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Return about how long, in seconds, the requests ahead would take to drain."""
+        rtt = self.limit.long_rtt or 1.0
+        drain = rtt * (self.queued + 1) / self.limit.limit
+        return int(min(MAX_RETRY_AFTER, max(1, math.ceil(drain))))
+
+    async def acquire(self) -> float:
+        """
+        Wait for a slot; return how long that took, in seconds.
+
+        :raises Shed: if the queue is full or the wait timed out
+        """
+        if self.in_flight < int(self.limit.limit) and not self._waiters:
+            self.in_flight += 1
+            return 0.0
+        if self.queued >= self.max_queue:
+            raise Shed('queue_full', self.retry_after())
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait((waiter,), timeout=self.queue_timeout)
+        except BaseException:
+            # Cancelled (the client went away); hand on a slot given meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._forget(waiter)
+            raise
+        if not waiter.done():
+            self._forget(waiter)
+            raise Shed('timeout', self.retry_after())
+        return time.perf_counter() - start
+
+    def release(self, rtt: Optional[float], failed: bool = False) -> None:
+        """
+        Free a slot.
+
+        :param rtt: how long the request took, not counting the wait (None if it was cancelled:
+                    that says nothing about the upstream, so the limit is left as it is)
+        :param failed: whether the request failed with a server error
+        """
+        if rtt is not None:
+            self.limit.update(rtt, self.in_flight, failed)
+        self.in_flight -= 1
+        self._wake()
+
+    def _forget(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _wake(self) -> None:
+        # Slots go to the waiters in order; the slot is theirs as soon as their future is set
+        while self._waiters and self.in_flight < int(self.limit.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {'limit': round(self.limit.limit, 2), 'in_flight': self.in_flight,
+                'queued': self.queued,
+                'latency_ms': round((self.limit.long_rtt or 0.0) * 1000, 1)}
+
+
+class AdmissionController(object):
+    """The route classes, and which paths belong to which."""
+
+    def __init__(self, classes: Dict[str, Iterable[str]], initial_limit: float = 20,
+                 min_limit: float = 1, max_limit: float = 200, max_queue: int = 50,
+                 queue_timeout: float = 10.0, tolerance: float = 2.0):
+        """
+        Create a controller.
+
+        :param classes: route class name -> the paths in it; other paths are not controlled
+        :param initial_limit: starting concurrency limit of each class
+        :param min_limit: lowest concurrency limit of each class
+        :param max_limit: highest concurrency limit of each class
+        :param max_queue: most requests of a class that may wait for a slot
+        :param queue_timeout: most seconds a request may wait for a slot
+        :param tolerance: how many times their usual latency requests may take before the
+                          limit shrinks
+        """
+        self.classes = {name: RouteClass(name, GradientLimit(initial_limit, min_limit, max_limit,
+                                                             tolerance),
+                                         max_queue, queue_timeout)
+                        for name in classes}
+        self.paths = {path: self.classes[name]
+                      for name, paths in classes.items() for path in paths}
+
+    def route_class(self, path: str) -> Optional[RouteClass]:
+        return self.paths.get(path.rstrip('/') or '/')
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: route_class.stats() for name, route_class in self.classes.items()}
+
+
+# The controller of the running app, for the metrics
+_CONTROLLER: Optional[AdmissionController] = None
+
+
+def active_controller() -> Optional[AdmissionController]:
+    return _CONTROLLER
+
+
+class AdmissionMiddleware(object):
+    """Queue or shed the requests of the controlled routes."""
+
+    def __init__(self, app, controller: AdmissionController):
+        global _CONTROLLER
+        self.app = app
+        self.controller = _CONTROLLER = controller
+
+    async def __call__(self, scope, receive, send):
+        route_class = self.controller.route_class(scope['path']) \
+            if scope['type'] == 'http' else None
+        if route_class is None:
+            return await self.app(scope, receive, send)
+        with span('admission', route_class=route_class.name) as trace:
+            try:
+                waited = await route_class.acquire()
+            except Shed as e:
+                if trace is not None:
+                    trace.set(shed=e.reason)
+                return await self._shed(route_class, e, scope, receive, send)
+        ADMISSION_QUEUE_WAIT.observe(waited, route_class.name)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except asyncio.CancelledError:
+            route_class.release(None)
+            raise
+        except BaseException:
+            route_class.release(time.perf_counter() - start, failed=True)
+            raise
+        route_class.release(time.perf_counter() - start, failed=status >= 500)
+
+    @staticmethod
+    async def _shed(route_class: RouteClass, e: Shed, scope, receive, send):
+        ADMISSION_SHED.inc(route_class.name, e.reason)
+        error_id = str(uuid.uuid4())
+        LOG.warning("error_id: %s, shed %s request (%s): %s", error_id, route_class.name,
+                    e.reason, route_class.stats())
+        response = JSONResponse(status_code=503,
+                                content={'error': 'the service is busy - retry later',
+                                         'id': error_id},
+                                headers={'Retry-After': str(e.retry_after)})
+        await response(scope, receive, send)
@@ -2,51 +2,130 @@
 #
 # AWS Bedrock client and related functions.
 #
+# This module is shared by the API server and the Streamlit app, so it must not import
+# streamlit; boto3 is imported on first use because it is slow to import.
+#
 import json
+import logging
+import sys
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from ai.metrics import UPSTREAM_RETRIES, upstream_call
+from ai.perf import cassettes
+
+from .config import BEDROCK_ENDPOINT_URL, BEDROCK_MODEL, BEDROCK_REGION
+
+logger = logging.getLogger(__name__)
+
 
-import boto3
-import streamlit as st
-from botocore.exceptions import ClientError
+def _report_error(message: str):
+    """Log an error, and show it in the page when running inside the Streamlit app."""
+    logger.error(message)
+    st = sys.modules.get('streamlit')
+    if st is not None and st.runtime.exists():
+        st.error(message)
 
-from .config import BEDROCK_MODEL, BEDROCK_REGION
 
+@lru_cache(maxsize=None)
+def get_bedrock_client(region: str = BEDROCK_REGION,
+                       endpoint_url: Optional[str] = BEDROCK_ENDPOINT_URL):
+    """Get cached AWS Bedrock client for a region."""
+    import boto3
+    from botocore.config import Config
 
-@st.cache_resource
-def get_bedrock_client():
-    """Get cached AWS Bedrock client."""
+    from .llm_providers import HTTP_POOL
+
+    # Retries are left to the LLM gateway, whose retry budget they would escape
+    config = Config(max_pool_connections=HTTP_POOL.maxsize, retries={'max_attempts': 0})
     try:
-        return boto3.client('bedrock-runtime', region_name=BEDROCK_REGION)
+        return boto3.client('bedrock-runtime', region_name=region, endpoint_url=endpoint_url,
+                            config=config)
     except Exception as e:
-        st.error(
+        _report_error(
             f"Error configuring AWS Bedrock: {e}. "
             "Please ensure your AWS credentials are configured correctly."
         )
-        st.stop()
+        raise
+
+
+def _request_body(system_prompt: str, user_msg: str, max_tokens: int) -> str:
+    return json.dumps({
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "system": system_prompt,
+        "messages": [{"role": "user", "content": user_msg}],
+        "temperature": 0.1
+    })
 
 
-def bedrock_invoke(system_prompt: str, user_msg: str, max_tokens: int = 512) -> str:
+def invoke_model(system_prompt: str, user_msg: str, max_tokens: int = 512,
+                 model: str = BEDROCK_MODEL, region: str = BEDROCK_REGION,
+                 endpoint_url: Optional[str] = BEDROCK_ENDPOINT_URL) -> str:
     """
-    Invoke AWS Bedrock with the given prompts.
+    Invoke a Bedrock model with the given prompts.
+
+    Returns:
+        AI response text
+
+    Raises:
+        botocore.exceptions.BotoCoreError, ClientError: if the model could not be invoked
+    """
+    body = _request_body(system_prompt, user_msg, max_tokens)
+    with upstream_call('bedrock', model):
+        # The client is only needed (and AWS credentials with it) when not replaying
+        resp = cassettes.bedrock_call(model, body, lambda: get_bedrock_client(region, endpoint_url)
+                                      .invoke_model(body=body, modelId=model))
+        text = json.loads(resp['body'].read())['content'][0]['text']
+    retries = resp.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+    if retries:
+        UPSTREAM_RETRIES.inc('bedrock', model, amount=retries)
+    return text
+
+
+def stream_model(system_prompt: str, user_msg: str, max_tokens: int = 512,
+                 model: str = BEDROCK_MODEL, region: str = BEDROCK_REGION,
+                 endpoint_url: Optional[str] = BEDROCK_ENDPOINT_URL) -> Iterator[str]:
+    """
+    Invoke a Bedrock model with the given prompts, yielding the response text as it comes.
+
+    Cassettes only hold whole responses, so with one in use this yields the response in one go.
+    """
+    if cassettes.active() is not None:
+        yield invoke_model(system_prompt, user_msg, max_tokens, model, region, endpoint_url)
+        return
+    body = _request_body(system_prompt, user_msg, max_tokens)
+    with upstream_call('bedrock', model):
+        resp = get_bedrock_client(region, endpoint_url).invoke_model_with_response_stream(
+            body=body, modelId=model)
+        for event in resp['body']:
+            chunk = json.loads(event.get('chunk', {}).get('bytes') or '{}')
+            if chunk.get('type') == 'content_block_delta':
+                text = chunk.get('delta', {}).get('text')
+                if text:
+                    yield text
+
+
+def bedrock_invoke(system_prompt: str, user_msg: str, max_tokens: int = 512,
+                   route: str = 'default') -> str:
+    """
+    Get an answer from the LLM backends of a route.
+
+    Unless llm_backends says otherwise that is the Bedrock model above, see llm_gateway.py.
 
     Args:
         system_prompt: System prompt for the AI
         user_msg: User message
         max_tokens: Maximum tokens to generate
+        route: which LLM route the call belongs to
 
     Returns:
         AI response text
     """
-    client = get_bedrock_client()
-    body = json.dumps({
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": max_tokens,
-        "system": system_prompt,
-        "messages": [{"role": "user", "content": user_msg}],
-        "temperature": 0.1
-    })
+    from .llm_gateway import LLM_GATEWAY, LLMUnavailable
+
     try:
-        resp = client.invoke_model(body=body, modelId=BEDROCK_MODEL)
-        return json.loads(resp['body'].read())['content'][0]['text']
-    except ClientError as e:
-        st.error(f"Bedrock API error: {e}")
+        return LLM_GATEWAY.complete(route, system_prompt, user_msg, max_tokens)
+    except LLMUnavailable as e:
+        _report_error(f"LLM error: {e}")
         return "Error: Unable to get response from AI model."
@@ -3,6 +3,7 @@
 # CIQ Agent Package - CMM Deployment Assistant
 #
 
+from .blueprint_registry import blueprint_registry
 from .ciq_core import ciq_agent
 from .config import BLUEPRINT_PATH, PARAM_DESCRIPTIONS
 from .session_manager import CIQSession, session_manager
@@ -10,6 +11,7 @@ from .session_manager import CIQSession, session_manager
 __all__ = [
     'ciq_agent',
     'session_manager',
+    'blueprint_registry',
     'CIQSession',
     'PARAM_DESCRIPTIONS',
     'BLUEPRINT_PATH'
@@ -2,12 +2,15 @@
 #
 # AI helper functions for the CMM Deployment Assistant.
 #
-import streamlit as st
+import threading
+from typing import Dict
 
-from ai.agents.bedrock_client import bedrock_invoke
+import streamlit as st
 
 from .cudo_client import query_cudo_api
-from .yaml_parser import PARAM_DESCRIPTIONS
+from .intent_classifier import intent_classifier, llm_classify
+from .question_bank import question_bank
+from .yaml_parser import CIQ_SCHEMA, PARAM_DESCRIPTIONS, USER_PARAMS
 
 
 @st.cache_data
@@ -38,7 +41,7 @@ def query_cudo_with_spinner(query: str, current_param: str = None) -> str:
 
 def supervisor_classify(user_input: str, current_param: str) -> str:
     """
-    Classify user input using AI supervisor.
+    Classify user input, asking the AI supervisor only when the local classifier is unsure.
 
     Args:
         user_input: User's input text
@@ -47,35 +50,39 @@ def supervisor_classify(user_input: str, current_param: str) -> str:
     Returns:
         Classification category
     """
-    system_prompt = (
-        "You are a supervisor AI that classifies user input for a CMM deployment chatbot. "
-        "Classify the input into one of these categories: 'param_answer', 'tech_query', "
-        "'general_silly', 'skip_done'. Return ONLY the category name."
-    )
-    user_msg = (
-        "The user is currently being asked for the value of the parameter: "
-        f"'{current_param}'.\nUser input: \"{user_input}\""
-    )
-    response = bedrock_invoke(system_prompt, user_msg, max_tokens=20)
-    return response.strip().lower()
+    return intent_classifier.classify(user_input, current_param, fallback=llm_classify).label
 
 
 def generate_question(param: str) -> str:
     """
     Generate a friendly question for a parameter using AI.
 
+    Each question is generated once and then served from the question bank.
+
     Args:
         param: Parameter name
 
     Returns:
         Generated question text
     """
-    system_prompt = (
-        "You are a friendly CMM Deployment Assistant. Generate a friendly, one-sentence "
-        "question to ask the user for a parameter value, using the provided description "
-        "for context."
-    )
-    user_msg = (
-        f"Parameter: '{param}'\nDescription: \"{PARAM_DESCRIPTIONS.get(param, '')}\""
-    )
-    return bedrock_invoke(system_prompt, user_msg, max_tokens=100).strip()
+    return question_bank.get(param, _description(param))
+
+
+def _description(param: str) -> str:
+    return CIQ_SCHEMA.get(param) or PARAM_DESCRIPTIONS.get(param, "")
+
+
+def questionnaire() -> Dict[str, str]:
+    """Return {parameter: description} for the parameters this app asks for."""
+    return {param: _description(param) for param in USER_PARAMS}
+
+
+@st.cache_resource
+def warm_question_bank() -> threading.Thread:
+    """Generate the questions missing from the question bank in the background, once."""
+    # The same parameters and descriptions generate_question() looks questions up with
+    thread = threading.Thread(target=question_bank.build,
+                              kwargs={"questionnaire": questionnaire()},
+                              name="question-bank", daemon=True)
+    thread.start()
+    return thread
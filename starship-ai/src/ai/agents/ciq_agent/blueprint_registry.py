@@ -0,0 +1,286 @@
+# Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+#
+# Registry of CIQ blueprints keyed by (product, version).
+#
+# Blueprint files are discovered by name in a directory, but only compiled (or loaded from their
+# precompiled artifact) the first time they are used.  Compiled blueprints are held in an LRU
+# bounded by an approximate memory budget, so one process can serve many product versions
+# without keeping all of them in memory.
+#
+# Edited blueprints are picked up without a restart: refresh() (driven by the file watcher in
+# ai.reload) recompiles changed blueprints and swaps them in, and a blueprint that fails to
+# compile keeps serving its last good version until it is fixed.
+#
+import logging
+import re
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from .compiled_blueprint import CompiledBlueprint, load_compiled_blueprint
+from .config import (
+    BLUEPRINT_DIR, BLUEPRINT_PATH, BLUEPRINT_QUESTIONNAIRES, DEFAULT_BLUEPRINT_PRODUCT,
+    DEFAULT_BLUEPRINT_VERSION, DEFAULT_REGISTRY_CONFIG)
+
+logger = logging.getLogger(__name__)
+
+BlueprintKey = Tuple[str, str]
+ReloadListener = Callable[[BlueprintKey, CompiledBlueprint], None]
+
+DEFAULT_BLUEPRINT: BlueprintKey = (DEFAULT_BLUEPRINT_PRODUCT, DEFAULT_BLUEPRINT_VERSION)
+
+BLUEPRINT_FILE_RE = re.compile(
+    r'^golden_config_(?P<product>[A-Za-z0-9]+)(?:_(?P<version>[A-Za-z0-9][\w.\-]*?))?_yaml\.txt$'
+)
+
+
+class UnknownBlueprintError(Exception):
+    """No blueprint is registered for the requested product/version."""
+
+    def __init__(self, product, version, *args):
+        super().__init__(args)
+        self.product = product
+        self.version = version
+
+    def __str__(self):
+        return f"no blueprint registered for product {self.product} version {self.version}"
+
+
+def _version_sort_key(version: str):
+    # Natural sort so that 24.10 sorts after 24.7
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', version)]
+
+
+def estimate_size(compiled: CompiledBlueprint) -> int:
+    """Return a rough estimate of the memory held by a compiled blueprint, in bytes."""
+    # The text is held once by the template; the parsed tree and the node index are each a few
+    # times larger than the text they describe.
+    return len(compiled.text) * 4 + len(compiled.template.nodes) * 320
+
+
+class BlueprintRegistry:
+    """Lazily loads compiled blueprints and keeps the most recently used ones in memory."""
+
+    def __init__(self,
+                 directory: Union[str, Path] = BLUEPRINT_DIR,
+                 max_memory_bytes: int = DEFAULT_REGISTRY_CONFIG["max_memory_bytes"],
+                 cache_dir: Union[str, Path, None] = None):
+        self.directory = Path(directory)
+        self.max_memory_bytes = max_memory_bytes
+        self.cache_dir = cache_dir
+
+        self._paths: Optional[Dict[BlueprintKey, Path]] = None
+        self._loaded: 'OrderedDict[BlueprintKey, Tuple[CompiledBlueprint, int]]' = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = Lock()
+        self._key_locks: Dict[BlueprintKey, Lock] = {}
+        # (size, mtime_ns) of blueprint edits that failed to compile, so they are not retried
+        self._failed: Dict[BlueprintKey, Tuple[int, int]] = {}
+        self._listeners: List[ReloadListener] = []
+
+    def discover(self) -> Dict[BlueprintKey, Path]:
+        """Rescan the blueprint directory and return {(product, version): path}."""
+        paths = {}
+        try:
+            candidates = sorted(self.directory.iterdir())
+        except FileNotFoundError:
+            logger.warning("blueprint directory %s does not exist", self.directory)
+            candidates = []
+        for candidate in candidates:
+            match = BLUEPRINT_FILE_RE.match(candidate.name)
+            if match and candidate.is_file():
+                key = (match.group('product'), match.group('version') or DEFAULT_BLUEPRINT_VERSION)
+                paths[key] = candidate
+        # The configured golden blueprint is always available as the default
+        paths.setdefault(DEFAULT_BLUEPRINT, Path(BLUEPRINT_PATH))
+        with self._lock:
+            self._paths = paths
+        return paths
+
+    @property
+    def paths(self) -> Dict[BlueprintKey, Path]:
+        if self._paths is None:
+            return self.discover()
+        return self._paths
+
+    def keys(self) -> List[BlueprintKey]:
+        """Return every known (product, version), sorted by product then version."""
+        return sorted(self.paths, key=lambda k: (k[0], _version_sort_key(k[1])))
+
+    def resolve(self,
+                product: Optional[str] = None,
+                version: Optional[str] = None) -> BlueprintKey:
+        """
+        Turn an optional product/version into a registered key.
+
+        A missing product means the default product.  A missing version means the product's
+        unversioned blueprint if there is one, otherwise its highest version.
+        """
+        product = product or DEFAULT_BLUEPRINT_PRODUCT
+        paths = self.paths
+        if version:
+            if (product, version) not in paths:
+                raise UnknownBlueprintError(product, version)
+            return product, version
+        if (product, DEFAULT_BLUEPRINT_VERSION) in paths:
+            return product, DEFAULT_BLUEPRINT_VERSION
+        versions = [v for p, v in paths if p == product]
+        if not versions:
+            raise UnknownBlueprintError(product, version)
+        return product, max(versions, key=_version_sort_key)
+
+    def get(self, key: BlueprintKey = DEFAULT_BLUEPRINT) -> CompiledBlueprint:
+        """
+        Return the compiled blueprint for the given key, loading it on first use.
+
+        If the blueprint has been edited since it was loaded it is recompiled.  When the edit
+        does not compile, the last good version keeps being served.
+        """
+        path = self.paths.get(key)
+        if path is None:
+            raise UnknownBlueprintError(*key)
+
+        with self._lock:
+            entry = self._loaded.get(key)
+            if entry is not None:
+                self._loaded.move_to_end(key)
+            key_lock = self._key_locks.setdefault(key, Lock())
+        if entry is not None and self._is_usable(key, entry[0], path):
+            return entry[0]
+
+        # Only one thread loads a given blueprint; others wait for it rather than duplicate work
+        with key_lock:
+            with self._lock:
+                entry = self._loaded.get(key)
+            if entry is not None and self._is_usable(key, entry[0], path):
+                return entry[0]
+            try:
+                compiled = load_compiled_blueprint(path, self.cache_dir)
+            except Exception as e:
+                if entry is None:
+                    raise
+                self._record_failure(key, path, e)
+                return entry[0]
+            self._store(key, compiled)
+            logger.info("loaded blueprint %s %s from %s", key[0], key[1], path)
+        if entry is not None and compiled.sha256 != entry[0].sha256:
+            self._notify(key, compiled)
+        return compiled
+
+    def refresh(self) -> Dict[str, List[BlueprintKey]]:
+        """
+        Pick up blueprint files that were added, removed or edited.
+
+        Edited blueprints that are currently loaded are recompiled straight away so the next
+        request does not pay for it.  This does blocking I/O and should be run off the event
+        loop.
+
+        :return: {"added": [...], "removed": [...], "reloaded": [...], "failed": [...]}
+        """
+        with self._lock:
+            before = dict(self._paths or {})
+        paths = self.discover()
+        changes = {
+            "added": sorted(set(paths) - set(before)),
+            "removed": sorted(set(before) - set(paths)),
+            "reloaded": [],
+            "failed": [],
+        }
+        for key in changes["removed"]:
+            self.evict(key)
+            self._failed.pop(key, None)
+
+        with self._lock:
+            loaded = list(self._loaded.items())
+        for key, (compiled, _) in loaded:
+            path = paths.get(key)
+            if path is None or self._is_usable(key, compiled, path):
+                continue
+            with self._key_locks.setdefault(key, Lock()):
+                try:
+                    fresh = load_compiled_blueprint(path, self.cache_dir)
+                except Exception as e:
+                    self._record_failure(key, path, e)
+                    changes["failed"].append(key)
+                    continue
+                self._store(key, fresh)
+            if fresh.sha256 != compiled.sha256:
+                logger.info("reloaded blueprint %s %s from %s", key[0], key[1], path)
+                changes["reloaded"].append(key)
+                self._notify(key, fresh)
+        return changes
+
+    def add_listener(self, listener: ReloadListener) -> None:
+        """Call the given function with (key, compiled) whenever a loaded blueprint changes."""
+        self._listeners.append(listener)
+
+    def questionnaire(self, key: BlueprintKey = DEFAULT_BLUEPRINT) -> Dict[str, str]:
+        """Return {parameter: description} for the parameters a session must collect."""
+        if key in BLUEPRINT_QUESTIONNAIRES:
+            return BLUEPRINT_QUESTIONNAIRES[key]
+        return self.get(key).ciq_schema
+
+    def evict(self, key: BlueprintKey) -> bool:
+        """Drop a compiled blueprint from memory; it is reloaded on next use."""
+        with self._lock:
+            entry = self._loaded.pop(key, None)
+            if entry is not None:
+                self._memory_bytes -= entry[1]
+        return entry is not None
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "known": len(self._paths or {}),
+                "loaded": [f"{product}/{version}" for product, version in self._loaded],
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+            }
+
+    def _store(self, key: BlueprintKey, compiled: CompiledBlueprint) -> None:
+        size = estimate_size(compiled)
+        with self._lock:
+            old = self._loaded.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= old[1]
+            self._loaded[key] = (compiled, size)
+            self._memory_bytes += size
+            self._failed.pop(key, None)
+            # Evict least recently used blueprints, but always keep the one just loaded
+            while self._memory_bytes > self.max_memory_bytes and len(self._loaded) > 1:
+                evicted, (_, evicted_size) = self._loaded.popitem(last=False)
+                self._memory_bytes -= evicted_size
+                logger.info("evicted blueprint %s %s from memory", *evicted)
+
+    def _is_usable(self, key: BlueprintKey, compiled: CompiledBlueprint, path: Path) -> bool:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            # Keep serving what we have; the registry will drop it on the next discover()
+            return True
+        signature = (st.st_size, st.st_mtime_ns)
+        if signature == (compiled.source_size, compiled.source_mtime_ns):
+            return True
+        # An edit that already failed to compile - keep the last good version
+        return self._failed.get(key) == signature
+
+    def _record_failure(self, key: BlueprintKey, path: Path, error: Exception) -> None:
+        try:
+            st = path.stat()
+        except OSError:
+            return
+        self._failed[key] = (st.st_size, st.st_mtime_ns)
+        logger.error("could not reload blueprint %s %s from %s, keeping the previous version: %r",
+                     key[0], key[1], path, error)
+
+    def _notify(self, key: BlueprintKey, compiled: CompiledBlueprint) -> None:
+        for listener in self._listeners:
+            try:
+                listener(key, compiled)
+            except Exception:
+                logger.exception("blueprint reload listener %r failed", listener)
+
+
+# Global blueprint registry instance
+blueprint_registry = BlueprintRegistry()
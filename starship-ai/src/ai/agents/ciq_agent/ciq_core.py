@@ -3,14 +3,19 @@
 # Core CIQ Agent logic for parameter collection and chat processing
 #
 
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 import yaml
 
-from .config import BLUEPRINT_PATH, PARAM_DESCRIPTIONS
-from .cudo_client import query_cudo_api
+from ai.tracing import span
+
+from .blueprint_registry import DEFAULT_BLUEPRINT, blueprint_registry
+from .compiled_blueprint import CompiledBlueprint
+from .config import CUDO_CONFIG, INTENT_CLASSIFIER_CONFIG
+from .prefetch import EXPLAIN_QUESTION, fetch_answer, is_explanation_request, prefetcher
+from .render_jobs import RenderJob, render_jobs
 from .session_manager import CIQSession, session_manager
-from .yaml_parser import load_yaml_blueprint
+from .yaml_template import TemplateError
 
 
 class CIQAgent:
@@ -18,26 +23,46 @@ class CIQAgent:
 
     def __init__(self):
         self.session_manager = session_manager
+        self.prefetcher = prefetcher
+        self.render_jobs = render_jobs
 
-    def process_chat_message(self, user_input: str, session_id: Optional[str] = None) -> Dict:
+    def process_chat_message(self, user_input: str, session_id: Optional[str] = None,
+                             blueprint: Optional[Tuple[str, str]] = None,
+                             on_text: Optional[Callable[[str], None]] = None) -> Dict:
         """
         Process a chat message and return response with session state.
 
         Args:
             user_input: User's input message
             session_id: Optional session ID, creates new if None
+            blueprint: (product, version) to pin a newly created session to
+            on_text: called with the response piece by piece, as it is generated (answers from
+                CuDo are streamed, the others come in one piece)
 
         Returns:
             Dict containing response, session_id, and session state
         """
         # Get or create session
-        session_id, session = self.session_manager.get_or_create_session(session_id)
+        with span("session"):
+            session_id, session = self.session_manager.get_or_create_session(session_id,
+                                                                             blueprint)
 
         # Add user message to history
         session.add_message("user", user_input)
 
         # Process input and generate response
-        response_text = self._generate_response(user_input, session)
+        sent: List[str] = []
+
+        def emit(text: str) -> None:
+            sent.append(text)
+            on_text(text)
+
+        response_text = self._generate_response(user_input, session,
+                                                emit if on_text is not None else None)
+        streamed = "".join(sent)
+        if on_text is not None and response_text.startswith(streamed) and \
+                len(response_text) > len(streamed):
+            on_text(response_text[len(streamed):])
 
         # Add assistant response to history
         session.add_message("assistant", response_text)
@@ -49,47 +74,53 @@ class CIQAgent:
             "session_id": session_id,
             "progress": session.get_progress(),
             "is_complete": session.is_complete,
-            "final_yaml": session.final_yaml
+            "final_yaml": session.final_yaml,
+            "yaml_hash": session.yaml_hash,
+            "yaml_version": session.yaml_version,
+            "yaml_job": session.yaml_job
         }
 
-    def _generate_response(self, user_input: str, session: CIQSession) -> str:
-        """Generate appropriate response based on user input and session state."""
+    def _generate_response(self, user_input: str, session: CIQSession,
+                           on_text: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Generate appropriate response based on user input and session state.
+
+        Handlers that can stream their response pass the beginning of it to on_text.
+        """
         if session.is_complete:
             return self._handle_completed_session(user_input, session)
 
         if not session.current_param:
             return "All parameters have been collected! Generating final YAML..."
 
+        # "What is this?" is answered from the prefetched explanation, whatever the classifier
+        # would make of it
+        if is_explanation_request(user_input, session.current_param):
+            return self._handle_technical_query(user_input, session, on_text)
+
         # Classify user intent
         intent = self._classify_intent(user_input, session.current_param)
         if intent == 'param_answer':
             return self._handle_parameter_answer(user_input, session)
         elif intent == 'tech_query':
-            return self._handle_technical_query(user_input, session)
+            return self._handle_technical_query(user_input, session, on_text)
         elif intent == 'skip_done':
             return self._handle_skip_parameter(session)
         else:  # general_silly
             return self._handle_general_query(user_input, session)
 
     def _classify_intent(self, user_input: str, current_param: str) -> str:
-        """Classify user input intent using simple heuristics."""
-        user_lower = user_input.lower().strip()
-
-        # Check for skip/done patterns
-        skip_patterns = ['skip', 'next', 'done', 'later', 'pass']
-        if any(pattern in user_lower for pattern in skip_patterns):
-            return 'skip_done'
-
-        # Check for technical query patterns
-        tech_patterns = ['what is', 'how do', 'explain', 'help', 'configure', 'setup']
-        if any(pattern in user_lower for pattern in tech_patterns):
-            return 'tech_query'
-
-        # Check if it looks like a parameter value (not a question)
-        question_patterns = ['?', 'what', 'how', 'why', 'when', 'where']
-        if not any(pattern in user_lower for pattern in question_patterns):
-            return 'param_answer'
-        return 'general_silly'
+        """Classify user intent locally, asking the LLM only when the classifier is unsure."""
+        # Imported on first use to keep numpy out of server start-up
+        from .intent_classifier import intent_classifier, llm_classify
+
+        fallback = llm_classify if INTENT_CLASSIFIER_CONFIG["llm_fallback"] else None
+        with span("intent") as trace:
+            prediction = intent_classifier.classify(user_input, current_param, fallback=fallback)
+            if trace is not None:
+                trace.set(label=prediction.label, source=prediction.source,
+                          confidence=round(prediction.confidence, 3))
+        return prediction.label
 
     def _handle_parameter_answer(self, user_input: str, session: CIQSession) -> str:
         """Handle when user provides a parameter value."""
@@ -100,40 +131,71 @@ class CIQAgent:
 
         if session.missing_params:
             next_param = session.current_param
-            response += self._generate_question(next_param)
+            self._prefetch_explanation(next_param, session)
+            response += self._generate_question(next_param, session)
         else:
+            self.prefetcher.cancel(session.session_id)
             response += "All parameters collected! Generating your deployment YAML..."
-            session.final_yaml = self._generate_final_yaml(session)
+            self.render_final_yaml(session)
         return response
 
-    def _handle_technical_query(self, user_input: str, session: CIQSession) -> str:
-        """Handle technical questions using CuDo API."""
-        current_param = session.current_param
+    def _handle_technical_query(self, user_input: str, session: CIQSession,
+                                on_text: Optional[Callable[[str], None]] = None) -> str:
+        """Handle technical questions using CuDo API, streaming the answer to on_text if given."""
+        # imported on first use (requests is slow)
+        from .cudo_client import query_cudo_api, stream_cudo_api
 
-        # Add context to the query
-        contextual_query = (
-            f"Context: I'm configuring the CMM parameter '{current_param}' "
-            f"which is: {PARAM_DESCRIPTIONS.get(current_param, '')}\n\n"
-            f"User Question: {user_input}\n\n"
-            f"Please provide relevant information about this parameter or "
-            f"answer the user's question in the context of CMM deployment "
-            f"configuration."
-        )
+        current_param = session.current_param
+        intro = "Here's what I found:\n\n"
         try:
-            cudo_response = query_cudo_api(contextual_query)
+            with span("tech_query") as trace:
+                cudo_response = None
+                if is_explanation_request(user_input, current_param):
+                    # Very likely fetched already, see _prefetch_explanation()
+                    cudo_response = self.prefetcher.take(session.session_id, current_param,
+                                                         timeout=CUDO_CONFIG["timeout"])
+                    if trace is not None:
+                        trace.set(prefetched=cudo_response is not None)
+                query = self._contextual_query(current_param, user_input, session)
+                if cudo_response is None and on_text is not None:
+                    pieces = []
+                    for piece in stream_cudo_api(query):
+                        if not pieces:
+                            on_text(intro)
+                        pieces.append(piece)
+                        on_text(piece)
+                    cudo_response = "".join(pieces)
+                elif cudo_response is None:
+                    cudo_response = query_cudo_api(query)
             response = (
-                f"Here's what I found:\n\n{cudo_response}\n\n"
+                f"{intro}{cudo_response}\n\n"
                 f"Now, back to the configuration. "
-                f"{self._generate_question(current_param)}"
+                f"{self._generate_question(current_param, session)}"
             )
         except Exception:
             response = (
                 f"I couldn't retrieve information right now. "
                 f"Let's continue with the configuration. "
-                f"{self._generate_question(current_param)}"
+                f"{self._generate_question(current_param, session)}"
             )
         return response
 
+    def _contextual_query(self, param: str, question: str, session: CIQSession) -> str:
+        """Return a question about a parameter, with the context CuDo needs to answer it."""
+        return (
+            f"Context: I'm configuring the CMM parameter '{param}' "
+            f"which is: {session.parameters.get(param, '')}\n\n"
+            f"User Question: {question}\n\n"
+            f"Please provide relevant information about this parameter or "
+            f"answer the user's question in the context of CMM deployment "
+            f"configuration."
+        )
+
+    def _prefetch_explanation(self, param: str, session: CIQSession) -> None:
+        """Start fetching the explanation of the parameter asked for next, in the background."""
+        query = self._contextual_query(param, EXPLAIN_QUESTION, session)
+        self.prefetcher.start(session.session_id, param, lambda: fetch_answer(query))
+
     def _handle_skip_parameter(self, session: CIQSession) -> str:
         """Handle when user wants to skip current parameter."""
         if len(session.missing_params) <= 1:
@@ -146,10 +208,11 @@ class CIQAgent:
         params_list = sorted(session.missing_params)
         current_index = params_list.index(session.current_param)
         session.current_param = params_list[(current_index + 1) % len(params_list)]
+        self.prefetcher.cancel(session.session_id)
 
         return (
             f"No problem, we can come back to that later. "
-            f"{self._generate_question(session.current_param)}"
+            f"{self._generate_question(session.current_param, session)}"
         )
 
     def _handle_general_query(self, user_input: str, session: CIQSession) -> str:
@@ -157,23 +220,23 @@ class CIQAgent:
         return (
             f"That's an interesting question! My main focus is helping you "
             f"configure CMM deployment parameters. Let's get back to it. "
-            f"{self._generate_question(session.current_param)}"
+            f"{self._generate_question(session.current_param, session)}"
         )
 
     def _handle_completed_session(self, user_input: str, session: CIQSession) -> str:
         """Handle messages after all parameters are collected."""
         if 'regenerate' in user_input.lower() or 'generate again' in user_input.lower():
-            session.final_yaml = self._generate_final_yaml(session)
-            return "I've regenerated the YAML configuration for you!"
+            self.render_final_yaml(session)
+            return "I'm regenerating the YAML configuration for you!"
 
         return (
             "All parameters have been collected and your YAML is ready! "
             "You can download it or ask me to regenerate it if needed."
         )
 
-    def _generate_question(self, param: str) -> str:
+    def _generate_question(self, param: str, session: CIQSession) -> str:
         """Generate a friendly question for a parameter."""
-        description = PARAM_DESCRIPTIONS.get(param, "")
+        description = session.parameters.get(param, "")
         param_display = param.replace("global.", "").replace(".", " ")
 
         return (
@@ -181,30 +244,73 @@ class CIQAgent:
             f"({description})"
         )
 
+    def render_final_yaml(self, session: CIQSession,
+                          callback_url: Optional[str] = None) -> RenderJob:
+        """
+        Generate the session's final YAML in the background, unless that is in progress already.
+
+        Args:
+            session: a complete session
+            callback_url: URL to POST the job status to once the YAML is ready
+
+        Returns:
+            The render job; session.final_yaml is set when it is done
+        """
+        def render() -> CIQSession:
+            session.set_final_yaml(self._generate_final_yaml(session))
+            return session
+
+        job = self.render_jobs.submit(session.session_id, render, callback_url)
+        session.yaml_job = job.id
+        return job
+
     def _generate_final_yaml(self, session: CIQSession) -> str:
         """Generate final YAML configuration from collected parameters."""
         try:
-            # Load blueprint
-            blueprint_dict = load_yaml_blueprint(str(BLUEPRINT_PATH))
-            if not blueprint_dict:
-                return "Error: Could not load YAML blueprint."
-
-            # Convert collected values to nested dict structure
-            nested_values = self._convert_to_nested_dict(session.collected_values)
-
-            # Merge values into blueprint
-            merged_dict = self._deep_merge(blueprint_dict, nested_values)
-
-            # Convert back to YAML string
-            return yaml.dump(
-                merged_dict,
-                default_flow_style=False,
-                sort_keys=False,
-                indent=2
-            )
+            # Splice the values into the compiled blueprint text.  This keeps the blueprint's
+            # comments and formatting and only touches the collected parameters.
+            with span("yaml_render"):
+                return self._blueprint(session).template.render(session.collected_values)
+        except FileNotFoundError:
+            return "Error: Could not load YAML blueprint."
+        except TemplateError:
+            # The values reshape the document (e.g. descend into a list) - do a full merge
+            return self._merge_final_yaml(session)
         except Exception as e:
             return f"Error generating YAML: {str(e)}"
 
+    def _merge_final_yaml(self, session: CIQSession) -> str:
+        """Generate final YAML by merging collected parameters into the loaded blueprint."""
+        try:
+            with span("yaml_merge"):
+                # Use the blueprint's precompiled tree (_deep_merge copies rather than mutates it)
+                blueprint_dict = self._blueprint(session).tree
+                if not blueprint_dict:
+                    return "Error: Could not load YAML blueprint."
+
+                # Convert collected values to nested dict structure
+                nested_values = self._convert_to_nested_dict(session.collected_values)
+
+                # Merge values into blueprint
+                merged_dict = self._deep_merge(blueprint_dict, nested_values)
+
+                # Convert back to YAML string
+                return yaml.dump(
+                    merged_dict,
+                    default_flow_style=False,
+                    sort_keys=False,
+                    indent=2
+                )
+        except Exception as e:
+            return f"Error generating YAML: {str(e)}"
+
+    @staticmethod
+    def _blueprint(session: CIQSession) -> CompiledBlueprint:
+        """Return the blueprint the session was created with, even if it has been reloaded."""
+        if session.compiled is not None:
+            return session.compiled
+        return blueprint_registry.get(session.blueprint)
+
     def _convert_to_nested_dict(self, flat_dict: Dict[str, str]) -> Dict:
         """Convert flat dot-notation dict to nested dict."""
         result = {}
@@ -236,16 +342,20 @@ class CIQAgent:
 
         return session.get_progress()
 
-    def get_parameters_schema(self) -> Dict[str, Dict]:
-        """Get the full parameters schema for payload generation."""
+    def get_parameters_schema(
+        self,
+        blueprint: Tuple[str, str] = DEFAULT_BLUEPRINT
+    ) -> Dict[str, Dict]:
+        """Get the full parameters schema of a blueprint for payload generation."""
         schema = {}
-        for param, description in PARAM_DESCRIPTIONS.items():
+        for param, description in blueprint_registry.questionnaire(blueprint).items():
             # Convert dot notation to field name for API compatibility
             field_name = param.replace("global.", "").replace(".", "_")
             schema[field_name] = {
                 "type": "string",
                 "x-displayName": description,
                 "x-order": 1,
+                "x-value": "",
                 "original_param": param
             }
         return schema
@@ -0,0 +1,207 @@
+# Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+#
+# Precompiled blueprint artifacts.
+#
+# Compiling a blueprint (CIQ schema, ordered parameter table, parsed tree and template offsets)
+# is done once and stored as an artifact in the blueprint cache directory.  Later processes load
+# the artifact instead of re-parsing the blueprint.  An artifact is trusted when the
+# blueprint's size and mtime are unchanged, and otherwise only when the blueprint's content hash
+# still matches - so touching a file costs a hash, and editing it forces a recompile.
+#
+# Artifacts hold data only (JSON), since the cache directory may be shared: a tampered artifact
+# can at worst produce a wrong template, never run code.
+#
+# Usage (e.g. at image build time):
+#     python -m ai.agents.ciq_agent.compiled_blueprint [blueprint ...]
+#
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import yaml
+
+from .config import BLUEPRINT_CACHE_DIR, BLUEPRINT_PATH
+from .yaml_template import BlueprintTemplate, TemplateNode
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever CompiledBlueprint or BlueprintTemplate change shape, or compiling changes
+ARTIFACT_VERSION = 3
+ARTIFACT_MAGIC = b'CIQBP'
+
+
+@dataclass
+class CompiledBlueprint:
+    """Everything derived from a blueprint file that is needed at runtime."""
+
+    source: str
+    sha256: str
+    source_size: int
+    source_mtime_ns: int
+    template: BlueprintTemplate
+    ciq_schema: Dict[str, str] = field(default_factory=dict)
+    params: List[str] = field(default_factory=list)
+    tree: Any = None
+
+    @property
+    def text(self) -> str:
+        return self.template.text
+
+
+def compile_blueprint(path: Union[str, Path]) -> CompiledBlueprint:
+    """
+    Parse and index the blueprint at the given path.
+
+    :raises ValueError: if the blueprint is not a YAML mapping
+    :raises yaml.YAMLError: if the blueprint is not valid YAML
+    """
+    path = Path(path)
+    raw = path.read_bytes()
+    st = path.stat()
+    text = raw.decode('utf-8')
+    tree = yaml.safe_load(text)
+    if not isinstance(tree, dict):
+        raise ValueError(f"blueprint {path} is not a YAML mapping")
+    template = BlueprintTemplate.compile(text)
+    ciq_schema = template.ciq_params()
+    return CompiledBlueprint(source=str(path),
+                             sha256=hashlib.sha256(raw).hexdigest(),
+                             source_size=st.st_size,
+                             source_mtime_ns=st.st_mtime_ns,
+                             template=template,
+                             ciq_schema=ciq_schema,
+                             params=sorted(ciq_schema.keys()),
+                             tree=tree)
+
+
+def artifact_path(path: Union[str, Path], cache_dir: Union[str, Path, None] = None) -> Path:
+    """Return where the compiled artifact for the given blueprint is stored."""
+    path = Path(path).resolve()
+    cache_dir = Path(cache_dir) if cache_dir is not None else BLUEPRINT_CACHE_DIR
+    # Include a digest of the full path so blueprints with the same name do not collide
+    digest = hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:12]
+    return cache_dir / f"{path.name}.{digest}.v{ARTIFACT_VERSION}.ciqbp"
+
+
+def _to_record(compiled: CompiledBlueprint) -> dict:
+    template = compiled.template
+    record = {'source': compiled.source,
+              'sha256': compiled.sha256,
+              'source_size': compiled.source_size,
+              'source_mtime_ns': compiled.source_mtime_ns,
+              'template': {'text': template.text,
+                           'newline': template.newline,
+                           'root_child_indent': template.root_child_indent,
+                           'nodes': [asdict(node) for node in template.nodes.values()]},
+              'ciq_schema': compiled.ciq_schema,
+              'params': compiled.params,
+              'tree': None}
+    # Only keep the parsed tree if JSON gives it back unchanged (no dates, non-string keys, ...)
+    try:
+        if json.loads(json.dumps(compiled.tree)) == compiled.tree:
+            record['tree'] = compiled.tree
+    except (TypeError, ValueError):
+        pass
+    return record
+
+
+def _from_record(record: dict) -> CompiledBlueprint:
+    data = record['template']
+    nodes = [TemplateNode(**node) for node in data['nodes']]
+    template = BlueprintTemplate(text=data['text'],
+                                 newline=data['newline'],
+                                 nodes={node.path: node for node in nodes},
+                                 root_child_indent=data['root_child_indent'])
+    tree = record['tree']
+    if tree is None:
+        tree = yaml.safe_load(template.text)
+    return CompiledBlueprint(source=record['source'],
+                             sha256=record['sha256'],
+                             source_size=record['source_size'],
+                             source_mtime_ns=record['source_mtime_ns'],
+                             template=template,
+                             ciq_schema=dict(record['ciq_schema']),
+                             params=list(record['params']),
+                             tree=tree)
+
+
+def _read_artifact(artifact: Path) -> Optional[CompiledBlueprint]:
+    try:
+        with open(artifact, 'rb') as f:
+            if f.read(len(ARTIFACT_MAGIC)) != ARTIFACT_MAGIC:
+                return None
+            return _from_record(json.loads(f.read().decode('utf-8')))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("ignoring unreadable blueprint artifact %s: %r", artifact, e)
+        return None
+
+
+def _write_artifact(artifact: Path, compiled: CompiledBlueprint) -> None:
+    # Write to a temp file and rename so concurrent processes never see a partial artifact
+    try:
+        artifact.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=artifact.parent, prefix=artifact.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(ARTIFACT_MAGIC)
+                f.write(json.dumps(_to_record(compiled), separators=(',', ':')).encode('utf-8'))
+            os.replace(tmp, artifact)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError as e:
+        logger.warning("could not write blueprint artifact %s: %r", artifact, e)
+
+
+def _is_current(compiled: CompiledBlueprint, path: Path, st: os.stat_result) -> bool:
+    if compiled.source_size == st.st_size and compiled.source_mtime_ns == st.st_mtime_ns:
+        return True
+    if compiled.source_size != st.st_size:
+        return False
+    return hashlib.sha256(path.read_bytes()).hexdigest() == compiled.sha256
+
+
+def load_compiled_blueprint(path: Union[str, Path] = BLUEPRINT_PATH,
+                            cache_dir: Union[str, Path, None] = None) -> CompiledBlueprint:
+    """
+    Return the compiled form of the given blueprint.
+
+    The on-disk artifact is used when it is current and the blueprint is only parsed when it is
+    not.  Nothing is kept in memory here - callers that want that should go through the
+    blueprint registry.
+    """
+    path = Path(path)
+    st = path.stat()
+    artifact = artifact_path(path, cache_dir)
+    compiled = _read_artifact(artifact)
+    if compiled is None or not _is_current(compiled, path, st):
+        logger.info("compiling blueprint %s", path)
+        compiled = compile_blueprint(path)
+        _write_artifact(artifact, compiled)
+    elif compiled.source_mtime_ns != st.st_mtime_ns:
+        # Same content, new mtime (e.g. re-checkout) - refresh so the next load skips hashing
+        compiled.source_mtime_ns = st.st_mtime_ns
+        _write_artifact(artifact, compiled)
+    compiled.source = str(path)
+    return compiled
+
+
+def main(argv: Optional[List[str]] = None) -> int:  # pragma: nocover
+    paths = (argv if argv is not None else sys.argv[1:]) or [str(BLUEPRINT_PATH)]
+    for path in paths:
+        compiled = load_compiled_blueprint(path)
+        print(f"{path}: {len(compiled.params)} CIQ parameters, sha256 {compiled.sha256[:12]} "
+              f"-> {artifact_path(path)}")
+    return 0
+
+
+if __name__ == '__main__':  # pragma: nocover
+    exit(main())
@@ -3,6 +3,7 @@
 # Configuration settings for CIQ Agent
 #
 
+import os
 from pathlib import Path
 
 # Get the directory where this config file is located
@@ -11,6 +12,27 @@ CIQ_AGENT_DIR = Path(__file__).parent
 # Path to the golden config YAML blueprint
 BLUEPRINT_PATH = CIQ_AGENT_DIR / "golden_config_CMM_yaml.txt"
 
+# Where compiled blueprint artifacts are kept (see compiled_blueprint.py)
+BLUEPRINT_CACHE_DIR = Path(
+    os.getenv("CIQ_BLUEPRINT_CACHE_DIR", str(CIQ_AGENT_DIR / ".blueprint_cache"))
+)
+
+# Where generated parameter questions are persisted (see question_bank.py)
+QUESTION_BANK_PATH = Path(
+    os.getenv("CIQ_QUESTION_BANK_PATH", str(BLUEPRINT_CACHE_DIR / "questions.json"))
+)
+
+# Blueprint registry: blueprints are discovered in BLUEPRINT_DIR by file name
+# (golden_config_<product>[_<version>]_yaml.txt).  A blueprint without a version in its name is
+# registered as DEFAULT_BLUEPRINT_VERSION.
+BLUEPRINT_DIR = Path(os.getenv("CIQ_BLUEPRINT_DIR", str(CIQ_AGENT_DIR)))
+DEFAULT_BLUEPRINT_PRODUCT = "CMM"
+DEFAULT_BLUEPRINT_VERSION = "default"
+
+DEFAULT_REGISTRY_CONFIG = {
+    "max_memory_bytes": 64 * 1024 * 1024  # approximate cap for compiled blueprints in memory
+}
+
 # CIQ Parameter descriptions mapping
 PARAM_DESCRIPTIONS = {
     "global.alms.host_interface": "ALMS host network interface configuration",
@@ -48,6 +70,12 @@ PARAM_DESCRIPTIONS = {
     "global.containers.timezone": "System timezone configuration for containers"
 }
 
+# Questionnaires that override a blueprint's '# CIQ:' markers, keyed by (product, version).
+# Blueprints not listed here ask for their CIQ-marked parameters.
+BLUEPRINT_QUESTIONNAIRES = {
+    (DEFAULT_BLUEPRINT_PRODUCT, DEFAULT_BLUEPRINT_VERSION): PARAM_DESCRIPTIONS
+}
+
 # Default CIQ session configuration
 DEFAULT_SESSION_CONFIG = {
     "max_session_duration": 3600,  # 1 hour in seconds
@@ -55,11 +83,23 @@ DEFAULT_SESSION_CONFIG = {
     "max_concurrent_sessions": 100
 }
 
-# CuDo API configuration
+# CuDo API configuration (CUDO_BASE_URL points the client elsewhere, e.g. at a fake CuDo server)
+CUDO_BASE_URL = os.getenv("CUDO_BASE_URL", "https://athena-cudo.ati.dyn.tre.nsn-rdnet.net")
 CUDO_CONFIG = {
-    "base_url": "https://athena-cudo.ati.dyn.tre.nsn-rdnet.net/generator/generator/v2/chat/",
+    "base_url": f"{CUDO_BASE_URL}/generator/generator/v2/chat/",
     "user_id": "4201337",
     "chat_id": "ciq_assistant",
     "max_retries": 3,
     "timeout": 30
 }
+
+# Intent classifier configuration
+INTENT_MODEL_PATH = CIQ_AGENT_DIR / "intent_model.npz"
+INTENT_TRAINING_PATH = CIQ_AGENT_DIR / "intent_training.jsonl"
+INTENT_CLASSIFIER_CONFIG = {
+    # Messages the local model is less sure about than this are classified by the LLM
+    "confidence_threshold": float(os.getenv("CIQ_INTENT_CONFIDENCE_THRESHOLD", "0.6")),
+    # Whether the API asks the LLM at all.  Off by default: the API classifies on the event
+    # loop, where a blocking Bedrock call would stall every other request.
+    "llm_fallback": os.getenv("CIQ_INTENT_LLM_FALLBACK", "false").lower() == "true"
+}
@@ -1,24 +1,22 @@
 # Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
 #
-# Robust CuDo API Client with comprehensive error handling and retry mechanisms.
-# Handles 500 internal server errors and other common API issues.
+# CuDo API client, with errors classified into user-friendly messages.  The queries go
+# through the LLM gateway, which retries them (500 internal server errors and the like).
 #
 
-import json
 import logging
-import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Dict, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Union
 
-import requests
-import urllib3
+from ..llm_gateway import LLM_GATEWAY, LLMUnavailable
+from ..llm_providers import HTTP_POOL, CudoBackend
+from .config import CUDO_CONFIG
 
-# Suppress InsecureRequestWarning
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+if TYPE_CHECKING:  # pragma: nocover
+    import requests
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -47,26 +45,43 @@ class CudoResponse:
 
 
 class CudoAPIClient:
-    """Robust CuDo API client with retry mechanisms and comprehensive error handling."""
+    """
+    CuDo API client.
+
+    Queries go through the LLM gateway (ai/agents/llm_gateway.py), which retries them within its
+    retry budget and shares its connection pool, cache and limits with the other LLM clients.
+    """
 
     def __init__(
         self,
-        base_url: str = (
-            "https://athena-cudo.ati.dyn.tre.nsn-rdnet.net/generator/"
-            "generator/v2/chat/"
-        ),
+        base_url: str = CUDO_CONFIG["base_url"],
         max_retries: int = 3,
-        retry_delay: float = 1.0,
         timeout: int = 30,
         user_id: str = "4201337",
-        chat_id: str = "cmm_assistant"
+        chat_id: str = "cmm_assistant",
+        verify: Union[bool, str] = False,
+        route: Optional[str] = None
     ):
+        """
+        Create a client.
+
+        Args:
+            base_url: URL of the CuDo chat API
+            max_retries: most times a failed query is retried
+            timeout: seconds to wait for an answer
+            user_id: user the queries are made for
+            chat_id: conversation the queries belong to
+            verify: TLS certificate verification: False, True or the path of a CA bundle
+            route: send the queries to the CuDo backends of this LLM route (whose settings are
+                then used instead of the ones above) rather than to base_url
+        """
         self.base_url = base_url
         self.max_retries = max_retries
-        self.retry_delay = retry_delay
         self.timeout = timeout
         self.user_id = user_id
         self.chat_id = chat_id
+        self.verify = verify
+        self.route = route
 
         # Default headers
         self.headers = {
@@ -75,22 +90,39 @@ class CudoAPIClient:
         }
 
         # Default athena options
-        self.default_athena_options = {
-            "user_id": self.user_id,
-            "chat_id": self.chat_id,
-            "indexes": ["cudo_cloud_mobility_manager_25_7_agora_index"],
-            "llm_server": "tgi",
-            "db_choice": "opensearch",
-            "use_dense": True,
-            "use_sparse": False
-        }
+        self.default_athena_options = dict(CudoBackend.DEFAULT_ATHENA_OPTIONS,
+                                           user_id=self.user_id, chat_id=self.chat_id)
+
+    @contextmanager
+    def session(self) -> Iterator['requests.Session']:
+        """Borrow an idle session of the LLM gateway's connection pool."""
+        with HTTP_POOL.session() as session:
+            yield session
+
+    def connect(self) -> int:
+        """
+        Open a connection to the CuDo API so the first query does not pay for TCP and TLS setup.
+
+        Returns:
+            The HTTP status of the (HEAD) request; any status means the connection is pooled
+        """
+        with self.session() as session:
+            response = session.head(
+                self.base_url,
+                headers=self.headers,
+                verify=self.verify,
+                timeout=self.timeout
+            )
+        return response.status_code
 
     def _classify_error(
         self,
-        response: requests.Response,
+        response: Optional['requests.Response'],
         exception: Optional[Exception] = None,
     ) -> CudoErrorType:
         """Classify the type of error based on response or exception."""
+        import requests
+
         if exception:
             if isinstance(exception, requests.exceptions.Timeout):
                 return CudoErrorType.TIMEOUT_ERROR
@@ -101,7 +133,8 @@ class CudoAPIClient:
             else:
                 return CudoErrorType.UNKNOWN_ERROR
 
-        if response:
+        # (A response is falsy when its status is an error, so compare with None)
+        if response is not None:
             if response.status_code == 401 or response.status_code == 403:
                 return CudoErrorType.AUTHENTICATION_ERROR
             elif response.status_code == 429:
@@ -113,31 +146,17 @@ class CudoAPIClient:
 
         return CudoErrorType.UNKNOWN_ERROR
 
-    def _should_retry(self, error_type: CudoErrorType, attempt: int) -> bool:
-        """Determine if we should retry based on error type and attempt number."""
-        if attempt >= self.max_retries:
-            return False
-
-        # Retry on server errors, network errors, and timeouts
-        retry_on = {
-            CudoErrorType.SERVER_ERROR,
-            CudoErrorType.NETWORK_ERROR,
-            CudoErrorType.TIMEOUT_ERROR,
-            CudoErrorType.RATE_LIMIT_ERROR
-        }
-
-        return error_type in retry_on
-
-    def _calculate_retry_delay(self, attempt: int, error_type: CudoErrorType) -> float:
-        """Calculate retry delay with exponential backoff."""
-        base_delay = self.retry_delay
-
-        # Longer delay for rate limiting
-        if error_type == CudoErrorType.RATE_LIMIT_ERROR:
-            base_delay *= 5
-
-        # Exponential backoff: delay = base_delay * (2 ^ attempt)
-        return base_delay * (2 ** attempt)
+    def _backend(
+        self,
+        model: str = "meta-llama/Llama-3.3-70B-Instruct",
+        custom_athena_options: Optional[Dict[str, Any]] = None
+    ) -> CudoBackend:
+        """Return the gateway backend making this client's queries."""
+        athena_options = self.default_athena_options.copy()
+        if custom_athena_options:
+            athena_options.update(custom_athena_options)
+        return CudoBackend("cudo", self.base_url, model, self.timeout, self.verify,
+                           self.headers, athena_options)
 
     def _build_payload(
         self,
@@ -148,52 +167,7 @@ class CudoAPIClient:
         custom_athena_options: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Build the API payload."""
-        athena_options = self.default_athena_options.copy()
-        if custom_athena_options:
-            athena_options.update(custom_athena_options)
-
-        return {
-            "model": model,
-            "messages": [{"role": "user", "content": query}],
-            "max_tokens": max_tokens,
-            "stream": stream,
-            "athena_options": athena_options
-        }
-
-    def _parse_response(self, response_data: Union[Dict, list]) -> str:
-        """Parse the API response and extract content."""
-        try:
-            # Handle list response (as in your original code)
-            if isinstance(response_data, list) and len(response_data) > 0:
-                first_item = response_data[0]
-                if 'choices' in first_item and len(first_item['choices']) > 0:
-                    choice = first_item['choices'][0]
-                    if 'message' in choice and 'content' in choice['message']:
-                        return choice['message']['content']
-
-            # Handle direct dict response
-            elif isinstance(response_data, dict):
-                if 'choices' in response_data and len(response_data['choices']) > 0:
-                    choice = response_data['choices'][0]
-                    if 'message' in choice and 'content' in choice['message']:
-                        return choice['message']['content']
-
-                # Handle other possible response formats
-                if 'content' in response_data:
-                    return response_data['content']
-                if 'text' in response_data:
-                    return response_data['text']
-
-            # If we can't parse the expected format, return a descriptive error
-            logger.warning(f"Unexpected response format: {response_data}")
-            return (
-                "I received a response from CuDo, but it was in an unexpected format. "
-                "Please try rephrasing your question."
-            )
-
-        except Exception as e:
-            logger.error(f"Error parsing CuDo response: {e}")
-            return f"Error parsing the response from CuDo: {str(e)}"
+        return self._backend(model, custom_athena_options).payload("", query, max_tokens, stream)
 
     def query(
         self,
@@ -203,7 +177,7 @@ class CudoAPIClient:
         custom_athena_options: Optional[Dict[str, Any]] = None
     ) -> CudoResponse:
         """
-        Query the CuDo API with robust error handling and retry logic.
+        Query the CuDo API through the LLM gateway.
 
         Args:
             query: The question/query to send to CuDo
@@ -214,114 +188,36 @@ class CudoAPIClient:
         Returns:
             CudoResponse object with success status and content/error information
         """
-        payload = self._build_payload(query, model, max_tokens, False, custom_athena_options)
-
-        for attempt in range(self.max_retries + 1):
-            try:
-                logger.info(
-                    "CuDo API attempt %s/%s for query: %s...",
-                    attempt + 1,
-                    self.max_retries + 1,
-                    query[:50],
-                )
-
-                response = requests.post(
-                    self.base_url,
-                    headers=self.headers,
-                    data=json.dumps(payload),
-                    verify=False,
-                    timeout=self.timeout
-                )
-
-                # Log response details for debugging
-                logger.info(f"CuDo API response status: {response.status_code}")
-
-                # Handle successful response
-                if response.status_code == 200:
-                    try:
-                        response_data = response.json()
-                        content = self._parse_response(response_data)
-
-                        return CudoResponse(
-                            success=True,
-                            content=content,
-                            status_code=response.status_code,
-                            raw_response=response_data
-                        )
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Failed to parse JSON response: {e}")
-                        return CudoResponse(
-                            success=False,
-                            error_message=f"Invalid JSON response from CuDo API: {str(e)}",
-                            error_type=CudoErrorType.SERVER_ERROR,
-                            status_code=response.status_code
-                        )
-
-                # Handle error responses
-                error_type = self._classify_error(response)
-                error_message = f"CuDo API returned status {response.status_code}"
-
-                # Try to get error details from response
-                try:
-                    error_data = response.json()
-                    if 'error' in error_data:
-                        error_message += f": {error_data['error']}"
-                    elif 'message' in error_data:
-                        error_message += f": {error_data['message']}"
-                except Exception:
-                    # If we can't parse error response, use the text
-                    if response.text:
-                        error_message += f": {response.text[:200]}"
-
-                logger.warning(f"CuDo API error: {error_message}")
-
-                # Check if we should retry
-                if self._should_retry(error_type, attempt):
-                    delay = self._calculate_retry_delay(attempt, error_type)
-                    logger.info(f"Retrying in {delay:.2f} seconds...")
-                    time.sleep(delay)
-                    continue
-                else:
-                    return CudoResponse(
-                        success=False,
-                        error_message=error_message,
-                        error_type=error_type,
-                        status_code=response.status_code
-                    )
-
-            except requests.exceptions.Timeout:
-                error_type = CudoErrorType.TIMEOUT_ERROR
-                error_message = f"CuDo API request timed out after {self.timeout} seconds"
-                logger.warning(error_message)
-
-            except requests.exceptions.ConnectionError as e:
-                error_type = CudoErrorType.NETWORK_ERROR
-                error_message = f"Failed to connect to CuDo API: {str(e)}"
-                logger.warning(error_message)
-
-            except requests.exceptions.RequestException as e:
-                error_type = CudoErrorType.NETWORK_ERROR
-                error_message = f"CuDo API request failed: {str(e)}"
-                logger.warning(error_message)
-
-            except Exception as e:
-                error_type = CudoErrorType.UNKNOWN_ERROR
-                error_message = f"Unexpected error during CuDo API call: {str(e)}"
-                logger.error(error_message)
-
-            # Check if we should retry for exceptions
-            if self._should_retry(error_type, attempt):
-                delay = self._calculate_retry_delay(attempt, error_type)
-                logger.info(f"Retrying in {delay:.2f} seconds...")
-                time.sleep(delay)
-            else:
-                break
-
-        # If we've exhausted all retries
+        logger.info("CuDo API query: %s...", query[:50])
+        backend = None if self.route else self._backend(model, custom_athena_options)
+        try:
+            content = LLM_GATEWAY.complete(self.route or "cudo", "", query, max_tokens,
+                                           backend=backend, attempts=self.max_retries + 1)
+        except LLMUnavailable as e:
+            return self._failure(e)
+        return CudoResponse(success=True, content=content, status_code=200)
+
+    def _failure(self, e: LLMUnavailable) -> CudoResponse:
+        """Describe why the gateway could not get an answer."""
+        import requests
+
+        error = e.__cause__ or e
+        response = error.response if isinstance(error, requests.HTTPError) else None
+        error_type = self._classify_error(response, None if response is not None else error)
+        if isinstance(error, requests.exceptions.Timeout):
+            error_message = f"CuDo API request timed out after {self.timeout} seconds"
+        elif response is not None:
+            error_message = f"CuDo API returned status {response.status_code}"
+            if response.text:
+                error_message += f": {response.text[:200]}"
+        else:
+            error_message = f"CuDo API request failed: {error}"
+        logger.warning("CuDo API error: %s", error_message)
         return CudoResponse(
             success=False,
             error_message=error_message,
-            error_type=error_type
+            error_type=error_type,
+            status_code=getattr(response, "status_code", None)
         )
 
     def query_simple(self, query: str) -> str:
@@ -340,42 +236,73 @@ class CudoAPIClient:
 
         if response.success:
             return response.content
+        return self._error_message(response)
+
+    def stream_simple(self, query: str, max_tokens: int = 500) -> Iterator[str]:
+        """
+        Like query_simple(), but yield the answer piece by piece as CuDo generates it.
+
+        An error before the first piece gives the same messages as query_simple(); an error
+        after it ends the answer there.
+        """
+        logger.info("CuDo API streamed query: %s...", query[:50])
+        backend = None if self.route else self._backend()
+        pieces = LLM_GATEWAY.stream(self.route or "cudo", "", query, max_tokens,
+                                    backend=backend)
+        started = False
+        try:
+            for piece in pieces:
+                started = True
+                yield piece
+        except LLMUnavailable as e:
+            if not started:
+                yield self._error_message(self._failure(e))
+        except Exception as e:
+            if not started:
+                raise
+            logger.warning("CuDo API stream broken off: %r", e)
+        finally:
+            pieces.close()
+
+    def _error_message(self, response: CudoResponse) -> str:
+        """Return a user-friendly message for a failed query."""
+        if response.error_type == CudoErrorType.NETWORK_ERROR:
+            return (
+                "I'm having trouble connecting to the CuDo knowledge base. "
+                "Please check your internet connection and try again."
+            )
+        elif response.error_type == CudoErrorType.SERVER_ERROR:
+            return (
+                "The CuDo knowledge base is currently experiencing issues (server error). "
+                "Please try again in a few moments."
+            )
+        elif response.error_type == CudoErrorType.TIMEOUT_ERROR:
+            return (
+                "The CuDo knowledge base is taking too long to respond. "
+                "Please try a simpler question or try again later."
+            )
+        elif response.error_type == CudoErrorType.AUTHENTICATION_ERROR:
+            return (
+                "There's an authentication issue with the CuDo knowledge base. "
+                "Please contact your administrator."
+            )
+        elif response.error_type == CudoErrorType.RATE_LIMIT_ERROR:
+            return (
+                "Too many requests to CuDo. Please wait a moment before asking another "
+                "question."
+            )
         else:
-            # Return user-friendly error messages
-            if response.error_type == CudoErrorType.NETWORK_ERROR:
-                return (
-                    "I'm having trouble connecting to the CuDo knowledge base. "
-                    "Please check your internet connection and try again."
-                )
-            elif response.error_type == CudoErrorType.SERVER_ERROR:
-                return (
-                    "The CuDo knowledge base is currently experiencing issues (server error). "
-                    "Please try again in a few moments."
-                )
-            elif response.error_type == CudoErrorType.TIMEOUT_ERROR:
-                return (
-                    "The CuDo knowledge base is taking too long to respond. "
-                    "Please try a simpler question or try again later."
-                )
-            elif response.error_type == CudoErrorType.AUTHENTICATION_ERROR:
-                return (
-                    "There's an authentication issue with the CuDo knowledge base. "
-                    "Please contact your administrator."
-                )
-            elif response.error_type == CudoErrorType.RATE_LIMIT_ERROR:
-                return (
-                    "Too many requests to CuDo. Please wait a moment before asking another "
-                    "question."
-                )
-            else:
-                return (
-                    "I encountered an issue while querying the CuDo knowledge base: "
-                    f"{response.error_message}"
-                )
+            return (
+                "I encountered an issue while querying the CuDo knowledge base: "
+                f"{response.error_message}"
+            )
 
 
 # Create a default client instance for easy use
-default_cudo_client = CudoAPIClient()
+# (Queries from the CIQ chat, answered by the CuDo backends of the ciq_docs route)
+default_cudo_client = CudoAPIClient(route="ciq_docs")
+# (Answers fetched ahead of time, see prefetch.py: not worth retrying)
+prefetch_cudo_client = CudoAPIClient(max_retries=0, route="ciq_docs")
 
 
 def query_cudo_api(query: str) -> str:
@@ -383,6 +310,11 @@ def query_cudo_api(query: str) -> str:
     return default_cudo_client.query_simple(query)
 
 
+def stream_cudo_api(query: str) -> Iterator[str]:
+    """Like query_cudo_api(), but yield the answer piece by piece."""
+    return default_cudo_client.stream_simple(query)
+
+
 # Example usage and testing
 if __name__ == "__main__":
     # Test the CuDo client
@@ -0,0 +1,376 @@
+# Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+#
+# Local intent classifier for CIQ chat messages.
+#
+# Every message is classified as one of INTENTS.  Messages that are unambiguous as a whole
+# (greetings, "skip", "what is an MCC?", "is this required?", and a path, IP address or
+# identifier given while a parameter is asked for) are matched by compiled whole-message rules,
+# so a value such as "nextgen" or "passw0rd!" is never mistaken for "next" or "pass".
+# Everything else goes through a small linear model over hashed character n-grams, evaluated
+# with NumPy.  The model's probabilities are temperature-calibrated on held-out data, and only
+# messages it is unsure about (confidence below the threshold) are sent to the LLM, when a
+# fallback is given.
+#
+# Training (writes the model next to this file):
+#     python -m ai.agents.ciq_agent.intent_classifier train [transcripts.jsonl ...]
+# Transcripts are JSON lines of {"text": ..., "label": ...}; intent_training.jsonl is the seed
+# set the shipped model is trained on.
+#
+import json
+import logging
+import re
+import sys
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .config import (
+    INTENT_CLASSIFIER_CONFIG, INTENT_MODEL_PATH, INTENT_TRAINING_PATH, PARAM_DESCRIPTIONS)
+from .prefetch import is_explanation_request
+
+logger = logging.getLogger(__name__)
+
+INTENTS = ('param_answer', 'tech_query', 'skip_done', 'general_silly')
+
+# Fallback used below the confidence threshold: (user_input, current_param) -> label
+Fallback = Callable[[str, Optional[str]], str]
+
+NGRAM_SIZES = (2, 3, 4)
+HASH_DIM = 4096
+RULE_CONFIDENCE = 0.98
+
+QUESTION_RE = re.compile(
+    r"^(?:what|what's|whats|how|why|which|where|when|explain|describe|tell me about|"
+    r"(?:can|could) you (?:explain|describe|tell me)|help me (?:understand|with)|"
+    r"is|are|does|do|should)\b")
+SKIP_RE = re.compile(
+    r"^(?:(?:ok|okay|please|just|let's|lets|i'll|i will|can we|we can)\s+)?"
+    r"(?:skip|pass|next|later|done|i'?m done|move on|moving on|not now|tbd|dunno|no idea|no clue|"
+    r"i don'?t know(?: yet)?|(?:let's |lets )?come back (?:to (?:it|this|that) )?later|"
+    r"ask me later|do it later)"
+    r"(?:\s+(?:this|it|this one|that|that one|one|question|for now|please|on this(?: one)?))*"
+    r"\??$")
+SMALL_TALK_RE = re.compile(
+    r"^(?:hi|hello|hey|hiya|yo|good (?:morning|afternoon|evening)|thanks|thank you|thx|cheers|"
+    r"bye|goodbye|see you|lol|haha+|how are you(?: doing)?(?: today)?|who are you)"
+    r"(?:\s+(?:there|bot|a lot|so much|you|all))*[?!.]*$")
+IP_RE = re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?:/\d{1,2})?\b|[0-9a-f]*:[0-9a-f:]+(?:/\d+)?")
+# Words of a question about the parameter being asked for, rather than about anything else
+ABOUT_PARAM_RE = re.compile(
+    r"\b(?:this|that|value|values|required|mandatory|optional|default|mean|means|"
+    r"format|example|allowed|valid|parameter|field|setting|needed|need)\b")
+# A single token shaped like a value: a path, an IP address or an identifier with digits or
+# separators (eth0, cmm-prod-01, enterprise.apn)
+VALUE_RE = re.compile(
+    r"(?:/|~/|\./|\.\./|[a-z]:\\)\S*|"
+    r"(?:\d{1,3}(?:\.\d{1,3}){3}(?:/\d{1,2})?|[0-9a-f]*:[0-9a-f:]+(?:/\d+)?)|"
+    r"(?=\S*[\d_.\-:@/])[a-z0-9][\w.\-:@/]*[a-z0-9]")
+STOP_WORDS = {'for', 'and', 'the', 'user', 'type', 'settings', 'configuration', 'address',
+              'system', 'full', 'short', 'display', 'limited', 'access', 'name', 'with'}
+
+
+def _domain_terms() -> frozenset:
+    # Words from the parameter names and descriptions mark a question as technical
+    terms = set()
+    for param, description in PARAM_DESCRIPTIONS.items():
+        for word in re.split(r"[^a-z0-9]+", f"{param} {description}".lower()):
+            if len(word) >= 2 and word not in STOP_WORDS and not word.isdigit():
+                terms.add(word)
+    return frozenset(terms | {'ip', 'ipv6', 'cidr', 'fqdn', 'dns', 'apn', 'plmn', 'mtu',
+                              'vlan', 'subnet', 'password', 'port', 'cmm', 'openshift'})
+
+
+DOMAIN_TERMS = _domain_terms()
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.lower().split()).rstrip('.! ')
+
+
+def features(text: str) -> np.ndarray:
+    """Return the indices of the active (binary) features of a message."""
+    norm = normalize(text)
+    padded = f" {norm} "
+    active = set()
+    for n in NGRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            active.add(zlib.crc32(padded[i:i + n].encode('utf-8')) % HASH_DIM)
+    # A few dense features the n-grams cannot express well
+    words = norm.split()
+    shape = (any(c.isdigit() for c in norm),
+             '?' in norm,
+             QUESTION_RE.match(norm) is not None,
+             len(words) <= 1,
+             len(words) > 6,
+             IP_RE.search(norm) is not None,
+             any(word.strip('?,') in DOMAIN_TERMS for word in words))
+    active.update(HASH_DIM + i for i, on in enumerate(shape) if on)
+    return np.fromiter(active, dtype=np.intp, count=len(active))
+
+
+NUM_FEATURES = HASH_DIM + 7
+
+
+def match_rules(text: str, current_param: Optional[str] = None) -> Optional[str]:
+    """
+    Return the intent of a message that is unambiguous as a whole, else None.
+
+    :param current_param: the parameter the user is being asked for, if any
+    """
+    norm = normalize(text)
+    if SKIP_RE.match(norm):
+        return 'skip_done'
+    if SMALL_TALK_RE.match(norm):
+        return 'general_silly'
+    if is_explanation_request(norm, current_param):
+        return 'tech_query'
+    if QUESTION_RE.match(norm) and (ABOUT_PARAM_RE.search(norm) or
+                                    any(w.strip('?,') in DOMAIN_TERMS for w in norm.split())):
+        return 'tech_query'
+    if current_param and VALUE_RE.fullmatch(norm):
+        return 'param_answer'
+    return None
+
+
+class IntentModel(object):
+    """Multinomial logistic regression over features(), with a calibration temperature."""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, temperature: float = 1.0,
+                 labels: Tuple[str, ...] = INTENTS):
+        self.weights = weights
+        self.bias = bias
+        self.temperature = temperature
+        self.labels = labels
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        logits = self.weights[features(text)].sum(axis=0) + self.bias
+        logits = logits / self.temperature
+        exp = np.exp(logits - logits.max())
+        return exp / exp.sum()
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        proba = self.predict_proba(text)
+        best = int(proba.argmax())
+        return self.labels[best], float(proba[best])
+
+    @classmethod
+    def load(cls, path: Union[str, Path] = INTENT_MODEL_PATH) -> 'IntentModel':
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['num_features']) != NUM_FEATURES:
+                raise ValueError(f"intent model {path} was trained with different features")
+            return cls(data['weights'], data['bias'], float(data['temperature']),
+                       tuple(str(label) for label in data['labels']))
+
+    def save(self, path: Union[str, Path] = INTENT_MODEL_PATH) -> None:
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, weights=self.weights, bias=self.bias,
+                                temperature=np.float64(self.temperature),
+                                labels=np.array(self.labels),
+                                num_features=np.int64(NUM_FEATURES))
+
+    @classmethod
+    def fit(cls, texts: List[str], labels: List[str], epochs: int = 400,
+            learning_rate: float = 0.5, l2: float = 1e-3) -> 'IntentModel':
+        """Train with full-batch gradient descent (the training sets are small)."""
+        x = _design_matrix(texts)
+        y = np.zeros((len(texts), len(INTENTS)), dtype=np.float32)
+        y[np.arange(len(texts)), [INTENTS.index(label) for label in labels]] = 1
+        weights = np.zeros((NUM_FEATURES, len(INTENTS)), dtype=np.float32)
+        bias = np.zeros(len(INTENTS), dtype=np.float32)
+        for _ in range(epochs):
+            proba = _softmax(x @ weights + bias)
+            error = (proba - y) / len(texts)
+            weights -= learning_rate * (x.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        return cls(weights, bias)
+
+
+def _design_matrix(texts: List[str]) -> np.ndarray:
+    x = np.zeros((len(texts), NUM_FEATURES), dtype=np.float32)
+    for row, text in enumerate(texts):
+        x[row, features(text)] = 1
+    return x
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def calibrate(model: IntentModel, texts: List[str], labels: List[str]) -> float:
+    """Return the temperature that minimizes the model's log loss on the given examples."""
+    logits = _design_matrix(texts) @ model.weights + model.bias
+    truth = np.array([INTENTS.index(label) for label in labels])
+    best, best_loss = 1.0, float('inf')
+    for temperature in np.arange(0.2, 5.01, 0.05):
+        proba = _softmax(logits / temperature)
+        loss = -np.log(proba[np.arange(len(truth)), truth] + 1e-12).mean()
+        if loss < best_loss:
+            best, best_loss = float(temperature), loss
+    return best
+
+
+def load_transcripts(paths: Iterable[Union[str, Path]]) -> Tuple[List[str], List[str]]:
+    texts, labels = [], []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    if row['label'] not in INTENTS:
+                        raise ValueError(f"{path}: unknown intent {row['label']!r}")
+                    texts.append(row['text'])
+                    labels.append(row['label'])
+    return texts, labels
+
+
+def train(paths: Iterable[Union[str, Path]] = (INTENT_TRAINING_PATH,),
+          holdout: float = 0.2, seed: int = 0) -> Tuple[IntentModel, Dict[str, float]]:
+    """
+    Train a model on labeled transcripts.
+
+    A held-out split is used to fit the calibration temperature and to report accuracy, then
+    the model is retrained on everything and the temperature carried over.
+    """
+    texts, labels = load_transcripts(paths)
+    order = np.random.default_rng(seed).permutation(len(texts))
+    cut = int(len(texts) * (1 - holdout))
+    fit_idx, held_idx = order[:cut], order[cut:]
+    model = IntentModel.fit([texts[i] for i in fit_idx], [labels[i] for i in fit_idx])
+    held_texts, held_labels = [texts[i] for i in held_idx], [labels[i] for i in held_idx]
+    temperature = calibrate(model, held_texts, held_labels)
+    correct = sum(model.predict(t)[0] == label for t, label in zip(held_texts, held_labels))
+
+    model = IntentModel.fit(texts, labels)
+    model.temperature = temperature
+    report = {'examples': len(texts),
+              'holdout_accuracy': correct / max(len(held_texts), 1),
+              'temperature': temperature}
+    return model, report
+
+
+@dataclass
+class IntentPrediction:
+    label: str
+    confidence: float
+    source: str  # 'rule', 'model' or 'llm'
+
+
+class IntentClassifier(object):
+    """Classify CIQ chat messages locally, asking an LLM only when the model is unsure."""
+
+    def __init__(self, model: Optional[IntentModel] = None,
+                 threshold: float = INTENT_CLASSIFIER_CONFIG["confidence_threshold"],
+                 model_path: Union[str, Path] = INTENT_MODEL_PATH):
+        self.threshold = threshold
+        self.model_path = Path(model_path)
+        self._model = model
+        self._lock = Lock()
+        self._counts = {'rule': 0, 'model': 0, 'llm': 0, 'llm_error': 0}
+
+    @property
+    def model(self) -> IntentModel:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def _load_model(self) -> IntentModel:
+        try:
+            return IntentModel.load(self.model_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("no usable intent model at %s (%r), training one from %s",
+                           self.model_path, e, INTENT_TRAINING_PATH)
+            return train()[0]
+
+    def classify(self, user_input: str, current_param: Optional[str] = None,
+                 fallback: Optional[Fallback] = None) -> IntentPrediction:
+        """
+        Classify a message.
+
+        :param user_input: the user's message
+        :param current_param: the parameter the user is being asked for (passed to the rules and
+                              the fallback)
+        :param fallback: called for messages the model is unsure about; if it fails or returns
+                         something that is not an intent, the model's answer is used
+        """
+        label = match_rules(user_input, current_param)
+        if label is not None:
+            return self._count(IntentPrediction(label, RULE_CONFIDENCE, 'rule'))
+
+        label, confidence = self.model.predict(user_input)
+        prediction = IntentPrediction(label, confidence, 'model')
+        if confidence >= self.threshold or fallback is None:
+            return self._count(prediction)
+
+        try:
+            answer = fallback(user_input, current_param).strip().strip("'\".").lower()
+        except Exception as e:
+            logger.warning("intent fallback failed, using the local model's answer: %r", e)
+            answer = None
+        if answer not in INTENTS:
+            self._counts['llm_error'] += 1
+            return self._count(prediction)
+        logger.debug("intent fallback for %r: model said %s (%.2f), LLM said %s",
+                     user_input, label, confidence, answer)
+        return self._count(IntentPrediction(answer, confidence, 'llm'))
+
+    def _count(self, prediction: IntentPrediction) -> IntentPrediction:
+        self._counts[prediction.source] += 1
+        total = self._counts['rule'] + self._counts['model'] + self._counts['llm']
+        if total % 500 == 0:
+            stats = self.stats()
+            logger.info("intent classifier: %d messages, %.1f%% rules, %.1f%% LLM fallback",
+                        total, stats['rule_rate'] * 100, stats['fallback_rate'] * 100)
+        return prediction
+
+    def stats(self) -> Dict[str, float]:
+        """Return how many messages were classified by each source, and the fallback rate."""
+        counts = dict(self._counts)
+        total = counts['rule'] + counts['model'] + counts['llm']
+        return {**counts,
+                'total': total,
+                'rule_rate': counts['rule'] / total if total else 0.0,
+                'fallback_rate': (counts['llm'] + counts['llm_error']) / total if total else 0.0}
+
+
+def llm_classify(user_input: str, current_param: Optional[str]) -> str:
+    """Ask Bedrock to classify a message (the fallback for low-confidence messages)."""
+    from ai.agents.bedrock_client import bedrock_invoke
+
+    system_prompt = (
+        "You are a supervisor AI that classifies user input for a CMM deployment chatbot. "
+        "Classify the input into one of these categories: 'param_answer', 'tech_query', "
+        "'general_silly', 'skip_done'. Return ONLY the category name."
+    )
+    user_msg = (
+        "The user is currently being asked for the value of the parameter: "
+        f"'{current_param}'.\nUser input: \"{user_input}\""
+    )
+    return bedrock_invoke(system_prompt, user_msg, max_tokens=20, route='ciq_intent')
+
+
+# Global intent classifier instance
+intent_classifier = IntentClassifier()
+
+
+def main(argv: Optional[List[str]] = None) -> int:  # pragma: nocover
+    argv = argv if argv is not None else sys.argv[1:]
+    if not argv or argv[0] != 'train':
+        print("usage: python -m ai.agents.ciq_agent.intent_classifier train [transcripts ...]")
+        return 2
+    model, report = train(argv[1:] or [INTENT_TRAINING_PATH])
+    model.save(INTENT_MODEL_PATH)
+    print(f"trained on {report['examples']} examples, held-out accuracy "
+          f"{report['holdout_accuracy']:.1%}, temperature {report['temperature']:.2f} "
+          f"-> {INTENT_MODEL_PATH}")
+    return 0
+
+
+if __name__ == '__main__':  # pragma: nocover
+    exit(main())
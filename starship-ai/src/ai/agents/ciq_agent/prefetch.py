@@ -0,0 +1,221 @@
+# Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+#
+# Speculative prefetch of the CuDo explanation of the next CIQ parameter.
+#
+# Once the user answers a parameter, the next one is known, and "what is this?" is very often
+# the next message.  The agent then starts fetching the explanation of the next parameter in the
+# background, so that such a question is answered without waiting for CuDo.  A prefetch is an
+# upstream call that may never be used, so they are bounded: at most `concurrency` run at once
+# and `rate` start per second on average (a token bucket); any more are skipped.  A session has
+# one prefetch at most, dropped (cancelled if it has not started) when the session moves on to
+# another parameter, and a result nobody takes expires after `ttl` seconds.
+#
+# starship_ciq_prefetches_total counts the prefetches by outcome (used, unused, failed or
+# skipped), which tells whether they pay for their upstream calls, and
+# starship_ciq_prefetch_hit_ratio is the fraction of the questions they answered.
+#
+import logging
+import re
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Dict, Optional
+
+from ai.metrics import CIQ_PREFETCH_LOOKUPS, CIQ_PREFETCHES
+from ai.ratelimit import TokenBuckets
+
+logger = logging.getLogger(__name__)
+
+# The question a prefetched explanation answers
+EXPLAIN_QUESTION = "What is this parameter, and how should I choose its value?"
+
+# Messages asking about the current parameter in general, once lowercased and stripped of
+# punctuation
+_GENERIC_QUESTIONS = {
+    "help", "explain", "explain this", "explain that", "explain it", "what", "what is this",
+    "whats this", "what is that", "whats that", "what is it", "whats it", "what is this for",
+    "what is that for", "what is this parameter", "whats this parameter", "what does this mean",
+    "what does that mean", "what does it mean", "what do you mean", "i need help with this",
+    "i need help with this parameter", "help with this", "help with this parameter",
+    "more info", "tell me more", "i dont know what this is", "no idea what this is",
+}
+_ABOUT = re.compile(r"(?:what is|whats|what are|explain|what does|what do|help with) "
+                    r"(?:a |an |the )?(.+?)(?: mean| do| for)?")
+
+
+def _normalize(text: str) -> str:
+    text = re.sub(r"[^a-z0-9]+", " ", text.lower().replace("'", ""))
+    return " ".join(text.split())
+
+
+def is_explanation_request(user_input: str, param: Optional[str]) -> bool:
+    """Return whether a message asks what the parameter is, rather than something specific."""
+    text = _normalize(user_input)
+    if text in _GENERIC_QUESTIONS:
+        return True
+    match = _ABOUT.fullmatch(text)
+    if not match or not param:
+        return False
+    # "what is the mcc" while asking for global.provisioning.mcc
+    parts = param.replace("global.", "").split(".")
+    names = {_normalize(parts[-1]), _normalize(" ".join(parts)), _normalize(param)}
+    return match.group(1) in names
+
+
+class _Prefetch(object):
+    def __init__(self, param: str, started: float):
+        self.param = param
+        self.started = started
+        self.future: Optional[Future] = None
+        self.dropped = False
+        self.outcome: Optional[str] = None  # once settled: used, unused or failed
+
+
+class Prefetcher(object):
+    """Fetches answers ahead of time, one per session, within a concurrency limit and budget."""
+
+    def __init__(self, concurrency: int = 4, rate: float = 2.0, ttl: float = 600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Create a prefetcher.
+
+        :param concurrency: most prefetches running at once; 0 turns prefetching off
+        :param rate: prefetches started per second on average; 0 turns prefetching off
+        :param ttl: seconds a prefetched answer is kept for
+        :param clock: source of the time, in seconds
+        """
+        self.concurrency = concurrency
+        self.rate = rate
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._prefetches: Dict[str, _Prefetch] = {}
+        self._running = 0
+        self._budget = TokenBuckets()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def configure(self, concurrency: int, rate: float) -> None:
+        with self._lock:
+            if concurrency != self.concurrency and self._executor is not None:
+                # Prefetches running on the old threads finish there
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.concurrency = concurrency
+            self.rate = rate
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of the lookups answered by a prefetch."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def start(self, key: str, param: str, fetch: Callable[[], Optional[str]]) -> bool:
+        """
+        Start prefetching the answer for a parameter, dropping the previous prefetch of the key.
+
+        :param key: what the prefetch is for (a session)
+        :param param: the parameter whose answer is fetched
+        :param fetch: fetches the answer; returns None if it could not
+        :return: whether the prefetch was started, rather than skipped
+        """
+        self.cancel(key)
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            if self.concurrency <= 0 or self.rate <= 0:
+                return False
+            if self._running >= self.concurrency or \
+                    self._budget.take('prefetch', self.rate, max(1.0, float(self.concurrency)),
+                                      now) > 0:
+                CIQ_PREFETCHES.inc('skipped')
+                return False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                    thread_name_prefix='ciq-prefetch')
+            prefetch = _Prefetch(param, now)
+            self._running += 1
+            self._prefetches[key] = prefetch
+            prefetch.future = self._executor.submit(self._run, prefetch, fetch)
+        return True
+
+    def _run(self, prefetch: _Prefetch, fetch: Callable[[], Optional[str]]) -> Optional[str]:
+        answer = None
+        try:
+            if not prefetch.dropped:
+                answer = fetch()
+        except Exception as e:
+            logger.warning("prefetch of %s failed: %r", prefetch.param, e)
+        finally:
+            with self._lock:
+                self._running -= 1
+                if answer is None and not prefetch.dropped:
+                    self._settle(prefetch, 'failed')
+        return answer
+
+    def take(self, key: str, param: str, timeout: float = 30.0) -> Optional[str]:
+        """
+        Return the prefetched answer for a parameter, if there is one.
+
+        A prefetch still running is waited for, up to timeout seconds, rather than asking again.
+        """
+        with self._lock:
+            self._expire(self.clock())
+            prefetch = self._prefetches.pop(key, None)
+        answer = None
+        if prefetch is not None and prefetch.param == param:
+            try:
+                answer = prefetch.future.result(timeout)
+            except (FutureTimeout, CancelledError):
+                pass
+        with self._lock:
+            if answer is not None:
+                self._settle(prefetch, 'used')
+                self.hits += 1
+            else:
+                if prefetch is not None:
+                    self._drop(prefetch)
+                self.misses += 1
+        CIQ_PREFETCH_LOOKUPS.inc('hit' if answer is not None else 'miss')
+        return answer
+
+    def cancel(self, key: str) -> None:
+        """Drop the prefetch of a key, if any."""
+        with self._lock:
+            prefetch = self._prefetches.pop(key, None)
+            if prefetch is not None:
+                self._drop(prefetch)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._prefetches)
+
+    def _drop(self, prefetch: _Prefetch) -> None:
+        prefetch.dropped = True
+        if prefetch.future.cancel():
+            self._running -= 1  # never started, so _run() will not count it down
+        self._settle(prefetch, 'unused')
+
+    def _settle(self, prefetch: _Prefetch, outcome: str) -> None:
+        if prefetch.outcome is None:
+            prefetch.outcome = outcome
+            CIQ_PREFETCHES.inc(outcome)
+
+    def _expire(self, now: float) -> None:
+        for key in [key for key, prefetch in self._prefetches.items()
+                    if now - prefetch.started > self.ttl]:
+            self._drop(self._prefetches.pop(key))
+
+
+def fetch_answer(query: str) -> Optional[str]:
+    """Ask CuDo, once, without retries; return None if that failed."""
+    from .cudo_client import prefetch_cudo_client  # imported on first use (requests is slow)
+
+    response = prefetch_cudo_client.query(query)
+    return response.content if response.success else None
+
+
+# Global prefetcher of the CIQ agent
+prefetcher = Prefetcher()
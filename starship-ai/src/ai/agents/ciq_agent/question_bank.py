@@ -0,0 +1,270 @@
+# Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+#
+# Generated parameter questions, kept in memory and persisted to disk.
+#
+# Phrasing the question for a parameter takes an LLM round trip, but the answer only depends on
+# the parameter, its description in the blueprint and the style asked for.  The question bank
+# generates each question once, serves it from memory afterwards and persists it, so that a
+# restarted process (or another replica sharing the cache directory) does not ask again.  An
+# entry is regenerated when the parameter's description changes.  New questions are written out
+# in batches, at most every save_delay seconds.
+#
+# Questions can be generated ahead of time, e.g. in an image build step:
+#     python -m ai.agents.ciq_agent.question_bank build [--product CMM] [--version V]
+# and regenerated after changing the prompts with the "refresh" command.
+#
+import argparse
+import atexit
+import json
+import logging
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock, Timer
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from .blueprint_registry import DEFAULT_BLUEPRINT, BlueprintKey, blueprint_registry
+from .config import QUESTION_BANK_PATH
+
+logger = logging.getLogger(__name__)
+
+# Style name -> system prompt
+STYLES = {
+    "friendly": (
+        "You are a friendly CMM Deployment Assistant. Generate a friendly, one-sentence "
+        "question to ask the user for a parameter value, using the provided description "
+        "for context."
+    ),
+    "concise": (
+        "You are a CMM Deployment Assistant. Generate a short, precise question to ask an "
+        "experienced engineer for a parameter value, using the provided description for context. "
+        "Reply with the question only."
+    ),
+}
+DEFAULT_STYLE = "friendly"
+
+# (param, description, style) -> question
+Generator = Callable[[str, str, str], str]
+EntryKey = Tuple[str, str, str, str]  # (product, version, style, param)
+
+
+def llm_generate(param: str, description: str, style: str = DEFAULT_STYLE) -> str:
+    """Ask Bedrock to phrase the question for a parameter."""
+    from ai.agents.bedrock_client import bedrock_invoke
+
+    user_msg = f"Parameter: '{param}'\nDescription: \"{description}\""
+    return bedrock_invoke(STYLES[style], user_msg, max_tokens=100, route='ciq_questions').strip()
+
+
+def template_question(param: str, description: str) -> str:
+    """Return a question built without the LLM, used when it cannot be reached."""
+    param_display = param.replace("global.", "").replace(".", " ")
+    return f"What value would you like to set for **{param_display}**? ({description})"
+
+
+class QuestionBank:
+    """Generates each parameter question once and serves it from memory afterwards."""
+
+    def __init__(self, path: Union[str, Path, None] = QUESTION_BANK_PATH,
+                 generate: Generator = llm_generate, save_delay: float = 2.0):
+        """
+        Create a question bank.
+
+        :param path: JSON file the questions are persisted to (None keeps them in memory only)
+        :param generate: function that phrases a question with the LLM
+        :param save_delay: seconds to wait for more new questions before writing the file
+        """
+        self.path = Path(path) if path is not None else None
+        self.generate = generate
+        self.save_delay = save_delay
+        # key -> (description, question)
+        self._entries: Optional[Dict[EntryKey, Tuple[str, str]]] = None
+        self._lock = Lock()
+        self._key_locks: Dict[EntryKey, Lock] = {}
+        self._save_lock = Lock()
+        self._save_timer: Optional[Timer] = None
+        self._dirty = False
+
+    def get(self, param: str, description: str, blueprint: BlueprintKey = DEFAULT_BLUEPRINT,
+            style: str = DEFAULT_STYLE) -> str:
+        """
+        Return the question for a parameter, generating it on first use.
+
+        If the LLM cannot be reached a template question is returned (and not remembered, so
+        the next call tries again).
+        """
+        key = (blueprint[0], blueprint[1], style, param)
+        question = self._lookup(key, description)
+        if question is not None:
+            return question
+        try:
+            question, generated = self._generate(key, description)
+        except Exception as e:
+            logger.warning("could not generate the question for %s, using a template: %r",
+                           param, e)
+            return template_question(param, description)
+        if generated:
+            self._schedule_save()
+        return question
+
+    def build(self, blueprint: BlueprintKey = DEFAULT_BLUEPRINT, style: str = DEFAULT_STYLE,
+              refresh: bool = False, max_workers: int = 4,
+              questionnaire: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+        """
+        Generate the questions for every parameter of a blueprint.
+
+        :param refresh: regenerate questions that are already known
+        :param questionnaire: {parameter: description} to generate questions for, if not the
+                              blueprint's own questionnaire
+        :return: {"generated": n, "cached": n, "failed": n}
+        """
+        if questionnaire is None:
+            questionnaire = blueprint_registry.questionnaire(blueprint)
+        report = {"generated": 0, "cached": 0, "failed": 0}
+
+        def generate(item):
+            param, description = item
+            try:
+                _, generated = self._generate((*blueprint, style, param), description, refresh)
+                return "generated" if generated else "cached"
+            except Exception as e:
+                logger.warning("could not generate the question for %s: %r", param, e)
+                return "failed"
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for outcome in pool.map(generate, questionnaire.items()):
+                report[outcome] += 1
+        if report["generated"]:
+            self.flush()
+        return report
+
+    def _generate(self, key: EntryKey, description: str,
+                  refresh: bool = False) -> Tuple[str, bool]:
+        """
+        Return (question, whether it was generated now), generating it if it is not known.
+
+        Only one thread generates a given question; others wait for it and then use it.
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, Lock())
+        with key_lock:
+            question = None if refresh else self._lookup(key, description)
+            if question is not None:
+                return question, False
+            question = self.generate(key[3], description, key[2])
+            self._remember(key, description, question)
+            return question, True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = {}
+
+    def flush(self) -> None:
+        """Write out questions generated since the last save, if any."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            dirty, self._dirty = self._dirty, False
+        if dirty:
+            self.save()
+
+    def _schedule_save(self) -> None:
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is not None or self.save_delay <= 0:
+                timer = None
+            else:
+                timer = self._save_timer = Timer(self.save_delay, self.flush)
+                timer.daemon = True
+        if timer is not None:
+            timer.start()
+        elif self.save_delay <= 0:
+            self.flush()
+
+    def save(self) -> None:
+        """Persist the questions (atomically, so readers never see a partial file)."""
+        if self.path is None:
+            return
+        # One writer at a time, so an older snapshot never replaces a newer one
+        with self._save_lock:
+            self._save()
+
+    def _save(self) -> None:
+        with self._lock:
+            records = [{"product": key[0], "version": key[1], "style": key[2], "param": key[3],
+                        "description": description, "question": question}
+                       for key, (description, question) in sorted((self._entries or {}).items())]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(records, f, indent=1)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError as e:
+            logger.warning("could not write question bank %s: %r", self.path, e)
+
+    def _load(self) -> Dict[EntryKey, Tuple[str, str]]:
+        entries = {}
+        if self.path is None:
+            return entries
+        try:
+            with open(self.path) as f:
+                for record in json.load(f):
+                    key = (record["product"], record["version"], record["style"], record["param"])
+                    entries[key] = (record["description"], record["question"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("ignoring unreadable question bank %s: %r", self.path, e)
+        return entries
+
+    def _lookup(self, key: EntryKey, description: str) -> Optional[str]:
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    self._entries = self._load()
+        entry = self._entries.get(key)
+        # A question generated for an older description is stale
+        if entry is not None and entry[0] == description:
+            return entry[1]
+        return None
+
+    def _remember(self, key: EntryKey, description: str, question: str) -> None:
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            self._entries[key] = (description, question)
+            self._dirty = True
+
+
+# Global question bank instance
+question_bank = QuestionBank()
+atexit.register(question_bank.flush)
+
+
+def main(argv: Optional[List[str]] = None) -> int:  # pragma: nocover
+    parser = argparse.ArgumentParser(prog="python -m ai.agents.ciq_agent.question_bank",
+                                     description="Generate the CIQ parameter questions.")
+    parser.add_argument("command", choices=("build", "refresh"),
+                        help="build generates missing questions, refresh regenerates all of them")
+    parser.add_argument("--product", help="blueprint product (default: the default blueprint)")
+    parser.add_argument("--version", help="blueprint version (default: the latest)")
+    parser.add_argument("--style", choices=sorted(STYLES), default=DEFAULT_STYLE)
+    args = parser.parse_args(argv if argv is not None else sys.argv[1:])
+
+    blueprint = blueprint_registry.resolve(args.product, args.version)
+    report = question_bank.build(blueprint, args.style, refresh=args.command == "refresh")
+    print(f"{blueprint[0]} {blueprint[1]} ({args.style}): {report['generated']} generated, "
+          f"{report['cached']} cached, {report['failed']} failed -> {question_bank.path}")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == '__main__':  # pragma: nocover
+    exit(main())
@@ -0,0 +1,186 @@
+# Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+#
+# Background rendering of the final YAML of CIQ sessions.
+#
+# Rendering a session's YAML (splicing the values into the blueprint, or merging and dumping
+# the whole tree) is CPU work proportional to the blueprint's size.  Rather than doing it on the
+# request that completes the session, it runs as a job on a small pool of worker threads, so the
+# chat turn returns at once and renders of large blueprints queue up among themselves instead of
+# holding up other requests.  Each job has an ID that clients can poll
+# (GET /ciq/jobs/{job_id}); a session has one render in progress at most, later requests for it
+# joining that job.  When the job finishes, its status can also be POSTed to callback URLs given
+# with the request, if they match one of the allowed patterns (ciq_yaml_callback_urls).
+#
+# Finished jobs are kept for `ttl` seconds, and `keep` of them at most.
+#
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ai.metrics import CIQ_YAML_RENDER_DURATION
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CallbackNotAllowed(ValueError):
+    """A callback URL that is not among the allowed ones."""
+
+
+class RenderJob(object):
+    """A YAML render of a session."""
+
+    def __init__(self, session_id: str):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.status = QUEUED
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.yaml_hash: Optional[str] = None
+        self.yaml_version: Optional[int] = None
+        self.error: Optional[str] = None
+        self.callback_urls: List[str] = []
+        self.future: Future = Future()
+        self.future.set_running_or_notify_cancel()  # so that it cannot be cancelled
+
+    @property
+    def done(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'job_id': self.id, 'session_id': self.session_id, 'status': self.status,
+                'submitted': self.submitted, 'started': self.started, 'finished': self.finished,
+                'yaml_hash': self.yaml_hash, 'yaml_version': self.yaml_version,
+                'error': self.error}
+
+
+class RenderJobs(object):
+    """Runs renders on a pool of worker threads and keeps track of them by job ID."""
+
+    def __init__(self, workers: int = 2, callback_urls: Iterable[str] = (), keep: int = 1000,
+                 ttl: float = 3600.0):
+        """
+        Create a job runner.
+
+        :param workers: renders running at once
+        :param callback_urls: patterns (fnmatch) of the URLs jobs may be asked to POST their
+                              status to when they finish
+        :param keep: most finished jobs kept
+        :param ttl: seconds finished jobs are kept for
+        """
+        self.workers = workers
+        self.callback_urls = list(callback_urls)
+        self.keep = keep
+        self.ttl = ttl
+        self._jobs: 'OrderedDict[str, RenderJob]' = OrderedDict()
+        self._in_progress: Dict[str, RenderJob] = {}  # session ID -> job
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def configure(self, workers: int, callback_urls: Iterable[str] = ()) -> None:
+        with self._lock:
+            if workers != self.workers and self._executor is not None:
+                # Jobs already queued run on the old threads
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.workers = workers
+            self.callback_urls = list(callback_urls)
+
+    def check_callback(self, url: str) -> None:
+        """:raises CallbackNotAllowed: if jobs may not POST to the URL."""
+        if not any(fnmatchcase(url, pattern) for pattern in self.callback_urls):
+            raise CallbackNotAllowed(f"callback URL {url} is not allowed")
+
+    def submit(self, session_id: str, render: Callable[[], Any],
+               callback_url: Optional[str] = None) -> RenderJob:
+        """
+        Render a session's YAML in the background, or join the render already in progress.
+
+        :param render: renders and stores the YAML; returns the session once done
+        :param callback_url: URL to POST the job status to when it finishes
+        :raises CallbackNotAllowed: if the callback URL is not allowed
+        """
+        if callback_url:
+            self.check_callback(callback_url)
+        with self._lock:
+            self._prune(time.time())
+            job = self._in_progress.get(session_id)
+            if job is None:
+                job = RenderJob(session_id)
+                self._jobs[job.id] = job
+                self._in_progress[session_id] = job
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=max(1, self.workers),
+                                                        thread_name_prefix='ciq-yaml')
+                self._executor.submit(self._run, job, render)
+            if callback_url and callback_url not in job.callback_urls:
+                job.callback_urls.append(callback_url)
+        return job
+
+    def _run(self, job: RenderJob, render: Callable[[], Any]) -> None:
+        job.status, job.started = RUNNING, time.time()
+        try:
+            session = render()
+            job.yaml_hash, job.yaml_version = session.yaml_hash, session.yaml_version
+            job.status = DONE
+        except Exception as e:
+            logger.exception("YAML render of session %s failed", job.session_id)
+            job.status, job.error = FAILED, f"{type(e).__name__}: {e}"
+        job.finished = time.time()
+        CIQ_YAML_RENDER_DURATION.observe(job.finished - job.started, job.status)
+        with self._lock:
+            if self._in_progress.get(job.session_id) is job:
+                del self._in_progress[job.session_id]
+        job.future.set_result(job)
+        for url in job.callback_urls:
+            self._notify(job, url)
+
+    @staticmethod
+    def _notify(job: RenderJob, url: str) -> None:
+        from ai.agents.llm_providers import HTTP_POOL
+
+        try:
+            with HTTP_POOL.session() as session:
+                session.post(url, json=job.as_dict(), timeout=10).raise_for_status()
+        except Exception as e:
+            logger.warning("could not notify %s of YAML job %s: %r", url, job.id, e)
+
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def in_progress(self, session_id: str) -> Optional[RenderJob]:
+        """Return the render of a session in progress, if any."""
+        with self._lock:
+            return self._in_progress.get(session_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of jobs kept, by status."""
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+    def _prune(self, now: float) -> None:
+        finished = [job for job in self._jobs.values() if job.done]
+        excess = len(finished) - self.keep
+        for job in finished:
+            if excess <= 0 and now - job.finished <= self.ttl:
+                break
+            del self._jobs[job.id]
+            excess -= 1
+
+
+# Global YAML render jobs of the CIQ agent
+render_jobs = RenderJobs()
@@ -3,13 +3,18 @@
 # Session management for CIQ chat conversations
 #
 
+import hashlib
 import time
 import uuid
 from dataclasses import dataclass, field
 from threading import Lock
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 
-from .config import DEFAULT_SESSION_CONFIG, PARAM_DESCRIPTIONS
+from .blueprint_registry import blueprint_registry
+from .compiled_blueprint import CompiledBlueprint
+from .config import (
+    DEFAULT_BLUEPRINT_PRODUCT, DEFAULT_BLUEPRINT_VERSION, DEFAULT_SESSION_CONFIG,
+    PARAM_DESCRIPTIONS)
 
 
 @dataclass
@@ -32,6 +37,13 @@ class CIQSession:
     # Chat history
     messages: List[CIQChatMessage] = field(default_factory=list)
 
+    # Blueprint this session is pinned to and the questionnaire it collects.  The compiled
+    # blueprint is kept too, so a blueprint reloaded mid-session does not change what the
+    # session renders.
+    blueprint: Tuple[str, str] = (DEFAULT_BLUEPRINT_PRODUCT, DEFAULT_BLUEPRINT_VERSION)
+    parameters: Dict[str, str] = field(default_factory=lambda: PARAM_DESCRIPTIONS)
+    compiled: Optional[CompiledBlueprint] = None
+
     # Parameter collection state
     collected_values: Dict[str, str] = field(default_factory=dict)
     missing_params: Set[str] = field(
@@ -42,6 +54,20 @@ class CIQSession:
     # Session status
     is_complete: bool = False
     final_yaml: Optional[str] = None
+    # Content hash of final_yaml and a counter bumped whenever it changes, so clients only
+    # need to re-fetch the document when these change
+    yaml_hash: Optional[str] = None
+    yaml_version: int = 0
+    # The latest render of final_yaml, which runs in the background (see render_jobs.py)
+    yaml_job: Optional[str] = None
+
+    def set_final_yaml(self, final_yaml: str) -> None:
+        """Store the generated YAML, bumping its version if the content changed."""
+        yaml_hash = hashlib.sha256(final_yaml.encode('utf-8')).hexdigest()[:32]
+        if yaml_hash != self.yaml_hash:
+            self.yaml_hash = yaml_hash
+            self.yaml_version += 1
+        self.final_yaml = final_yaml
 
     def add_message(self, role: str, content: str) -> None:
         """Add a message to the chat history."""
@@ -63,7 +89,7 @@ class CIQSession:
 
     def get_progress(self) -> Dict[str, any]:
         """Get current collection progress."""
-        total_params = len(PARAM_DESCRIPTIONS)
+        total_params = len(self.parameters)
         collected_count = len(self.collected_values)
 
         return {
@@ -72,7 +98,9 @@ class CIQSession:
             "progress_percentage": (collected_count / total_params) * 100,
             "missing_params": list(self.missing_params),
             "current_param": self.current_param,
-            "is_complete": self.is_complete
+            "is_complete": self.is_complete,
+            "blueprint": {"product": self.blueprint[0], "version": self.blueprint[1],
+                          "sha256": self.compiled.sha256 if self.compiled else None}
         }
 
     def is_expired(
@@ -90,12 +118,19 @@ class CIQSessionManager:
         self._sessions: Dict[str, CIQSession] = {}
         self._lock = Lock()
 
-    def create_session(self) -> str:
-        """Create a new CIQ session and return session ID."""
+    def create_session(self, blueprint: Optional[Tuple[str, str]] = None) -> str:
+        """Create a new CIQ session pinned to the given blueprint and return session ID."""
         session_id = str(uuid.uuid4())
+        blueprint = blueprint or (DEFAULT_BLUEPRINT_PRODUCT, DEFAULT_BLUEPRINT_VERSION)
+        compiled = blueprint_registry.get(blueprint)
+        parameters = blueprint_registry.questionnaire(blueprint)
 
         with self._lock:
-            session = CIQSession(session_id=session_id)
+            session = CIQSession(session_id=session_id,
+                                 blueprint=blueprint,
+                                 parameters=parameters,
+                                 compiled=compiled,
+                                 missing_params=set(parameters))
             # Initialize with first parameter
             if session.missing_params:
                 session.current_param = sorted(session.missing_params)[0]
@@ -143,9 +178,23 @@ class CIQSessionManager:
         with self._lock:
             return len(self._sessions)
 
+    def stats(self) -> Dict[str, int]:
+        """Return the number of sessions by state: active, complete or expired (not yet purged)."""
+        counts = {"active": 0, "complete": 0, "expired": 0}
+        with self._lock:
+            for session in self._sessions.values():
+                if session.is_expired():
+                    counts["expired"] += 1
+                elif session.is_complete:
+                    counts["complete"] += 1
+                else:
+                    counts["active"] += 1
+        return counts
+
     def get_or_create_session(
         self,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        blueprint: Optional[Tuple[str, str]] = None
     ) -> tuple[str, CIQSession]:
         """Get existing session or create new one if not found."""
         if session_id:
@@ -154,7 +203,7 @@ class CIQSessionManager:
                 return session_id, session
 
         # Create new session if none exists or expired
-        new_session_id = self.create_session()
+        new_session_id = self.create_session(blueprint)
         new_session = self.get_session(new_session_id)
         return new_session_id, new_session
 
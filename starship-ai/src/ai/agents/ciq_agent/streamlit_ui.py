@@ -8,7 +8,8 @@ import yaml
 
 from ai.agents.bedrock_client import bedrock_invoke
 
-from .ai_helpers import generate_question, query_cudo_with_spinner, supervisor_classify
+from .ai_helpers import (
+    generate_question, query_cudo_with_spinner, supervisor_classify, warm_question_bank)
 from .config import BLUEPRINT_PATH
 from .yaml_parser import USER_PARAMS, load_yaml_blueprint
 
@@ -30,6 +31,7 @@ def setup_page_config():
 
 def initialize_session_state():
     """Initialize Streamlit session state variables."""
+    warm_question_bank()
     if 'history' not in st.session_state:
         st.session_state.history = []
     if 'collected_values' not in st.session_state:
@@ -6,7 +6,10 @@ import re
 import streamlit as st
 import yaml
 
-from .config import BLUEPRINT_PATH, PARAM_DESCRIPTIONS
+from .blueprint_registry import DEFAULT_BLUEPRINT, blueprint_registry
+from .compiled_blueprint import load_compiled_blueprint
+from .config import PARAM_DESCRIPTIONS
+from .yaml_template import BlueprintTemplate
 
 
 def parse_ciq_params_from_yaml(yaml_path):
@@ -15,43 +18,15 @@ def parse_ciq_params_from_yaml(yaml_path):
 
     Returns a dict: {dot_notation_key: description}
     """
-    ciq_params = {}
-    with open(yaml_path, 'r') as f:
-        lines = f.readlines()
-
-    path_stack = []
-    for line in lines:
-        if not line.strip() or line.strip().startswith("#"):
-            continue
-
-        # Check for CIQ comment
-        ciq_match = re.search(r'#\s*CIQ:\s*(.*)$', line)
-        if ciq_match:
-            description = ciq_match.group(1).strip()
-            key_match = re.match(r'^(\s*)([\w\.]+):', line)
-            if key_match:
-                key = key_match.group(2)
-                full_key = ".".join(path_stack + [key])
-                ciq_params[full_key] = description
-
-        # Update path stack for nesting (2-space indent assumed)
-        indent_match = re.match(r'^(\s*)([\w\.]+):', line)
-        if indent_match:
-            indent = len(indent_match.group(1))
-            key = indent_match.group(2)
-            level = indent // 2
-            path_stack = path_stack[:level]
-            path_stack.append(key)
-
-    return ciq_params
+    with open(yaml_path, 'r', newline='') as f:
+        return BlueprintTemplate.compile(f.read()).ciq_params()
 
 
 @st.cache_data
 def load_yaml_blueprint(path):
     """Load and cache the YAML blueprint file."""
     try:
-        with open(path, 'r') as f:
-            return yaml.safe_load(f)
+        return load_compiled_blueprint(path).tree
     except FileNotFoundError:
         st.error(f"Error: The blueprint file '{path}' was not found.")
         return None
@@ -93,11 +68,23 @@ def merge_yaml_with_llm(blueprint_str: str, user_values_str: str, bedrock_invoke
         return match.group(1) if match else response
 
 
-# Initialize CIQ schema
+# Initialize CIQ schema from the precompiled blueprint artifact
 try:
-    CIQ_SCHEMA = parse_ciq_params_from_yaml(BLUEPRINT_PATH)
-    USER_PARAMS = sorted(CIQ_SCHEMA.keys())
+    _compiled = blueprint_registry.get()
+    CIQ_SCHEMA = dict(_compiled.ciq_schema)
+    USER_PARAMS = list(_compiled.params)
 except Exception:
     # Fallback to config-based parameters if YAML parsing fails
-    CIQ_SCHEMA = PARAM_DESCRIPTIONS
+    CIQ_SCHEMA = dict(PARAM_DESCRIPTIONS)
     USER_PARAMS = sorted(PARAM_DESCRIPTIONS.keys())
+
+
+def _refresh_schema(key, compiled):
+    # Update in place so modules that imported CIQ_SCHEMA/USER_PARAMS see the new blueprint
+    if key == DEFAULT_BLUEPRINT:
+        CIQ_SCHEMA.clear()
+        CIQ_SCHEMA.update(compiled.ciq_schema)
+        USER_PARAMS[:] = compiled.params
+
+
+blueprint_registry.add_listener(_refresh_schema)
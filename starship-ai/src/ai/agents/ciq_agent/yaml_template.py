@@ -0,0 +1,317 @@
+# Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+#
+# Offset-indexed YAML blueprint template for in-place value patching.
+#
+# The golden blueprint is compiled once into an index of every block-mapping key, recording
+# where its value lives in the original text.  Rendering a set of collected parameters then
+# splices the YAML-escaped values straight into the original text, so the work done per render
+# is proportional to the number of parameters rather than the size of the blueprint, and all
+# comments (including the '# CIQ:' markers), quoting and line endings are preserved as-is.
+#
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+# Kinds of indexed nodes
+SCALAR = 'scalar'  # plain, quoted or single-line flow value on the key line
+EMPTY = 'empty'  # key with no value (null), may be given children when rendering
+MAPPING = 'mapping'  # key whose value is a nested block mapping
+OPAQUE = 'opaque'  # sequences, block and multi-line scalars, anchors, aliases and merge keys -
+#                    indexed but never patched or descended into
+
+KEY_RE = re.compile(r'^( *)([^\s#\'"\-?:,\[\]{}][^:#]*?|"[^"]*"|\'[^\']*\'):(?=[ \t]|$)')
+SEQUENCE_RE = re.compile(r'^( *)-(?=[ \t]|$)')
+CIQ_RE = re.compile(r'#\s*CIQ:\s*(.*)$')
+
+
+class TemplateError(Exception):
+    """A set of values cannot be spliced into the blueprint without re-serializing it."""
+
+    def __init__(self, path, reason, *args):
+        super().__init__(args)
+        self.path = path
+        self.reason = reason
+
+    def __str__(self):
+        return f"cannot patch '{self.path}' in place: {self.reason}"
+
+
+@dataclass
+class TemplateNode:
+    """Location of a single mapping key and its value within the blueprint text."""
+
+    path: str
+    kind: str
+    indent: int
+    line: int  # 0-based line number of the key
+    value_start: int  # offset of the first character after the key's ':'
+    value_end: int  # end offset of the value text (exclusive)
+    block_end: int  # end offset of the last line belonging to this key (exclusive, no EOL)
+    child_indent: Optional[int] = None
+    ciq: Optional[str] = None
+
+
+@dataclass
+class BlueprintTemplate:
+    """Compiled, offset-indexed form of a YAML blueprint."""
+
+    text: str
+    newline: str = '\n'
+    nodes: Dict[str, TemplateNode] = field(default_factory=dict)
+    root_child_indent: int = 0
+
+    @classmethod
+    def compile(cls, text: str) -> 'BlueprintTemplate':
+        """Index every block-mapping key in the given YAML text."""
+        newline = '\r\n' if '\r\n' in text else '\n'
+        template = cls(text=text, newline=newline)
+        nodes = template.nodes
+
+        # Stack of open entries: (indent, path or None for sequence items, node)
+        stack: List[Tuple[int, Optional[str], Optional[TemplateNode]]] = []
+        last_content_end = 0
+        offset = 0
+
+        def pop_to(indent: int, inclusive: bool):
+            while stack and (stack[-1][0] >= indent if inclusive else stack[-1][0] > indent):
+                _, _, node = stack.pop()
+                if node is not None:
+                    node.block_end = max(node.block_end, last_content_end)
+                    if node.kind == OPAQUE and node.value_end < node.block_end and \
+                            node.value_end > node.value_start:
+                        # Block scalars own their continuation lines
+                        node.value_end = node.block_end
+
+        for lineno, raw in enumerate(text.splitlines(keepends=True)):
+            line_start = offset
+            offset += len(raw)
+            line = raw.rstrip('\r\n')
+            stripped = line.strip()
+            if not stripped or stripped.startswith('#') or stripped in ('---', '...'):
+                continue
+            line_end = line_start + len(line)
+
+            seq_match = SEQUENCE_RE.match(line)
+            if seq_match:
+                indent = len(seq_match.group(1))
+                pop_to(indent, inclusive=False)
+                if stack and stack[-1][2] is not None and stack[-1][2].kind in (EMPTY, MAPPING):
+                    stack[-1][2].kind = OPAQUE
+                if not stack or stack[-1][1] is not None:
+                    stack.append((indent, None, None))
+                last_content_end = line_end
+                continue
+
+            key_match = KEY_RE.match(line)
+            if not key_match:
+                # Continuation of a multi-line scalar or something we do not index
+                if stack and stack[-1][2] is not None and stack[-1][2].kind in (SCALAR, EMPTY):
+                    stack[-1][2].kind = OPAQUE
+                last_content_end = line_end
+                continue
+
+            indent = len(key_match.group(1))
+            pop_to(indent, inclusive=True)
+            if stack and stack[-1][1] is None:
+                # Inside a sequence item: not addressable by dotted path
+                last_content_end = line_end
+                continue
+            parent = stack[-1][2] if stack else None
+            if parent is not None and parent.kind == OPAQUE:
+                last_content_end = line_end
+                continue
+
+            key = key_match.group(2).strip()
+            if key[0] in '"\'':
+                key = key[1:-1]
+            elif key == '<<' and parent is not None:
+                # Keys merged in from elsewhere cannot be patched without changing the source
+                parent.kind = OPAQUE
+                last_content_end = line_end
+                continue
+            path = f"{parent.path}.{key}" if parent is not None else key
+            if parent is None:
+                if not nodes:
+                    template.root_child_indent = indent
+            else:
+                parent.kind = MAPPING
+                if parent.child_indent is None:
+                    parent.child_indent = indent
+
+            colon = line_start + key_match.end()
+            value_start, value_end = _value_span(line, key_match.end())
+            kind = SCALAR
+            if value_start == value_end:
+                kind = EMPTY
+            elif line[value_start] in '|>&*' or not _closed(line, value_start, value_end):
+                # Block scalars, anchored or aliased values, and quoted scalars or flow
+                # collections that go on over several lines
+                kind = OPAQUE
+            ciq_match = CIQ_RE.search(line, value_end)
+
+            node = TemplateNode(path=path,
+                                kind=kind,
+                                indent=indent,
+                                line=lineno,
+                                value_start=colon if kind == EMPTY else line_start + value_start,
+                                value_end=colon if kind == EMPTY else line_start + value_end,
+                                block_end=line_end,
+                                ciq=ciq_match.group(1).strip() if ciq_match else None)
+            nodes[path] = node
+            stack.append((indent, path, node))
+            last_content_end = line_end
+
+        pop_to(-1, inclusive=False)
+        return template
+
+    def ciq_params(self) -> Dict[str, str]:
+        """Return the '# CIQ:' marked keys as {dot_notation_key: description}."""
+        return {path: node.ciq for path, node in self.nodes.items() if node.ciq is not None}
+
+    def render(self, values: Dict[str, Any]) -> str:
+        """
+        Splice the given dot-notation values into the blueprint text.
+
+        Keys that already exist in the blueprint have their value replaced in place.  Keys that
+        do not exist are appended to the end of their closest existing parent mapping, creating
+        any intermediate mappings that are needed.
+
+        :raises TemplateError: if a value would need to descend into a sequence or an existing
+                               scalar; callers should fall back to a full merge in that case.
+        """
+        edits: List[Tuple[int, int, str]] = []
+        inserts: Dict[Optional[str], Dict] = {}
+
+        for key, value in values.items():
+            opaque = self._opaque_ancestor(key)
+            if opaque is not None:
+                raise TemplateError(key, f"'{opaque}' is a sequence, multi-line scalar, anchor, "
+                                         f"alias or merged mapping")
+            node = self.nodes.get(key)
+            if node is not None:
+                if node.kind == SCALAR:
+                    edits.append((node.value_start, node.value_end, format_scalar(value)))
+                else:
+                    # Empty values and whole mappings are replaced starting right after the ':'
+                    end = node.block_end if node.kind == MAPPING else node.value_end
+                    edits.append((node.value_start, end, ' ' + format_scalar(value)))
+                continue
+
+            parts = key.split('.')
+            anchor = None
+            for i in range(len(parts) - 1, 0, -1):
+                candidate = self.nodes.get('.'.join(parts[:i]))
+                if candidate is not None:
+                    anchor = candidate
+                    break
+            if anchor is not None and anchor.kind not in (MAPPING, EMPTY):
+                raise TemplateError(key, f"'{anchor.path}' is not a mapping")
+            pending = inserts.setdefault(anchor.path if anchor else None, {})
+            remaining = parts[len(anchor.path.split('.')):] if anchor else parts
+            for part in remaining[:-1]:
+                pending = pending.setdefault(part, {})
+                if not isinstance(pending, dict):
+                    raise TemplateError(key, f"'{part}' is set to a scalar")
+            pending[remaining[-1]] = value
+
+        for anchor_path, children in inserts.items():
+            if anchor_path is None:
+                indent = self.root_child_indent
+                at = len(self.text.rstrip('\r\n'))
+            else:
+                anchor = self.nodes[anchor_path]
+                if anchor_path in values:
+                    raise TemplateError(anchor_path, 'set both as a value and as a parent')
+                indent = anchor.child_indent
+                if indent is None:
+                    indent = anchor.indent + 2
+                at = anchor.block_end
+            lines = _emit_lines(children, indent)
+            edits.append((at, at, ''.join(self.newline + line for line in lines)))
+
+        # Apply edits left to right, slicing the untouched text in between
+        edits.sort(key=lambda e: (e[0], e[1]))
+        out = []
+        pos = 0
+        for start, end, replacement in edits:
+            if start < pos:
+                raise TemplateError(self._path_at(start), 'overlapping values')
+            out.append(self.text[pos:start])
+            out.append(replacement)
+            pos = end
+        out.append(self.text[pos:])
+        return ''.join(out)
+
+    def _opaque_ancestor(self, key: str) -> Optional[str]:
+        """Return the path of the key or its closest ancestor that is OPAQUE, if any."""
+        parts = key.split('.')
+        for i in range(len(parts), 0, -1):
+            node = self.nodes.get('.'.join(parts[:i]))
+            if node is not None and node.kind == OPAQUE:
+                return node.path
+        return None
+
+    def _path_at(self, offset: int) -> str:
+        for path, node in self.nodes.items():
+            if node.value_start <= offset <= node.block_end:
+                return path
+        return '<unknown>'
+
+
+def _value_span(line: str, pos: int) -> Tuple[int, int]:
+    """Return the (start, end) of the value text that follows a key's ':' on a line."""
+    length = len(line)
+    while pos < length and line[pos] in ' \t':
+        pos += 1
+    if pos >= length or line[pos] == '#':
+        return pos, pos
+    start = pos
+    quote = line[pos]
+    if quote in '"\'':
+        pos += 1
+        while pos < length:
+            if quote == '"' and line[pos] == '\\':
+                pos += 2
+                continue
+            if line[pos] == quote:
+                if quote == '\'' and pos + 1 < length and line[pos + 1] == '\'':
+                    pos += 2
+                    continue
+                return start, pos + 1
+            pos += 1
+        return start, length
+    comment = line.find(' #', start)
+    end = comment if comment >= 0 else length
+    return start, len(line[:end].rstrip())
+
+
+def _closed(line: str, start: int, end: int) -> bool:
+    """Return False if the quoted scalar or flow collection at line[start:end] is not closed."""
+    closing = {'"': '"', "'": "'", '[': ']', '{': '}'}.get(line[start])
+    return closing is None or (end - start >= 2 and line[end - 1] == closing)
+
+
+def _emit_lines(children: Dict, indent: int) -> List[str]:
+    lines = []
+    for key, value in children.items():
+        if isinstance(value, dict) and value:
+            lines.append(f"{' ' * indent}{key}:")
+            lines.extend(_emit_lines(value, indent + 2))
+        else:
+            lines.append(f"{' ' * indent}{key}: {format_scalar(value)}")
+    return lines
+
+
+def format_scalar(value: Any) -> str:
+    """Return the given value as a single-line YAML scalar that loads back to the same value."""
+    style = '"' if isinstance(value, str) and ('\n' in value or '\r' in value) else None
+    dumped = yaml.safe_dump(value,
+                            default_style=style,
+                            default_flow_style=True,
+                            allow_unicode=True,
+                            width=float('inf'))
+    if dumped.endswith('\n...\n'):
+        dumped = dumped[:-len('\n...\n')]
+    return dumped.rstrip('\n')
@@ -2,6 +2,8 @@
 #
 # Configuration constants for the CMM Deployment Assistant.
 #
+import os
+
 import urllib3
 
 # Disable SSL warnings
@@ -10,9 +12,12 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 # File paths
 BLUEPRINT_PATH = "golden_config_CMM_yaml.txt"
 
-# API Configuration
-CUDO_API_URL = "https://athena-cudo.ati.dyn.tre.nsn-rdnet.net/generator/generator/v2/chat/"
+# API Configuration (CUDO_BASE_URL points the clients elsewhere, e.g. at a fake CuDo server)
+CUDO_BASE_URL = os.getenv("CUDO_BASE_URL", "https://athena-cudo.ati.dyn.tre.nsn-rdnet.net")
+CUDO_API_URL = f"{CUDO_BASE_URL}/generator/generator/v2/chat/"
 
-# AWS Bedrock Configuration
+# AWS Bedrock Configuration (BEDROCK_ENDPOINT_URL replaces the AWS endpoint, e.g. with a fake
+# Bedrock server)
 BEDROCK_MODEL = "anthropic.claude-3-5-sonnet-20240620-v1:0"
 BEDROCK_REGION = "us-east-1"
+BEDROCK_ENDPOINT_URL = os.getenv("BEDROCK_ENDPOINT_URL") or None
@@ -0,0 +1,369 @@
+# Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+#
+# The LLM gateway: every LLM call of the app, to Bedrock, CuDo or another backend, goes through
+# LLM_GATEWAY.complete() or LLM_GATEWAY.stream().
+#
+# The backends are provider adapters (llm_providers.py) and are picked per call by the router
+# (llm_router.py), unless the caller names one.  Whatever the backend, a call gets:
+#
+#   - connections from the shared pool (HTTP_POOL, and Bedrock clients sized to match);
+#   - retries, on another backend when the route has one, but only while the retry budget
+#     lasts: retries may add llm_retry_budget (e.g. 20%) to the calls made, so that an outage
+#     does not turn into a retry storm.  Bad requests (HTTP 4xx) are not retried;
+#   - answers from the response cache, when the same prompt was answered in the last
+#     llm_cache_ttl seconds;
+#   - a limit of llm_backend_concurrency calls in progress per backend; a call waiting too long
+#     for one goes to another backend.
+#
+# This module is shared by the API server and the Streamlit app, so it must not import
+# streamlit.
+#
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from ai.metrics import LLM_CACHE_REQUESTS, LLM_RETRIES_DENIED, UPSTREAM_RETRIES
+
+from .llm_providers import Backend, create_backend, is_client_error
+from .llm_router import DEFAULT_ROUTES, LLM_ROUTER, LLMRouter, default_backends
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class LLMUnavailable(RuntimeError):
+    """No backend could answer."""
+
+
+class BackendBusy(RuntimeError):
+    """A backend had as many calls in progress as it may for too long."""
+
+
+class RetryBudget(object):
+    """
+    Retries allowed, as a share of the calls made.
+
+    Each call adds ratio to the budget and each retry takes 1 from it; min_per_second is added
+    over time too, so retries stay possible when there are few calls.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 0.5, most: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.most = most
+        self.clock = clock
+        self.balance = most
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def configure(self, ratio: float) -> None:
+        self.ratio = ratio
+
+    def _refill(self, amount: float) -> None:
+        now = self.clock()
+        self.balance = min(self.most, self.balance + amount +
+                           (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self) -> None:
+        """Count a call."""
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        """Return True if a retry may be made (and count it)."""
+        with self._lock:
+            self._refill(0.0)
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+class ResponseCache(object):
+    """Answers to recent prompts, least recently used first out."""
+
+    def __init__(self, size: int = 256, ttl: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.size = size
+        self.ttl = ttl
+        self.clock = clock
+        self._answers: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, size: int, ttl: float) -> None:
+        with self._lock:
+            self.size = size
+            self.ttl = ttl
+            while len(self._answers) > max(0, size):
+                self._answers.popitem(last=False)
+
+    def __len__(self):
+        return len(self._answers)
+
+    @staticmethod
+    def key(scope: str, system_prompt: str, user_msg: str, max_tokens: int) -> str:
+        text = json.dumps([scope, system_prompt, user_msg, max_tokens])
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._answers.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._answers.move_to_end(key)
+                LLM_CACHE_REQUESTS.inc('hit')
+                return entry[1]
+            self._answers.pop(key, None)
+        LLM_CACHE_REQUESTS.inc('miss')
+        return None
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            if self.size <= 0 or self.ttl <= 0:
+                return
+            self._answers[key] = (self.clock() + self.ttl, text)
+            self._answers.move_to_end(key)
+            while len(self._answers) > self.size:
+                self._answers.popitem(last=False)
+
+
+class ConcurrencyLimiter(object):
+    """Limits on the calls in progress to each backend."""
+
+    def __init__(self, limit: int = 16, timeout: float = 10.0):
+        """
+        Create a limiter.
+
+        :param limit: most calls in progress to a backend without a max_concurrency of its own
+        :param timeout: most seconds a call waits for another to finish
+        """
+        self.limit = limit
+        self.timeout = timeout
+        self._in_progress: Dict[str, int] = {}
+        self._changed = threading.Condition()
+
+    def acquire(self, backend: Backend) -> None:
+        """
+        Count a call to a backend in progress, once it is under its limit.
+
+        :raises BackendBusy: if it was not under its limit within the timeout
+        """
+        limit = backend.max_concurrency or self.limit
+        with self._changed:
+            if not self._changed.wait_for(
+                    lambda: self._in_progress.get(backend.name, 0) < limit, self.timeout):
+                raise BackendBusy(f"{backend.name} has had {limit} calls in progress for "
+                                  f"{self.timeout:.0f} seconds")
+            self._in_progress[backend.name] = self._in_progress.get(backend.name, 0) + 1
+
+    def release(self, backend: Backend) -> None:
+        with self._changed:
+            count = self._in_progress.get(backend.name, 0) - 1
+            if count > 0:
+                self._in_progress[backend.name] = count
+            else:
+                self._in_progress.pop(backend.name, None)
+            self._changed.notify_all()
+
+    def in_progress(self) -> Dict[str, int]:
+        with self._changed:
+            return dict(self._in_progress)
+
+
+class LLMGateway(object):
+    """Makes LLM calls, with the pool, retry budget, cache and limits shared by them all."""
+
+    def __init__(self, router: LLMRouter = LLM_ROUTER, attempts: int = 3, backoff: float = 0.5,
+                 retries: Optional[RetryBudget] = None, cache: Optional[ResponseCache] = None,
+                 limiter: Optional[ConcurrencyLimiter] = None):
+        """
+        Create a gateway.
+
+        :param router: picks the backend of each call
+        :param attempts: most times a call is tried
+        :param backoff: seconds before retrying a backend, doubling with each retry
+        :param retries: the retry budget
+        :param cache: the response cache
+        :param limiter: the concurrency limits
+        """
+        self.router = router
+        self.attempts = attempts
+        self.backoff = backoff
+        self.retries = retries if retries is not None else RetryBudget()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.limiter = limiter if limiter is not None else ConcurrencyLimiter()
+
+    def _cache_key(self, route: str, backend: Optional[Backend], system_prompt: str,
+                   user_msg: str, max_tokens: int) -> str:
+        # Answers are kept by route, or by backend for calls to a given one
+        scope = route if backend is None else json.dumps(backend.settings(), sort_keys=True,
+                                                         default=str)
+        return self.cache.key(scope, system_prompt, user_msg, max_tokens)
+
+    def _call(self, route: str, backend: Optional[Backend], attempts: Optional[int],
+              call: Callable[[Backend], T], hold: bool = False) -> Tuple[Backend, float, T]:
+        """
+        Make a call to the backend given or, failing that, to those of the route, retrying it.
+
+        :param hold: leave the call counted as in progress; the caller must then release it
+                     and record it with the router when it is done
+        :return: the backend that answered, when the call was made and its result
+        :raises LLMUnavailable: if no backend answered
+        """
+        tried: List[str] = []
+        error: Optional[Exception] = None
+        for attempt in range(max(1, attempts or self.attempts)):
+            if attempt:
+                if is_client_error(error):
+                    break
+                if not self.retries.withdraw():
+                    LLM_RETRIES_DENIED.inc()
+                    logger.warning("LLM call on route %s not retried: out of retry budget", route)
+                    break
+            else:
+                self.retries.deposit()
+            try:
+                chosen = backend or self.router.choose(route, tried)
+            except LookupError as e:
+                error = e
+                break
+            if attempt:
+                UPSTREAM_RETRIES.inc(chosen.kind, chosen.name)
+                if chosen.name in tried:
+                    time.sleep(self.backoff * 2 ** (tried.count(chosen.name) - 1))
+            tried.append(chosen.name)
+            start = time.perf_counter()
+            try:
+                self.limiter.acquire(chosen)
+            except BackendBusy as e:
+                self._record(backend, chosen, 0.0, None)
+                logger.warning("LLM backend %s busy on route %s: %s", chosen.name, route, e)
+                error = e
+                continue
+            try:
+                result = call(chosen)
+            except Exception as e:
+                self.limiter.release(chosen)
+                self._record(backend, chosen, time.perf_counter() - start,
+                             None if is_client_error(e) else True)
+                logger.warning("LLM backend %s failed on route %s: %s", chosen.name, route, e)
+                error = e
+                continue
+            if not hold:
+                self.limiter.release(chosen)
+                self._record(backend, chosen, time.perf_counter() - start, False)
+            return chosen, start, result
+        raise LLMUnavailable(f"no LLM backend of route {route} answered (tried "
+                             f"{', '.join(tried) or 'none'}): {error}") from error
+
+    def _record(self, given: Optional[Backend], chosen: Backend, elapsed: float,
+                failed: Optional[bool]) -> None:
+        if given is None:
+            # Only the calls the router chose the backend of count in its stats
+            self.router.record(chosen, elapsed, failed)
+
+    def complete(self, route: str, system_prompt: str, user_msg: str, max_tokens: int = 512,
+                 backend: Optional[Backend] = None, attempts: Optional[int] = None,
+                 cache: bool = True) -> str:
+        """
+        Get an answer to a prompt.
+
+        :param route: the route of the call, which decides the backends it may go to
+        :param backend: the backend to call, rather than those of the route
+        :param attempts: most times the call is tried (the gateway's attempts if None)
+        :param cache: whether the answer may come from, and go to, the response cache
+        :raises LLMUnavailable: if no backend answered
+        """
+        key = self._cache_key(route, backend, system_prompt, user_msg, max_tokens) \
+            if cache else None
+        if key is not None:
+            text = self.cache.get(key)
+            if text is not None:
+                return text
+        _, _, text = self._call(route, backend, attempts,
+                                lambda chosen: chosen.complete(system_prompt, user_msg,
+                                                               max_tokens))
+        if key is not None:
+            self.cache.put(key, text)
+        return text
+
+    def stream(self, route: str, system_prompt: str, user_msg: str, max_tokens: int = 512,
+               backend: Optional[Backend] = None, cache: bool = True) -> Iterator[str]:
+        """
+        Get an answer to a prompt piece by piece, as it is generated.
+
+        A call is only retried until the first piece arrives.  The parameters are those of
+        complete().
+
+        :raises LLMUnavailable: if no backend answered
+        """
+        key = self._cache_key(route, backend, system_prompt, user_msg, max_tokens) \
+            if cache else None
+        if key is not None:
+            text = self.cache.get(key)
+            if text is not None:
+                yield text
+                return
+
+        def start_stream(chosen: Backend) -> Tuple[Iterator[str], Optional[str]]:
+            pieces = chosen.stream(system_prompt, user_msg, max_tokens)
+            return pieces, next(pieces, None)
+
+        chosen, start, (pieces, first) = self._call(route, backend, None, start_stream,
+                                                    hold=True)
+        failed: Optional[bool] = None
+        text: List[str] = []
+        try:
+            if first is not None:
+                text.append(first)
+                yield first
+            for piece in pieces:
+                text.append(piece)
+                yield piece
+            failed = False
+        except GeneratorExit:
+            # The caller stopped reading, which says nothing about the backend
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            close = getattr(pieces, 'close', None)
+            if close is not None:
+                close()
+            self.limiter.release(chosen)
+            self._record(backend, chosen, time.perf_counter() - start, failed)
+        if key is not None:
+            self.cache.put(key, ''.join(text))
+
+    def connect(self) -> Dict[str, str]:
+        """Open a connection to each backend ahead of the first call; return what was done."""
+        done = {}
+        for name, backend in list(self.router.backends.items()):
+            try:
+                done[name] = backend.connect()
+            except Exception as e:
+                done[name] = f"failed: {e}"
+        return done
+
+
+LLM_GATEWAY = LLMGateway()
+
+
+def configure_llm_gateway(config) -> None:
+    """Apply the llm_* settings of a config (llm_pool_size is only applied at start-up)."""
+    if config.llm_backends:
+        backends = [create_backend(settings) for settings in config.llm_backends]
+        routes = config.llm_routes or {}
+    else:
+        backends, routes = default_backends(), dict(DEFAULT_ROUTES, **(config.llm_routes or {}))
+    LLM_GATEWAY.router.configure(backends, routes)
+    LLM_GATEWAY.retries.configure(float(config.llm_retry_budget))
+    LLM_GATEWAY.cache.configure(int(config.llm_cache_size), float(config.llm_cache_ttl))
+    LLM_GATEWAY.limiter.limit = int(config.llm_backend_concurrency)
@@ -0,0 +1,382 @@
+# Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+#
+# Provider adapters for the LLM gateway (llm_gateway.py).
+#
+# An adapter (a backend, as configured in llm_backends) turns a prompt into a call to one kind of
+# LLM service and its answer back into text: Bedrock models, OpenAI-compatible chat completion
+# endpoints (TGI, vLLM), CuDo generators, or a local stand-in answering at once.  The HTTP
+# adapters all take their connections from one pool, HTTP_POOL.  Retries, caching and
+# concurrency limits are left to the gateway; is_client_error() tells it which failures are the
+# request's fault rather than the backend's.
+#
+# This module is shared by the API server and the Streamlit app, so it must not import
+# streamlit; boto3 and requests are imported on first use because they are slow to import.
+#
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Union
+
+from ai.metrics import upstream_call
+from ai.perf import cassettes
+
+from .config import BEDROCK_ENDPOINT_URL, BEDROCK_MODEL, BEDROCK_REGION, CUDO_API_URL
+
+if TYPE_CHECKING:  # pragma: nocover
+    import requests
+
+# Bedrock error codes that mean "slow down" rather than "bad request"
+THROTTLING_CODES = ('ThrottlingException', 'TooManyRequestsException',
+                    'ServiceUnavailableException', 'ModelNotReadyException')
+
+
+class HttpPool(object):
+    """
+    Connections to the HTTP backends, shared by all of them.
+
+    A requests session is not thread-safe, so each one is used by one thread at a time, but they
+    all mount the same adapter, whose connection pools (one per host) are.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        """Create a pool keeping at most maxsize connections open to each host."""
+        self.maxsize = maxsize
+        self._adapter = None
+        self._sessions: List['requests.Session'] = []
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize: int) -> None:
+        with self._lock:
+            if maxsize != self.maxsize:
+                # Sessions created from now on get an adapter of the new size
+                self.maxsize = maxsize
+                self._adapter = None
+                self._sessions = []
+
+    @contextmanager
+    def session(self) -> Iterator['requests.Session']:
+        """Borrow an idle session, preferring the most recently used (its connection is warm)."""
+        with self._lock:
+            session = self._sessions.pop() if self._sessions else None
+            adapter = self._adapter
+        if session is None:
+            import requests
+            import urllib3
+
+            # Backends may be configured not to verify TLS certificates (CuDo labs are not)
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            if adapter is None:
+                adapter = requests.adapters.HTTPAdapter(pool_connections=self.maxsize,
+                                                        pool_maxsize=self.maxsize)
+                with self._lock:
+                    self._adapter = self._adapter or adapter
+                    adapter = self._adapter
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        try:
+            yield session
+        finally:
+            with self._lock:
+                if session.get_adapter('https://') is self._adapter:
+                    self._sessions.append(session)
+
+
+HTTP_POOL = HttpPool()
+
+
+def http_status(error: BaseException) -> Optional[int]:
+    """Return the HTTP status a failed call got back, if any."""
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):  # botocore
+        return response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return getattr(response, 'status_code', None)
+
+
+def is_client_error(error: BaseException) -> bool:
+    """Return True if a call failed because of the request itself, so retrying is pointless."""
+    status = http_status(error)
+    if status is None or not 400 <= status < 500 or status in (408, 429):
+        return False
+    response = getattr(error, 'response', None)
+    code = response.get('Error', {}).get('Code') if isinstance(response, dict) else None
+    return code not in THROTTLING_CODES
+
+
+def completion_text(data: Any) -> str:
+    """
+    Return the text of a completion, in any of the shapes the LLM services answer with.
+
+    :raises ValueError: if there is no text in it
+    """
+    if isinstance(data, list) and data:
+        # CuDo answers with a list of completions
+        return completion_text(data[0])
+    if isinstance(data, dict):
+        choices = data.get('choices')
+        if isinstance(choices, list) and choices and isinstance(choices[0], dict):
+            choice = choices[0]
+            if isinstance(choice.get('message'), dict) and 'content' in choice['message']:
+                return choice['message']['content']
+            if 'text' in choice:
+                return choice['text']
+        message = data.get('message')
+        if isinstance(message, dict) and 'content' in message:
+            return message['content']
+        if isinstance(message, str):
+            return message
+        for field in ('content', 'response', 'text', 'answer'):
+            if isinstance(data.get(field), str):
+                return data[field]
+        if 'data' in data:
+            return completion_text(data['data'])
+    raise ValueError(f"no text in the answer: {str(data)[:200]}")
+
+
+class Backend(object):
+    """An LLM that can complete a prompt."""
+
+    kind = ''
+
+    def __init__(self, name: str, max_concurrency: Optional[int] = None):
+        """
+        Create a backend.
+
+        :param name: name of the backend (in llm_routes and the metrics)
+        :param max_concurrency: most calls in progress at once (llm_backend_concurrency if None)
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+
+    def complete(self, system_prompt: str, user_msg: str, max_tokens: int) -> str:
+        """Return the LLM's answer; raise if it could not give one."""
+        raise NotImplementedError
+
+    def stream(self, system_prompt: str, user_msg: str, max_tokens: int) -> Iterator[str]:
+        """Yield the LLM's answer piece by piece, as it is generated."""
+        yield self.complete(system_prompt, user_msg, max_tokens)
+
+    def connect(self) -> str:
+        """Open a connection ahead of the first call; return what was done."""
+        return 'nothing to connect'
+
+    def settings(self) -> Dict[str, Any]:
+        """Return what the backend was created with (as in llm_backends)."""
+        return {'name': self.name, 'kind': self.kind, 'max_concurrency': self.max_concurrency}
+
+
+class BedrockBackend(Backend):
+    """A model in an AWS Bedrock region."""
+
+    kind = 'bedrock'
+
+    def __init__(self, name: str, model: str = BEDROCK_MODEL, region: str = BEDROCK_REGION,
+                 endpoint_url: Optional[str] = BEDROCK_ENDPOINT_URL,
+                 max_concurrency: Optional[int] = None):
+        super().__init__(name, max_concurrency)
+        self.model = model
+        self.region = region
+        self.endpoint_url = endpoint_url
+
+    def complete(self, system_prompt: str, user_msg: str, max_tokens: int) -> str:
+        from .bedrock_client import invoke_model
+
+        return invoke_model(system_prompt, user_msg, max_tokens, self.model, self.region,
+                            self.endpoint_url)
+
+    def stream(self, system_prompt: str, user_msg: str, max_tokens: int) -> Iterator[str]:
+        from .bedrock_client import stream_model
+
+        return stream_model(system_prompt, user_msg, max_tokens, self.model, self.region,
+                            self.endpoint_url)
+
+    def connect(self) -> str:
+        from .bedrock_client import get_bedrock_client
+
+        get_bedrock_client(self.region, self.endpoint_url)
+        return f"client for {self.region} created"
+
+    def settings(self) -> Dict[str, Any]:
+        return dict(super().settings(), model=self.model, region=self.region,
+                    endpoint_url=self.endpoint_url)
+
+
+class ChatCompletionsBackend(Backend):
+    """An OpenAI-compatible chat completions endpoint, such as TGI's or vLLM's."""
+
+    kind = 'openai'
+
+    def __init__(self, name: str, url: str, model: str = 'tgi', timeout: float = 60.0,
+                 verify: Union[bool, str] = True, headers: Optional[Dict[str, str]] = None,
+                 max_concurrency: Optional[int] = None):
+        """
+        Create a backend.
+
+        :param url: URL of the endpoint, e.g. http://tgi:8080/v1/chat/completions
+        :param model: model name sent with each request
+        :param timeout: seconds to wait for an answer
+        :param verify: TLS certificate verification: False, True or the path of a CA bundle
+        :param headers: extra request headers, e.g. Authorization
+        :param max_concurrency: most calls in progress at once
+        """
+        super().__init__(name, max_concurrency)
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self.verify = verify
+        self.headers = dict({'Content-Type': 'application/json'}, **(headers or {}))
+
+    def payload(self, system_prompt: str, user_msg: str, max_tokens: int,
+                stream: bool = False) -> Dict[str, Any]:
+        messages = [{'role': 'user', 'content': user_msg}]
+        if system_prompt:
+            messages.insert(0, {'role': 'system', 'content': system_prompt})
+        return {'model': self.model, 'messages': messages, 'max_tokens': max_tokens,
+                'temperature': 0.1, 'stream': stream}
+
+    def _post(self, session: 'requests.Session', payload: Dict[str, Any],
+              stream: bool = False) -> 'requests.Response':
+        return cassettes.requests_call(
+            self.kind, 'POST', self.url, payload,
+            lambda: session.post(self.url, json=payload, headers=self.headers,
+                                 verify=self.verify, timeout=self.timeout, stream=stream))
+
+    def complete(self, system_prompt: str, user_msg: str, max_tokens: int) -> str:
+        payload = self.payload(system_prompt, user_msg, max_tokens)
+        with upstream_call(self.kind, self.name) as call, HTTP_POOL.session() as session:
+            response = self._post(session, payload)
+            call.outcome = str(response.status_code)
+            response.raise_for_status()
+            data = response.json()
+        return completion_text(data)
+
+    def stream(self, system_prompt: str, user_msg: str, max_tokens: int) -> Iterator[str]:
+        payload = self.payload(system_prompt, user_msg, max_tokens, stream=True)
+        with upstream_call(self.kind, self.name) as call, HTTP_POOL.session() as session:
+            response = self._post(session, payload, stream=True)
+            call.outcome = str(response.status_code)
+            with response:
+                response.raise_for_status()
+                if 'json' in response.headers.get('Content-Type', ''):
+                    # A server that does not stream answers in one piece
+                    yield completion_text(response.json())
+                    return
+                # Server-sent events: "data: <chunk as JSON>" lines, then "data: [DONE]"
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        break
+                    choices = json.loads(data).get('choices') or [{}]
+                    text = (choices[0].get('delta') or {}).get('content')
+                    if text:
+                        yield text
+
+    def connect(self) -> str:
+        with HTTP_POOL.session() as session:
+            response = session.head(self.url, headers=self.headers, verify=self.verify,
+                                    timeout=self.timeout)
+        # Any status means the connection is pooled
+        return f"connected (HTTP {response.status_code})"
+
+    def settings(self) -> Dict[str, Any]:
+        return dict(super().settings(), url=self.url, model=self.model, timeout=self.timeout,
+                    verify=self.verify, headers=self.headers)
+
+
+class CudoBackend(ChatCompletionsBackend):
+    """A CuDo generator, answering with the help of its document indexes."""
+
+    kind = 'cudo'
+
+    DEFAULT_ATHENA_OPTIONS = {
+        'user_id': '4201337',
+        'chat_id': 'cmm_assistant',
+        'indexes': ['cudo_cloud_mobility_manager_25_7_agora_index'],
+        'llm_server': 'tgi',
+        'db_choice': 'opensearch',
+        'use_dense': True,
+        'use_sparse': False,
+    }
+
+    def __init__(self, name: str, url: str = CUDO_API_URL,
+                 model: str = 'meta-llama/Llama-3.3-70B-Instruct', timeout: float = 30.0,
+                 verify: Union[bool, str] = False, headers: Optional[Dict[str, str]] = None,
+                 athena_options: Optional[Dict[str, Any]] = None,
+                 max_concurrency: Optional[int] = None):
+        super().__init__(name, url, model, timeout, verify,
+                         dict({'User-Agent': 'CMM-Assistant/1.0'}, **(headers or {})),
+                         max_concurrency)
+        self.athena_options = dict(self.DEFAULT_ATHENA_OPTIONS, **(athena_options or {}))
+
+    def payload(self, system_prompt: str, user_msg: str, max_tokens: int,
+                stream: bool = False) -> Dict[str, Any]:
+        # CuDo takes the system prompt as an option, with the document search
+        payload = super().payload('', user_msg, max_tokens, stream)
+        payload['athena_options'] = dict(self.athena_options, **(
+            {'system_prompt': system_prompt} if system_prompt else {}))
+        return payload
+
+    def settings(self) -> Dict[str, Any]:
+        return dict(super().settings(), athena_options=self.athena_options)
+
+
+class LocalBackend(Backend):
+    """A stand-in for an LLM, for tests and load tests: answers "{}" to prompts wanting JSON."""
+
+    kind = 'local'
+
+    def __init__(self, name: str, latency: float = 0.0, error_rate: float = 0.0,
+                 reply: Optional[str] = None, max_concurrency: Optional[int] = None):
+        """
+        Create a backend.
+
+        :param latency: seconds each answer takes
+        :param error_rate: fraction of the calls failing (with a ConnectionError)
+        :param reply: the answer to give (by default "{}" or "OK")
+        :param max_concurrency: most calls in progress at once
+        """
+        super().__init__(name, max_concurrency)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.reply = reply
+
+    def complete(self, system_prompt: str, user_msg: str, max_tokens: int) -> str:
+        time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            raise ConnectionError(f"{self.name} failed (error_rate {self.error_rate})")
+        if self.reply is not None:
+            return self.reply
+        return '{}' if 'json' in system_prompt.lower() else 'OK'
+
+    def stream(self, system_prompt: str, user_msg: str, max_tokens: int) -> Iterator[str]:
+        text = self.complete(system_prompt, user_msg, max_tokens)
+        for start in range(0, len(text), 8):
+            yield text[start:start + 8]
+
+    def settings(self) -> Dict[str, Any]:
+        return dict(super().settings(), latency=self.latency, error_rate=self.error_rate,
+                    reply=self.reply)
+
+
+BACKEND_KINDS = {cls.kind: cls for cls in (BedrockBackend, ChatCompletionsBackend, CudoBackend,
+                                           LocalBackend)}
+
+
+def create_backend(settings: Dict[str, Any]) -> Backend:
+    """Create a backend from its llm_backends entry: {name, kind, <settings of the kind>}."""
+    settings = dict(settings)
+    name = settings.pop('name', None)
+    kind = settings.pop('kind', None)
+    if not name:
+        raise ValueError("an LLM backend has no name")
+    if kind not in BACKEND_KINDS:
+        raise ValueError(f"LLM backend {name}: unknown kind {kind!r}, expected one of "
+                         f"{', '.join(BACKEND_KINDS)}")
+    try:
+        return BACKEND_KINDS[kind](name, **settings)
+    except TypeError as e:
+        raise ValueError(f"LLM backend {name}: {e}") from None
@@ -0,0 +1,207 @@
+# Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+#
+# Choice of the backend for each LLM call made through the gateway (llm_gateway.py).
+#
+# Each route (llm_routes: "wizard", "ciq_intent", ...) lists the backends acceptable for it.  A
+# call goes to the acceptable backend with the lowest score: its EWMA latency times the calls it
+# has outstanding plus one, divided by its EWMA success rate, so a backend that slows down,
+# throttles or takes on a backlog gets less of the traffic.  A backend not used yet is scored
+# with the best latency known, so it gets tried.
+#
+# A backend failing eject_after calls in a row, or half of them, is ejected: it gets no calls
+# for ejection_time seconds, doubling each time it is ejected again.  After that it is let back
+# in slowly: its score is raised up to tenfold, less and less over readmit_time seconds, and a
+# single failure ejects it again.  If every acceptable backend is ejected, the route uses them
+# anyway rather than fail.
+#
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ai.metrics import LLM_BACKEND_EJECTIONS
+
+from .llm_providers import Backend, BedrockBackend, CudoBackend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTE = 'default'
+# A backend let back in after an ejection starts with its score multiplied by this
+READMIT_PENALTY = 10.0
+
+
+class BackendStats(object):
+    """How a backend has been doing."""
+
+    def __init__(self):
+        self.latency: Optional[float] = None  # EWMA of the seconds successful calls took
+        self.errors = 0.0  # EWMA of the fraction of calls failing
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0  # in a row
+        self.ejections = 0  # in a row, without a spell of good health in between
+        self.ejected_until = 0.0
+        self.readmitted = -float('inf')
+
+    def as_dict(self, now: float) -> Dict[str, Any]:
+        return {'latency_ms': round((self.latency or 0.0) * 1000, 1),
+                'error_rate': round(self.errors, 3), 'outstanding': self.outstanding,
+                'requests': self.requests, 'ejected': self.ejected_until > now}
+
+
+class LLMRouter(object):
+    """The backends, which routes may use which, and how each backend has been doing."""
+
+    def __init__(self, backends: Iterable[Backend] = (),
+                 routes: Optional[Dict[str, List[str]]] = None,
+                 smoothing: float = 0.2, eject_after: int = 3, eject_error_rate: float = 0.5,
+                 ejection_time: float = 10.0, max_ejection_time: float = 300.0,
+                 readmit_time: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Create a router.
+
+        :param backends: the backends
+        :param routes: route -> names of the backends it may use; a route not given uses those
+                       of the "default" route, or else all the backends
+        :param smoothing: weight of each call in the latency and error rate averages (0 to 1)
+        :param eject_after: failures in a row that eject a backend
+        :param eject_error_rate: error rate that ejects a backend
+        :param ejection_time: seconds a backend is first ejected for
+        :param max_ejection_time: most seconds a backend is ejected for
+        :param readmit_time: seconds over which an ejected backend is let back in
+        :param clock: source of the time, in seconds
+        """
+        self.smoothing = smoothing
+        self.eject_after = eject_after
+        self.eject_error_rate = eject_error_rate
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self.readmit_time = readmit_time
+        self.clock = clock
+        self.backends: Dict[str, Backend] = {}
+        self.routes: Dict[str, List[str]] = {}
+        self._stats: Dict[str, BackendStats] = {}
+        self._lock = threading.Lock()
+        self.configure(backends, routes)
+
+    def configure(self, backends: Iterable[Backend],
+                  routes: Optional[Dict[str, List[str]]] = None) -> None:
+        """Set the backends and routes; backends configured as before keep their stats."""
+        backends = {backend.name: backend for backend in backends}
+        routes = {route: list(names) for route, names in (routes or {}).items()}
+        for route, names in routes.items():
+            unknown = [name for name in names if name not in backends]
+            if unknown or not names:
+                raise ValueError(f"LLM route {route}: unknown backends {', '.join(unknown)}"
+                                 if unknown else f"LLM route {route} has no backends")
+        with self._lock:
+            stats = {}
+            for name, backend in backends.items():
+                old = self.backends.get(name)
+                if old is not None and old.settings() == backend.settings():
+                    backends[name], stats[name] = old, self._stats[name]
+                else:
+                    stats[name] = BackendStats()
+            self.backends, self.routes, self._stats = backends, routes, stats
+
+    def route_backends(self, route: str) -> List[str]:
+        """Return the names of the backends a route may use."""
+        return self.routes.get(route) or self.routes.get(DEFAULT_ROUTE) or list(self.backends)
+
+    def _score(self, stats: BackendStats, best_latency: float, now: float) -> float:
+        latency = stats.latency if stats.latency is not None else best_latency
+        score = latency * (stats.outstanding + 1) / max(0.01, 1.0 - stats.errors)
+        since = now - stats.readmitted
+        if since < self.readmit_time:
+            score *= 1 + (READMIT_PENALTY - 1) * (1 - since / self.readmit_time)
+        return score
+
+    def choose(self, route: str, tried: Iterable[str] = ()) -> Backend:
+        """
+        Pick the backend for a call and count it as outstanding, until record() is called.
+
+        :param tried: backends the call failed on already; others are preferred
+        :raises LookupError: if there are no backends
+        """
+        now = self.clock()
+        with self._lock:
+            names = self.route_backends(route)
+            if not names:
+                raise LookupError(f"no LLM backends for route {route}")
+            for name in names:
+                stats = self._stats[name]
+                if stats.ejected_until and stats.ejected_until <= now:
+                    # Back in, on probation: one more failure ejects it again
+                    stats.ejected_until = 0.0
+                    stats.readmitted = now
+                    stats.failures = self.eject_after - 1
+            healthy = [name for name in names if not self._stats[name].ejected_until]
+            # When all are ejected, better to try one than to fail the call
+            names = healthy or names
+            names = [name for name in names if name not in tried] or names
+            known = [self._stats[name].latency for name in names
+                     if self._stats[name].latency is not None]
+            best_latency = min(known) if known else 1.0
+            scores = {name: self._score(self._stats[name], best_latency, now) for name in names}
+            lowest = min(scores.values())
+            best = [name for name, score in scores.items() if score == lowest]
+            # Among equals, one not used yet goes first
+            untried = [name for name in best if self._stats[name].latency is None]
+            name = random.choice(untried or best)
+            stats = self._stats[name]
+            stats.outstanding += 1
+            stats.requests += 1
+            return self.backends[name]
+
+    def record(self, backend: Backend, elapsed: float, failed: Optional[bool]) -> None:
+        """
+        Record how a call chosen with choose() went.
+
+        :param elapsed: seconds the call took
+        :param failed: whether it failed; None if that says nothing about the backend (the
+                       request was bad, or the backend was not called)
+        """
+        now = self.clock()
+        with self._lock:
+            if self.backends.get(backend.name) is not backend:
+                return  # reconfigured meanwhile
+            stats = self._stats[backend.name]
+            stats.outstanding -= 1
+            if failed is None:
+                return
+            stats.errors += ((1.0 if failed else 0.0) - stats.errors) * self.smoothing
+            if not failed:
+                stats.latency = elapsed if stats.latency is None else \
+                    stats.latency + (elapsed - stats.latency) * self.smoothing
+                stats.failures = 0
+                if now - stats.readmitted > self.readmit_time:
+                    stats.ejections = 0
+                return
+            stats.failures += 1
+            if stats.ejected_until:
+                return
+            if stats.failures < self.eject_after and stats.errors < self.eject_error_rate:
+                return
+            ejection = min(self.max_ejection_time, self.ejection_time * 2 ** stats.ejections)
+            stats.ejections += 1
+            stats.ejected_until = now + ejection
+        LLM_BACKEND_EJECTIONS.inc(backend.name)
+        logger.warning("LLM backend %s ejected for %.0f seconds (%d failures in a row, error "
+                       "rate %.2f)", backend.name, ejection, stats.failures, stats.errors)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = self.clock()
+        with self._lock:
+            return {name: stats.as_dict(now) for name, stats in self._stats.items()}
+
+
+def default_backends() -> List[Backend]:
+    """Return the backends used when llm_backends is not set: those of config.py."""
+    return [BedrockBackend('bedrock'), CudoBackend('cudo')]
+
+
+# The routes used when llm_backends is not set: CuDo for the questions about the documentation
+DEFAULT_ROUTES = {DEFAULT_ROUTE: ['bedrock'], 'cudo_chat': ['cudo'], 'ciq_docs': ['cudo']}
+
+LLM_ROUTER = LLMRouter(default_backends(), DEFAULT_ROUTES)
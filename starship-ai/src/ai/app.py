@@ -1,6 +1,8 @@
 #  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import asyncio
 import logging
 import os
+from contextlib import asynccontextmanager
 
 import uvicorn
 from asgi_correlation_id import CorrelationIdMiddleware
@@ -12,10 +14,41 @@ from uvicorn.config import Config
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
 from ai import LOG, __version__
+from ai.admission import AdmissionController, AdmissionMiddleware
+from ai.agents.ciq_agent.prefetch import prefetcher
+from ai.agents.ciq_agent.render_jobs import render_jobs
+from ai.agents.llm_gateway import configure_llm_gateway
+from ai.agents.llm_providers import HTTP_POOL
+from ai.compression import CompressionMiddleware
 from ai.config import NWaCConfig
 from ai.exceptions import InitializationError
+from ai.fairqueue import LLM_QUEUE
+from ai.logs import configure_sampling
+from ai.metrics import REGISTRY
 from ai.models.v1.common import ParseError, ParseErrors
+from ai.ratelimit import RateLimitMiddleware, configure_rate_limits
+from ai.reload import ConfigSnapshotMiddleware, Reloader
 from ai.routes.v1 import PREFIX, ROUTE_LIST, TAG_METADATA
+from ai.tracing import TracingMiddleware
+from ai.warmup import READINESS
+
+
+async def validation_exception_handler(request, exc: RequestValidationError) -> JSONResponse:
+    """Report every validation error with its location (e.g. body -> foo) and message."""
+    # Locations can end in __root__ when a model defines a custom type (e.g. IMSI, a string
+    # matching a regex); that part conveys no useful info to the API consumer, so it is dropped.
+    errors = exc.errors()
+    LOG.debug("%d validation error(s) processing path %s - raw errors: %s", len(errors),
+              request.url.path, errors)
+    messages = [ParseError(path=' -> '.join(str(part) for part in error['loc']
+                                            if part != '__root__')[:128],
+                           message=str(error['msg'])[:128])
+                for error in errors]
+    error_messages = ParseErrors(error='failed to validate request body',
+                                 count=str(min(len(errors), 999)),
+                                 messages=messages)
+    return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        content=error_messages.dict())
 
 
 class App(object):
@@ -30,6 +63,7 @@ class App(object):
 
         self.app = None
         self.uvicorn_config = None
+        self.overrides = {}
 
         self._has_been_set = False
 
@@ -47,14 +81,9 @@ class App(object):
         """
         if self.nwac_config is None or not self.nwac_config.initialized:
             LOG.warning("attempted to apply overrides before config was done")
-        for i in args.keys():
-            if hasattr(self.nwac_config, i):
-                if args[i] is not None:
-                    if getattr(self.nwac_config, i) != args[i]:
-                        LOG.info(f"overriding {i} to {args[i]}")
-                        setattr(self.nwac_config, i, args[i])
-            else:
-                LOG.info(f"did not apply override for {i} - not a config attribute")
+        self.nwac_config.apply_overrides(args)
+        # Kept so they can be re-applied when the config file is hot reloaded
+        self.overrides = dict(args)
 
     def init(self):
         """
@@ -87,9 +116,44 @@ class App(object):
                            redoc_url=f"{PREFIX}/redoc",
                            title=self.nwac_config.title,
                            version=__version__,
+                           lifespan=self.lifespan,
                            )
 
         # Middlewares
+        if self.nwac_config.admission_control:
+            # Innermost, so that traces and the Server-Timing header include the time queued
+            controller = AdmissionController(
+                {'ciq_chat': [f"{PREFIX}/ciq/chat"],
+                 'cudo_chat': [f"{PREFIX}/cudo/chat"],
+                 'wizard_chat': [f"{PREFIX}/workload-cluster/chat", f"{PREFIX}/hub-cluster/chat",
+                                 f"{PREFIX}/general-info/chat"]},
+                initial_limit=float(self.nwac_config.admission_initial_limit),
+                min_limit=float(self.nwac_config.admission_min_limit),
+                max_limit=float(self.nwac_config.admission_max_limit),
+                max_queue=int(self.nwac_config.admission_max_queue),
+                queue_timeout=float(self.nwac_config.admission_queue_timeout),
+                tolerance=float(self.nwac_config.admission_latency_tolerance))
+            self.app.add_middleware(AdmissionMiddleware, controller=controller)
+        self.app.add_middleware(CompressionMiddleware,
+                                minimum_size=int(self.nwac_config.compression_min_size),
+                                cache_size=int(self.nwac_config.compression_cache_size))
+        self.app.add_middleware(TracingMiddleware,
+                                slow_request_ms=float(self.nwac_config.trace_slow_request_ms),
+                                buffer_size=int(self.nwac_config.trace_buffer_size),
+                                probe_paths=[f"{PREFIX}/health", f"{PREFIX}/ready",
+                                             f"{PREFIX}/metrics"])
+        self.app.add_middleware(ConfigSnapshotMiddleware)
+        # Outside the admission control, so that throttled requests don't take its slots
+        configure_rate_limits(self.nwac_config)
+        LLM_QUEUE.configure(int(self.nwac_config.llm_concurrency),
+                            self.nwac_config.llm_queue_weights)
+        HTTP_POOL.configure(int(self.nwac_config.llm_pool_size))
+        configure_llm_gateway(self.nwac_config)
+        prefetcher.configure(int(self.nwac_config.ciq_prefetch_concurrency),
+                             float(self.nwac_config.ciq_prefetch_rate))
+        render_jobs.configure(int(self.nwac_config.ciq_yaml_workers),
+                              self.nwac_config.ciq_yaml_callback_urls)
+        self.app.add_middleware(RateLimitMiddleware, prefix=PREFIX)
         self.app.add_middleware(CorrelationIdMiddleware)
         self.app.add_middleware(ProxyHeadersMiddleware)
         # Add CORS middleware
@@ -106,13 +170,16 @@ class App(object):
 
         # Configure uvicorn via its Config class, applying any overrides from the NWaC config
         # that may have come in from the command line.
-        self.uvicorn_config = Config(app=self.app)
+        # Logging was configured when ai was imported (see ai/__init__.py); don't let uvicorn
+        # configure it again, that would replace the log queue's handlers.
+        self.uvicorn_config = Config(app=self.app, log_config=None)
         if self.nwac_config.port is not None:
             self.uvicorn_config.port = int(self.nwac_config.port)
         if self.nwac_config.host is not None:
             self.uvicorn_config.host = self.nwac_config.host
         self.uvicorn_config.use_colors = False
         self.uvicorn_config.log_level = self.nwac_config.log_level.lower()
+        configure_sampling(self.nwac_config.log_sampling)
         # GOOGLE_APPLICATION_CREDENTIALS controls how the Google Python APIs authenticate (e.g., it
         # points to a private key associated with the service account that we're using to talk to
         # firestore).
@@ -126,52 +193,51 @@ class App(object):
         # We want to make validation errors a lot clearer for external developers.  To do that,
         # we need tp create a custom exception handler for request validation errors (they're
         # thrown by pydantic and handled by Fast API) and register it.
-        @self.app.exception_handler(RequestValidationError)
-        async def validation_exception_handler(request, exc):
-            err = str(exc).splitlines()
-            # THIS IS FRAGILE.
-            # These errors seem to come in clumps of 2 lines per error with a leading line
-            # describing the number of errors found.
-            # Assume that's just always true :(.  Specific assumptions are noted below.
-            #
-            # We can have 1 or more errors, depending on how messed up the request body actually
-            # was.  Report them all here.
-            # The encode().decode() stuff is to get the newlines to show as \n in our json output.
-            err_count = err[0].split(' ')[0]  # line normally reads "N {some text...}"
-            LOG.debug(f"{err_count} validation error(s) processing path {request.url.path} - "
-                      f"raw message: {str(exc).encode('unicode_escape').decode()}")
-            err = err[1:]  # the actual errors start on the next line
-            error_messages = ParseErrors(error='failed to validate request body',
-                                         count=err_count,
-                                         messages=[])
-
-            for i in range(0, int(err_count)):
-                # The remaining lines should be in pairs.  The first line of the pair should be the
-                # path and the second should be the actual problem with that path.  For example, if
-                # the body is supposed to have an attribute foo that matches a regex, then the line
-                # pair we get should look like:
-                # body -> foo
-                #   foo does not match regex <some regex>
-                #
-                # The actual details of the problem aren't relevant - we'll simply emit it - but
-                # the path needs some processing.  Specifically, the path could be (depending
-                # on how we construct our pydantic models): body -> foo -> __root__.  In this
-                # case, root would be due to defining a custom type (e.g., IMSI which is a string
-                # matching a specific regex).  We need to nuke the -> __root__ part as it conveys
-                # no useful info to the API consumer - they don't know (and don't need to know)
-                # the details of how we chose to implement our models.
-                err_path = err[i * 2].strip()
-                err_msg = err[i * 2 + 1].strip()
-                if err_path.endswith('-> __root__'):  # pragma: nocover
-                    err_path = err_path[0:err_path.index('-> __root__')].strip()
-                parse_error = ParseError(path=err_path,
-                                         message=err_msg)
-
-                LOG.debug(f"error {i + 1}: {str(parse_error)}")
-                error_messages.messages.append(parse_error)
-            return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                                content=error_messages.dict()
-                                )
+        self.app.add_exception_handler(RequestValidationError, validation_exception_handler)
+
+    @asynccontextmanager
+    async def lifespan(self, app: FastAPI):
+        """Start background services with the server and stop them when it shuts down."""
+        reloader = None
+        hot_reload = self.nwac_config.hot_reload
+        if hot_reload is None:
+            hot_reload = self.nwac_config.dev
+        if hot_reload:
+            reloader = Reloader(self.nwac_config, self.overrides)
+            await reloader.start()
+        # Warm up in the background so the server (and /health) is up while it runs
+        warmup = None
+        if self.nwac_config.warmup:
+            warmup = asyncio.create_task(READINESS.warm_up(self.nwac_config), name='nwac-warmup')
+        else:
+            READINESS.skip()
+        metrics_flusher = None
+        if self.nwac_config.metrics_dir:
+            interval = float(self.nwac_config.metrics_flush_interval)
+            REGISTRY.directory = self.nwac_config.metrics_dir
+            # A worker that missed a few flushes in a row is gone
+            REGISTRY.expiry = max(interval * 3, 30.0)
+            metrics_flusher = asyncio.create_task(self._flush_metrics(interval),
+                                                  name='nwac-metrics')
+        try:
+            yield
+        finally:
+            if warmup is not None and not warmup.done():
+                warmup.cancel()
+            if metrics_flusher is not None:
+                metrics_flusher.cancel()
+                await asyncio.to_thread(REGISTRY.remove_snapshot)
+            if reloader is not None:
+                await reloader.stop()
+
+    @staticmethod
+    async def _flush_metrics(interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(REGISTRY.write_snapshot)
+            except OSError as e:
+                LOG.warning("could not write metrics snapshot to %s: %r", REGISTRY.directory, e)
 
     def run(self):
         """Run the REST server."""
@@ -0,0 +1,178 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Negotiated response compression.
+
+CompressionMiddleware compresses complete response bodies with the best encoding the client
+accepts: gzip always, and zstd and brotli when their libraries are installed (the "compression"
+extra).  Small bodies, bodies that are already encoded, streamed responses (including server-sent
+events) and responses without a body are passed through untouched.  Every response that could
+have been compressed carries Vary: Accept-Encoding, compressed or not, so shared caches keep the
+encodings apart.
+
+Bodies that are served over and over (payload schemas, the OpenAPI document, a completed
+session's YAML) can be compressed once and kept in a small LRU.  Responses with a strong ETag
+are cached by ETag, and other GET responses by a digest of the body; the bodies of other
+methods (e.g. chat turns) are not expected to repeat and are never cached.
+"""
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: nocover
+    zstandard = None
+try:
+    import brotli
+except ImportError:  # pragma: nocover
+    brotli = None
+
+# Content types that are not worth compressing or must not be buffered
+EXCLUDED_CONTENT_TYPES = ('text/event-stream', 'image/', 'audio/', 'video/', 'application/zip',
+                          'application/gzip', 'application/zstd')
+# Bodies larger than this are never kept in the precompressed cache
+MAX_CACHED_BODY = 1024 * 1024
+
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    # In order of preference when the client accepts several equally
+    compressors = {}
+    if zstandard is not None:
+        compressors['zstd'] = zstandard.ZstdCompressor(level=3).compress
+    if brotli is not None:
+        compressors['br'] = lambda body: brotli.compress(body, quality=4)
+    compressors['gzip'] = lambda body: gzip.compress(body, compresslevel=6, mtime=0)
+    return compressors
+
+
+def negotiate(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """
+    Pick an encoding from an Accept-Encoding header value.
+
+    :param accept_encoding: the header value, e.g. "gzip, deflate, br;q=0.9"
+    :param available: the encodings we can produce, most preferred first
+    :return: the chosen encoding, or None to send the body as-is
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name] = quality
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _with_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Return the headers with Accept-Encoding added to Vary (merged into any existing one)."""
+    vary = [v for k, v in headers if k == b'vary']
+    if any(v.strip() == b'*' or b'accept-encoding' in v.lower() for v in vary):
+        return headers
+    return [(k, v) for k, v in headers if k != b'vary'] + \
+        [(b'vary', b', '.join(vary + [b'Accept-Encoding']))]
+
+
+class CompressionMiddleware(object):
+    """Compress response bodies according to the request's Accept-Encoding."""
+
+    def __init__(self, app, minimum_size: int = 1024, cache_size: int = 0):
+        """
+        Create the middleware.
+
+        :param app: the ASGI app to wrap
+        :param minimum_size: bodies smaller than this many bytes are sent uncompressed
+        :param cache_size: number of compressed bodies to keep for reuse (0 disables caching)
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache_size = cache_size
+        self.compressors = _compressors()
+        self._cache: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        accept_encoding = ''
+        for name, value in scope['headers']:
+            if name == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+        encoding = negotiate(accept_encoding, list(self.compressors))
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                # Hold the start until we have seen the body
+                start = message
+                return
+            if message['type'] != 'http.response.body' or start is None:
+                return await send(message)
+            pending, start = start, None
+            if message.get('more_body', False) or not self._compressible(pending, message):
+                # Streamed (or not worth it) - pass through untouched from here on
+                await send(pending)
+                return await send(message)
+            if encoding is None:
+                # Sent as-is to this client, but another one would get it compressed
+                await send({**pending, 'headers': _with_vary(pending['headers'])})
+                return await send(message)
+            body = self._compress(encoding, message['body'], pending, scope['method'])
+            headers = [(k, v) for k, v in _with_vary(pending['headers'])
+                       if k not in (b'content-length', b'etag')]
+            etag = next((v for k, v in pending['headers'] if k == b'etag'), None)
+            if etag is not None:
+                # The encoded bytes differ from what a strong ETag names, so weaken it (weak
+                # comparison in If-None-Match still matches it against the original)
+                headers.append((b'etag', etag if etag.startswith(b'W/') else b'W/' + etag))
+            headers.append((b'content-encoding', encoding.encode('latin-1')))
+            headers.append((b'content-length', str(len(body)).encode('latin-1')))
+            await send({**pending, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, start, message) -> bool:
+        if len(message.get('body', b'')) < self.minimum_size:
+            return False
+        for name, value in start['headers']:
+            if name == b'content-encoding':
+                return False
+            if name == b'content-type' and \
+                    value.decode('latin-1').lower().startswith(EXCLUDED_CONTENT_TYPES):
+                return False
+        return True
+
+    def _compress(self, encoding: str, body: bytes, start, method: str) -> bytes:
+        if not self.cache_size or len(body) > MAX_CACHED_BODY:
+            return self.compressors[encoding](body)
+        etag = next((v for k, v in start['headers'] if k == b'etag'), None)
+        # Strong ETags identify the exact bytes; other GET responses are keyed by content
+        if etag is not None and not etag.startswith(b'W/'):
+            key = (encoding, etag.decode('latin-1'))
+        elif method in ('GET', 'HEAD'):
+            key = (encoding, hashlib.blake2b(body, digest_size=16).hexdigest())
+        else:
+            return self.compressors[encoding](body)
+        compressed = self._cache.get(key)
+        if compressed is None:
+            compressed = self.compressors[encoding](body)
+            self._cache[key] = compressed
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return compressed
@@ -1,5 +1,7 @@
 #  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
-from typing import Any, Dict, List, Union
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Union
 
 import yaml
 
@@ -34,6 +36,8 @@ class NWaCConfig(object):
         self.host = None
         self.port = None
         self.log_level = ""
+        # logger name -> ai.logs.SamplingFilter arguments (rate, per_second)
+        self.log_sampling = {}
         self.project_id = ""
         self.app_credentials = ""
         self.endpoints = EndPoints()
@@ -45,6 +49,102 @@ class NWaCConfig(object):
         self.intent_list_version = "v1"
         self.intent_list_timeout = 5
 
+        # hot_reload watches the config file and the CIQ blueprints and applies changes without
+        # a restart; None (the default) turns it on in dev mode only.  hot_reload_interval is the
+        # polling period (in seconds) used when inotify is not available.
+        self.hot_reload = None
+        self.hot_reload_interval = 2.0
+
+        # Responses of at least compression_min_size bytes are compressed when the client
+        # accepts it.  compression_cache_size compressed bodies are kept for reuse (0 disables).
+        self.compression_min_size = 1024
+        self.compression_cache_size = 64
+
+        # LLM-backed requests are admitted up to a concurrency limit per route class, which adapts
+        # to their latency between admission_min_limit and admission_max_limit.  Up to
+        # admission_max_queue more wait at most admission_queue_timeout seconds; the others get a
+        # 503 with Retry-After.  See ai/admission.py.
+        self.admission_control = True
+        self.admission_initial_limit = 20
+        self.admission_min_limit = 2
+        self.admission_max_limit = 200
+        self.admission_max_queue = 50
+        self.admission_queue_timeout = 10.0
+        self.admission_latency_tolerance = 2.0
+
+        # Requests to the route groups in rate_limits are limited per client, by token buckets
+        # kept in memory or, to share them between worker processes, in the SQLite database
+        # rate_limit_db.  Clients are told apart by the first of rate_limit_key they send.  At
+        # most llm_concurrency LLM calls run at once, their turns shared fairly between sessions
+        # and clients (weighted by llm_queue_weights).  See ai/ratelimit.py and ai/fairqueue.py.
+        self.rate_limits = {}
+        self.rate_limit_key = ['api_key', 'ip']
+        self.rate_limit_db = ''
+        self.llm_concurrency = 16
+        self.llm_queue_weights = {}
+
+        # LLM calls go through a gateway to the backends in llm_backends (by default the Bedrock
+        # model and CuDo of ai/agents/config.py), each route using those llm_routes lists for it,
+        # picked by latency, error rate and load; failing backends are ejected for a while.  The
+        # backends share a pool of llm_pool_size connections per host, a retry budget allowing
+        # llm_retry_budget retries per call, a cache of llm_cache_size answers kept for
+        # llm_cache_ttl seconds, and a limit of llm_backend_concurrency calls in progress per
+        # backend.  See ai/agents/llm_gateway.py.
+        self.llm_backends = []
+        self.llm_routes = {}
+        self.llm_pool_size = 32
+        self.llm_retry_budget = 0.2
+        self.llm_cache_size = 256
+        self.llm_cache_ttl = 300.0
+        self.llm_backend_concurrency = 16
+
+        # Once a CIQ parameter is answered, the CuDo explanation of the next one is fetched in
+        # the background, at most ciq_prefetch_concurrency at once and ciq_prefetch_rate a second
+        # (0 turns prefetching off).  See ai/agents/ciq_agent/prefetch.py.
+        self.ciq_prefetch_concurrency = 4
+        self.ciq_prefetch_rate = 2.0
+
+        # The final YAML of CIQ sessions is rendered in the background by ciq_yaml_workers
+        # threads; clients may have the job status POSTed to URLs matching ciq_yaml_callback_urls
+        # when it is done.  See ai/agents/ciq_agent/render_jobs.py.
+        self.ciq_yaml_workers = 2
+        self.ciq_yaml_callback_urls = []
+
+        # The CIQ chat WebSocket (/ciq/chat/ws) pings its clients every ciq_ws_heartbeat seconds,
+        # queues at most ciq_ws_send_queue events per connection, refuses messages over
+        # ciq_ws_max_message bytes, and allows ciq_ws_max_connections connections at a time.
+        # See ai/routes/v1/ciq_socket.py.
+        self.ciq_ws_heartbeat = 20.0
+        self.ciq_ws_send_queue = 64
+        self.ciq_ws_max_message = 16384
+        self.ciq_ws_max_connections = 500
+
+        # The server warms up (compiles blueprints, creates LLM clients, opens connections) when
+        # it starts and only reports ready once that is done.  Each component gets
+        # warmup_timeout seconds; warmup_probe also sends Bedrock a one-token request.
+        self.warmup = True
+        self.warmup_timeout = 30.0
+        self.warmup_probe = False
+
+        # With several worker processes, each writes its metrics to metrics_dir every
+        # metrics_flush_interval seconds so /metrics can report the sum over all of them.
+        self.metrics_dir = ''
+        self.metrics_flush_interval = 5.0
+
+        # Requests are traced in-process.  The span tree of a request that takes at least
+        # trace_slow_request_ms is logged, the last trace_buffer_size traces are kept, and
+        # trace_debug_endpoint serves them at /debug/traces.
+        self.trace_slow_request_ms = 2000
+        self.trace_buffer_size = 100
+        self.trace_debug_endpoint = False
+
+        # GET /debug/profile samples the process's stacks for up to profiler_max_seconds.  It is
+        # served in dev mode or with profiler_endpoint; callers must send profiler_token in the
+        # X-Profiler-Token header, which outside dev mode must be set.
+        self.profiler_endpoint = False
+        self.profiler_token = ''
+        self.profiler_max_seconds = 60
+
         self._initialized = False
 
     def update_from_file(self):
@@ -88,6 +188,21 @@ class NWaCConfig(object):
 
         self._initialized = True
 
+    def apply_overrides(self, args: dict):
+        """
+        Override settings with the given values.
+
+        Keys that are not config attributes and keys whose value is None are skipped.
+        """
+        for i in args.keys():
+            if hasattr(self, i):
+                if args[i] is not None:
+                    if getattr(self, i) != args[i]:
+                        LOG.info(f"overriding {i} to {args[i]}")
+                        setattr(self, i, args[i])
+            else:
+                LOG.info(f"did not apply override for {i} - not a config attribute")
+
     @property
     def initialized(self) -> bool:
         return self._initialized
@@ -115,11 +230,36 @@ class NWaCConfig(object):
 
 CONFIG = NWaCConfig()
 
+# The config a request started with.  Pinned per request by ai.reload.ConfigSnapshotMiddleware so
+# that a request keeps using one config even if the file is reloaded while it is in flight.
+_REQUEST_CONFIG: ContextVar[Optional[NWaCConfig]] = ContextVar('nwac_request_config', default=None)
+
+
+def get_config() -> NWaCConfig:
+    """Return the config for the current request, or the current config outside of one."""
+    return _REQUEST_CONFIG.get() or CONFIG
+
+
+@contextmanager
+def config_snapshot():
+    """Keep get_config() returning the current config for the duration of the block."""
+    token = _REQUEST_CONFIG.set(get_config())
+    try:
+        yield
+    finally:
+        _REQUEST_CONFIG.reset(token)
+
+
+def set_config(config: NWaCConfig):
+    """Make the given config current.  Requests already in flight are not affected."""
+    global CONFIG
+    CONFIG = config
+
 
 # Function to fetch configuration values dynamically
 def get_config_value(key):
     """Retrieve a config value dynamically after the config has been loaded."""
-    value = getattr(CONFIG, key, None)
+    value = getattr(get_config(), key, None)
     if value is None:
         LOG.warning(f"{key} is not set in the config file.")
     return value
@@ -0,0 +1,125 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Weighted fair queueing of LLM calls.
+
+The LLM clients block, so the routes run them in worker threads, at most llm_concurrency at a
+time per process.  When more are waiting, the slots are shared out fairly between flows - a CIQ
+session, or the client for calls outside a session - rather than first come, first served, so a
+client firing many requests at once does not hold up everyone else.  The queue is start-time fair:
+each call gets a virtual start tag, the later of the current virtual time and the finish tag of
+its flow's previous call, and the waiting call with the smallest tag goes next.  A flow with
+weight 2 gets twice the share of a flow with weight 1 (llm_queue_weights, by client identity).
+
+A session's calls are also run one at a time, as its state is not meant to be changed by two
+calls at once.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from ai.metrics import LLM_QUEUE_WAIT
+
+# (start tag, future set when the call may go, whether the flow runs one call at a time)
+_Entry = Tuple[float, asyncio.Future, bool]
+
+
+class FairQueue(object):
+    """Share a number of slots fairly between flows."""
+
+    def __init__(self, slots: int = 16, weights: Optional[Dict[str, float]] = None):
+        """
+        Create a queue.
+
+        :param slots: how many calls may run at once
+        :param weights: client identity -> weight (1 if not given)
+        """
+        self.slots = slots
+        self.weights = dict(weights or {})
+        self.busy = 0
+        self._virtual = 0.0
+        self._waiting: Dict[str, Deque[_Entry]] = {}
+        self._running: Dict[str, int] = {}
+        self._finish: Dict[str, float] = {}
+
+    def configure(self, slots: int, weights: Optional[Dict[str, float]] = None) -> None:
+        self.slots = slots
+        self.weights = dict(weights or {})
+
+    @property
+    def queued(self) -> int:
+        return sum(len(entries) for entries in self._waiting.values())
+
+    @asynccontextmanager
+    async def turn(self, flow: str, client: Optional[str] = None,
+                   exclusive: bool = False) -> AsyncIterator[None]:
+        """
+        Wait for a fair turn to make a call.
+
+        :param flow: what the call belongs to (e.g. "session:<id>")
+        :param client: the client making the call, for its weight (defaults to the flow)
+        :param exclusive: run the calls of the flow one at a time
+        """
+        weight = self.weights.get(client or flow, 1.0)
+        start = max(self._virtual, self._finish.get(flow, 0.0))
+        self._finish[flow] = start + 1.0 / max(weight, 1e-3)
+        go = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(flow, deque()).append((start, go, exclusive))
+        queued_at = time.perf_counter()
+        self._dispatch()
+        try:
+            await go
+        except BaseException:
+            if go.done() and not go.cancelled():
+                # Given a turn just as it was cancelled
+                self._release(flow)
+            else:
+                go.cancel()
+            raise
+        LLM_QUEUE_WAIT.observe(time.perf_counter() - queued_at)
+        try:
+            yield
+        finally:
+            self._release(flow)
+
+    def _release(self, flow: str) -> None:
+        self.busy -= 1
+        self._running[flow] -= 1
+        if not self._running[flow]:
+            del self._running[flow]
+            if flow not in self._waiting and self._finish.get(flow, 0.0) <= self._virtual:
+                # Idle and not ahead of the others: it is as if the flow had never called
+                self._finish.pop(flow, None)
+        if len(self._finish) > 10000:
+            self._finish = {f: finish for f, finish in self._finish.items()
+                            if finish > self._virtual or f in self._running or f in self._waiting}
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self.busy < self.slots:
+            best: Optional[Tuple[float, str]] = None
+            for flow, entries in list(self._waiting.items()):
+                while entries and entries[0][1].done():
+                    entries.popleft()  # cancelled while waiting
+                if not entries:
+                    del self._waiting[flow]
+                    continue
+                start, _, exclusive = entries[0]
+                if exclusive and self._running.get(flow):
+                    continue
+                if best is None or start < best[0]:
+                    best = (start, flow)
+            if best is None:
+                return
+            start, flow = best
+            _, go, _ = self._waiting[flow].popleft()
+            if not self._waiting[flow]:
+                del self._waiting[flow]
+            self._virtual = max(self._virtual, start)
+            self.busy += 1
+            self._running[flow] = self._running.get(flow, 0) + 1
+            go.set_result(None)
+
+
+LLM_QUEUE = FairQueue()
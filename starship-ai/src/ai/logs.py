@@ -0,0 +1,244 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Log output: JSON formatting, a background writer thread and sampling.
+
+JsonFormatter writes one JSON object per line, built with json.dumps so that quotes, newlines and
+the like in messages can't break it; AccessJsonFormatter does the same for uvicorn's access log.
+
+LogQueue moves formatting and writing off the calling thread: the loggers it is attached to only
+run their handlers' filters (which need the caller's context, e.g. its correlation ID) and put
+the record on a queue, and a background thread formats and writes it.  The message is merged
+with its arguments on the background thread too, unless an argument could change in the
+meantime.
+
+SamplingFilter bounds the volume of a busy logger (e.g. the access log): it keeps a fraction of
+its records and at most so many per second.  Warnings and errors are always kept, and the next
+record kept notes how many were dropped before it.
+"""
+import copy
+import http
+import json
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler
+from typing import Dict, List, Optional
+
+# Arguments of these types can't change after the call, so formatting them can wait
+_IMMUTABLE = (str, int, float, bool, type(None), bytes)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as JSON objects: time, lvl, correlation_id, from and msg."""
+
+    def __init__(self, datefmt: Optional[str] = None, detailed: bool = False):
+        """
+        Create a formatter.
+
+        :param datefmt: strftime format of the time
+        :param detailed: give the module and function a record comes from as well as its logger
+        """
+        super().__init__(datefmt=datefmt)
+        self.detailed = detailed
+
+    def fields(self, record: logging.LogRecord) -> dict:
+        origin = record.name
+        if self.detailed:
+            origin = f"{record.name}.{record.module}.{record.funcName}"
+        result = {'time': self.formatTime(record, self.datefmt),
+                  'lvl': record.levelname,
+                  'correlation_id': getattr(record, 'correlation_id', None),
+                  'from': origin,
+                  'msg': record.getMessage()}
+        dropped = getattr(record, 'dropped', 0)
+        if dropped:
+            result['dropped'] = dropped
+        return result
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = self.fields(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            fields['exc'] = record.exc_text
+        if record.stack_info:
+            fields['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(fields, default=str)
+
+
+class AccessJsonFormatter(JsonFormatter):
+    """Format uvicorn access log records: time, lvl, correlation_id, from, src, req and status."""
+
+    def fields(self, record: logging.LogRecord) -> dict:
+        client_addr, method, full_path, http_version, status_code = record.args
+        try:
+            phrase = http.HTTPStatus(int(status_code)).phrase
+        except ValueError:
+            phrase = ''
+        result = {'time': self.formatTime(record, self.datefmt),
+                  'lvl': record.levelname,
+                  'correlation_id': getattr(record, 'correlation_id', None),
+                  'from': record.name,
+                  'src': client_addr,
+                  'req': f"{method} {full_path} HTTP/{http_version}",
+                  'status': f"{status_code} {phrase}"}
+        dropped = getattr(record, 'dropped', 0)
+        if dropped:
+            result['dropped'] = dropped
+        return result
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of a logger's records, and at most so many per second."""
+
+    def __init__(self, rate: float = 1.0, per_second: Optional[float] = None,
+                 always: int = logging.WARNING):
+        """
+        Create a filter.
+
+        :param rate: fraction of the records to keep (every 1/rate-th one is kept)
+        :param per_second: most records to keep per second (in bursts of up to that many)
+        :param always: records at this level or above are always kept
+        """
+        super().__init__()
+        self.rate = rate
+        self.per_second = per_second
+        self.always = always
+        self.dropped = 0
+        # The first record is kept
+        self._credit = 1.0 - rate
+        self._tokens = per_second
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.always:
+            return self._keep(record)
+        with self._lock:
+            self._credit += self.rate
+            if self._credit < 1.0:
+                self.dropped += 1
+                return False
+            if self.per_second is not None:
+                now = time.monotonic()
+                self._tokens = min(self.per_second,
+                                   self._tokens + (now - self._refilled) * self.per_second)
+                self._refilled = now
+                if self._tokens < 1.0:
+                    self.dropped += 1
+                    return False
+                self._tokens -= 1.0
+            self._credit -= 1.0
+        return self._keep(record)
+
+    def _keep(self, record: logging.LogRecord) -> bool:
+        if self.dropped:
+            with self._lock:
+                record.dropped, self.dropped = self.dropped, 0
+        return True
+
+
+def configure_sampling(settings: Dict[str, dict]) -> None:
+    """
+    Set the sampling of loggers, replacing any set before.
+
+    :param settings: logger name -> SamplingFilter arguments (rate, per_second)
+    """
+    for logger in [logging.getLogger()] + [logging.getLogger(name)
+                                           for name in logging.root.manager.loggerDict]:
+        for existing in [f for f in logger.filters if isinstance(f, SamplingFilter)]:
+            logger.removeFilter(existing)
+    for name, arguments in (settings or {}).items():
+        logging.getLogger(name).addFilter(SamplingFilter(**arguments))
+
+
+class _QueueHandler(QueueHandler):
+    """Hands records for the given handlers to a LogQueue."""
+
+    def __init__(self, log_queue: 'LogQueue', handlers: List[logging.Handler]):
+        super().__init__(log_queue.queue)
+        self.log_queue = log_queue
+        self.handlers = handlers
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # The handlers' filters run here: they may need the caller's context
+        handlers = [h for h in self.handlers if record.levelno >= h.level and h.filter(record)]
+        if not handlers:
+            return False
+        if not self.log_queue.running:
+            for handler in handlers:
+                handler.handle(record)
+            return True
+        try:
+            self.queue.put_nowait((self.prepare(record), handlers))
+        except Exception:
+            self.handleError(record)
+        return True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        args = record.args
+        if not isinstance(record.msg, str) or \
+                args and not (isinstance(args, tuple) and all(isinstance(a, _IMMUTABLE)
+                                                              for a in args)):
+            # An argument could change before the record is written: merge it now
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class LogQueue(object):
+    """Writes the records of the loggers it is attached to on a background thread."""
+
+    def __init__(self):
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def attach(self, *names: str) -> None:
+        """Route the records of the given loggers (by name, '' is the root) through the queue."""
+        for name in names:
+            logger = logging.getLogger(name)
+            handlers = [h for h in logger.handlers if not isinstance(h, _QueueHandler)]
+            if handlers:
+                logger.handlers = [_QueueHandler(self, handlers)]
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write, name='nwac-log', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Write the records still queued, then write directly from the calling threads."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self.queue.put(None)
+            thread.join()
+
+    def _write(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            self._emit(*item)
+        # Records queued by threads that hadn't seen the queue stop yet
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self._emit(*item)
+
+    @staticmethod
+    def _emit(record: logging.LogRecord, handlers: List[logging.Handler]) -> None:
+        for handler in handlers:
+            handler.acquire()
+            try:
+                handler.emit(record)
+            finally:
+                handler.release()
@@ -11,6 +11,7 @@ from ai.app import App
 from ai.config import CONFIG
 # from sm.db.docdb import init_doc_dbs
 from ai.routes.v1 import __api_version__
+from ai.startup import format_report, profile_imports
 
 
 def create_parser():
@@ -46,6 +47,12 @@ def create_parser():
                     help=("Print the schema to ./openapi_{api version}.yaml and exit "
                           "(default: %(default)s)")
                     )
+    _p.add_argument('--profile-startup',
+                    default=False,
+                    action='store_true',
+                    help=("Print how long the server's imports take, per module, and exit "
+                          "(default: %(default)s)")
+                    )
     _p.add_argument('--intent-list-api-url',
                     help='Override the intent list API URL'
                     )
@@ -72,6 +79,9 @@ def main():  # pragma: nocover
     # 7) Run the app.  We expect the app to only exit when the server has been told to stop
     #    (or on some catastrophic error that we/it doesn't handle).
     _args = vars(create_parser().parse_args())
+    if _args['profile_startup']:
+        print(format_report(profile_imports()))
+        return 0
     LOG.info('Starting server initialization')
     CONFIG.config_file = _args['config_file']
     CONFIG.update_from_file()
@@ -0,0 +1,488 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Prometheus metrics.
+
+A small registry of counters, gauges and histograms, exposed in the Prometheus text format by
+GET /metrics.  Recording is cheap and takes no locks: every thread records into its own shard of
+each metric, and the shards are only added up when the metrics are scraped.
+
+Each process keeps its own metrics.  When the server runs as several worker processes, set
+metrics_dir to a directory shared by them: every worker then writes a snapshot of its metrics
+there periodically, and whichever worker is scraped reports the sum over all of them.  A worker
+removes its snapshot when it shuts down.  Snapshots of workers that are gone, or that have not
+been rewritten for a while (a crashed worker, or its PID reused by another process), are ignored
+and removed; totals then drop, which Prometheus treats as a counter reset.
+"""
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from ai.tracing import span
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# Seconds; covers quick local work up to slow LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[str, ...]
+
+
+class Metric(object):
+    """Base class: values are kept per thread and summed when collected."""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 registry: Optional['Registry'] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            # First use in this thread - the only time a lock is taken
+            values = self._local.values = {}
+            with self._shards_lock:
+                self._shards.append(values)
+            return values
+
+    def collect(self) -> Dict[Labels, object]:
+        """Return {label values: value} summed over all threads."""
+        total = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # Copying the items is atomic, so a thread recording meanwhile is not a problem
+            for labels, value in list(shard.items()):
+                total[labels] = _add(total.get(labels), value)
+        return total
+
+
+def _add(a, b):
+    if a is None:
+        return list(b) if isinstance(b, list) else b
+    if isinstance(a, list):
+        return [x + y for x, y in zip(a, b)]
+    return a + b
+
+
+class Counter(Metric):
+    kind = COUNTER
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+
+class Gauge(Metric):
+    """A gauge that is moved up and down, or computed by a function when collected."""
+
+    kind = GAUGE
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 function: Optional[Callable[[], Dict[Labels, float]]] = None,
+                 registry: Optional['Registry'] = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.function = function
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    @contextmanager
+    def track(self, *labels: str) -> Iterator[None]:
+        """Count the block as in progress while it runs."""
+        self.inc(*labels)
+        try:
+            yield
+        finally:
+            self.dec(*labels)
+
+    def collect(self) -> Dict[Labels, object]:
+        if self.function is not None:
+            return dict(self.function())
+        return super().collect()
+
+
+class Histogram(Metric):
+    kind = HISTOGRAM
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+                 registry: Optional['Registry'] = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        # [count per bucket (not cumulative)..., count above the last bucket, sum]
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+
+class Registry(object):
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.directory: Optional[str] = None
+        # Other workers' snapshots older than this many seconds are stale
+        self.expiry = 60.0
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+
+    def snapshot(self) -> dict:
+        """Return this process's metrics in a JSON-serializable form."""
+        return {name: {'kind': metric.kind,
+                       'values': [[list(labels), value]
+                                  for labels, value in metric.collect().items()]}
+                for name, metric in self.metrics.items()}
+
+    def write_snapshot(self) -> None:
+        """Write this process's snapshot to the shared directory (atomically)."""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=f'{os.getpid()}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, os.path.join(self.directory, f'{os.getpid()}.json'))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def remove_snapshot(self) -> None:
+        """Remove this process's snapshot from the shared directory (on shutdown)."""
+        if self.directory:
+            _remove(os.path.join(self.directory, f'{os.getpid()}.json'))
+
+    def collect(self) -> Dict[str, Dict[Labels, object]]:
+        """Return {metric name: {label values: value}} over this process and any others."""
+        totals = {name: metric.collect() for name, metric in self.metrics.items()}
+        for snapshot in self._other_snapshots():
+            for name, data in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = totals[name]
+                for labels, value in data['values']:
+                    values[tuple(labels)] = _add(values.get(tuple(labels)), value)
+        return totals
+
+    def _other_snapshots(self) -> Iterator[dict]:
+        if not self.directory:
+            return
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        oldest = time.time() - self.expiry
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext != '.json' or not stem.isdigit() or int(stem) == os.getpid():
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if not _is_alive(int(stem)) or os.path.getmtime(path) < oldest:
+                    _remove(path)
+                    continue
+                with open(path) as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue
+
+    def exposition(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        totals = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, value in sorted(totals[name].items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if metric.kind != HISTOGRAM:
+                    lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (math.inf,), value[:-1]):
+                    cumulative += count
+                    bucket_labels = _format_labels(pairs + [('le', _format_value(bound))])
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(pairs)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _escape_help(text: str) -> str:
+    return text.replace('\\', r'\\').replace('\n', r'\n')
+
+
+def _format_labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# Global metrics registry
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = Histogram(
+    'starship_http_request_duration_seconds',
+    'Time taken to handle a request, by route template, method and status code.',
+    ('route', 'method', 'status'))
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    'starship_http_requests_in_flight',
+    'Requests currently being handled, by route template.',
+    ('route',))
+UPSTREAM_REQUEST_DURATION = Histogram(
+    'starship_upstream_request_duration_seconds',
+    'Time taken by calls to upstream services, by upstream, target and outcome.',
+    ('upstream', 'target', 'outcome'))
+UPSTREAM_RETRIES = Counter(
+    'starship_upstream_retries_total',
+    'Retried calls to upstream services, by upstream and target.',
+    ('upstream', 'target'))
+UPSTREAM_REQUESTS_IN_FLIGHT = Gauge(
+    'starship_upstream_requests_in_flight',
+    'Calls to upstream services currently in progress, by upstream.',
+    ('upstream',))
+
+
+def _session_counts() -> Dict[Labels, float]:
+    from ai.agents.ciq_agent.session_manager import session_manager
+
+    return {(state,): count for state, count in session_manager.stats().items()}
+
+
+CIQ_SESSIONS = Gauge(
+    'starship_ciq_sessions',
+    'CIQ chat sessions held in the session store, by state.',
+    ('state',), function=_session_counts)
+
+
+def _yaml_job_counts() -> Dict[Labels, float]:
+    from ai.agents.ciq_agent.render_jobs import render_jobs
+
+    return {(status,): count for status, count in render_jobs.stats().items()}
+
+
+CIQ_YAML_JOBS = Gauge(
+    'starship_ciq_yaml_jobs',
+    'CIQ YAML render jobs kept, by status (queued, running, done or failed).',
+    ('status',), function=_yaml_job_counts)
+CIQ_YAML_RENDER_DURATION = Histogram(
+    'starship_ciq_yaml_render_seconds',
+    'Time taken by CIQ YAML render jobs, by status (done or failed).',
+    ('status',))
+
+
+def _open_sockets() -> Dict[Labels, float]:
+    from ai.routes.v1.ciq_socket import ChatSocket
+
+    return {(): len(ChatSocket.OPEN)}
+
+
+CIQ_SOCKETS = Gauge(
+    'starship_ciq_chat_sockets',
+    'CIQ chat WebSocket connections open.',
+    function=_open_sockets)
+CIQ_PREFETCHES = Counter(
+    'starship_ciq_prefetches_total',
+    'Speculative prefetches of CuDo answers for CIQ parameters, by outcome (used, unused, '
+    'failed, or skipped for the concurrency limit or budget).',
+    ('outcome',))
+CIQ_PREFETCH_LOOKUPS = Counter(
+    'starship_ciq_prefetch_lookups_total',
+    'CIQ questions about a parameter looked up among the prefetched answers, by result (hit or '
+    'miss).',
+    ('result',))
+
+
+def _prefetch_hit_ratio() -> Dict[Labels, float]:
+    from ai.agents.ciq_agent.prefetch import prefetcher
+
+    return {(): prefetcher.hit_ratio}
+
+
+CIQ_PREFETCH_HIT_RATIO = Gauge(
+    'starship_ciq_prefetch_hit_ratio',
+    'Fraction of the CIQ questions about a parameter answered by a prefetch.',
+    function=_prefetch_hit_ratio)
+
+
+def _admission_stats(stat: str) -> Dict[Labels, float]:
+    from ai.admission import active_controller
+
+    controller = active_controller()
+    if controller is None:
+        return {}
+    return {(name,): stats[stat] for name, stats in controller.stats().items()}
+
+
+ADMISSION_LIMIT = Gauge(
+    'starship_admission_limit',
+    'Adaptive concurrency limit of LLM-backed requests, by route class.',
+    ('route_class',), function=lambda: _admission_stats('limit'))
+ADMISSION_IN_FLIGHT = Gauge(
+    'starship_admission_in_flight',
+    'LLM-backed requests admitted and in progress, by route class.',
+    ('route_class',), function=lambda: _admission_stats('in_flight'))
+ADMISSION_QUEUED = Gauge(
+    'starship_admission_queued',
+    'LLM-backed requests waiting to be admitted, by route class.',
+    ('route_class',), function=lambda: _admission_stats('queued'))
+ADMISSION_QUEUE_WAIT = Histogram(
+    'starship_admission_queue_wait_seconds',
+    'Time LLM-backed requests waited to be admitted, by route class.',
+    ('route_class',))
+ADMISSION_SHED = Counter(
+    'starship_admission_shed_total',
+    'LLM-backed requests turned away with a 503, by route class and reason (queue_full or '
+    'timeout).',
+    ('route_class', 'reason'))
+
+
+RATE_LIMITED = Counter(
+    'starship_rate_limited_total',
+    'Requests refused with a 429 because their client was over the limit, by route group.',
+    ('group',))
+
+
+def _llm_calls() -> Dict[Labels, float]:
+    from ai.fairqueue import LLM_QUEUE
+
+    return {('running',): LLM_QUEUE.busy, ('queued',): LLM_QUEUE.queued}
+
+
+LLM_CALLS = Gauge(
+    'starship_llm_calls',
+    'LLM calls running or waiting for a turn in the fair queue.',
+    ('state',), function=_llm_calls)
+LLM_QUEUE_WAIT = Histogram(
+    'starship_llm_queue_wait_seconds',
+    'Time LLM calls waited for a turn in the fair queue.')
+
+
+def _llm_backend_stats(stat: str) -> Dict[Labels, float]:
+    from ai.agents.llm_router import LLM_ROUTER
+
+    return {(name,): float(stats[stat]) for name, stats in LLM_ROUTER.stats().items()}
+
+
+LLM_BACKEND_LATENCY = Gauge(
+    'starship_llm_backend_latency_milliseconds',
+    'Moving average of the latency of LLM backends, by backend.',
+    ('backend',), function=lambda: _llm_backend_stats('latency_ms'))
+LLM_BACKEND_ERROR_RATE = Gauge(
+    'starship_llm_backend_error_rate',
+    'Moving average of the fraction of calls to LLM backends failing, by backend.',
+    ('backend',), function=lambda: _llm_backend_stats('error_rate'))
+LLM_BACKEND_OUTSTANDING = Gauge(
+    'starship_llm_backend_outstanding',
+    'Calls to LLM backends in progress, by backend.',
+    ('backend',), function=lambda: _llm_backend_stats('outstanding'))
+LLM_BACKEND_EJECTED = Gauge(
+    'starship_llm_backend_ejected',
+    'Whether an LLM backend is currently ejected (1) for failing, by backend.',
+    ('backend',), function=lambda: _llm_backend_stats('ejected'))
+LLM_BACKEND_EJECTIONS = Counter(
+    'starship_llm_backend_ejections_total',
+    'Times LLM backends were ejected for failing, by backend.',
+    ('backend',))
+LLM_CACHE_REQUESTS = Counter(
+    'starship_llm_cache_requests_total',
+    'LLM calls looked up in the response cache, by result (hit or miss).',
+    ('result',))
+LLM_RETRIES_DENIED = Counter(
+    'starship_llm_retries_denied_total',
+    'Failed LLM calls not retried because the retry budget was used up.')
+
+
+class UpstreamCall(object):
+    """Outcome of an upstream call being timed by upstream_call(); set outcome to override."""
+
+    def __init__(self):
+        self.outcome = 'ok'
+
+
+@contextmanager
+def upstream_call(upstream: str, target: str) -> Iterator[UpstreamCall]:
+    """
+    Time a call to an upstream service.
+
+    The call is also traced as a span named after the upstream.  The outcome is recorded as
+    "ok", or "error" if the block raises; the block can also set call.outcome itself (e.g. to the
+    HTTP status it got back).
+    """
+    call = UpstreamCall()
+    start = time.perf_counter()
+    UPSTREAM_REQUESTS_IN_FLIGHT.inc(upstream)
+    with span(upstream, target=target) as trace:
+        try:
+            yield call
+        except BaseException:
+            call.outcome = 'error'
+            raise
+        finally:
+            UPSTREAM_REQUESTS_IN_FLIGHT.dec(upstream)
+            UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - start, upstream, target,
+                                              call.outcome)
+            if trace is not None:
+                trace.set(outcome=call.outcome)
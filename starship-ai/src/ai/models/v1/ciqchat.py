@@ -9,6 +9,13 @@ from ai.models.v1.common import FieldSchema
 class CIQChatRequest(BaseModel):
     input: str
     session_id: Optional[str] = None
+    # Blueprint to use when a new session is created (defaults to the default CMM blueprint)
+    product: Optional[str] = None
+    version: Optional[str] = None
+    # Legacy clients can ask for the full final_yaml in every response.  Otherwise only
+    # yaml_hash/yaml_version are returned and the document is fetched from
+    # GET /ciq/session/{session_id}/yaml when they change.
+    include_final_yaml: bool = False
 
 
 class CIQChatProperties(dict):
@@ -23,9 +30,26 @@ class CIQChatResponse(BaseModel):
     progress: dict
     is_complete: bool = False
     final_yaml: Optional[str] = None
+    yaml_hash: Optional[str] = None
+    yaml_version: int = 0
+    # The background render of final_yaml started by this or an earlier message, see
+    # GET /ciq/jobs/{job_id}
+    yaml_job: Optional[str] = None
     properties: Optional[dict[str, FieldSchema]] = None
 
 
+class CIQYAMLJob(BaseModel):
+    job_id: str
+    session_id: str
+    status: str  # queued, running, done or failed
+    submitted: float
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    yaml_hash: Optional[str] = None
+    yaml_version: Optional[int] = None
+    error: Optional[str] = None
+
+
 def build_mock_ciq_response() -> CIQChatResponse:
     """Create a mock CIQChatResponse object for quick testing."""
     return CIQChatResponse(
@@ -1,4 +1,6 @@
 #  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+from typing import Optional
+
 from pydantic import BaseModel
 
 # from mandatory_conf import MandatoryField
@@ -7,6 +9,18 @@ from ai.models.v1.common import FieldSchema
 
 class CIQPayloadRequest(BaseModel):
     input: str
+    product: Optional[str] = None
+    version: Optional[str] = None
+
+
+class CIQBlueprint(BaseModel):
+    product: str
+    version: str
+    loaded: bool = False
+
+
+class CIQBlueprintsResponse(BaseModel):
+    blueprints: list[CIQBlueprint]
 
 
 class CIQPayloadResponse(BaseModel):
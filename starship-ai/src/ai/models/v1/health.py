@@ -1,7 +1,21 @@
 #  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+from typing import Dict, Optional
+
 from pydantic import BaseModel
 
 
 # Model for login requests
 class HealthResponse(BaseModel):
     status: str
+
+
+class ComponentReadiness(BaseModel):
+    status: str
+    required: bool
+    duration_ms: Optional[float] = None
+    detail: Optional[str] = None
+
+
+class ReadinessResponse(BaseModel):
+    status: str
+    components: Dict[str, ComponentReadiness] = {}
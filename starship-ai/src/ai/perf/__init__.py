@@ -0,0 +1,2 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""Performance tooling: a load generator, fake upstreams, cassettes and micro-benchmarks."""
@@ -0,0 +1,377 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Micro-benchmarks of in-process hot paths.
+
+Each benchmark times one call of a function on a realistic fixture: the golden CMM blueprint, or
+synthetic blueprints much larger than it.  A call is repeated enough times for a sample to take
+at least --min-time, and --repeat samples are taken; the per-call minimum, median, mean, maximum
+and standard deviation (in microseconds) are saved as JSON:
+
+    python -m ai.perf.bench run --output before.json
+    python -m ai.perf.bench run --filter final_yaml --output after.json
+    python -m ai.perf.bench compare before.json after.json --threshold 10
+
+compare reports the benchmarks whose median got slower by more than the threshold (and exits 1
+if there are any) as well as those that got faster.  Compare runs made on the same machine.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from ai.agents.ciq_agent.compiled_blueprint import CompiledBlueprint, compile_blueprint
+from ai.agents.ciq_agent.config import BLUEPRINT_PATH
+
+# Sizes of the synthetic blueprints, in CIQ parameters (the golden blueprint has a few dozen)
+SYNTHETIC_SIZES = (500, 2000)
+
+
+class Skip(Exception):
+    """The benchmark can't run here (e.g. an optional dependency is missing)."""
+
+
+# name -> setup function returning the callable to time
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark: the decorated function sets it up and returns what to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+# Fixtures
+
+def synthetic_blueprint(params: int) -> str:
+    """Return a blueprint with the given number of CIQ parameters, in sections of 20."""
+    lines = ['# Synthetic blueprint for benchmarks', 'global:']
+    for section in range(0, params, 20):
+        lines += [f'  section{section // 20}:',
+                  f'    # Settings of section {section // 20}',
+                  '    enabled: true',
+                  '    servers:',
+                  '      - name: primary',
+                  '        port: 8080']
+        for param in range(section, min(section + 20, params)):
+            lines.append(f'    param{param}: "default-{param}"  # CIQ: What is parameter {param}? '
+                         f'(e.g., value-{param})')
+    return '\n'.join(lines) + '\n'
+
+
+@lru_cache(maxsize=None)
+def blueprint(name: str) -> CompiledBlueprint:
+    """Return a compiled fixture blueprint: 'golden' or 'synthetic-<params>'."""
+    if name == 'golden':
+        return compile_blueprint(BLUEPRINT_PATH)
+    params = int(name.split('-', 1)[1])
+    fd, path = tempfile.mkstemp(suffix='_yaml.txt')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(synthetic_blueprint(params))
+        return compile_blueprint(path)
+    finally:
+        os.unlink(path)
+
+
+def fixtures() -> List[str]:
+    return ['golden'] + [f'synthetic-{size}' for size in SYNTHETIC_SIZES]
+
+
+def values(compiled: CompiledBlueprint) -> Dict[str, str]:
+    return {param: f'value-{i}' for i, param in enumerate(compiled.params)}
+
+
+def complete_session(compiled: CompiledBlueprint):
+    from ai.agents.ciq_agent.session_manager import CIQSession
+
+    session = CIQSession(session_id='bench', blueprint=('BENCH', 'bench'),
+                         parameters=compiled.ciq_schema, compiled=compiled,
+                         missing_params=set(compiled.ciq_schema))
+    for param, value in values(compiled).items():
+        session.collect_parameter(param, value)
+    return session
+
+
+# Benchmarks
+
+def _per_fixture(name: str, fixture_names: Optional[List[str]] = None):
+    """Register a benchmark once per fixture blueprint: the setup takes the blueprint."""
+    def register(setup):
+        for fixture in fixture_names or fixtures():
+            BENCHMARKS[f'{name}[{fixture}]'] = (lambda f: lambda: setup(blueprint(f)))(fixture)
+        return setup
+    return register
+
+
+@_per_fixture('ciq_core.generate_final_yaml')
+def _generate_final_yaml(compiled):
+    from ai.agents.ciq_agent.ciq_core import ciq_agent
+
+    session = complete_session(compiled)
+    return lambda: ciq_agent._generate_final_yaml(session)
+
+
+@_per_fixture('ciq_core.merge_final_yaml')
+def _merge_final_yaml(compiled):
+    from ai.agents.ciq_agent.ciq_core import ciq_agent
+
+    session = complete_session(compiled)
+    return lambda: ciq_agent._merge_final_yaml(session)
+
+
+@_per_fixture('ciq_core.convert_to_nested_dict')
+def _convert_to_nested_dict(compiled):
+    from ai.agents.ciq_agent.ciq_core import ciq_agent
+
+    flat = values(compiled)
+    return lambda: ciq_agent._convert_to_nested_dict(flat)
+
+
+@_per_fixture('ciq_core.deep_merge')
+def _deep_merge(compiled):
+    from ai.agents.ciq_agent.ciq_core import ciq_agent
+
+    nested = ciq_agent._convert_to_nested_dict(values(compiled))
+    return lambda: ciq_agent._deep_merge(compiled.tree, nested)
+
+
+@_per_fixture('yaml_parser.parse_ciq_params_from_yaml')
+def _parse_ciq_params(compiled):
+    try:
+        from ai.agents.ciq_agent.yaml_parser import parse_ciq_params_from_yaml
+    except ImportError as e:  # it needs streamlit
+        raise Skip(str(e)) from None
+    fd, path = tempfile.mkstemp(suffix='_yaml.txt')
+    with os.fdopen(fd, 'w', newline='') as f:
+        f.write(compiled.text)
+
+    def parse():
+        return parse_ciq_params_from_yaml(path)
+
+    parse.cleanup = lambda: os.unlink(path)
+    return parse
+
+
+@_per_fixture('session.collect_parameter', ['golden', 'synthetic-500'])
+def _collect_parameter(compiled):
+    session = complete_session(compiled)
+    collected = values(compiled)
+
+    def collect_all():
+        # One whole questionnaire per call
+        session.collected_values = {}
+        session.missing_params = set(compiled.ciq_schema)
+        session.is_complete = False
+        for param, value in collected.items():
+            session.collect_parameter(param, value)
+
+    return collect_all
+
+
+@benchmark('session_manager.get_or_create_session[8 threads x 250]')
+def _get_or_create_session():
+    from ai.agents.ciq_agent.session_manager import CIQSessionManager
+
+    manager = CIQSessionManager()
+    session_ids = [manager.create_session() for _ in range(1000)]
+    pool = ThreadPoolExecutor(8, thread_name_prefix='bench')
+
+    def lookups(offset: int):
+        for i in range(250):
+            manager.get_or_create_session(session_ids[(offset + i * 7) % len(session_ids)])
+
+    def contend():
+        for future in [pool.submit(lookups, thread * 125) for thread in range(8)]:
+            future.result()
+
+    contend.cleanup = pool.shutdown
+    return contend
+
+
+@benchmark('app.validation_exception_handler[2 errors]')
+def _validation_exception_handler():
+    from fastapi.exceptions import RequestValidationError
+    from pydantic import ValidationError
+    from starlette.requests import Request
+
+    from ai.app import validation_exception_handler
+    from ai.models.v1.ciqchat import CIQChatRequest
+
+    try:
+        CIQChatRequest.model_validate({'session_id': 3})
+    except ValidationError as e:
+        exc = RequestValidationError([{**error, 'loc': ('body',) + error['loc']}
+                                      for error in e.errors()])
+    request = Request({'type': 'http', 'method': 'POST', 'path': '/starship_ai/v1/ciq/chat',
+                       'headers': [], 'query_string': b''})
+    loop = asyncio.new_event_loop()
+
+    def handle():
+        return loop.run_until_complete(validation_exception_handler(request, exc))
+
+    handle.cleanup = loop.close
+    return handle
+
+
+@benchmark('models.default_wl_properties')
+def _default_wl_properties():
+    from ai.models.v1.wlpayload import MAPPING_NAMES, default_wl_properties
+
+    current = {name: f'value-{i}' for i, name in enumerate(MAPPING_NAMES)}
+    return lambda: default_wl_properties(current)
+
+
+@benchmark('models.default_infra_hubcl_properties')
+def _default_infra_hubcl_properties():
+    from ai.models.v1.infrahubclpayload import MAPPING_NAMES, default_infra_hubcl_properties
+
+    current = {name: f'value-{i}' for i, name in enumerate(MAPPING_NAMES)}
+    return lambda: default_infra_hubcl_properties(current)
+
+
+@benchmark('models.default_gen_info_properties')
+def _default_gen_info_properties():
+    from ai.models.v1.geninfopayload import MAPPING_NAMES, default_gen_info_properties
+
+    current = {name: f'value-{i}' for i, name in enumerate(MAPPING_NAMES)}
+    return lambda: default_gen_info_properties(current)
+
+
+# Running
+
+def _time(func: Callable, loops: int) -> float:
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        return time.perf_counter() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def measure(func: Callable, repeat: int = 7, min_time: float = 0.1) -> dict:
+    """Time func; return per-call statistics in microseconds."""
+    loops = 1
+    while True:
+        elapsed = _time(func, loops)
+        if elapsed >= min_time:
+            break
+        # Aim a little past min_time so the next try is likely the last
+        loops = max(loops * 2, int(loops * min_time * 1.2 / elapsed) if elapsed else loops * 10)
+    samples = [_time(func, loops) / loops * 1e6 for _ in range(repeat)]
+    return {'min': round(min(samples), 3),
+            'median': round(statistics.median(samples), 3),
+            'mean': round(statistics.fmean(samples), 3),
+            'max': round(max(samples), 3),
+            'stdev': round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+            'loops': loops,
+            'repeat': repeat}
+
+
+def run(names: List[str], repeat: int = 7, min_time: float = 0.1,
+        progress: Optional[Callable[[str, dict], None]] = None) -> dict:
+    """Run the given benchmarks; return the results, with the skipped ones and why."""
+    results: Dict[str, dict] = {}
+    skipped: Dict[str, str] = {}
+    for name in names:
+        try:
+            func = BENCHMARKS[name]()
+        except Skip as e:
+            skipped[name] = str(e)
+            continue
+        try:
+            results[name] = measure(func, repeat, min_time)
+        finally:
+            getattr(func, 'cleanup', lambda: None)()
+        if progress is not None:
+            progress(name, results[name])
+    return {'started': time.time(),
+            'host': {'node': platform.node(), 'python': platform.python_version(),
+                     'machine': platform.machine(), 'cpus': os.cpu_count()},
+            'unit': 'us',
+            'benchmarks': results,
+            'skipped': skipped}
+
+
+def compare(base: dict, new: dict, threshold: float = 10.0, stat: str = 'median') -> dict:
+    """Return the benchmarks that got slower or faster by more than threshold percent."""
+    slower, faster = [], []
+    for name in sorted(set(base['benchmarks']) & set(new['benchmarks'])):
+        before = base['benchmarks'][name][stat]
+        after = new['benchmarks'][name][stat]
+        if not before:
+            continue
+        change = (after - before) / before * 100
+        line = f"{name}: {before:.3f} -> {after:.3f} us ({change:+.1f}%)"
+        if change > threshold:
+            slower.append(line)
+        elif change < -threshold:
+            faster.append(line)
+    return {'slower': slower, 'faster': faster}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m ai.perf.bench',
+                                     description='Micro-benchmarks of in-process hot paths.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run benchmarks')
+    run_parser.add_argument('--filter', default='', help='only benchmarks containing this')
+    run_parser.add_argument('--repeat', type=int, default=7, help='samples per benchmark')
+    run_parser.add_argument('--min-time', type=float, default=0.1,
+                            help='shortest time a sample may take, in seconds')
+    run_parser.add_argument('--output', help='save the results to this JSON file')
+    commands.add_parser('list', help='list the benchmarks')
+    compare_parser = commands.add_parser('compare', help='compare two results files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=10.0,
+                                help='percentage change to report')
+    compare_parser.add_argument('--stat', default='median', choices=('min', 'median', 'mean'))
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        print('\n'.join(BENCHMARKS))
+        return 0
+    if args.command == 'compare':
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        changes = compare(base, new, args.threshold, args.stat)
+        for title in ('slower', 'faster'):
+            if changes[title]:
+                print(f"{title}:\n  " + '\n  '.join(changes[title]))
+        if not changes['slower']:
+            print(f"no regressions beyond {args.threshold:g}%")
+        return 1 if changes['slower'] else 0
+
+    def progress(name, result):
+        print(f"{name:<64}{result['median']:>14.3f} us  (+/- {result['stdev']:.3f}, "
+              f"{result['loops']} loops)", flush=True)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run(names, args.repeat, args.min_time, progress)
+    for name, reason in results['skipped'].items():
+        print(f"{name:<64} skipped: {reason}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
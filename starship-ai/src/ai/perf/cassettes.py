@@ -0,0 +1,289 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Record and replay upstream traffic (CuDo, Bedrock and the configured endpoints).
+
+In record mode every upstream call is made for real, and its request, response and duration are
+appended to a cassette file.  In replay mode the calls never leave the process: each one is
+answered from the cassette after the recorded delay, multiplied by a latency scale (0 answers at
+once).  Both are turned on with environment variables, so they work in the API server and the
+Streamlit app alike:
+
+    STARSHIP_CASSETTE=ciq.jsonl STARSHIP_CASSETTE_MODE=record starship_ai ...
+    STARSHIP_CASSETTE=ciq.jsonl STARSHIP_CASSETTE_LATENCY=0.5 starship_ai ...
+
+A cassette is a JSON lines file: a header line, then one interaction per line.  Interactions are
+indexed by a key made of the upstream, method, URL path and query and the canonical JSON of the
+request body (request headers are neither part of the key nor recorded, they hold credentials).
+When the same request was recorded several times, replays cycle through the recordings in order,
+so a run is deterministic.  A request that is not in the cassette fails like an unreachable
+upstream would.  Calls that raised (timeouts, refused connections) are not recorded.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+from ai import LOG
+
+if TYPE_CHECKING:  # pragma: nocover
+    import httpx
+    import requests
+
+CASSETTE_VERSION = 1
+MODES = ('record', 'replay')
+# Response headers worth keeping; the others are transport details or cookies
+KEPT_HEADERS = ('content-type', 'content-encoding', 'etag', 'x-amzn-requestid')
+
+
+class CassetteError(Exception):
+    """The cassette file can't be used."""
+
+
+class CassetteMiss(LookupError):
+    """The request being replayed is not in the cassette."""
+
+
+def _canonical(body: Any) -> str:
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            return body
+    return json.dumps(body, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def request_key(upstream: str, method: str, url: str, body: Any = None,
+                params: Optional[dict] = None) -> str:
+    """Return the index key of a request: the host is left out, so cassettes can move."""
+    parts = urlsplit(url)
+    query = '&'.join(q for q in (parts.query, urlencode(sorted((params or {}).items()))) if q)
+    text = f"{upstream} {method.upper()} {parts.path}?{query} {_canonical(body)}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+@dataclass
+class Interaction:
+    """One recorded call."""
+
+    upstream: str
+    key: str
+    method: str
+    url: str
+    status: int
+    elapsed: float
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: Optional[str] = None
+    body_b64: Optional[str] = None
+    request: Any = None
+
+    @property
+    def content(self) -> bytes:
+        if self.body_b64 is not None:
+            return base64.b64decode(self.body_b64)
+        return (self.body or '').encode('utf-8')
+
+
+class Cassette(object):
+    """A cassette file, opened to record to or replay from."""
+
+    def __init__(self, path: str, mode: str = 'replay', latency_scale: float = 1.0):
+        if mode not in MODES:
+            raise CassetteError(f"unknown cassette mode {mode!r}, expected one of "
+                                f"{', '.join(MODES)}")
+        if latency_scale < 0:
+            raise CassetteError("the latency scale can't be negative")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.index: Dict[str, List[Interaction]] = {}
+        self._played: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            self._load()
+        elif not os.path.exists(path) or os.path.getsize(path) == 0:
+            self._append({'cassette': CASSETTE_VERSION, 'created': time.time()})
+        else:
+            # Recording more into an existing cassette; check it is one
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                if header.get('cassette') != CASSETTE_VERSION:
+                    raise CassetteError(f"{self.path} is not a version {CASSETTE_VERSION} "
+                                        "cassette")
+                for line in f:
+                    if line.strip():
+                        interaction = Interaction(**json.loads(line))
+                        self.index.setdefault(interaction.key, []).append(interaction)
+        except (OSError, ValueError, TypeError) as e:
+            raise CassetteError(f"can't read cassette {self.path}: {e}") from None
+
+    def _append(self, record: dict) -> None:
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def __len__(self):
+        return sum(len(interactions) for interactions in self.index.values())
+
+    def find(self, key: str) -> Interaction:
+        """Return the next recording of the request with the given key."""
+        with self._lock:
+            interactions = self.index.get(key)
+            if not interactions:
+                raise CassetteMiss(f"request {key} is not in cassette {self.path}")
+            played = self._played.get(key, 0)
+            self._played[key] = played + 1
+        return interactions[played % len(interactions)]
+
+    def delay(self, interaction: Interaction) -> float:
+        return interaction.elapsed * self.latency_scale
+
+    def record(self, upstream: str, key: str, method: str, url: str, status: int,
+               headers: Dict[str, str], content: bytes, elapsed: float,
+               request: Any = None) -> Interaction:
+        """Append an interaction to the cassette."""
+        headers = {name.lower(): value for name, value in headers.items()
+                   if name.lower() in KEPT_HEADERS}
+        try:
+            body, body_b64 = content.decode('utf-8'), None
+        except UnicodeDecodeError:
+            body, body_b64 = None, base64.b64encode(content).decode('ascii')
+        if isinstance(request, (bytes, str)):
+            request = _canonical(request)
+        interaction = Interaction(upstream=upstream, key=key, method=method.upper(),
+                                  url=urlsplit(url).path, status=status,
+                                  elapsed=round(elapsed, 6), headers=headers, body=body,
+                                  body_b64=body_b64, request=request)
+        self._append(asdict(interaction))
+        with self._lock:
+            self.index.setdefault(key, []).append(interaction)
+        return interaction
+
+
+_cassette: Optional[Cassette] = None
+_configured = False
+
+
+def active() -> Optional[Cassette]:
+    """Return the cassette set with use() or by the environment, or None."""
+    global _cassette, _configured
+    if not _configured:
+        path = os.getenv('STARSHIP_CASSETTE')
+        if path:
+            _cassette = Cassette(path, os.getenv('STARSHIP_CASSETTE_MODE', 'replay'),
+                                 float(os.getenv('STARSHIP_CASSETTE_LATENCY', '1.0')))
+            LOG.warning("upstream calls are %s with cassette %s (%d interactions)",
+                        'recorded' if _cassette.mode == 'record' else 'replayed', path,
+                        len(_cassette))
+        _configured = True
+    return _cassette
+
+
+def use(cassette: Optional[Cassette]) -> None:
+    """Record or replay with the given cassette from now on (None: call upstreams for real)."""
+    global _cassette, _configured
+    _cassette, _configured = cassette, True
+
+
+# Adapters for the HTTP libraries the clients use.  Each one takes a send function making the
+# real call and returns what that would: a recorded call's response when replaying.
+
+def requests_call(upstream: str, method: str, url: str, body: Any,
+                  send: Callable[[], 'requests.Response']) -> 'requests.Response':
+    """Make a call with requests, through the active cassette if there is one."""
+    cassette = active()
+    if cassette is None:
+        return send()
+    import requests
+
+    key = request_key(upstream, method, url, body)
+    if cassette.mode == 'record':
+        start = time.perf_counter()
+        response = send()
+        cassette.record(upstream, key, method, url, response.status_code, response.headers,
+                        response.content, time.perf_counter() - start, body)
+        return response
+    try:
+        interaction = cassette.find(key)
+    except CassetteMiss as e:
+        LOG.warning("%s", e)
+        raise requests.exceptions.ConnectionError(str(e)) from None
+    time.sleep(cassette.delay(interaction))
+    response = requests.Response()
+    response.status_code = interaction.status
+    response.headers.update(interaction.headers)
+    response._content = interaction.content
+    # Read already, so that iter_content() and iter_lines() go over the content
+    response._content_consumed = True
+    response.encoding = 'utf-8'
+    response.url = url
+    return response
+
+
+async def httpx_call(upstream: str, method: str, url: str, body: Any, params: Optional[dict],
+                     send: Callable[[], Awaitable['httpx.Response']]) -> 'httpx.Response':
+    """Make a call with httpx, through the active cassette if there is one."""
+    cassette = active()
+    if cassette is None:
+        return await send()
+    import httpx
+
+    key = request_key(upstream, method, url, body, params)
+    if cassette.mode == 'record':
+        start = time.perf_counter()
+        response = await send()
+        cassette.record(upstream, key, method, url, response.status_code, response.headers,
+                        response.content, time.perf_counter() - start, body)
+        return response
+    request = httpx.Request(method, url, params=params)
+    try:
+        interaction = cassette.find(key)
+    except CassetteMiss as e:
+        LOG.warning("%s", e)
+        raise httpx.ConnectError(str(e), request=request) from None
+    await asyncio.sleep(cassette.delay(interaction))
+    return httpx.Response(interaction.status, headers=interaction.headers,
+                          content=interaction.content, request=request)
+
+
+def bedrock_call(model: str, body: str, send: Callable[[], dict]) -> dict:
+    """Call InvokeModel, through the active cassette if there is one."""
+    cassette = active()
+    if cassette is None:
+        return send()
+    from botocore.exceptions import EndpointConnectionError
+    from botocore.response import StreamingBody
+
+    url = f"/model/{model}/invoke"
+    key = request_key('bedrock', 'POST', url, body)
+    if cassette.mode == 'record':
+        start = time.perf_counter()
+        response = send()
+        content = response['body'].read()
+        metadata = response.get('ResponseMetadata', {})
+        cassette.record('bedrock', key, 'POST', url, metadata.get('HTTPStatusCode', 200),
+                        metadata.get('HTTPHeaders', {}), content, time.perf_counter() - start,
+                        body)
+        return dict(response, body=StreamingBody(io.BytesIO(content), len(content)))
+    try:
+        interaction = cassette.find(key)
+    except CassetteMiss as e:
+        LOG.warning("%s", e)
+        raise EndpointConnectionError(endpoint_url=url) from None
+    time.sleep(cassette.delay(interaction))
+    content = interaction.content
+    return {'body': StreamingBody(io.BytesIO(content), len(content)),
+            'contentType': interaction.headers.get('content-type', 'application/json'),
+            'ResponseMetadata': {'HTTPStatusCode': interaction.status,
+                                 'HTTPHeaders': interaction.headers, 'RetryAttempts': 0}}
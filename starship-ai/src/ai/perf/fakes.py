@@ -0,0 +1,197 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+r"""
+Fake CuDo and Bedrock servers for load tests.
+
+They answer like the real services closely enough for the API server's clients, after a delay
+drawn from a latency distribution, and fail a given fraction of requests with a 503.  Point the
+API server at them with CUDO_BASE_URL and BEDROCK_ENDPOINT_URL (plus any AWS credentials, boto3
+wants some but the fake doesn't check them):
+
+    python -m ai.perf.fakes --cudo-latency lognormal:800,0.4 --bedrock-latency uniform:300,900
+    CUDO_BASE_URL=http://127.0.0.1:9101 BEDROCK_ENDPOINT_URL=http://127.0.0.1:9102 \\
+        AWS_ACCESS_KEY_ID=fake AWS_SECRET_ACCESS_KEY=fake starship_ai
+
+Latencies are given as "fixed:MS", "uniform:LOW,HIGH", "exponential:MEAN" or
+"lognormal:MEDIAN,SIGMA", all in milliseconds.  GET /stats returns the number of requests and
+errors each server has seen.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+from typing import List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+
+
+class Latency(object):
+    """A latency distribution, in milliseconds."""
+
+    def __init__(self, kind: str, params: List[float]):
+        if kind not in DISTRIBUTIONS:
+            raise ValueError(f"unknown latency distribution {kind!r}, expected one of "
+                             f"{', '.join(DISTRIBUTIONS)}")
+        needed = 2 if kind in ('uniform', 'lognormal') else 1
+        if len(params) != needed or any(p < 0 for p in params):
+            raise ValueError(f"{kind} latency takes {needed} non-negative number(s)")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Latency':
+        """Parse "kind:a[,b]", e.g. "lognormal:200,0.5"."""
+        kind, _, params = spec.partition(':')
+        try:
+            values = [float(p) for p in params.split(',')] if params else []
+        except ValueError:
+            raise ValueError(f"invalid latency {spec!r}") from None
+        return cls(kind.strip(), values)
+
+    def sample(self, rng: random.Random) -> float:
+        """Return a latency in seconds."""
+        if self.kind == 'fixed':
+            ms = self.params[0]
+        elif self.kind == 'uniform':
+            ms = rng.uniform(*self.params)
+        elif self.kind == 'exponential':
+            ms = rng.expovariate(1 / self.params[0]) if self.params[0] else 0.0
+        else:
+            median, sigma = self.params
+            ms = rng.lognormvariate(math.log(median), sigma) if median else 0.0
+        return ms / 1000
+
+    def __str__(self):
+        return f"{self.kind}:{','.join(f'{p:g}' for p in self.params)}"
+
+
+class Upstream(object):
+    """How a fake server behaves, and what it has seen."""
+
+    def __init__(self, latency: Latency, error_rate: float = 0.0, seed: Optional[int] = None):
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+    async def respond(self, body: dict) -> JSONResponse:
+        self.requests += 1
+        await asyncio.sleep(self.latency.sample(self.rng))
+        if self.rng.random() < self.error_rate:
+            self.errors += 1
+            return JSONResponse({'message': 'injected failure'}, status_code=503)
+        return JSONResponse(body)
+
+    async def respond_events(self, chunks: List[dict]) -> Response:
+        """Like respond(), but send the chunks as server-sent events, the latency apart."""
+        response = await self.respond({})
+        if response.status_code != 200:
+            return response
+        delay = self.latency.sample(self.rng) / max(1, len(chunks))
+
+        async def events():
+            for chunk in chunks:
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(delay)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type='text/event-stream')
+
+    def stats(self) -> dict:
+        return {'requests': self.requests, 'errors': self.errors, 'latency': str(self.latency),
+                'error_rate': self.error_rate}
+
+
+def cudo_app(upstream: Upstream) -> FastAPI:
+    """
+    Return a fake CuDo server: an OpenAI style chat completion for any question.
+
+    The answer is streamed as server-sent events, a few words each, when the request asks for a
+    stream.
+    """
+    app = FastAPI()
+
+    @app.post('/generator/generator/v2/chat/')
+    async def chat(request: Request):
+        payload = await request.json()
+        messages = payload.get('messages') or [{}]
+        question = str(messages[-1].get('content', ''))[:200]
+        answer = f"(fake CuDo) Here is what the documentation says about: {question}"
+        if payload.get('stream'):
+            words = answer.split(' ')
+            return await upstream.respond_events([
+                {'choices': [{'delta': {'content': ' '.join(words[i:i + 4]) + ' '}}]}
+                for i in range(0, len(words), 4)])
+        return await upstream.respond({'choices': [{'message': {
+            'role': 'assistant', 'content': answer}}]})
+
+    @app.get('/stats')
+    async def stats():
+        return upstream.stats()
+
+    return app
+
+
+def bedrock_app(upstream: Upstream) -> FastAPI:
+    """
+    Return a fake Bedrock runtime server for InvokeModel.
+
+    Prompts asking for JSON get an empty JSON object (the wizard chats parse the reply), the
+    others a sentence.
+    """
+    app = FastAPI()
+
+    @app.post('/model/{model_id:path}/invoke')
+    async def invoke(model_id: str, request: Request):
+        payload = json.loads(await request.body() or b'{}')
+        wants_json = 'JSON' in str(payload.get('system', ''))
+        text = '{}' if wants_json else f"(fake {model_id}) Please provide the value."
+        return await upstream.respond({'content': [{'type': 'text', 'text': text}],
+                                       'stop_reason': 'end_turn'})
+
+    @app.get('/stats')
+    async def stats():
+        return upstream.stats()
+
+    return app
+
+
+async def serve(cudo: Upstream, bedrock: Upstream, host: str = '127.0.0.1',
+                cudo_port: int = 9101, bedrock_port: int = 9102) -> None:
+    """Run both fake servers until cancelled."""
+    import uvicorn
+
+    servers = [uvicorn.Server(uvicorn.Config(cudo_app(cudo), host=host, port=cudo_port,
+                                             log_level='warning', log_config=None)),
+               uvicorn.Server(uvicorn.Config(bedrock_app(bedrock), host=host, port=bedrock_port,
+                                             log_level='warning', log_config=None))]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m ai.perf.fakes',
+                                     description='Run fake CuDo and Bedrock servers.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--cudo-port', type=int, default=9101)
+    parser.add_argument('--bedrock-port', type=int, default=9102)
+    parser.add_argument('--cudo-latency', type=Latency.parse, default='lognormal:800,0.4')
+    parser.add_argument('--bedrock-latency', type=Latency.parse, default='lognormal:600,0.5')
+    parser.add_argument('--cudo-error-rate', type=float, default=0.0)
+    parser.add_argument('--bedrock-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None, help='seed for repeatable runs')
+    args = parser.parse_args(argv)
+    cudo = Upstream(args.cudo_latency, args.cudo_error_rate, args.seed)
+    bedrock = Upstream(args.bedrock_latency, args.bedrock_error_rate, args.seed)
+    print(f"fake CuDo on http://{args.host}:{args.cudo_port} ({cudo.latency}), "
+          f"fake Bedrock on http://{args.host}:{args.bedrock_port} ({bedrock.latency})")
+    asyncio.run(serve(cudo, bedrock, args.host, args.cudo_port, args.bedrock_port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Async load generator.
+
+A scenario (a YAML file, see the bundled ones in ai/perf/scenarios) is a list of requests that a
+virtual user makes in order, over and over, until the test ends:
+
+    name: ciq_conversation
+    vars:
+      answers: [10.0.0.1, ens3, ...]
+    steps:
+      - name: start                      # requests are reported per step name
+        method: POST
+        path: /ciq/chat                  # relative to --target
+        json: {input: Hello, product: CMM}
+        save: {session_id: session_id}   # keep response fields for later steps
+      - name: answer
+        method: POST
+        path: /ciq/chat
+        json: {input: "{value}", session_id: "{session_id}"}
+        values: answers                  # {value} is the next one of vars.answers
+        repeat: 60                       # up to 60 times...
+        until: is_complete               # ...stopping once the response has this field set
+      - name: yaml
+        method: GET
+        path: /ciq/session/{session_id}/yaml
+        conditional: true                # send If-None-Match with the last ETag seen
+
+Strings in path and json are formatted with the values saved so far.  A response other than
+2xx or 304 (or the statuses listed in the step's expect) is an error, and ends that iteration of
+the scenario.
+
+    python -m ai.perf.loadtest run ciq_conversation --users 20 --duration 60 --report a.json
+    python -m ai.perf.loadtest compare a.json b.json
+
+The report gives the throughput, latency percentiles and errors overall and per step, and is
+saved as JSON so that runs of two builds on the same machine can be compared.
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import yaml
+
+SCENARIO_DIR = Path(__file__).parent / 'scenarios'
+DEFAULT_TARGET = 'http://127.0.0.1:5050/starship_ai/v1'
+OK_STATUSES = frozenset(range(200, 300)) | {304}
+
+
+class ScenarioError(ValueError):
+    """A scenario file is invalid."""
+
+
+class Step(object):
+    def __init__(self, spec: dict):
+        try:
+            self.name = str(spec['name'])
+            self.method = str(spec.get('method', 'GET')).upper()
+            self.path = str(spec['path'])
+        except KeyError as e:
+            raise ScenarioError(f"step {spec.get('name', '?')} has no {e.args[0]}") from None
+        self.json = spec.get('json')
+        self.save: Dict[str, str] = dict(spec.get('save') or {})
+        self.values: Optional[str] = spec.get('values')
+        self.repeat = int(spec.get('repeat', 1))
+        self.until: Optional[str] = spec.get('until')
+        self.conditional = bool(spec.get('conditional', False))
+        self.expect = frozenset(spec['expect']) if 'expect' in spec else OK_STATUSES
+
+
+class Scenario(object):
+    def __init__(self, spec: dict):
+        if not isinstance(spec, dict) or not spec.get('steps'):
+            raise ScenarioError("a scenario needs a list of steps")
+        self.name = str(spec.get('name', 'scenario'))
+        self.description = str(spec.get('description', ''))
+        self.vars: Dict[str, Any] = dict(spec.get('vars') or {})
+        self.steps = [Step(step) for step in spec['steps']]
+        for step in self.steps:
+            if step.values is not None and not isinstance(self.vars.get(step.values), list):
+                raise ScenarioError(f"step {step.name}: vars.{step.values} is not a list")
+
+    @classmethod
+    def load(cls, name_or_path: Union[str, Path]) -> 'Scenario':
+        """Load a scenario file, or a bundled scenario by name."""
+        path = Path(name_or_path)
+        if not path.exists():
+            path = SCENARIO_DIR / f"{name_or_path}.yaml"
+        if not path.exists():
+            raise ScenarioError(f"no scenario {name_or_path} (bundled: {', '.join(bundled())})")
+        with open(path) as f:
+            return cls(yaml.safe_load(f))
+
+
+def bundled() -> List[str]:
+    return sorted(path.stem for path in SCENARIO_DIR.glob('*.yaml'))
+
+
+def _format(value, state: dict):
+    if isinstance(value, str):
+        return value.format_map(state)
+    if isinstance(value, dict):
+        return {k: _format(v, state) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_format(v, state) for v in value]
+    return value
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Return the nearest-rank q-th percentile of sorted values."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+class Results(object):
+    """Latencies and outcomes, per step."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Counter] = {}
+        self.errors: Dict[str, Counter] = {}
+
+    def add(self, step: str, ms: float, outcome: str, ok: bool) -> None:
+        self.latencies.setdefault(step, []).append(ms)
+        self.statuses.setdefault(step, Counter())[outcome] += 1
+        if not ok:
+            self.errors.setdefault(step, Counter())[outcome] += 1
+
+    @staticmethod
+    def _summary(latencies: List[float], errors: int, elapsed: float) -> dict:
+        latencies = sorted(latencies)
+        return {'requests': len(latencies),
+                'errors': errors,
+                'throughput': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                'latency_ms': {'mean': round(sum(latencies) / len(latencies), 2)
+                               if latencies else 0.0,
+                               'p50': round(percentile(latencies, 50), 2),
+                               'p95': round(percentile(latencies, 95), 2),
+                               'p99': round(percentile(latencies, 99), 2),
+                               'max': round(latencies[-1], 2) if latencies else 0.0}}
+
+    def report(self, elapsed: float) -> dict:
+        everything = [ms for latencies in self.latencies.values() for ms in latencies]
+        total = self._summary(everything, sum(sum(c.values()) for c in self.errors.values()),
+                              elapsed)
+        total['steps'] = {}
+        for step, latencies in self.latencies.items():
+            summary = self._summary(latencies, sum(self.errors.get(step, Counter()).values()),
+                                    elapsed)
+            summary['outcomes'] = dict(self.statuses[step])
+            summary['failures'] = dict(self.errors.get(step, Counter()))
+            total['steps'][step] = summary
+        return total
+
+
+class _User(object):
+    """A virtual user: runs the scenario over and over until the deadline."""
+
+    def __init__(self, client, scenario: Scenario, results: Results, think: float):
+        self.client = client
+        self.scenario = scenario
+        self.results = results
+        self.think = think
+        self.counters: Counter = Counter()
+        self.etags: Dict[str, str] = {}
+
+    async def run(self, deadline: float) -> None:
+        while time.monotonic() < deadline:
+            state = {k: v for k, v in self.scenario.vars.items() if not isinstance(v, list)}
+            for step in self.scenario.steps:
+                if not await self._step(step, state, deadline):
+                    break
+
+    async def _step(self, step: Step, state: dict, deadline: float) -> bool:
+        """Make a step's requests; return False if the rest of the iteration can't go on."""
+        for _ in range(step.repeat):
+            if time.monotonic() >= deadline:
+                return False
+            if step.values is not None:
+                values = self.scenario.vars[step.values]
+                state['value'] = values[self.counters[step.name] % len(values)]
+                self.counters[step.name] += 1
+            headers = {}
+            if step.conditional and step.name in self.etags:
+                headers['If-None-Match'] = self.etags[step.name]
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(step.method, _format(step.path, state),
+                                                     json=_format(step.json, state),
+                                                     headers=headers)
+            except Exception as e:
+                self.results.add(step.name, (time.perf_counter() - start) * 1000,
+                                 type(e).__name__, False)
+                return False
+            ok = response.status_code in step.expect
+            self.results.add(step.name, (time.perf_counter() - start) * 1000,
+                             str(response.status_code), ok)
+            if not ok:
+                return False
+            if 'etag' in response.headers:
+                self.etags[step.name] = response.headers['etag']
+            body = _json(response)
+            for name, field in step.save.items():
+                state[name] = body.get(field)
+            if self.think:
+                await asyncio.sleep(self.think)
+            if step.until and body.get(step.until):
+                break
+        return True
+
+
+def _json(response) -> dict:
+    try:
+        body = response.json()
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+async def run(scenario: Scenario, target: str = DEFAULT_TARGET, users: int = 10,
+              duration: float = 60.0, ramp_up: float = 0.0, think: float = 0.0,
+              timeout: float = 60.0, transport=None) -> dict:
+    """
+    Run a load test and return its report.
+
+    :param scenario: what each virtual user does
+    :param target: base URL of the API
+    :param users: number of concurrent virtual users
+    :param duration: how long to run for, in seconds (including the ramp-up)
+    :param ramp_up: time over which users are started, in seconds
+    :param think: pause after each request, in seconds
+    :param timeout: request timeout, in seconds
+    :param transport: httpx transport to use instead of the network (for tests)
+    """
+    import httpx  # imported on first use, it is slow to import
+
+    results = Results()
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=target, timeout=timeout, limits=limits,
+                                 transport=transport) as client:
+        start = time.monotonic()
+        deadline = start + duration
+
+        async def user(index: int):
+            await asyncio.sleep(ramp_up * index / users)
+            await _User(client, scenario, results, think).run(deadline)
+
+        await asyncio.gather(*(user(i) for i in range(users)))
+        elapsed = time.monotonic() - start
+    report = results.report(elapsed)
+    report.update(scenario=scenario.name, target=target, users=users, duration=duration,
+                  ramp_up=ramp_up, think=think, elapsed=round(elapsed, 3), started=time.time(),
+                  host={'node': platform.node(), 'python': platform.python_version(),
+                        'machine': platform.machine()})
+    return report
+
+
+def compare(base: dict, new: dict, threshold: float = 10.0) -> List[str]:
+    """
+    Compare two reports; return the regressions, worse than threshold percent.
+
+    Throughput is worse when lower, latency percentiles when higher; an error rate that grew is
+    always a regression.
+    """
+    regressions = []
+    for step in ['(total)'] + sorted(set(base['steps']) & set(new['steps'])):
+        old = base if step == '(total)' else base['steps'][step]
+        now = new if step == '(total)' else new['steps'][step]
+        checks = [('throughput', old['throughput'], now['throughput'], -1)]
+        checks += [(q, old['latency_ms'][q], now['latency_ms'][q], 1)
+                   for q in ('p50', 'p95', 'p99')]
+        for metric, before, after, sign in checks:
+            if before and (after - before) / before * 100 * sign > threshold:
+                regressions.append(f"{step} {metric}: {before:g} -> {after:g} "
+                                   f"({(after - before) / before * 100:+.1f}%)")
+        old_rate = old['errors'] / old['requests'] if old['requests'] else 0.0
+        new_rate = now['errors'] / now['requests'] if now['requests'] else 0.0
+        if new_rate > old_rate:
+            regressions.append(f"{step} error rate: {old_rate:.2%} -> {new_rate:.2%}")
+    return regressions
+
+
+def format_report(report: dict) -> str:
+    lines = [f"{report['scenario']}: {report['users']} users for {report['elapsed']:.1f} s "
+             f"against {report['target']}",
+             f"{'step':<24}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>10}"
+             f"{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    rows = [(name, summary) for name, summary in report['steps'].items()]
+    rows.append(('(total)', report))
+    for name, summary in rows:
+        latency = summary['latency_ms']
+        lines.append(f"{name:<24}{summary['requests']:>10}{summary['errors']:>8}"
+                     f"{summary['throughput']:>9.1f}{latency['p50']:>10.1f}"
+                     f"{latency['p95']:>10.1f}{latency['p99']:>10.1f}{latency['max']:>10.1f}")
+    for name, summary in report['steps'].items():
+        if summary['failures']:
+            lines.append(f"{name} failures: {summary['failures']}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m ai.perf.loadtest',
+                                     description='Load test the API server.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run a scenario')
+    run_parser.add_argument('scenario', help=f"scenario file, or one of: {', '.join(bundled())}")
+    run_parser.add_argument('--target', default=DEFAULT_TARGET, help='base URL of the API')
+    run_parser.add_argument('--users', type=int, default=10)
+    run_parser.add_argument('--duration', type=float, default=60.0, help='seconds')
+    run_parser.add_argument('--ramp-up', type=float, default=0.0, help='seconds')
+    run_parser.add_argument('--think', type=float, default=0.0,
+                            help='pause after each request, in seconds')
+    run_parser.add_argument('--timeout', type=float, default=60.0, help='request timeout')
+    run_parser.add_argument('--report', help='also save the report to this JSON file')
+    commands.add_parser('list', help='list the bundled scenarios')
+    compare_parser = commands.add_parser('compare', help='compare two reports')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=10.0,
+                                help='percentage change to report as a regression')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name in bundled():
+            print(f"{name}: {Scenario.load(name).description}")
+        return 0
+    if args.command == 'compare':
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        regressions = compare(base, new, args.threshold)
+        print('\n'.join(regressions) if regressions else 'no regressions')
+        return 1 if regressions else 0
+    report = asyncio.run(run(Scenario.load(args.scenario), args.target, args.users,
+                             args.duration, args.ramp_up, args.think, args.timeout))
+    print(format_report(report))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
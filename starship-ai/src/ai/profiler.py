@@ -0,0 +1,168 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+On-demand sampling CPU profiler.
+
+Profiler.run() samples the Python stack of every thread (through sys._current_frames) at a fixed
+interval for a number of seconds, and returns the samples as collapsed stacks: one
+"frame;frame;...;frame count" line per distinct stack, outermost frame first, which is what
+flamegraph.pl, speedscope and similar tools read.  Nothing runs between profiles.
+
+A sample taken while the event loop is handling a request is attributed to it: its stack is
+rooted at the request's method and route template (and, if asked for, its correlation ID)
+instead of the thread's name.  Work a request hands to a worker thread cannot be traced back to
+it, and is rooted at the worker thread's name.
+
+Threads waiting for work (an idle event loop, idle pool workers) are left out unless asked for,
+so what remains is where the CPU time goes.  Taking a sample holds the GIL, which stalls the
+rest of the process for as long as it takes; the sampler backs off when needed to keep that
+under max_overhead.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional
+
+from ai.tracing import TracingMiddleware, active_request
+
+# (file name, function) of leaf frames of threads that are waiting for work
+IDLE_FRAMES = {
+    ('selectors.py', 'select'),
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+}
+
+_REQUEST_CODE = TracingMiddleware.__call__.__code__
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is already being taken."""
+
+
+class Profile(object):
+    """The result of a profile."""
+
+    def __init__(self, stacks: Dict[str, int], samples: int, duration: float, overhead: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.duration = duration
+        self.overhead = overhead
+
+    def collapsed(self) -> str:
+        """Return the stacks in the collapsed format, most frequent first."""
+        lines = [f"{stack} {count}" for stack, count in
+                 sorted(self.stacks.items(), key=lambda item: (-item[1], item[0]))]
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+class Profiler(object):
+    """Samples every thread's stack on demand; only one profile runs at a time."""
+
+    def __init__(self, max_overhead: float = 0.02):
+        """
+        Create a profiler.
+
+        :param max_overhead: largest fraction of the time the sampler may spend taking samples
+        """
+        self.max_overhead = max_overhead
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def run(self, seconds: float, interval: float = 0.01, per_request: bool = False,
+            include_idle: bool = False) -> Profile:
+        """
+        Sample all threads for the given time (blocks the calling thread meanwhile).
+
+        :param seconds: how long to sample for
+        :param interval: time between samples, in seconds
+        :param per_request: root request samples at the correlation ID as well as the route
+        :param include_idle: also count threads that are waiting for work
+        :raise ProfilerBusy: when another profile is being taken
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("a profile is already being taken")
+        try:
+            return self._sample(seconds, interval, per_request, include_idle)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, interval: float, per_request: bool,
+                include_idle: bool) -> Profile:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        busy = 0.0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while True:
+            before = time.perf_counter()
+            if before >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                stack = self._collapse(frame, names.get(ident, f'thread-{ident}'), per_request,
+                                       include_idle)
+                if stack is not None:
+                    stacks[stack] += 1
+            # Don't keep the other threads' frames alive while sleeping
+            frames = frame = None
+            samples += 1
+            cost = time.perf_counter() - before
+            busy += cost
+            # Sleep long enough for sampling to stay within max_overhead of the time
+            time.sleep(max(interval - cost, cost * (1 - self.max_overhead) / self.max_overhead))
+        duration = time.perf_counter() - start
+        return Profile(dict(stacks), samples, duration, busy / duration if duration else 0.0)
+
+    @staticmethod
+    def _collapse(frame: FrameType, thread_name: str, per_request: bool,
+                  include_idle: bool) -> Optional[str]:
+        code = frame.f_code
+        if not include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+            return None
+        names: List[str] = []
+        root = thread_name
+        while frame is not None:
+            code = frame.f_code
+            if code is _REQUEST_CODE:
+                # The frames above this one are the server's, not the request's
+                label = _request_label(frame, per_request)
+                if label is not None:
+                    root = label
+                    break
+            names.append(_frame_label(code))
+            frame = frame.f_back
+        names.append(root)
+        return ';'.join(reversed(names))
+
+
+def _frame_label(code) -> str:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{code.co_name} ({module}:{code.co_firstlineno})"
+
+
+def _request_label(frame: FrameType, per_request: bool) -> Optional[str]:
+    # Not frame.f_locals: reading it from another thread races with the running code
+    request = active_request(frame)
+    if request is None:
+        return None
+    root, request_id = request
+    attributes = root.attributes
+    label = f"{attributes['method']} {attributes.get('route', attributes['path'])}"
+    if per_request and request_id:
+        label = f"{label} [{request_id}]"
+    return label.replace(';', ':')
+
+
+# Global profiler instance
+PROFILER = Profiler()
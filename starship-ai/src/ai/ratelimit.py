@@ -0,0 +1,283 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Per-client rate limiting.
+
+Routes are put in groups (rate_limits in starship.yaml), each with a token bucket per client: a
+client may make burst requests at once, and rate requests a second after that.  Requests over
+the limit get a 429 with a Retry-After header.  Routes outside every group are not limited.
+
+A client is identified by the first of these that the request carries, in the order given by
+rate_limit_key:
+
+    api_key   the X-API-Key or Authorization header (only a digest of it is kept)
+    session   the CIQ session in the path, or an X-Session-Id header
+    ip        the client address; behind a proxy that is the forwarded address, as long as the
+              proxy is trusted by uvicorn (--forwarded-allow-ips)
+
+The buckets are kept in memory, or in a SQLite database (rate_limit_db) when several worker
+processes must share them.  The database is used from a thread of its own, so that a request
+waiting for another process to release its lock does not hold up the event loop.  The client
+identity of the current request is also available to
+the route, see current_client().
+"""
+import asyncio
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from ai import LOG
+from ai.metrics import RATE_LIMITED
+
+KEY_SOURCES = ('api_key', 'session', 'ip')
+ANONYMOUS = 'anonymous'
+_SESSION_IN_PATH = re.compile(r'/session/([^/]+)')
+
+_CLIENT: ContextVar[str] = ContextVar('nwac_client', default=ANONYMOUS)
+
+
+def current_client() -> str:
+    """Return the identity of the client making the current request."""
+    return _CLIENT.get()
+
+
+def client_identity(scope, sources: Iterable[str] = ('api_key', 'ip')) -> str:
+    """Return the identity of the client making a request, e.g. "ip:10.0.0.1"."""
+    headers = dict(scope.get('headers') or ())
+    for source in sources:
+        if source == 'api_key':
+            key = headers.get(b'x-api-key') or headers.get(b'authorization')
+            if key:
+                return f"key:{hashlib.sha256(key).hexdigest()[:16]}"
+        elif source == 'session':
+            match = _SESSION_IN_PATH.search(scope.get('path', ''))
+            session_id = match.group(1) if match else \
+                headers.get(b'x-session-id', b'').decode('latin-1')
+            if session_id:
+                return f"session:{session_id[:64]}"
+        elif source == 'ip':
+            client = scope.get('client')
+            if client:
+                return f"ip:{client[0]}"
+    return ANONYMOUS
+
+
+class TokenBuckets(object):
+    """Token buckets kept in memory."""
+
+    def __init__(self):
+        # key -> (tokens, updated, time at which the bucket will be full again)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, now: Optional[float] = None) -> float:
+        """
+        Take a token from a bucket.
+
+        :return: 0 if there was one, otherwise the seconds until there will be one
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (burst, now, now))
+            tokens, wait = _take(tokens, now - updated, rate, burst)
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            if len(self._buckets) > 100000:
+                # A bucket that has refilled is the same as no bucket
+                self._buckets = {key: bucket for key, bucket in self._buckets.items()
+                                 if bucket[2] > now}
+        return wait
+
+    async def take_async(self, key: str, rate: float, burst: float) -> float:
+        """Take a token from a bucket, from the event loop (see take())."""
+        return self.take(key, rate, burst)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteTokenBuckets(object):
+    """Token buckets kept in a SQLite database, shared by the processes using it."""
+
+    # Buckets idle for this long have refilled (for any sensible rate) and are deleted
+    IDLE_SECONDS = 3600
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._takes = 0
+        # Takes are serialized by the lock anyway: one thread is enough, and waiting for the
+        # database does not tie up the threads of the routes
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rate-limit-db')
+        self._db = sqlite3.connect(path, timeout=1.0, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL, updated REAL)')
+
+    def take(self, key: str, rate: float, burst: float, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        with self._lock:
+            try:
+                self._db.execute('BEGIN IMMEDIATE')
+                try:
+                    row = self._db.execute('SELECT tokens, updated FROM buckets WHERE key = ?',
+                                           (key,)).fetchone()
+                    tokens, updated = row if row is not None else (burst, now)
+                    tokens, wait = _take(tokens, now - updated, rate, burst)
+                    self._db.execute('INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)',
+                                     (key, tokens, now))
+                    self._takes += 1
+                    if self._takes % 1000 == 0:
+                        self._db.execute('DELETE FROM buckets WHERE updated < ?',
+                                         (now - self.IDLE_SECONDS,))
+                    self._db.execute('COMMIT')
+                except BaseException:
+                    self._db.execute('ROLLBACK')
+                    raise
+            except sqlite3.Error as e:
+                # Better to let a request through than to fail it because of the limiter
+                LOG.warning("rate limit database %s failed, not limiting: %s", self.path, e)
+                return 0.0
+        return wait
+
+    async def take_async(self, key: str, rate: float, burst: float) -> float:
+        """Take a token from a bucket on the database thread, without blocking the loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.take, key,
+                                                                rate, burst)
+
+    def close(self) -> None:
+        # Takes still queued find the database closed and let their requests through
+        self._executor.shutdown(wait=False)
+        with self._lock:
+            self._db.close()
+
+
+def _take(tokens: float, elapsed: float, rate: float, burst: float) -> Tuple[float, float]:
+    tokens = min(burst, tokens + max(0.0, elapsed) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate if rate > 0 else math.inf
+
+
+class RouteGroup(object):
+    """Routes sharing a rate limit."""
+
+    def __init__(self, name: str, routes: List[str], rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"rate limit group {name}: rate must be positive")
+        self.name = name
+        self.routes = list(routes)
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+
+    def matches(self, path: str) -> bool:
+        return any(fnmatchcase(path, route) for route in self.routes)
+
+
+class RateLimiter(object):
+    """The route groups, how clients are told apart, and where the buckets are kept."""
+
+    def __init__(self):
+        self.groups: List[RouteGroup] = []
+        self.key_sources: Tuple[str, ...] = ('api_key', 'ip')
+        self.buckets = TokenBuckets()
+        self.db = ''
+
+    def configure(self, groups: Dict[str, dict], key_sources: Iterable[str] = ('api_key', 'ip'),
+                  db: str = '') -> None:
+        """
+        Set the route groups from the rate_limits setting.
+
+        :param groups: group name -> {routes: [path patterns], rate: per second, burst: count}
+        :param key_sources: how clients are identified, in order of preference
+        :param db: SQLite database to keep the buckets in ('' keeps them in memory)
+        """
+        unknown = set(key_sources) - set(KEY_SOURCES)
+        if unknown:
+            raise ValueError(f"unknown rate_limit_key {', '.join(sorted(unknown))}, expected "
+                             f"some of {', '.join(KEY_SOURCES)}")
+        self.groups = [RouteGroup(name, settings.get('routes', []), settings.get('rate', 0),
+                                  settings.get('burst')) for name, settings in groups.items()]
+        self.key_sources = tuple(key_sources)
+        if db != self.db:
+            old, self.buckets = self.buckets, SqliteTokenBuckets(db) if db else TokenBuckets()
+            old.close()
+            self.db = db
+
+    def group(self, path: str) -> Optional[RouteGroup]:
+        for group in self.groups:
+            if group.matches(path):
+                return group
+        return None
+
+    async def check(self, path: str, client: str) -> Tuple[Optional[RouteGroup], float]:
+        """Return the group of the path and 0, or the seconds to wait if over its limit."""
+        group = self.group(path)
+        if group is None:
+            return None, 0.0
+        return group, await self.buckets.take_async(f"{group.name}|{client}", group.rate,
+                                                    group.burst)
+
+
+RATE_LIMITER = RateLimiter()
+
+
+def configure_rate_limits(config) -> None:
+    """Apply the rate_limit* settings of a config."""
+    RATE_LIMITER.configure(config.rate_limits or {}, config.rate_limit_key, config.rate_limit_db)
+
+
+class RateLimitMiddleware(object):
+    """Identify the client of each request, and refuse those over their group's limit."""
+
+    def __init__(self, app, prefix: str = '', limiter: RateLimiter = RATE_LIMITER):
+        """
+        Create the middleware.
+
+        :param app: the ASGI app to wrap
+        :param prefix: path prefix of the routes (the route patterns of the groups omit it)
+        :param limiter: the rate limiter to use
+        """
+        self.app = app
+        self.prefix = prefix
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] not in ('http', 'websocket'):
+            return await self.app(scope, receive, send)
+        client = client_identity(scope, self.limiter.key_sources)
+        token = _CLIENT.set(client)
+        try:
+            path = scope['path']
+            if path.startswith(self.prefix):
+                path = path[len(self.prefix):]
+            group, wait = await self.limiter.check(path, client)
+            if wait:
+                return await self._throttle(group, client, wait, scope, receive, send)
+            await self.app(scope, receive, send)
+        finally:
+            _CLIENT.reset(token)
+
+    @staticmethod
+    async def _throttle(group: RouteGroup, client: str, wait: float, scope, receive, send):
+        RATE_LIMITED.inc(group.name)
+        error_id = str(uuid.uuid4())
+        LOG.info("error_id: %s, %s over the %s rate limit", error_id, client, group.name)
+        if scope['type'] == 'websocket':
+            # Refuse the connection (the client sees a 403 handshake response)
+            return await send({'type': 'websocket.close', 'code': 1008})
+        retry_after = min(3600, max(1, math.ceil(wait)))
+        response = JSONResponse(status_code=429,
+                                content={'error': 'too many requests - retry later',
+                                         'id': error_id},
+                                headers={'Retry-After': str(retry_after)})
+        await response(scope, receive, send)
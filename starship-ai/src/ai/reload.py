@@ -0,0 +1,262 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Hot reload of the config file and the CIQ blueprints.
+
+A Reloader watches starship.yaml and the blueprint directory.  When something changes, the
+changed files are re-parsed and validated in a worker thread, and only if that succeeds is the
+new version swapped in.  A file that fails to parse or validate is logged and the previous
+version keeps being served.
+
+Swapping is atomic from the point of view of a request: ConfigSnapshotMiddleware pins the
+config that was current when the request arrived, so a request never sees half of one config
+and half of another.
+"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+from ai import LOG
+from ai import config as nwac_config
+from ai.agents.ciq_agent.blueprint_registry import BlueprintRegistry, blueprint_registry
+from ai.agents.ciq_agent.config import BLUEPRINT_PATH
+from ai.agents.ciq_agent.prefetch import prefetcher
+from ai.agents.ciq_agent.render_jobs import render_jobs
+from ai.agents.llm_gateway import configure_llm_gateway
+from ai.config import NWaCConfig
+from ai.fairqueue import LLM_QUEUE
+from ai.logs import configure_sampling
+from ai.ratelimit import configure_rate_limits
+
+try:
+    # watchfiles uses inotify on Linux; without it we poll
+    from watchfiles import awatch
+except ImportError:  # pragma: nocover
+    awatch = None
+
+# Settings that are only read when the server starts (by uvicorn, the middlewares or the
+# background tasks); changing them in the file needs a restart
+RESTART_ONLY = ('host', 'port', 'hot_reload', 'hot_reload_interval', 'compression_min_size',
+                'compression_cache_size', 'admission_control', 'admission_initial_limit',
+                'admission_min_limit', 'admission_max_limit', 'admission_max_queue',
+                'admission_queue_timeout', 'admission_latency_tolerance',
+                'trace_slow_request_ms', 'trace_buffer_size', 'metrics_dir',
+                'metrics_flush_interval', 'llm_pool_size')
+# Settings applied by configure_llm_gateway()
+LLM_SETTINGS = ('llm_backends', 'llm_routes', 'llm_retry_budget', 'llm_cache_size',
+                'llm_cache_ttl', 'llm_backend_concurrency')
+
+Signature = Optional[Tuple]
+
+
+def _signature(path: Path) -> Signature:
+    """Return something that changes whenever the file (or the files in a directory) change."""
+    try:
+        if path.is_dir():
+            return tuple(sorted((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                                for entry in os.scandir(path) if entry.is_file()))
+        # stat() follows symlinks, so ConfigMap-style '..data' swaps are seen as a change
+        st = path.stat()
+        return st.st_ino, st.st_size, st.st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class FileWatcher(object):
+    """
+    Watch a set of files and directories and report which of them changed.
+
+    inotify (via watchfiles) is only used to wake up early - what actually changed is always
+    decided by comparing stat() signatures, so both modes report the same thing and editors
+    that replace files rather than writing them in place are handled.
+    """
+
+    def __init__(self, paths: Iterable[Union[str, Path]], interval: float = 2.0,
+                 use_inotify: bool = True):
+        self.paths = [Path(p) for p in paths]
+        self.interval = interval
+        self.use_inotify = use_inotify and awatch is not None
+        self._stop = asyncio.Event()
+        self._signatures: Dict[Path, Signature] = {}
+
+    def scan(self) -> List[Path]:
+        """Return the watched paths that changed since the previous call (blocking)."""
+        changed = []
+        for path in self.paths:
+            signature = _signature(path)
+            if signature != self._signatures.get(path):
+                changed.append(path)
+            self._signatures[path] = signature
+        return changed
+
+    def stop(self):
+        self._stop.set()
+
+    async def changes(self) -> AsyncIterator[List[Path]]:
+        """Yield the list of changed paths each time something changes, until stopped."""
+        await asyncio.to_thread(self.scan)
+        async for _ in self._wakeups():
+            changed = await asyncio.to_thread(self.scan)
+            if changed:
+                yield changed
+
+    async def _wakeups(self) -> AsyncIterator[None]:
+        if self.use_inotify:
+            # Watch the parent directories: editors and ConfigMaps replace files by renaming
+            dirs = sorted({str(p if p.is_dir() else p.parent) for p in self.paths})
+            try:
+                async for _ in awatch(*dirs, stop_event=self._stop, recursive=False,
+                                      debounce=int(self.interval * 1000) // 4 or 50):
+                    yield
+                return
+            except Exception as e:
+                LOG.warning("inotify watch on %s unavailable (%r), polling every %ss instead",
+                            dirs, e, self.interval)
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                yield
+
+
+class Reloader(object):
+    """
+    Reloads the config file and the CIQ blueprints when they change on disk.
+
+    Settings read per request through get_config() take effect at once; those in RESTART_ONLY
+    are logged as needing a restart.
+    """
+
+    def __init__(self, config: NWaCConfig, overrides: Optional[dict] = None,
+                 registry: BlueprintRegistry = blueprint_registry):
+        """
+        Create a reloader.
+
+        :param config: the config currently in use
+        :param overrides: command line overrides to re-apply on top of a reloaded config file
+        :param registry: blueprint registry to refresh when blueprints change
+        """
+        self.config = config
+        self.overrides = overrides or {}
+        self.registry = registry
+        self.config_file = Path(config.config_file)
+        paths = [self.config_file, registry.directory]
+        if Path(BLUEPRINT_PATH).parent != registry.directory:
+            paths.append(Path(BLUEPRINT_PATH))
+        self.watcher = FileWatcher(paths, interval=float(config.hot_reload_interval))
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run(), name='nwac-reloader')
+        LOG.info("watching %s for changes (%s)", ', '.join(str(p) for p in self.watcher.paths),
+                 'inotify' if self.watcher.use_inotify else 'polling')
+
+    async def stop(self):
+        self.watcher.stop()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        async for changed in self.watcher.changes():
+            try:
+                await self.reload(changed)
+            except Exception:
+                LOG.exception("unexpected error while reloading %s", changed)
+
+    async def reload(self, changed: Iterable[Path]):
+        """Reload whatever the given changed paths affect."""
+        changed = list(changed)
+        if self.config_file in changed:
+            await self.reload_config()
+        if any(path != self.config_file for path in changed):
+            await self.reload_blueprints()
+
+    async def reload_config(self) -> bool:
+        """Re-read the config file and make it current if it is valid."""
+        LOG.info("config file %s changed, reloading", self.config_file)
+        try:
+            new = await asyncio.to_thread(self._load_config)
+        except Exception as e:
+            LOG.error("could not reload config file %s, keeping the current config: %r",
+                      self.config_file, e)
+            return False
+        old = self.config
+        for name in RESTART_ONLY:
+            if getattr(new, name) != getattr(old, name):
+                LOG.warning("config %s changed from %s to %s - this needs a restart to take "
+                            "effect", name, getattr(old, name), getattr(new, name))
+        if new.log_level != old.log_level:
+            _set_log_level(new.log_level)
+        if new.log_sampling != old.log_sampling:
+            configure_sampling(new.log_sampling)
+        if (new.rate_limits, new.rate_limit_key, new.rate_limit_db) != \
+                (old.rate_limits, old.rate_limit_key, old.rate_limit_db):
+            try:
+                configure_rate_limits(new)
+            except (ValueError, OSError) as e:
+                LOG.error("invalid rate limits, keeping the current ones: %s", e)
+        LLM_QUEUE.configure(int(new.llm_concurrency), new.llm_queue_weights)
+        if _llm_settings(new) != _llm_settings(old):
+            try:
+                configure_llm_gateway(new)
+            except ValueError as e:
+                LOG.error("invalid LLM backends or routes, keeping the current ones: %s", e)
+        prefetcher.configure(int(new.ciq_prefetch_concurrency), float(new.ciq_prefetch_rate))
+        render_jobs.configure(int(new.ciq_yaml_workers), new.ciq_yaml_callback_urls)
+        nwac_config.set_config(new)
+        self.config = new
+        LOG.info("reloaded config file %s with %d endpoint(s)", self.config_file,
+                 len(new.endpoints))
+        return True
+
+    async def reload_blueprints(self) -> Dict[str, list]:
+        """Pick up added, removed and edited blueprints."""
+        changes = await asyncio.to_thread(self.registry.refresh)
+        for kind in ('added', 'removed', 'reloaded', 'failed'):
+            for product, version in changes[kind]:
+                LOG.info("blueprint %s %s %s", product, version, kind)
+        return changes
+
+    def _load_config(self) -> NWaCConfig:
+        # Build a complete new config off to the side; the current one is never touched
+        new = NWaCConfig(config_file=str(self.config_file))
+        new.update_from_file()
+        new.apply_overrides({k: v for k, v in self.overrides.items()
+                             if hasattr(new, k) and k != 'config_file'})
+        if new.dev:
+            new.log_level = 'DEBUG'
+        if not isinstance(new.log_level, str) or \
+                not isinstance(logging.getLevelName(new.log_level.upper()), int):
+            raise ValueError(f"invalid log_level {new.log_level!r}")
+        new.tags = self.config.tags
+        return new
+
+
+def _llm_settings(config: NWaCConfig) -> Tuple:
+    return tuple(getattr(config, name) for name in LLM_SETTINGS)
+
+
+def _set_log_level(level: str):
+    LOG.warning("changing log level to %s", level)
+    for name in list(logging.root.manager.loggerDict):
+        logging.getLogger(name).setLevel(level)
+    logging.getLogger().setLevel(level)
+
+
+class ConfigSnapshotMiddleware(object):
+    """Pin the config that is current when a request arrives for the whole of that request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] not in ('http', 'websocket'):
+            return await self.app(scope, receive, send)
+        with nwac_config.config_snapshot():
+            await self.app(scope, receive, send)
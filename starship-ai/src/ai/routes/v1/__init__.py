@@ -2,12 +2,13 @@
 from fastapi import APIRouter
 
 import ai.routes.v1.ciq_assistant as ciq_assistant
+import ai.routes.v1.ciq_socket as ciq_socket
 import ai.routes.v1.cudo_assistant as cudo_assistant
 import ai.routes.v1.geninfo_assistant as geninfo_assistant
 import ai.routes.v1.infra_assistant as infra_assistant
 import ai.routes.v1.wlcluster_assistant as wlcluster_assistant
 from ai.routes import API_PREFIX
-from ai.routes.v1 import health
+from ai.routes.v1 import debug, health, metrics
 
 __api_version__ = "v1"
 
@@ -15,8 +16,13 @@ PREFIX = f"{API_PREFIX}/{__api_version__}"
 
 _health = APIRouter()
 _health.include_router(health.router)
+_metrics = APIRouter()
+_metrics.include_router(metrics.router)
+_debug = APIRouter()
+_debug.include_router(debug.router)
 _ciq = APIRouter()
 _ciq.include_router(ciq_assistant.router)
+_ciq.include_router(ciq_socket.router)
 _geninfo = APIRouter()
 _geninfo.include_router(geninfo_assistant.router)
 _infra = APIRouter()
@@ -28,6 +34,8 @@ _cudo.include_router(cudo_assistant.router)
 
 ROUTE_LIST = [
     _health,
+    _metrics,
+    _debug,
     _ciq,
     _geninfo,
     _infra,
@@ -39,6 +47,8 @@ ROUTE_LIST = [
 # then their metadata should be added here, not in the individual route files.
 TAG_METADATA = [
     health.tag_metadata,
+    metrics.tag_metadata,
+    debug.tag_metadata,
     ciq_assistant.tag_metadata,
     geninfo_assistant.tag_metadata,
     infra_assistant.tag_metadata,
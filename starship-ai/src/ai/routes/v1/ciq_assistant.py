@@ -1,13 +1,20 @@
 #  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import asyncio
 import logging
+from typing import Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
 
+from ai.agents.ciq_agent.blueprint_registry import UnknownBlueprintError, blueprint_registry
 from ai.agents.ciq_agent.ciq_core import ciq_agent
-from ai.models.v1.ciqchat import CIQChatRequest, CIQChatResponse
-from ai.models.v1.ciqpayload import CIQPayloadRequest, CIQPayloadResponse
+from ai.agents.ciq_agent.render_jobs import FAILED, CallbackNotAllowed, RenderJob
+from ai.models.v1.ciqchat import CIQChatRequest, CIQChatResponse, CIQYAMLJob
+from ai.models.v1.ciqpayload import (
+    CIQBlueprint, CIQBlueprintsResponse, CIQPayloadRequest, CIQPayloadResponse)
 from ai.models.v1.common import FieldSchema
-from ai.routes.v1.common import COMMON_ERRORS, TimedRoute
+from ai.routes.v1.common import (
+    COMMON_ERRORS, NOT_MODIFIED, PAYLOAD_CACHE, TimedRoute, call_llm, etag_matches)
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -22,6 +29,74 @@ tag_metadata = {
     'description': 'AI CIQ Assistant APIs.'
 }
 
+# Seconds a request waits for a YAML render before answering 202 with the job instead
+YAML_WAIT_TIMEOUT = 30.0
+
+
+async def _wait_for_job(job: RenderJob, timeout: float = YAML_WAIT_TIMEOUT) -> bool:
+    """Wait for a render job to finish without holding up the event loop."""
+    try:
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+def session_blueprint(session_id: Optional[str], product: Optional[str],
+                      version: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Return the blueprint to create a session with, if the chat needs a new session.
+
+    Existing sessions stay pinned to the blueprint they were created with, and asking one for
+    another blueprint is an error.
+
+    :raises HTTPException: 409 if the session is pinned to another blueprint
+    :raises UnknownBlueprintError: if there is no such blueprint
+    """
+    session = ciq_agent.session_manager.get_session(session_id) if session_id else None
+    if session is not None and not session.is_expired():
+        pinned_product, pinned_version = session.blueprint
+        if (product and product != pinned_product) or (version and version != pinned_version):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"session {session_id} is pinned to product {pinned_product} "
+                       f"version {pinned_version}")
+    elif product or version:
+        return blueprint_registry.resolve(product, version)
+    return None
+
+
+def _job_accepted(job: RenderJob, request: Request) -> JSONResponse:
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job.as_dict(),
+                        headers={'Location': str(request.url_for('get_ciq_yaml_job',
+                                                                 job_id=job.id))})
+
+
+def _build_ciq_payload(blueprint) -> CIQPayloadResponse:
+    # Get parameters schema from CIQ agent
+    properties_schema = ciq_agent.get_parameters_schema(blueprint)
+
+    # Convert to FieldSchema objects
+    properties_obj = {}
+
+    for field_name, schema_info in properties_schema.items():
+        properties_obj[field_name] = FieldSchema(
+            type=schema_info["type"],
+            x_displayName=schema_info["x-displayName"],
+            x_order=schema_info["x-order"],
+            x_value=schema_info["x-value"]
+        )
+
+    logger.info("Generated schema with %s parameters", len(properties_obj))
+
+    return CIQPayloadResponse(
+        properties=properties_obj,
+        response=(
+            f"CIQ schema with {len(properties_obj)} parameters "
+            f"returned successfully"
+        )
+    )
+
 
 @router.post(
     "/ciq/payload",
@@ -31,49 +106,57 @@ tag_metadata = {
     description="Returns CIQ schema properties for CMM deployment configuration.",
     responses={
         **COMMON_ERRORS,
+        **NOT_MODIFIED,
         status.HTTP_200_OK: {
             'model': CIQPayloadResponse,
             'description': 'CIQ payload schema returned'
         }
     },
 )
-async def ciq_payload(req: CIQPayloadRequest) -> CIQPayloadResponse:
+async def ciq_payload(req: CIQPayloadRequest, request: Request) -> CIQPayloadResponse:
     """Generate CIQ payload schema with all required parameters."""
     try:
-        logger.info(
-            f"Generating CIQ payload schema for input: {req.input[:50]}..."
-        )
-
-        # Get parameters schema from CIQ agent
-        properties_schema = ciq_agent.get_parameters_schema()
-
-        # Convert to FieldSchema objects
-        properties_obj = {}
-
-        for field_name, schema_info in properties_schema.items():
-            properties_obj[field_name] = FieldSchema(
-                type=schema_info["type"],
-                x_displayName=schema_info["x-displayName"],
-                x_order=schema_info["x-order"]
-            )
-
-        logger.info(f"Generated schema with {len(properties_obj)} parameters")
-
-        return CIQPayloadResponse(
-            properties=properties_obj,
-            response=(
-                f"CIQ schema with {len(properties_obj)} parameters "
-                f"returned successfully"
-            )
-        )
+        logger.info("Generating CIQ payload schema for input: %.50s...", req.input)
+
+        # The schema only changes when the blueprint's questionnaire does (e.g. on a reload)
+        blueprint = blueprint_registry.resolve(req.product, req.version)
+        questionnaire = blueprint_registry.questionnaire(blueprint)
+        return PAYLOAD_CACHE.response(request, ('ciq', blueprint), tuple(questionnaire.items()),
+                                      lambda: _build_ciq_payload(blueprint))
+    except UnknownBlueprintError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        logger.error(f"Error generating CIQ payload: {str(e)}")
+        logger.error("Error generating CIQ payload: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate CIQ payload: {str(e)}"
         )
 
 
+@router.get(
+    "/ciq/blueprints",
+    tags=tags,
+    operation_id="GetCIQBlueprints",
+    summary="List CIQ blueprints",
+    description="Lists the product blueprints and versions that CIQ sessions can be created for.",
+    responses={
+        **COMMON_ERRORS,
+        status.HTTP_200_OK: {
+            'model': CIQBlueprintsResponse,
+            'description': 'Available CIQ blueprints'
+        }
+    },
+)
+async def ciq_blueprints() -> CIQBlueprintsResponse:
+    """List the blueprints known to the blueprint registry."""
+    loaded = set(blueprint_registry.stats()["loaded"])
+    return CIQBlueprintsResponse(blueprints=[
+        CIQBlueprint(product=product, version=version,
+                     loaded=f"{product}/{version}" in loaded)
+        for product, version in blueprint_registry.keys()
+    ])
+
+
 @router.post(
     "/ciq/chat",
     tags=tags,
@@ -85,35 +168,49 @@ async def ciq_payload(req: CIQPayloadRequest) -> CIQPayloadResponse:
         status.HTTP_200_OK: {
             'model': CIQChatResponse,
             'description': 'CIQ chat response with session state and progress'
+        },
+        status.HTTP_409_CONFLICT: {
+            'description': 'The session is pinned to a different product or version'
         }
     },
 )
 async def ciq_chat(req: CIQChatRequest) -> CIQChatResponse:
     """Process chat message and manage CIQ parameter collection session."""
     try:
-        logger.info(
-            f"Processing CIQ chat message: {req.input[:50]}... "
-            f"(session: {req.session_id})"
-        )
-
-        # Process message through CIQ agent
-        result = ciq_agent.process_chat_message(req.input, req.session_id)
-
-        progress_pct = result['progress']['progress_percentage']
-        logger.info(
-            f"CIQ chat processed successfully. "
-            f"Session: {result['session_id']}, Progress: {progress_pct:.1f}%"
-        )
+        logger.info("Processing CIQ chat message: %.50s... (session: %s)", req.input,
+                    req.session_id)
+
+        # Process message through CIQ agent.  A blueprint is only needed for new sessions.
+        blueprint = session_blueprint(req.session_id, req.product, req.version)
+        result = await call_llm(ciq_agent.process_chat_message, req.input, req.session_id,
+                                blueprint, session_id=req.session_id)
+        job = ciq_agent.render_jobs.get(result["yaml_job"]) if result["yaml_job"] else None
+        if req.include_final_yaml and job is not None and not job.done:
+            # Legacy clients expect the YAML in the response that completes the session
+            await _wait_for_job(job)
+            session = ciq_agent.session_manager.get_session(result["session_id"])
+            result.update(final_yaml=session.final_yaml, yaml_hash=session.yaml_hash,
+                          yaml_version=session.yaml_version)
+
+        logger.info("CIQ chat processed successfully. Session: %s, Progress: %.1f%%",
+                    result['session_id'], result['progress']['progress_percentage'])
 
         return CIQChatResponse(
             response=result["response"],
             session_id=result["session_id"],
             progress=result["progress"],
             is_complete=result["is_complete"],
-            final_yaml=result["final_yaml"]
+            final_yaml=result["final_yaml"] if req.include_final_yaml else None,
+            yaml_hash=result["yaml_hash"],
+            yaml_version=result["yaml_version"],
+            yaml_job=result["yaml_job"]
         )
+    except UnknownBlueprintError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in CIQ chat: {str(e)}")
+        logger.error("Error in CIQ chat: %s", e)
         raise HTTPException(status_code=500, detail=f"CIQ chat error: {str(e)}")
 
 
@@ -134,7 +231,7 @@ async def ciq_chat(req: CIQChatRequest) -> CIQChatResponse:
 async def get_ciq_session_progress(session_id: str) -> dict:
     """Get progress information for a CIQ session."""
     try:
-        logger.info(f"Getting progress for CIQ session: {session_id}")
+        logger.info("Getting progress for CIQ session: %s", session_id)
 
         progress = ciq_agent.get_session_progress(session_id)
 
@@ -144,16 +241,14 @@ async def get_ciq_session_progress(session_id: str) -> dict:
                 detail="Session not found or expired"
             )
 
-        progress_pct = progress['progress_percentage']
-        logger.info(
-            f"Session progress retrieved: {progress_pct:.1f}% complete"
-        )
+        logger.info("Session progress retrieved: %.1f%% complete",
+                    progress['progress_percentage'])
 
         return progress
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting session progress: {str(e)}")
+        logger.error("Error getting session progress: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to get session progress: {str(e)}"
@@ -165,19 +260,34 @@ async def get_ciq_session_progress(session_id: str) -> dict:
     tags=tags,
     operation_id="GenerateCIQYAML",
     summary="Generate YAML for CIQ session",
-    description="Generate final deployment YAML from collected parameters in a session.",
+    description=(
+        "Generate final deployment YAML from collected parameters in a session.  The YAML is "
+        "rendered in the background; the request waits for it unless wait is false, and "
+        "answers 202 with the render job (see GET /ciq/jobs/{job_id}) if it is not ready in "
+        "time.  With callback_url, the job status is also POSTed there once the YAML is ready."
+    ),
     responses={
         **COMMON_ERRORS,
         status.HTTP_200_OK: {
             'model': dict,
             'description': 'Generated YAML configuration'
+        },
+        status.HTTP_202_ACCEPTED: {
+            'model': CIQYAMLJob,
+            'description': 'The YAML is being generated'
         }
     },
 )
-async def generate_ciq_yaml(session_id: str) -> dict:
+async def generate_ciq_yaml(
+    session_id: str,
+    request: Request,
+    wait: bool = Query(True, description='Wait for the YAML rather than answer 202 at once'),
+    callback_url: Optional[str] = Query(None, description='URL to POST the job status to '
+                                        'once the YAML is ready (must be an allowed one)')
+) -> dict:
     """Generate final YAML configuration from session parameters."""
     try:
-        logger.info(f"Generating YAML for CIQ session: {session_id}")
+        logger.info("Generating YAML for CIQ session: %s", session_id)
 
         session = ciq_agent.session_manager.get_session(session_id)
 
@@ -193,24 +303,104 @@ async def generate_ciq_yaml(session_id: str) -> dict:
                 detail="Session is not complete. Collect all parameters first."
             )
 
-        if not session.final_yaml:
-            # Generate YAML if not already generated
-            session.final_yaml = ciq_agent._generate_final_yaml(session)
-            ciq_agent.session_manager.update_session(session_id, session)
+        # Generate YAML if not already generated (or join the render in progress)
+        job = ciq_agent.render_jobs.in_progress(session_id)
+        if job is not None or not session.final_yaml:
+            job = ciq_agent.render_final_yaml(session, callback_url)
+            if not wait or not await _wait_for_job(job):
+                return _job_accepted(job, request)
+            if job.status == FAILED:
+                raise HTTPException(status_code=500,
+                                    detail=f"Failed to generate YAML: {job.error}")
 
-        logger.info(f"YAML generated successfully for session: {session_id}")
+        logger.info("YAML generated successfully for session: %s", session_id)
 
         return {
             "yaml_content": session.final_yaml,
+            "yaml_hash": session.yaml_hash,
+            "yaml_version": session.yaml_version,
             "session_id": session_id,
+            "job_id": session.yaml_job,
             "parameters_count": len(session.collected_values),
             "generated_at": session.last_activity
         }
+    except CallbackNotAllowed as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error generating YAML: {str(e)}")
+        logger.error("Error generating YAML: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate YAML: {str(e)}"
         )
+
+
+@router.get(
+    "/ciq/session/{session_id}/yaml",
+    tags=tags,
+    operation_id="GetCIQYAML",
+    summary="Get the YAML of a completed CIQ session",
+    description=(
+        "Returns the generated deployment YAML of a completed session.  The ETag is the "
+        "yaml_hash reported in chat responses, so clients can poll with If-None-Match and "
+        "only download the document when it changed.  While the first YAML of the session is "
+        "being generated, the answer is 202 with the render job."
+    ),
+    responses={
+        **COMMON_ERRORS,
+        **NOT_MODIFIED,
+        status.HTTP_200_OK: {
+            'content': {'application/yaml': {}},
+            'description': 'Generated YAML configuration'
+        },
+        status.HTTP_202_ACCEPTED: {
+            'model': CIQYAMLJob,
+            'description': 'The YAML is being generated'
+        }
+    },
+)
+async def get_ciq_yaml(session_id: str, request: Request) -> Response:
+    """Return the session's generated YAML, or 304 if the client already has this version."""
+    session = ciq_agent.session_manager.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    job = ciq_agent.render_jobs.in_progress(session_id)
+    if not session.final_yaml:
+        if job is not None:
+            return _job_accepted(job, request)
+        raise HTTPException(status_code=404, detail="YAML has not been generated yet")
+
+    headers = {'ETag': f'"{session.yaml_hash}"',
+               'X-YAML-Version': str(session.yaml_version),
+               'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), headers['ETag']):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=session.final_yaml, media_type='application/yaml', headers=headers)
+
+
+@router.get(
+    "/ciq/jobs/{job_id}",
+    tags=tags,
+    operation_id="GetCIQYAMLJob",
+    summary="Get the status of a CIQ YAML render job",
+    description=(
+        "Returns the status of a background YAML render (queued, running, done or failed), as "
+        "started by the message completing a session, a regenerate request or POST "
+        "/ciq/session/{session_id}/yaml.  Once done, the YAML is at "
+        "GET /ciq/session/{session_id}/yaml."
+    ),
+    responses={
+        **COMMON_ERRORS,
+        status.HTTP_200_OK: {
+            'model': CIQYAMLJob,
+            'description': 'Status of the render job'
+        }
+    },
+)
+async def get_ciq_yaml_job(job_id: str) -> CIQYAMLJob:
+    """Return the status of a YAML render job."""
+    job = ciq_agent.render_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return CIQYAMLJob(**job.as_dict())
@@ -0,0 +1,226 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+WebSocket transport for the CIQ chat.
+
+A connection to /ciq/chat/ws?session_id=<id> is bound to one CIQ session for as long as it is
+open (a new session is created, pinned to the product and version query parameters, when
+session_id is not given or has expired).  Instead of a POST /ciq/chat per message and polling of
+the progress, messages and events are JSON objects with a "type" sent over the socket:
+
+    client -> server
+    message     {"input": ...}: a chat message, as the input of POST /ciq/chat
+    ping        answered with a pong
+    pong        the answer to the server's ping
+
+    server -> client
+    session     on connecting: session_id, progress, is_complete, yaml_hash, yaml_version and
+                yaml_job, as in a POST /ciq/chat response
+    token       {"text": ...}: the next piece of the response to a message, as it is generated
+    message     the whole response to a message, once done: the fields of a POST /ciq/chat
+                response (its text is the tokens put together, unless an answer broke off)
+    progress    the session's progress, after each message
+    yaml_ready  a render of the session's YAML is done: the job (see GET /ciq/jobs/{job_id})
+    ping, pong  heartbeats
+    error       {"detail": ...}: a message that could not be handled (the socket stays open)
+
+The messages of a connection are handled one at a time, in the session's turn of the fair
+queue.  Events go out through a queue of ciq_ws_send_queue events; a client reading slower than
+its responses are generated holds up their generation rather than using up memory.  The server
+sends a ping every ciq_ws_heartbeat seconds, and closes the connection when the client has sent
+nothing for three of them while no message was being handled.  Messages over
+ciq_ws_max_message bytes are refused, and at most ciq_ws_max_connections connections are open at
+a time; more are refused (closed with code 1013, try again later).
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, List, Optional, Set
+
+from fastapi import APIRouter, HTTPException, WebSocket
+from starlette.concurrency import run_in_threadpool
+
+from ai.agents.ciq_agent.blueprint_registry import UnknownBlueprintError
+from ai.agents.ciq_agent.ciq_core import ciq_agent
+from ai.agents.ciq_agent.render_jobs import RenderJob
+from ai.config import get_config
+from ai.routes.v1.ciq_assistant import session_blueprint
+from ai.routes.v1.common import call_llm
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Close codes
+GOING_AWAY = 1001
+POLICY_VIOLATION = 1008
+TRY_AGAIN_LATER = 1013
+
+
+class ChatSocket(object):
+    """A WebSocket connection bound to a CIQ session."""
+
+    # The connections open in this process
+    OPEN: Set['ChatSocket'] = set()
+
+    def __init__(self, websocket: WebSocket, session_id: str, heartbeat: float = 20.0,
+                 send_queue: int = 64, max_message: int = 16384):
+        """
+        Create a connection handler.
+
+        :param websocket: the accepted connection
+        :param session_id: the session it is bound to
+        :param heartbeat: seconds between pings
+        :param send_queue: most events waiting to be sent
+        :param max_message: most bytes in a message from the client
+        """
+        self.websocket = websocket
+        self.session_id = session_id
+        self.heartbeat = heartbeat
+        self.max_message = max_message
+        self.outgoing: asyncio.Queue = asyncio.Queue(maxsize=max(1, send_queue))
+        self.last_seen = time.monotonic()
+        self.busy = False
+        self.closed = False
+        self.close_code = 1000
+        self._watched: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    async def send(self, kind: str, **fields: Any) -> None:
+        """Queue an event, waiting while the queue is full."""
+        if not self.closed:
+            await self.outgoing.put({'type': kind, **fields})
+
+    async def run(self) -> None:
+        """Handle the connection until it is closed."""
+        ChatSocket.OPEN.add(self)
+        tasks = [asyncio.create_task(self._write()), asyncio.create_task(self._heartbeat()),
+                 asyncio.create_task(self._read())]
+        try:
+            await self._send_session()
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.closed = True
+            ChatSocket.OPEN.discard(self)
+            for task in tasks + self._tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, *self._tasks, return_exceptions=True)
+            # Let a response being generated put its last pieces, see _turn()
+            while not self.outgoing.empty():
+                self.outgoing.get_nowait()
+            try:
+                await self.websocket.close(code=self.close_code)
+            except RuntimeError:
+                pass  # closed already
+
+    async def _write(self) -> None:
+        while True:
+            await self.websocket.send_json(await self.outgoing.get())
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            if not self.busy and time.monotonic() - self.last_seen > 3 * self.heartbeat:
+                logger.info("closing the CIQ chat socket of session %s: no heartbeat",
+                            self.session_id)
+                self.close_code = GOING_AWAY
+                return
+            await self.send('ping')
+
+    async def _read(self) -> None:
+        while True:
+            event = await self.websocket.receive()
+            if event['type'] == 'websocket.disconnect':
+                return
+            self.last_seen = time.monotonic()
+            text = event.get('text')
+            if text is None:
+                text = (event.get('bytes') or b'').decode('utf-8', 'replace')
+            if len(text.encode('utf-8')) > self.max_message:
+                await self.send('error', detail=f"message over {self.max_message} bytes")
+                continue
+            try:
+                message = json.loads(text)
+                kind = message.get('type')
+            except (ValueError, AttributeError):
+                await self.send('error', detail="messages must be JSON objects")
+                continue
+            if kind == 'message' and isinstance(message.get('input'), str):
+                await self._turn(message['input'])
+            elif kind == 'ping':
+                await self.send('pong')
+            elif kind != 'pong':
+                await self.send('error', detail=f"unknown message type {kind!r}")
+
+    async def _turn(self, text: str) -> None:
+        """Answer a chat message, streaming the response."""
+        loop = asyncio.get_running_loop()
+
+        def on_text(piece: str) -> None:
+            # In the worker thread: wait for room in the queue
+            if not self.closed:
+                asyncio.run_coroutine_threadsafe(self.send('token', text=piece), loop).result()
+
+        self.busy = True
+        try:
+            result = await call_llm(ciq_agent.process_chat_message, text, self.session_id,
+                                    session_id=self.session_id, on_text=on_text)
+        except Exception as e:
+            logger.error("Error in CIQ chat socket: %s", e)
+            await self.send('error', detail=f"CIQ chat error: {str(e)}")
+            return
+        finally:
+            self.busy = False
+            self.last_seen = time.monotonic()
+        if result['session_id'] != self.session_id:
+            # The session expired meanwhile: the connection moves to the new one
+            self.session_id = result['session_id']
+            await self._send_session()
+        await self.send('message', response=result['response'], session_id=self.session_id,
+                        progress=result['progress'], is_complete=result['is_complete'],
+                        yaml_hash=result['yaml_hash'], yaml_version=result['yaml_version'],
+                        yaml_job=result['yaml_job'])
+        await self.send('progress', **result['progress'])
+        self._watch(result['yaml_job'])
+
+    async def _send_session(self) -> None:
+        session = ciq_agent.session_manager.get_session(self.session_id)
+        await self.send('session', session_id=self.session_id, progress=session.get_progress(),
+                        is_complete=session.is_complete, yaml_hash=session.yaml_hash,
+                        yaml_version=session.yaml_version, yaml_job=session.yaml_job)
+        job = ciq_agent.render_jobs.in_progress(self.session_id)
+        if job is not None:
+            self._watch(job.id)
+
+    def _watch(self, job_id: Optional[str]) -> None:
+        """Push a yaml_ready event when the render job finishes."""
+        job = ciq_agent.render_jobs.get(job_id) if job_id else None
+        if job is not None and job.id not in self._watched:
+            self._watched.add(job.id)
+            self._tasks.append(asyncio.create_task(self._yaml_ready(job)))
+
+    async def _yaml_ready(self, job: RenderJob) -> None:
+        await asyncio.shield(asyncio.wrap_future(job.future))
+        await self.send('yaml_ready', **job.as_dict())
+
+
+@router.websocket("/ciq/chat/ws")
+async def ciq_chat_socket(websocket: WebSocket, session_id: Optional[str] = None,
+                          product: Optional[str] = None, version: Optional[str] = None):
+    """CIQ chat over a WebSocket bound to one session."""
+    config = get_config()
+    if len(ChatSocket.OPEN) >= int(config.ciq_ws_max_connections):
+        logger.warning("refusing a CIQ chat socket: %d open already", len(ChatSocket.OPEN))
+        return await websocket.close(code=TRY_AGAIN_LATER)
+    try:
+        blueprint = session_blueprint(session_id, product, version)
+    except (HTTPException, UnknownBlueprintError) as e:
+        return await websocket.close(code=POLICY_VIOLATION,
+                                     reason=str(getattr(e, 'detail', e))[:120])
+    session_id, _ = await run_in_threadpool(ciq_agent.session_manager.get_or_create_session,
+                                            session_id, blueprint)
+    await websocket.accept()
+    logger.info("CIQ chat socket opened for session %s", session_id)
+    await ChatSocket(websocket, session_id, heartbeat=float(config.ciq_ws_heartbeat),
+                     send_queue=int(config.ciq_ws_send_queue),
+                     max_message=int(config.ciq_ws_max_message)).run()
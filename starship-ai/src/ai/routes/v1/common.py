@@ -1,17 +1,27 @@
 #  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
 import datetime
+import hashlib
+import time
 import uuid
-from typing import Callable, Tuple, Union
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
 
-import httpx
 from fastapi import Request, Response, status
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
 
 from ai import LOG
-from ai.config import CONFIG
+from ai.config import get_config
 from ai.endpoints.v1 import EndpointTypes
+from ai.fairqueue import LLM_QUEUE
+from ai.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, upstream_call
 from ai.models.v1.common import GENERAL_ERROR, ForbiddenError, GeneralError, ParseErrors
+from ai.perf import cassettes
+from ai.ratelimit import current_client
+from ai.tracing import current_span
 
 SERVER_ERROR = {status.HTTP_500_INTERNAL_SERVER_ERROR: {
     'model': GeneralError,
@@ -34,6 +44,10 @@ COMMON_ERRORS = {**FORBIDDEN_ERROR,
                  **SERVER_ERROR,
                  **PARSE_ERRORS}
 
+NOT_MODIFIED = {status.HTTP_304_NOT_MODIFIED: {
+    'description': 'Not modified since the version identified by If-None-Match'
+}}
+
 
 async def call_endpoint(ep_type: EndpointTypes, method: str, url: str, headers: dict,
                         error_action: str, body: Union[dict, list, None] = None, params=None,
@@ -53,61 +67,163 @@ async def call_endpoint(ep_type: EndpointTypes, method: str, url: str, headers:
     :return: The response (either a list or dict) plus the return code or JSONResponse plus a
              return code of 500 if we encounter an error
     """
+    import httpx  # imported on first use, it is slow to import
+
     _error = GENERAL_ERROR.format(action='communicate with server')
-    LOG.debug(f"executing {method} to endpoint type {ep_type.value} using url {url}, "
-              f"headers: {headers}, body: {body}")
-    _connect_timeout = CONFIG.endpoints.by_type(ep_type)[0].connect_timeout
-    _read_timeout = CONFIG.endpoints.by_type(ep_type)[0].read_timeout
+    LOG.debug("executing %s to endpoint type %s using url %s, headers: %s, body: %s", method,
+              ep_type.value, url, headers, body)
+    _endpoint = get_config().endpoints.by_type(ep_type)[0]
+    _connect_timeout = _endpoint.connect_timeout
+    _read_timeout = _endpoint.read_timeout
     _timeout = httpx.Timeout(5, connect=_connect_timeout, read=_read_timeout)
     try:
-        async with httpx.AsyncClient(verify=verify, timeout=_timeout) as client:
-            if method == 'GET':
-                _r = await client.get(url=url, headers=headers, params=params)
-            if method == 'POST':
-                _r = await client.post(url=url, headers=headers, json=body, params=params)
-            if method == 'PUT':
-                _r = await client.put(url=url, headers=headers, json=body, params=params)
-            if method == 'PATCH':
-                _r = await client.patch(url=url, headers=headers, json=body, params=params)
-            if method == 'DELETE':
-                _r = await client.delete(url=url, headers=headers, params=params)
+        with upstream_call('endpoint', ep_type.value) as call:
+            async def send():
+                async with httpx.AsyncClient(verify=verify, timeout=_timeout) as client:
+                    if method == 'GET':
+                        return await client.get(url=url, headers=headers, params=params)
+                    if method == 'POST':
+                        return await client.post(url=url, headers=headers, json=body,
+                                                 params=params)
+                    if method == 'PUT':
+                        return await client.put(url=url, headers=headers, json=body,
+                                                params=params)
+                    if method == 'PATCH':
+                        return await client.patch(url=url, headers=headers, json=body,
+                                                  params=params)
+                    if method == 'DELETE':
+                        return await client.delete(url=url, headers=headers, params=params)
+
+            _r = await cassettes.httpx_call(ep_type.value, method, url, body, params, send)
+            call.outcome = str(_r.status_code)
         _status = _r.status_code
         if len(_r.content) > 0:
             _body = _r.json()
         else:
             _body = None
-        LOG.info(f"successful {method} for {url}")
-        LOG.debug(f"{method} {url} status code: {_status}, body: {_body}")
+        LOG.info("successful %s for %s", method, url)
+        LOG.debug("%s %s status code: %s, body: %s", method, url, _status, _body)
         return _body, _status
     except (httpx.ConnectTimeout, httpx.ReadTimeout):
         _uuid = uuid.uuid4()
-        LOG.warning(f"error_id: {_uuid}, timeout on {method}: {error_action}")
+        LOG.warning("error_id: %s, timeout on %s: %s", _uuid, method, error_action)
         _response = GeneralError(error=_error, id=str(_uuid))
         return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             content=_response.dict()), 500
     except Exception as e:
         _uuid = uuid.uuid4()
-        LOG.warning(f"error_id: {_uuid}, unexpected exception during {method}: {error_action} "
-                    f"exception: {repr(e)}")
+        LOG.warning("error_id: %s, unexpected exception during %s: %s exception: %r", _uuid,
+                    method, error_action, e)
         _response = GeneralError(error=_error, id=str(_uuid))
         return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             content=_response.dict()), 500
 
 
+async def call_llm(func: Callable, *args, session_id: Optional[str] = None, **kwargs):
+    """
+    Run a blocking call to an LLM (or an agent making them) in a worker thread.
+
+    The call waits for its turn in the fair queue: as part of the session's flow when it is for a
+    session (whose calls then run one at a time), otherwise as part of the client's.
+    """
+    client = current_client()
+    flow = f"session:{session_id}" if session_id else client
+    async with LLM_QUEUE.turn(flow, client, exclusive=session_id is not None):
+        return await run_in_threadpool(func, *args, **kwargs)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Return True if an If-None-Match header value matches the given ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+class PayloadCache(object):
+    """
+    Payload responses serialized once per version of the data they are built from.
+
+    The payload schemas only change when the tables behind them do, yet the UI polls them
+    constantly.  Rather than rebuilding and re-serializing the models on every poll, the JSON
+    bytes and a strong ETag are kept until the version passed in by the caller changes.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Hashable, Tuple[Any, bytes, str]] = {}
+
+    def get(self, key: Hashable, version: Any,
+            build: Callable[[], BaseModel]) -> Tuple[bytes, str]:
+        """
+        Return the serialized payload for key and its ETag, building it if version changed.
+
+        :param key: identifies the payload (e.g. route and blueprint)
+        :param version: anything comparable that changes when the payload would change.  It is
+                        stored, so it must not be mutated afterwards (pass a tuple, not a dict).
+        :param build: returns the response model; only called when the version changed
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            body = build().model_dump_json(by_alias=True).encode('utf-8')
+            # Derived from the content so every worker hands out the same ETag
+            entry = (version, body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+            self._entries[key] = entry
+        return entry[1], entry[2]
+
+    def response(self, request: Request, key: Hashable, version: Any,
+                 build: Callable[[], BaseModel]) -> Response:
+        """Return the cached payload, or 304 Not Modified if the client already has it."""
+        body, etag = self.get(key, version, build)
+        # no-cache: clients may keep the payload but must revalidate it on every poll
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag_matches(request.headers.get('if-none-match'), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=body, media_type='application/json', headers=headers)
+
+    def clear(self):
+        self._entries.clear()
+
+
+PAYLOAD_CACHE = PayloadCache()
+
+
 def log_usage(user: str, subscription: str, request: Request):
-    LOG.info(f'user: {user}, subscription: {subscription}, method: {request.method}, '
-             f'path: {request.url.path}')
+    LOG.info('user: %s, subscription: %s, method: %s, path: %s', user, subscription,
+             request.method, request.url.path)
 
 
 class TimedRoute(APIRoute):
     def get_route_handler(self) -> Callable:
         orig_handler = super().get_route_handler()
 
+        route = self.path_format
+
         async def route_time(request: Request) -> Response:
             then = datetime.datetime.now(datetime.timezone.utc)
-            response: Response = await orig_handler(request)
+            start = time.perf_counter()
+            status_code = 500
+            trace = current_span()
+            if trace is not None:
+                trace.set(route=route)
+            HTTP_REQUESTS_IN_FLIGHT.inc(route)
+            try:
+                response: Response = await orig_handler(request)
+                status_code = response.status_code
+            except HTTPException as e:
+                status_code = e.status_code
+                raise
+            except RequestValidationError:
+                # Turned into a 422 by the app's exception handler
+                status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+                raise
+            finally:
+                HTTP_REQUESTS_IN_FLIGHT.dec(route)
+                HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, route, request.method,
+                                              str(status_code))
             duration = datetime.datetime.now(datetime.timezone.utc) - then
-            LOG.info(f"processing_time: {duration}")
+            LOG.info("processing_time: %s", duration)
             return response
 
         return route_time
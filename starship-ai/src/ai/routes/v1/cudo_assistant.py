@@ -2,9 +2,9 @@
 from fastapi import APIRouter, HTTPException, status
 
 from ai import LOG
-from ai.agents.athena_cudo_agent import AthenaCuDoClient
+from ai.agents.llm_gateway import LLM_GATEWAY, LLMUnavailable
 from ai.models.v1.cudochat import CudoChatRequest
-from ai.routes.v1.common import COMMON_ERRORS, TimedRoute
+from ai.routes.v1.common import COMMON_ERRORS, TimedRoute, call_llm
 
 router = APIRouter(route_class=TimedRoute)
 
@@ -33,18 +33,20 @@ tag_metadata = {
 async def cudo_chat(req: CudoChatRequest) -> str:
     try:
         # Log incoming input
-        LOG.info(f"Received input: {req.input}")
-
-        # Send the actual user input to Athena and extract normalized content
-        client = AthenaCuDoClient()
-        response = client.send_message(req.input)
-        if not response:
+        LOG.info("Received input: %s", req.input)
+
+        # Send the actual user input to CuDo, through the LLM gateway
+        try:
+            content = await call_llm(LLM_GATEWAY.complete, 'cudo_chat', '', req.input,
+                                     max_tokens=8008)
+        except LLMUnavailable as e:
+            LOG.warning("CuDo chat failed: %s", e)
             raise HTTPException(status_code=502, detail="Upstream AI service returned no response")
-
-        content = client.extract_content(response)
-        LOG.info(f"Extracted content: {content}")
+        LOG.info("Extracted content: %s", content)
 
         return content
+    except HTTPException:
+        raise
     except Exception as e:
-        LOG.error(f"Error: {e}")
+        LOG.error("Error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
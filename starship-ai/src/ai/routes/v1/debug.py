@@ -0,0 +1,83 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import asyncio
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from ai import LOG
+from ai.config import get_config
+from ai.profiler import PROFILER, ProfilerBusy
+from ai.tracing import TRACES
+
+router = APIRouter()
+
+# common tags
+tags = ['debug']
+
+tag_metadata = {'name': 'debug',
+                'description': 'Debugging APIs (only enabled in dev mode or when configured).'}
+
+
+@router.get("/debug/traces",
+            tags=tags,
+            operation_id="GetRecentTraces",
+            summary='Recent request traces',
+            description=('Returns the span trees of the most recent requests, newest first. '
+                         'Enabled in dev mode or with trace_debug_endpoint.'),
+            responses={status.HTTP_404_NOT_FOUND: {'description': 'The endpoint is disabled'}})
+async def recent_traces(limit: int = Query(20, ge=1, le=1000),
+                        min_ms: float = Query(0.0, ge=0.0,
+                                              description='Only traces at least this slow')):
+    config = get_config()
+    if not (config.trace_debug_endpoint or config.dev):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Not Found')
+    return {'traces': TRACES.recent(limit, min_ms)}
+
+
+@router.get("/debug/profile",
+            tags=tags,
+            operation_id="GetCpuProfile",
+            summary='Sample a CPU profile',
+            description=('Samples the stacks of all threads for the given time and returns them '
+                         'as collapsed stacks (one "frame;frame;... count" line per stack), '
+                         'ready for flame graph tools.  Samples taken while handling a request '
+                         'are rooted at its method and route.  Enabled in dev mode or with '
+                         'profiler_endpoint.'),
+            response_class=PlainTextResponse,
+            responses={status.HTTP_403_FORBIDDEN: {'description': 'Missing or wrong token'},
+                       status.HTTP_404_NOT_FOUND: {'description': 'The endpoint is disabled'},
+                       status.HTTP_409_CONFLICT: {'description': 'A profile is already running'}})
+async def cpu_profile(seconds: float = Query(10.0, gt=0.0,
+                                             description='How long to sample for (capped by '
+                                                         'profiler_max_seconds)'),
+                      interval_ms: float = Query(10.0, ge=1.0, le=1000.0,
+                                                 description='Time between samples'),
+                      per_request: bool = Query(False, description='Also split request samples '
+                                                                   'by correlation ID'),
+                      include_idle: bool = Query(False, description='Also count threads waiting '
+                                                                    'for work'),
+                      x_profiler_token: Optional[str] = Header(None)):
+    config = get_config()
+    if not (config.profiler_endpoint or config.dev):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Not Found')
+    token = str(config.profiler_token or '')
+    # Outside dev mode the endpoint is only served with a token
+    if not token and not config.dev:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail='profiler_token must be set outside dev mode')
+    if token and not hmac.compare_digest(x_profiler_token or '', token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Forbidden')
+    seconds = min(seconds, float(config.profiler_max_seconds))
+    try:
+        profile = await asyncio.to_thread(PROFILER.run, seconds, interval_ms / 1000,
+                                          per_request, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    LOG.info("profiled for %.1f s: %d samples, %.2f%% overhead", profile.duration,
+             profile.samples, profile.overhead * 100)
+    return PlainTextResponse(profile.collapsed(),
+                             headers={'X-Profile-Samples': str(profile.samples),
+                                      'X-Profile-Duration': f'{profile.duration:.3f}',
+                                      'X-Profile-Overhead': f'{profile.overhead:.4f}'})
@@ -1,13 +1,14 @@
 #  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
 import json
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 
+from ai import LOG
 from ai.agents.bedrock_client import bedrock_invoke
 from ai.models.v1.geninfochat import GenInfoChatRequest
 from ai.models.v1.geninfopayload import (
     GenInfoPayloadRequest, GenInfoPayloadResponse, default_gen_info_properties)
-from ai.routes.v1.common import COMMON_ERRORS, TimedRoute
+from ai.routes.v1.common import COMMON_ERRORS, NOT_MODIFIED, PAYLOAD_CACHE, TimedRoute, call_llm
 
 router = APIRouter(route_class=TimedRoute)
 
@@ -40,16 +41,20 @@ GEN_INFO_VALUES_STATE = {
     description="Returns General Info schema properties based on default metadata.",
     responses={
         **COMMON_ERRORS,
+        **NOT_MODIFIED,
         status.HTTP_200_OK: {
             "model": GenInfoPayloadResponse,
             "description": "General Info payload schema returned",
         },
     },
 )
-async def geninfo_payload(req: GenInfoPayloadRequest) -> GenInfoPayloadResponse:
+async def geninfo_payload(req: GenInfoPayloadRequest, request: Request) -> GenInfoPayloadResponse:
     try:
-        properties_obj = default_gen_info_properties(GEN_INFO_VALUES_STATE)
-        return GenInfoPayloadResponse(properties=properties_obj)
+        # The payload only changes when the collected values do
+        return PAYLOAD_CACHE.response(
+            request, 'general-info', tuple(GEN_INFO_VALUES_STATE.items()),
+            lambda: GenInfoPayloadResponse(
+                properties=default_gen_info_properties(GEN_INFO_VALUES_STATE)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -82,14 +87,16 @@ async def geninfo_payload_hyphen(req: GenInfoChatRequest) -> str:
     Return only with the JSON object with no extra text.
             """
         )
-        response_text = bedrock_invoke(
+        response_text = await call_llm(
+            bedrock_invoke,
             system_prompt=system_prompt,
             user_msg=req.question,
             max_tokens=512,
+            route='wizard',
         )
 
         data_json = json.loads(response_text)
-        print(f"Data JSON: {data_json}")
+        LOG.debug("Data JSON: %s", data_json)
         for key in data_json:
             GEN_INFO_VALUES_STATE[key] = data_json[key]
 
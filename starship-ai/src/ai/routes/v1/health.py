@@ -1,8 +1,9 @@
 #  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Response, status
 
-from ai.models.v1.health import HealthResponse
+from ai.models.v1.health import HealthResponse, ReadinessResponse
 from ai.routes.v1.common import COMMON_ERRORS, TimedRoute
+from ai.warmup import READINESS
 
 router = APIRouter(route_class=TimedRoute)
 
@@ -10,7 +11,7 @@ router = APIRouter(route_class=TimedRoute)
 tags = ['health']
 
 tag_metadata = {'name': 'health',
-                'description': 'Health check APIs.'}
+                'description': 'Health and readiness check APIs.'}
 
 
 @router.get("/health",
@@ -24,3 +25,25 @@ tag_metadata = {'name': 'health',
                             'description': 'A list of rack units for the given rack id'}})
 async def health_check():
     return {"status": "ok"}
+
+
+@router.get("/ready",
+            tags=tags,
+            operation_id="GetReadinessCheck",
+            summary='Readiness check api',
+            description=('Reports whether the service has warmed up and can take traffic, with '
+                         'the status and warm-up time of each component.  Upstream services '
+                         'that fail to warm up make the service degraded but still ready.'),
+            response_model=ReadinessResponse,
+            responses={**COMMON_ERRORS,
+                       status.HTTP_200_OK: {
+                           'model': ReadinessResponse,
+                           'description': 'The service is ready (or degraded)'},
+                       status.HTTP_503_SERVICE_UNAVAILABLE: {
+                           'model': ReadinessResponse,
+                           'description': 'The service is warming up or a required component '
+                                          'failed to warm up'}})
+async def readiness_check(response: Response):
+    if not READINESS.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return READINESS.report()
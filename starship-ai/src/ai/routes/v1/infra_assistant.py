@@ -1,13 +1,14 @@
 #  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
 import json
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 
+from ai import LOG
 from ai.agents.bedrock_client import bedrock_invoke
 from ai.models.v1.infrahubclchat import InfraHubClChatRequest
 from ai.models.v1.infrahubclpayload import (
     InfraHubClPayloadRequest, InfraHubClPayloadResponse, default_infra_hubcl_properties)
-from ai.routes.v1.common import COMMON_ERRORS, TimedRoute
+from ai.routes.v1.common import COMMON_ERRORS, NOT_MODIFIED, PAYLOAD_CACHE, TimedRoute, call_llm
 
 router = APIRouter(route_class=TimedRoute)
 
@@ -44,16 +45,21 @@ INFRA_HUB_VALUES_STATE = {
     description="Returns Infra Hub Cluster schema properties based on default metadata.",
     responses={
         **COMMON_ERRORS,
+        **NOT_MODIFIED,
         status.HTTP_200_OK: {
             "model": InfraHubClPayloadResponse,
             "description": "Infra Hub Cluster payload schema returned",
         },
     },
 )
-async def infra_payload(req: InfraHubClPayloadRequest) -> InfraHubClPayloadResponse:
+async def infra_payload(req: InfraHubClPayloadRequest,
+                        request: Request) -> InfraHubClPayloadResponse:
     try:
-        properties_obj = default_infra_hubcl_properties(INFRA_HUB_VALUES_STATE)
-        return InfraHubClPayloadResponse(properties=properties_obj)
+        # The payload only changes when the collected values do
+        return PAYLOAD_CACHE.response(
+            request, 'hub-cluster', tuple(INFRA_HUB_VALUES_STATE.items()),
+            lambda: InfraHubClPayloadResponse(
+                properties=default_infra_hubcl_properties(INFRA_HUB_VALUES_STATE)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -86,14 +92,16 @@ async def infra_chat(req: InfraHubClChatRequest) -> str:
             """
         )
 
-        response_text = bedrock_invoke(
+        response_text = await call_llm(
+            bedrock_invoke,
             system_prompt=system_prompt,
             user_msg=req.input,
             max_tokens=512,
+            route='wizard',
         )
 
         data_json = json.loads(response_text)
-        print(f"Data JSON: {data_json}")
+        LOG.debug("Data JSON: %s", data_json)
         for key in data_json:
             INFRA_HUB_VALUES_STATE[key] = data_json[key]
 
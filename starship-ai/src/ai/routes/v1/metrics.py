@@ -0,0 +1,29 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+from fastapi import APIRouter, Response, status
+
+from ai.metrics import REGISTRY
+
+router = APIRouter()
+
+# common tags
+tags = ['metrics']
+
+tag_metadata = {'name': 'metrics',
+                'description': 'Prometheus metrics.'}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@router.get("/metrics",
+            tags=tags,
+            operation_id="GetMetrics",
+            summary='Prometheus metrics',
+            description=('Request and upstream latency histograms, retry counters, in-flight '
+                         'gauges and session store gauges, in the Prometheus text format.'),
+            response_class=Response,
+            responses={status.HTTP_200_OK: {
+                'content': {CONTENT_TYPE: {}},
+                'description': 'Metrics in the Prometheus text exposition format'}})
+def metrics() -> Response:
+    # Synchronous, so collecting (and reading other workers' snapshots) runs off the event loop
+    return Response(REGISTRY.exposition(), media_type=CONTENT_TYPE)
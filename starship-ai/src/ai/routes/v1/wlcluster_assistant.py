@@ -1,12 +1,13 @@
 #  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
 import json
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 
+from ai import LOG
 from ai.agents.bedrock_client import bedrock_invoke
 from ai.models.v1.wlchat import WLChatRequest
 from ai.models.v1.wlpayload import WLPayloadRequest, WLPayloadResponse, default_wl_properties
-from ai.routes.v1.common import COMMON_ERRORS, TimedRoute
+from ai.routes.v1.common import COMMON_ERRORS, NOT_MODIFIED, PAYLOAD_CACHE, TimedRoute, call_llm
 
 router = APIRouter(route_class=TimedRoute)
 
@@ -42,16 +43,19 @@ WLCL_VALUES_STATE = {
     ),
     responses={
         **COMMON_ERRORS,
+        **NOT_MODIFIED,
         status.HTTP_200_OK: {
             "model": WLPayloadResponse,
             "description": "Workload Cluster payload schema returned",
         },
     },
 )
-async def wlcluster_payload(req: WLPayloadRequest) -> WLPayloadResponse:
+async def wlcluster_payload(req: WLPayloadRequest, request: Request) -> WLPayloadResponse:
     try:
-        properties_obj = default_wl_properties(WLCL_VALUES_STATE)
-        return WLPayloadResponse(properties=properties_obj)
+        # The payload only changes when the collected values do
+        return PAYLOAD_CACHE.response(
+            request, 'workload-cluster', tuple(WLCL_VALUES_STATE.items()),
+            lambda: WLPayloadResponse(properties=default_wl_properties(WLCL_VALUES_STATE)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -85,14 +89,16 @@ async def wlcluster_chat(req: WLChatRequest) -> str:
             """
         )
 
-        response_text = bedrock_invoke(
+        response_text = await call_llm(
+            bedrock_invoke,
             system_prompt=system_prompt,
             user_msg=req.question,
             max_tokens=512,
+            route='wizard',
         )
 
         data_json = json.loads(response_text)
-        print(f"Data JSON: {data_json}")
+        LOG.debug("Data JSON: %s", data_json)
         for key in data_json:
             WLCL_VALUES_STATE[key] = data_json[key]
 
@@ -0,0 +1,67 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Import-time profile of the server.
+
+The API server must start quickly and should not carry the Streamlit UI's dependencies, so the
+import graph of ai.app is kept lean: modules that are slow to import (boto3, numpy, requests,
+httpx) are imported where they are first used.  profile_imports() measures a fresh interpreter
+importing the server with ``python -X importtime``; it backs the --profile-startup option and the
+import-time budget test.
+"""
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List
+
+SERVER_MODULE = 'ai.app'
+# Modules the server must not import at start-up
+FORBIDDEN_MODULES = ('streamlit', 'pandas', 'boto3', 'botocore')
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def profile_imports(module: str = SERVER_MODULE) -> List[ImportTiming]:
+    """Import the given module in a fresh interpreter and return the time taken per module."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings.append(ImportTiming(name.strip(), int(self_us), int(cumulative_us),
+                                    (len(name) - len(name.lstrip())) // 2))
+    return timings
+
+
+def total_seconds(timings: List[ImportTiming], module: str = SERVER_MODULE) -> float:
+    """Return the cumulative import time of the given module, in seconds."""
+    return next(t.cumulative_us for t in timings if t.module == module) / 1e6
+
+
+def format_report(timings: List[ImportTiming], module: str = SERVER_MODULE,
+                  limit: int = 30) -> str:
+    """Return a report of the slowest imports, by cumulative and by self time."""
+    packages = {}
+    for t in timings:
+        # Time spent in each top-level package's own modules
+        root = t.module.split('.')[0]
+        packages[root] = packages.get(root, 0) + t.self_us
+    lines = [f"import {module}: {total_seconds(timings, module) * 1000:.1f} ms "
+             f"({len(timings)} modules)", '',
+             f"{'cumulative ms':>14}  {'self ms':>8}  module"]
+    for t in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:limit]:
+        lines.append(f"{t.cumulative_us / 1000:14.1f}  {t.self_us / 1000:8.1f}  "
+                     f"{'  ' * t.depth}{t.module}")
+    lines += ['', f"{'self ms':>14}  package"]
+    for root, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]:
+        lines.append(f"{us / 1000:14.1f}  {root}")
+    forbidden = sorted({t.module.split('.')[0] for t in timings} & set(FORBIDDEN_MODULES))
+    lines += ['', f"UI/heavy modules imported: {', '.join(forbidden) or 'none'}"]
+    return '\n'.join(lines)
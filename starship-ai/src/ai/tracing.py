@@ -0,0 +1,211 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+In-process request tracing.
+
+TracingMiddleware starts a trace for every HTTP request, and span() marks a stage of the work
+(session lookup, intent classification, an upstream call, YAML rendering, ...).  Spans nest
+through a context variable, so they follow the request into awaited coroutines and into worker
+threads started with asyncio.to_thread or run_in_threadpool.  Outside a request span() does
+nothing.
+
+Each response gets a Server-Timing header with the total time spent per stage.  The full span
+tree of a request that takes longer than trace_slow_request_ms is logged and kept in memory for
+GET /debug/traces; while that endpoint is enabled, every request's is kept.  Requests to the
+probe paths (health checks, metrics scrapes) are never kept.
+"""
+import json
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import FrameType
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from asgi_correlation_id import correlation_id
+
+from ai import LOG
+from ai.config import get_config
+
+
+class Span(object):
+    __slots__ = ('name', 'attributes', 'start', 'end', 'children')
+
+    def __init__(self, name: str, attributes: Optional[dict] = None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List['Span'] = []
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end if self.end is not None else time.perf_counter()) - self.start) * 1000
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self, origin: Optional[float] = None) -> dict:
+        origin = self.start if origin is None else origin
+        result = {'name': self.name,
+                  'start_ms': round((self.start - origin) * 1000, 3),
+                  'duration_ms': round(self.duration_ms, 3)}
+        if self.attributes:
+            result['attributes'] = self.attributes
+        if self.children:
+            result['children'] = [child.to_dict(origin) for child in self.children]
+        return result
+
+    def walk(self) -> Iterator['Span']:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+_CURRENT_SPAN: ContextVar[Optional[Span]] = ContextVar('nwac_current_span', default=None)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time the block as a child of the current span.
+
+    :param name: stage name; used as the Server-Timing metric name, so keep it to letters,
+                 digits, '.', '_' and '-'
+    :param attributes: details to record with the span (keep them small)
+    :return: the span, so the block can add attributes, or None outside a request
+    """
+    parent = _CURRENT_SPAN.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attributes)
+    parent.children.append(child)
+    token = _CURRENT_SPAN.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.attributes['error'] = type(e).__name__
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _CURRENT_SPAN.reset(token)
+
+
+def current_span() -> Optional[Span]:
+    return _CURRENT_SPAN.get()
+
+
+def server_timing(root: Span) -> str:
+    """Return a Server-Timing header value: the total time per stage, then the request's."""
+    totals: Dict[str, float] = {}
+    for item in root.walk():
+        if item is not root:
+            totals[item.name] = totals.get(item.name, 0.0) + item.duration_ms
+    entries = [f"{name};dur={ms:.1f}" for name, ms in totals.items()]
+    entries.append(f"total;dur={root.duration_ms:.1f}")
+    return ', '.join(entries)
+
+
+class TraceBuffer(object):
+    """The most recent traces, for the debug endpoint."""
+
+    def __init__(self, size: int = 100):
+        self._traces: deque = deque(maxlen=size)
+
+    def resize(self, size: int) -> None:
+        if size != self._traces.maxlen:
+            self._traces = deque(self._traces, maxlen=size)
+
+    def add(self, trace: dict) -> None:
+        self._traces.append(trace)
+
+    def recent(self, limit: Optional[int] = None, min_ms: float = 0.0) -> List[dict]:
+        """Return recent traces, newest first."""
+        traces = [t for t in reversed(self._traces) if t['duration_ms'] >= min_ms]
+        return traces[:limit] if limit is not None else traces
+
+
+# Global buffer of recent traces
+TRACES = TraceBuffer()
+
+
+# The requests being handled: id of TracingMiddleware.__call__'s frame -> (root span, correlation
+# ID).  Read by the profiler from another thread to attribute samples to requests; single dict
+# operations are atomic, so it needs no lock.
+_ACTIVE_REQUESTS: Dict[int, Tuple[Span, Optional[str]]] = {}
+
+
+def active_request(frame: FrameType) -> Optional[Tuple[Span, Optional[str]]]:
+    """Return the root span and correlation ID of the request handled in the given frame."""
+    return _ACTIVE_REQUESTS.get(id(frame))
+
+
+class TracingMiddleware(object):
+    """Trace every HTTP request; add Server-Timing and log slow requests."""
+
+    def __init__(self, app, slow_request_ms: float = 2000.0, buffer_size: Optional[int] = None,
+                 traces: TraceBuffer = TRACES, keep_all: Optional[bool] = None,
+                 probe_paths: Iterable[str] = ()):
+        """
+        Create the middleware.
+
+        :param slow_request_ms: requests that take longer are logged and always kept
+        :param buffer_size: number of traces to keep
+        :param traces: where to keep them
+        :param keep_all: keep every request's trace; None to do so only while the debug
+                         endpoint is enabled in the current configuration
+        :param probe_paths: paths whose traces are never kept
+        """
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self.traces = traces
+        self.keep_all = keep_all
+        self.probe_paths = frozenset(probe_paths)
+        if buffer_size is not None:
+            self.traces.resize(buffer_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        root = Span('request', {'method': scope['method'], 'path': scope['path']})
+        request_id = correlation_id.get()
+        token = _CURRENT_SPAN.set(root)
+        frame_id = id(sys._getframe())
+        _ACTIVE_REQUESTS[frame_id] = (root, request_id)
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                root.attributes['status'] = message['status']
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', server_timing(root).encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            root.end = time.perf_counter()
+            _CURRENT_SPAN.reset(token)
+            del _ACTIVE_REQUESTS[frame_id]
+            self._finish(root, request_id)
+
+    def _keep_all(self) -> bool:
+        if self.keep_all is not None:
+            return self.keep_all
+        config = get_config()
+        return bool(config.trace_debug_endpoint or config.dev)
+
+    def _finish(self, root: Span, request_id: Optional[str]) -> None:
+        slow = root.duration_ms >= self.slow_request_ms
+        probe = root.attributes['path'] in self.probe_paths
+        if not slow and (probe or not self._keep_all()):
+            return
+        trace = root.to_dict()
+        trace['correlation_id'] = request_id
+        trace['time'] = time.time()
+        if not probe:
+            self.traces.add(trace)
+        if slow:
+            LOG.warning("slow request: %s %s took %.0f ms: %s", root.attributes['method'],
+                        root.attributes['path'], root.duration_ms, json.dumps(trace))
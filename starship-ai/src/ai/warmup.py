@@ -0,0 +1,161 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+"""
+Warm-up and readiness.
+
+Rather than have the first requests after a rollout or scale-out pay for compiling blueprints,
+loading the intent model, creating the AWS client and opening connections, the server does that
+work in a warm-up phase when it starts and only reports ready (GET /ready) once it is done.
+/health keeps answering as soon as the process is up, so it stays the liveness probe.
+
+Components that are internal to the service must warm up for it to be ready.  Upstream services
+(Bedrock, CuDo) are warmed up too, but a failure there only marks the service as degraded: they
+are shared by every replica, and taking all of them out of rotation because an upstream is down
+would turn a partial outage into a total one.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from ai import LOG
+from ai.config import NWaCConfig
+
+PENDING = 'pending'
+OK = 'ok'
+FAILED = 'failed'
+
+WARMING_UP = 'warming_up'
+READY = 'ready'
+DEGRADED = 'degraded'
+NOT_READY = 'not_ready'
+
+
+@dataclass
+class ComponentStatus:
+    required: bool
+    status: str = PENDING
+    duration_ms: Optional[float] = None
+    detail: Optional[str] = None
+
+
+def warm_blueprints(config: NWaCConfig) -> str:
+    from ai.agents.ciq_agent.blueprint_registry import DEFAULT_BLUEPRINT, blueprint_registry
+
+    compiled = blueprint_registry.get(DEFAULT_BLUEPRINT)
+    return f"{DEFAULT_BLUEPRINT[0]} {DEFAULT_BLUEPRINT[1]}: {len(compiled.params)} parameters"
+
+
+def warm_intent_classifier(config: NWaCConfig) -> str:
+    from ai.agents.ciq_agent.intent_classifier import intent_classifier
+
+    intent_classifier.model.predict('warm up')
+    return f"model loaded from {intent_classifier.model_path.name}"
+
+
+def warm_bedrock(config: NWaCConfig) -> str:
+    import boto3
+
+    from ai.agents.bedrock_client import get_bedrock_client
+    from ai.agents.llm_gateway import LLM_GATEWAY
+    from ai.agents.llm_router import DEFAULT_ROUTE
+
+    get_bedrock_client()
+    credentials = boto3.DEFAULT_SESSION.get_credentials()
+    if credentials is None:
+        raise RuntimeError("no AWS credentials found")
+    # Resolves (and, for temporary credentials, refreshes) them now rather than on first use
+    credentials.get_frozen_credentials()
+    if config.warmup_probe:
+        # Through the gateway rather than bedrock_invoke(), which answers failures with a message
+        LLM_GATEWAY.complete(DEFAULT_ROUTE, "Reply with OK.", "ping", max_tokens=1, attempts=1,
+                             cache=False)
+    return f"credentials from {credentials.method}"
+
+
+def warm_cudo(config: NWaCConfig) -> str:
+    from ai.agents.llm_router import LLM_ROUTER
+
+    # Opens the connections the LLM gateway's pool will reuse
+    backends = [backend for backend in LLM_ROUTER.backends.values() if backend.kind == 'cudo']
+    if not backends:
+        return "no CuDo backends"
+    return ', '.join(f"{backend.name} {backend.connect()}" for backend in backends)
+
+
+@dataclass
+class Component:
+    name: str
+    warm_up: Callable[[NWaCConfig], str]
+    required: bool = True
+
+
+COMPONENTS = [
+    Component('blueprints', warm_blueprints),
+    Component('intent_classifier', warm_intent_classifier),
+    Component('bedrock', warm_bedrock, required=False),
+    Component('cudo', warm_cudo, required=False),
+]
+
+
+class Readiness(object):
+    """Tracks the warm-up of each component and whether the service is ready."""
+
+    def __init__(self):
+        self.components: Dict[str, ComponentStatus] = {}
+        self.finished = False
+
+    @property
+    def state(self) -> str:
+        if not self.finished:
+            return WARMING_UP
+        if any(c.required and c.status != OK for c in self.components.values()):
+            return NOT_READY
+        if any(c.status != OK for c in self.components.values()):
+            return DEGRADED
+        return READY
+
+    @property
+    def ready(self) -> bool:
+        return self.state in (READY, DEGRADED)
+
+    def skip(self):
+        """Report ready without warming up (warm-up disabled)."""
+        self.components = {}
+        self.finished = True
+
+    async def warm_up(self, config: NWaCConfig, components: List[Component] = COMPONENTS):
+        """Warm up the given components concurrently, each in a worker thread."""
+        self.finished = False
+        self.components = {c.name: ComponentStatus(required=c.required) for c in components}
+        start = time.perf_counter()
+        await asyncio.gather(*(self._warm_up(c, config) for c in components))
+        self.finished = True
+        LOG.info("warm-up finished in %.0f ms: %s", (time.perf_counter() - start) * 1000,
+                 self.state)
+
+    async def _warm_up(self, component: Component, config: NWaCConfig):
+        status = self.components[component.name]
+        start = time.perf_counter()
+        try:
+            status.detail = await asyncio.wait_for(
+                asyncio.to_thread(component.warm_up, config), timeout=float(config.warmup_timeout))
+            status.status = OK
+        except Exception as e:
+            status.status = FAILED
+            status.detail = repr(e) if not isinstance(e, asyncio.TimeoutError) else \
+                f"timed out after {config.warmup_timeout}s"
+            log = LOG.error if component.required else LOG.warning
+            log("warm-up of %s failed: %s", component.name, status.detail)
+        status.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    def report(self) -> dict:
+        return {'status': self.state,
+                'components': {name: {'status': c.status,
+                                      'required': c.required,
+                                      'duration_ms': c.duration_ms,
+                                      'detail': c.detail}
+                               for name, c in self.components.items()}}
+
+
+# Global readiness of this process
+READINESS = Readiness()
@@ -0,0 +1,66 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import pytest
+
+from ai.agents.ciq_agent.blueprint_registry import (
+    DEFAULT_BLUEPRINT, BlueprintRegistry, UnknownBlueprintError)
+from ai.agents.ciq_agent.config import PARAM_DESCRIPTIONS
+
+
+@pytest.fixture
+def registry(tmp_path):
+    for version in ('24.7', '24.10'):
+        (tmp_path / f"golden_config_CMM_{version}_yaml.txt").write_text(
+            f"global:\n  release: {version}  # CIQ: Which release?\n")
+    (tmp_path / "golden_config_SMF_yaml.txt").write_text("a: 1  # CIQ: What is a?\n")
+    (tmp_path / "notes.txt").write_text("not a blueprint")
+    return BlueprintRegistry(tmp_path, cache_dir=tmp_path / 'cache')
+
+
+def test_discovery_and_resolution(registry):
+    assert ('CMM', '24.10') in registry.keys()
+    assert ('SMF', 'default') in registry.keys()
+    assert DEFAULT_BLUEPRINT in registry.keys()
+    assert registry.resolve() == DEFAULT_BLUEPRINT
+    assert registry.resolve('SMF') == ('SMF', 'default')
+    assert registry.resolve('CMM', '24.7') == ('CMM', '24.7')
+    with pytest.raises(UnknownBlueprintError):
+        registry.resolve('CMM', '1.0')
+    # Nothing is compiled until it is used
+    assert registry.stats()['loaded'] == []
+
+
+def test_questionnaires(registry):
+    assert registry.questionnaire(DEFAULT_BLUEPRINT) is PARAM_DESCRIPTIONS
+    assert registry.questionnaire(('CMM', '24.10')) == {'global.release': 'Which release?'}
+
+
+def test_lru_respects_memory_cap(registry):
+    registry.get(('CMM', '24.7'))
+    size = registry.stats()['memory_bytes']
+    registry.max_memory_bytes = size * 2 + 1
+    registry.get(('CMM', '24.10'))
+    registry.get(('CMM', '24.7'))
+    registry.get(('SMF', 'default'))
+    assert registry.stats()['loaded'] == ['CMM/24.7', 'SMF/default']
+    assert registry.stats()['memory_bytes'] <= registry.max_memory_bytes
+
+
+def test_refresh_reloads_edits_and_keeps_last_good_version(registry, tmp_path):
+    key = ('CMM', '24.10')
+    seen = []
+    registry.add_listener(lambda k, compiled: seen.append((k, compiled.ciq_schema)))
+    registry.get(key)
+
+    (tmp_path / "golden_config_CMM_24.10_yaml.txt").write_text(
+        "global:\n  release: 24.10.1  # CIQ: Which maintenance release?\n")
+    (tmp_path / "golden_config_CMM_25.1_yaml.txt").write_text("a: 1\n")
+    changes = registry.refresh()
+    assert changes['added'] == [('CMM', '25.1')]
+    assert changes['reloaded'] == [key]
+    assert seen == [(key, {'global.release': 'Which maintenance release?'})]
+
+    # A broken edit is reported and the previous version is still served
+    (tmp_path / "golden_config_CMM_24.10_yaml.txt").write_text("global: [unterminated\n")
+    assert registry.refresh()['failed'] == [key]
+    assert registry.get(key).ciq_schema == {'global.release': 'Which maintenance release?'}
+    assert len(seen) == 1
@@ -0,0 +1,49 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import json
+import os
+import pickle
+
+from ai.agents.ciq_agent import compiled_blueprint
+from ai.agents.ciq_agent.compiled_blueprint import artifact_path, load_compiled_blueprint
+
+
+def test_artifact_is_reused_until_content_changes(tmp_path, mocker):
+    blueprint = tmp_path / 'golden.yaml'
+    blueprint.write_text("a:\n  b: 1  # CIQ: What is b?\n")
+    cache_dir = tmp_path / 'cache'
+    compile_spy = mocker.spy(compiled_blueprint, 'compile_blueprint')
+
+    first = load_compiled_blueprint(blueprint, cache_dir)
+    assert first.ciq_schema == {'a.b': 'What is b?'}
+    assert artifact_path(blueprint, cache_dir).exists()
+
+    # A touched but unchanged file reuses the artifact
+    st = blueprint.stat()
+    os.utime(blueprint, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert load_compiled_blueprint(blueprint, cache_dir).params == ['a.b']
+    assert compile_spy.call_count == 1
+
+    # Changing the content invalidates it
+    blueprint.write_text("a:\n  c: 2  # CIQ: What is c?\n")
+    assert load_compiled_blueprint(blueprint, cache_dir).params == ['a.c']
+    assert compile_spy.call_count == 2
+
+
+def test_artifact_is_data_only(tmp_path):
+    blueprint = tmp_path / 'golden.yaml'
+    blueprint.write_text("a:\n  b: 1  # CIQ: What is b?\nwhen: 2025-01-01\n")
+    cache_dir = tmp_path / 'cache'
+    compiled = load_compiled_blueprint(blueprint, cache_dir)
+
+    # Stored as JSON; a tree JSON cannot hold (here a date) is parsed again when loaded
+    artifact = artifact_path(blueprint, cache_dir)
+    record = json.loads(artifact.read_bytes()[len(compiled_blueprint.ARTIFACT_MAGIC):])
+    assert record['tree'] is None
+    loaded = load_compiled_blueprint(blueprint, cache_dir)
+    assert loaded.tree == compiled.tree
+    assert loaded.template.nodes == compiled.template.nodes
+    assert loaded.template.render({'a.b': 2}) == compiled.template.render({'a.b': 2})
+
+    # Anything that is not a valid artifact is ignored and recompiled
+    artifact.write_bytes(compiled_blueprint.ARTIFACT_MAGIC + pickle.dumps(compiled))
+    assert load_compiled_blueprint(blueprint, cache_dir).params == ['a.b']
@@ -0,0 +1,32 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import importlib
+import logging
+
+from ai.agents.ciq_agent import cudo_client
+from ai.startup import profile_imports
+
+
+def test_import_is_lean():
+    # requests is only imported once the client is used
+    imported = {t.module for t in profile_imports('ai.agents.ciq_agent.cudo_client')}
+    assert 'requests' not in imported
+
+
+def test_import_leaves_logging_alone(mocker):
+    basic_config = mocker.patch.object(logging, 'basicConfig')
+    importlib.reload(cudo_client)
+    basic_config.assert_not_called()
+
+
+def test_sessions_are_not_shared_between_threads(mocker):
+    client = cudo_client.CudoAPIClient(verify='/etc/ssl/ca.pem')
+    head = mocker.patch('requests.Session.head', return_value=mocker.Mock(status_code=405))
+    assert client.connect() == 405
+    assert head.call_args.kwargs['verify'] == '/etc/ssl/ca.pem'
+
+    # The session warmed up by connect() is reused; a concurrent user gets its own
+    with client.session() as first:
+        with client.session() as second:
+            assert second is not first
+    with client.session() as again:
+        assert again is first
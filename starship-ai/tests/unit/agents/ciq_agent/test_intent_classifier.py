@@ -0,0 +1,96 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import pytest
+
+from ai.agents.ciq_agent.intent_classifier import (
+    INTENTS, IntentClassifier, IntentModel, intent_classifier, match_rules, train)
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return IntentClassifier(IntentModel.load())
+
+
+@pytest.mark.parametrize('text, intent', [
+    ('nextgen', 'param_answer'),
+    ('passw0rd!', 'param_answer'),
+    ('10.20.0.0/16', 'param_answer'),
+    ('skip', 'skip_done'),
+    ('Skip this one for now.', 'skip_done'),
+    ('what is an MCC?', 'tech_query'),
+    ('hello', 'general_silly'),
+    ('tell me a joke', 'general_silly'),
+])
+def test_classify(classifier, text, intent):
+    prediction = classifier.classify(text)
+    assert prediction.label == intent
+    assert 0 < prediction.confidence <= 1
+
+
+@pytest.mark.parametrize('text, intent', [
+    ('what is this?', 'tech_query'),
+    ("what's this?", 'tech_query'),
+    ('tell me more', 'tech_query'),
+    ('what do you mean', 'tech_query'),
+    ('is this required?', 'tech_query'),
+    ('/var/log', 'param_answer'),
+    ('192.168.10.1', 'param_answer'),
+    ('cmm-prod-01', 'param_answer'),
+    ('what is your name?', 'general_silly'),
+])
+def test_classify_while_a_parameter_is_asked_for(text, intent):
+    prediction = intent_classifier.classify(text, current_param='log_path')
+    assert prediction.label == intent
+    # The model agrees with the rules
+    assert intent_classifier.model.predict(text)[0] == intent
+
+
+def test_rules_match_whole_messages_only():
+    assert match_rules('next') == 'skip_done'
+    assert match_rules('nextgen') is None
+    assert match_rules('pass') == 'skip_done'
+    assert match_rules('password123') is None
+    # Value shapes are answers only when a parameter is asked for
+    assert match_rules('/var/log') is None
+    assert match_rules('/var/log', 'log_path') == 'param_answer'
+    assert match_rules('what is the meaning of life', 'log_path') is None
+
+
+def test_fallback_only_below_threshold(classifier):
+    calls = []
+
+    def fallback(text, param):
+        calls.append((text, param))
+        return 'tech_query'
+
+    confident = IntentClassifier(classifier.model, threshold=0.0)
+    assert confident.classify('ACME Mobile', fallback=fallback).source == 'model'
+    assert calls == []
+
+    unsure = IntentClassifier(classifier.model, threshold=1.01)
+    prediction = unsure.classify('ACME Mobile', 'global.name', fallback=fallback)
+    assert (prediction.label, prediction.source) == ('tech_query', 'llm')
+    assert calls == [('ACME Mobile', 'global.name')]
+    # Rules never need the fallback
+    assert unsure.classify('skip', fallback=fallback).source == 'rule'
+    assert unsure.stats()['fallback_rate'] == 0.5
+    assert unsure.classify('done', fallback=fallback).label == 'skip_done'
+
+
+def test_fallback_errors_keep_the_model_answer(classifier):
+    unsure = IntentClassifier(classifier.model, threshold=1.01)
+    assert unsure.classify('ACME Mobile', fallback=lambda *_: 'no idea').source == 'model'
+
+    def broken(*_):
+        raise RuntimeError('bedrock down')
+
+    assert unsure.classify('ACME Mobile', fallback=broken).label == 'param_answer'
+    assert unsure.stats()['llm_error'] == 2
+
+
+def test_train_and_round_trip(tmp_path):
+    model, report = train()
+    assert report['holdout_accuracy'] > 0.7
+    model.save(tmp_path / 'model.npz')
+    loaded = IntentModel.load(tmp_path / 'model.npz')
+    assert loaded.labels == INTENTS
+    assert loaded.predict('10.0.0.1') == model.predict('10.0.0.1')
@@ -0,0 +1,109 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import threading
+
+from ai.agents.ciq_agent import ciq_core
+from ai.agents.ciq_agent.ciq_core import CIQAgent
+from ai.agents.ciq_agent.prefetch import Prefetcher, is_explanation_request
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_explanation_requests():
+    param = 'global.provisioning.mcc'
+    for text in ("What's this?", 'help', 'what is the MCC', 'explain mcc', 'What does this mean?',
+                 'what is provisioning mcc?'):
+        assert is_explanation_request(text, param), text
+    for text in ('what is the mnc', 'how do i know my mcc', 'what values are allowed?', '244'):
+        assert not is_explanation_request(text, param), text
+
+
+def test_prefetched_answer_is_taken_once():
+    prefetcher = Prefetcher()
+    assert prefetcher.start('s1', 'mcc', lambda: 'MCC is the country code')
+    assert prefetcher.take('s1', 'mcc') == 'MCC is the country code'
+    assert prefetcher.take('s1', 'mcc') is None
+    assert (prefetcher.hits, prefetcher.misses) == (1, 1)
+    assert prefetcher.hit_ratio == 0.5
+
+    # A failed fetch is a miss
+    prefetcher.start('s1', 'mnc', lambda: None)
+    assert prefetcher.take('s1', 'mnc') is None
+    prefetcher.start('s1', 'mnc', lambda: 1 / 0)
+    assert prefetcher.take('s1', 'mnc') is None
+    assert prefetcher.misses == 3
+
+
+def test_running_prefetch_is_waited_for_or_dropped():
+    prefetcher = Prefetcher()
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return 'answer'
+
+    prefetcher.start('s1', 'mcc', slow)
+    threading.Timer(0.05, release.set).start()
+    assert prefetcher.take('s1', 'mcc') == 'answer'
+
+    # The session moved on: the answer for the parameter before is dropped
+    release.clear()
+    prefetcher.start('s1', 'mcc', slow)
+    prefetcher.start('s1', 'mnc', lambda: 'mnc answer')
+    release.set()
+    assert prefetcher.take('s1', 'mcc') is None
+    assert prefetcher.pending() == 0
+
+
+def test_concurrency_budget_and_expiry():
+    clock = Clock()
+    prefetcher = Prefetcher(concurrency=2, rate=1.0, ttl=60.0, clock=clock)
+    release = threading.Event()
+    assert prefetcher.start('s1', 'a', lambda: release.wait(5) and 'a')
+    assert prefetcher.start('s2', 'a', lambda: release.wait(5) and 'a')
+    # Both slots taken
+    assert not prefetcher.start('s3', 'a', lambda: 'a')
+    release.set()
+    assert prefetcher.take('s1', 'a') == 'a'
+    assert prefetcher.take('s2', 'a') == 'a'
+    # Slots free, but the budget (a burst of 2, then 1 a second) is used up
+    assert not prefetcher.start('s3', 'a', lambda: 'a')
+    clock.now += 1
+    assert prefetcher.start('s3', 'a', lambda: 'a')
+    # Not taken in time
+    clock.now += 61
+    assert prefetcher.take('s3', 'a') is None
+
+    prefetcher.configure(0, 1.0)
+    clock.now += 10
+    assert not prefetcher.start('s4', 'a', lambda: 'a')
+
+
+def test_agent_answers_from_the_prefetch(monkeypatch):
+    fetched, asked = [], []
+    monkeypatch.setattr(ciq_core, 'fetch_answer', lambda query: fetched.append(query) or 'ahead')
+    monkeypatch.setattr('ai.agents.ciq_agent.cudo_client.query_cudo_api',
+                        lambda query: asked.append(query) or 'asked')
+    agent = CIQAgent()
+    agent.prefetcher = Prefetcher()
+
+    session_id = agent.process_chat_message('eth0')['session_id']
+    session = agent.session_manager.get_session(session_id)
+    assert len(fetched) == 1 and session.current_param in fetched[0]
+    reply = agent.process_chat_message('what is this?', session_id)['response']
+    assert 'ahead' in reply and asked == []
+
+    # Asked again, or something specific: CuDo is asked
+    assert 'asked' in agent.process_chat_message('what is this?', session_id)['response']
+    assert 'asked' in agent.process_chat_message('what values are allowed?',
+                                                 session_id)['response']
+    assert len(asked) == 2
+    assert agent.prefetcher.hits == 1
+    # Not one more fetch: questions did not move the session on
+    assert len(fetched) == 1
+    agent.session_manager.delete_session(session_id)
@@ -0,0 +1,81 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import threading
+
+from ai.agents.ciq_agent.blueprint_registry import DEFAULT_BLUEPRINT
+from ai.agents.ciq_agent.config import PARAM_DESCRIPTIONS
+from ai.agents.ciq_agent.question_bank import QuestionBank
+
+
+class FakeLLM(object):
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, param, description, style):
+        self.calls.append((param, style))
+        return f"{style}: {param}? ({description})"
+
+
+def test_generated_once_and_persisted(tmp_path):
+    llm = FakeLLM()
+    bank = QuestionBank(tmp_path / 'questions.json', llm)
+    first = bank.get('global.name', 'Deployment name')
+    assert bank.get('global.name', 'Deployment name') == first
+    assert bank.get('global.name', 'Deployment name', style='concise') != first
+    assert len(llm.calls) == 2
+
+    # A new process reads them back (once written out) without asking the LLM
+    assert not (tmp_path / 'questions.json').exists()
+    bank.flush()
+    other = QuestionBank(tmp_path / 'questions.json', FakeLLM())
+    assert other.get('global.name', 'Deployment name') == first
+    assert other.generate.calls == []
+
+    # A changed description makes the question stale
+    other.get('global.name', 'Name of the deployment')
+    assert other.generate.calls == [('global.name', 'friendly')]
+    other.flush()
+
+
+def test_llm_failure_falls_back_to_a_template(tmp_path):
+    def broken(*_):
+        raise RuntimeError('bedrock down')
+
+    bank = QuestionBank(tmp_path / 'questions.json', broken)
+    assert 'name' in bank.get('global.name', 'Deployment name')
+    assert not (tmp_path / 'questions.json').exists()
+
+
+def test_build_and_refresh(tmp_path):
+    llm = FakeLLM()
+    bank = QuestionBank(tmp_path / 'questions.json', llm)
+    report = bank.build(DEFAULT_BLUEPRINT)
+    assert report == {'generated': len(PARAM_DESCRIPTIONS), 'cached': 0, 'failed': 0}
+    assert bank.build(DEFAULT_BLUEPRINT)['cached'] == len(PARAM_DESCRIPTIONS)
+    assert bank.build(DEFAULT_BLUEPRINT, refresh=True)['generated'] == len(PARAM_DESCRIPTIONS)
+    assert len(llm.calls) == 2 * len(PARAM_DESCRIPTIONS)
+
+
+def test_build_and_get_generate_each_question_once(tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_llm(param, description, style):
+        calls.append(param)
+        started.set()
+        release.wait(5)
+        return f"{param}?"
+
+    bank = QuestionBank(tmp_path / 'questions.json', slow_llm)
+    builder = threading.Thread(target=bank.build,
+                               kwargs={'questionnaire': {'global.name': 'Deployment name'}})
+    builder.start()
+    started.wait(5)
+    # A user asking for the question meanwhile waits for the build instead of asking again
+    asker = threading.Thread(target=bank.get, args=('global.name', 'Deployment name'))
+    asker.start()
+    release.set()
+    builder.join()
+    asker.join()
+    assert calls == ['global.name']
+    assert (tmp_path / 'questions.json').exists()
@@ -0,0 +1,65 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import threading
+
+import pytest
+
+from ai.agents.ciq_agent.render_jobs import CallbackNotAllowed, RenderJobs
+from ai.agents.ciq_agent.session_manager import CIQSession
+
+
+def test_render_in_the_background_joining_the_one_in_progress():
+    jobs = RenderJobs(workers=1)
+    session = CIQSession(session_id='s1')
+    release = threading.Event()
+    renders = []
+
+    def render():
+        release.wait(5)
+        renders.append(1)
+        session.set_final_yaml('a: 1\n')
+        return session
+
+    job = jobs.submit('s1', render)
+    assert job.status in ('queued', 'running')
+    assert jobs.submit('s1', render) is job
+    assert jobs.in_progress('s1') is job
+    release.set()
+    assert job.future.result(5) is job
+    assert job.status == 'done' and renders == [1]
+    assert (job.yaml_hash, job.yaml_version) == (session.yaml_hash, 1)
+    assert jobs.get(job.id) is job and jobs.in_progress('s1') is None
+
+    # Once done, a new render is a new job
+    again = jobs.submit('s1', render)
+    assert again is not job
+    again.future.result(5)
+    assert jobs.stats()['done'] == 2
+
+
+def test_failed_render():
+    jobs = RenderJobs()
+    job = jobs.submit('s1', lambda: 1 / 0)
+    job.future.result(5)
+    assert job.status == 'failed'
+    assert job.error.startswith('ZeroDivisionError')
+    assert job.as_dict()['finished'] >= job.as_dict()['started']
+
+
+def test_callbacks_must_be_allowed():
+    jobs = RenderJobs(callback_urls=['https://portal.example.com/hooks/*'])
+    jobs.check_callback('https://portal.example.com/hooks/ciq')
+    with pytest.raises(CallbackNotAllowed):
+        jobs.submit('s1', lambda: None, callback_url='http://169.254.169.254/latest')
+    jobs.configure(2)
+    with pytest.raises(CallbackNotAllowed):
+        jobs.check_callback('https://portal.example.com/hooks/ciq')
+
+
+def test_finished_jobs_are_pruned():
+    jobs = RenderJobs(keep=2)
+    session = CIQSession(session_id='s1')
+    done = [jobs.submit(f's{i}', lambda: session) for i in range(4)]
+    for job in done:
+        job.future.result(5)
+    jobs.submit('s9', lambda: session).future.result(5)
+    assert [job for job in done if jobs.get(job.id)] == done[2:]
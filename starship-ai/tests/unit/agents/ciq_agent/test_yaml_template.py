@@ -0,0 +1,88 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import pytest
+import yaml
+
+from ai.agents.ciq_agent.compiled_blueprint import load_compiled_blueprint
+from ai.agents.ciq_agent.config import BLUEPRINT_PATH, PARAM_DESCRIPTIONS
+from ai.agents.ciq_agent.yaml_template import BlueprintTemplate, TemplateError
+
+BLUEPRINT = ("top:\r\n"
+             "  name: old  # CIQ: What is the name?\r\n"
+             "  empty:\r\n"
+             "  quoted: \"a # b\"\r\n"
+             "  items:\r\n"
+             "  - one\r\n"
+             "  nested:\r\n"
+             "    leaf: 1\r\n"
+             "# trailing comment\r\n"
+             "other: true\r\n")
+
+
+def _deep_merge(base, update):
+    for key, value in update.items():
+        if isinstance(base.get(key), dict) and isinstance(value, dict):
+            _deep_merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def _nested(flat):
+    result = {}
+    for key, value in flat.items():
+        parts = key.split('.')
+        current = result
+        for part in parts[:-1]:
+            current = current.setdefault(part, {})
+        current[parts[-1]] = value
+    return result
+
+
+def test_render_without_values_is_identity():
+    template = BlueprintTemplate.compile(BLUEPRINT)
+    assert template.render({}) == BLUEPRINT
+    assert template.ciq_params() == {'top.name': 'What is the name?'}
+
+
+def test_render_preserves_comments_and_line_endings():
+    template = BlueprintTemplate.compile(BLUEPRINT)
+    out = template.render({'top.name': 'new', 'top.empty': '310', 'top.quoted': 'x',
+                           'top.nested.added': 'y', 'top.extra.deep': 'z'})
+    assert "  name: new  # CIQ: What is the name?\r\n" in out
+    assert "  empty: '310'\r\n" in out
+    assert "  quoted: x\r\n" in out
+    assert "    leaf: 1\r\n    added: y\r\n  extra:\r\n    deep: z\r\n# trailing" in out
+    assert yaml.safe_load(out)['top']['extra'] == {'deep': 'z'}
+
+
+def test_render_rejects_descending_into_sequences_and_scalars():
+    template = BlueprintTemplate.compile(BLUEPRINT)
+    with pytest.raises(TemplateError):
+        template.render({'top.items.first': 'x'})
+    with pytest.raises(TemplateError):
+        template.render({'top.name.sub': 'x'})
+
+
+@pytest.mark.parametrize('text, key', [
+    ("a: this is\n  continued\nb: 1\n", 'a'),
+    ("a:\n  on the next line\nb: 1\n", 'a'),
+    ("a: \"quoted over\n  two lines\"\nb: 1\n", 'a'),
+    ("a: {x: 1,\n  y: 2}\nb: 1\n", 'a.y'),
+    ("a: &anc val\nb: *anc\n", 'a'),
+    ("a: &anc val\nb: *anc\n", 'b'),
+    ("base: &base\n  x: 1\nc:\n  <<: *base\n  y: 2\n", 'base.x'),
+    ("base: &base\n  x: 1\nc:\n  <<: *base\n  y: 2\n", 'c.x'),
+    ("base: &base\n  x: 1\nc:\n  <<: *base\n  y: 2\n", 'c.y'),
+])
+def test_render_rejects_values_it_cannot_patch_in_place(text, key):
+    template = BlueprintTemplate.compile(text)
+    assert template.render({}) == text
+    with pytest.raises(TemplateError):
+        template.render({key: 'new'})
+
+
+def test_golden_blueprint_matches_full_merge():
+    template = load_compiled_blueprint(BLUEPRINT_PATH).template
+    values = {key: f"value for {key}: #{i}" for i, key in enumerate(PARAM_DESCRIPTIONS)}
+    expected = _deep_merge(yaml.safe_load(template.text), _nested(values))
+    assert yaml.safe_load(template.render(values)) == expected
@@ -0,0 +1,127 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import threading
+
+import pytest
+import requests
+
+from ai.agents.llm_gateway import (
+    ConcurrencyLimiter, LLMGateway, LLMUnavailable, ResponseCache, RetryBudget)
+from ai.agents.llm_providers import Backend, LocalBackend
+from ai.agents.llm_router import LLMRouter
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Flaky(Backend):
+    """Fails the first calls, then answers."""
+
+    kind = 'flaky'
+
+    def __init__(self, name, failures, error=ConnectionError):
+        super().__init__(name)
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def complete(self, system_prompt, user_msg, max_tokens):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error()
+        return f"answer {self.calls}"
+
+
+def test_retries_come_out_of_the_budget():
+    clock = Clock()
+    budget = RetryBudget(ratio=0.5, min_per_second=0, most=2, clock=clock)
+    flaky = Flaky('flaky', failures=100)
+    gateway = LLMGateway(LLMRouter([flaky]), attempts=3, backoff=0, retries=budget)
+    with pytest.raises(LLMUnavailable):
+        gateway.complete('default', '', 'hi', cache=False)
+    assert flaky.calls == 3
+    # The budget is spent: no more retries until calls are made
+    with pytest.raises(LLMUnavailable):
+        gateway.complete('default', '', 'hi', cache=False)
+    assert flaky.calls == 4
+    flaky.failures = 5
+    assert gateway.complete('default', '', 'hi', cache=False) == 'answer 6'
+
+
+def test_bad_requests_are_not_retried():
+    response = requests.Response()
+    response.status_code = 400
+    flaky = Flaky('flaky', failures=1, error=lambda: requests.HTTPError(response=response))
+    router = LLMRouter([flaky])
+    with pytest.raises(LLMUnavailable, match='tried flaky'):
+        LLMGateway(router, backoff=0).complete('default', '', 'hi')
+    assert flaky.calls == 1
+    # Nor do they count against the backend
+    assert router.stats()['flaky']['error_rate'] == 0
+
+
+def test_answers_are_cached():
+    clock = Clock()
+    flaky = Flaky('flaky', failures=0)
+    gateway = LLMGateway(LLMRouter([flaky]), cache=ResponseCache(size=2, ttl=60, clock=clock))
+    assert gateway.complete('default', '', 'hi') == 'answer 1'
+    assert gateway.complete('default', '', 'hi') == 'answer 1'
+    assert gateway.complete('other', '', 'hi') == 'answer 2'
+    assert gateway.complete('default', '', 'hi', max_tokens=5) == 'answer 3'
+    assert gateway.complete('default', '', 'hi', cache=False) == 'answer 4'
+    clock.now += 61
+    assert gateway.complete('other', '', 'hi') == 'answer 5'
+
+
+def test_busy_backends_are_passed_over():
+    slow = LocalBackend('slow', latency=0.3, reply='slow', max_concurrency=1)
+    spare = LocalBackend('spare', reply='spare')
+    router = LLMRouter([slow, spare], {'first': ['slow'], 'second': ['slow', 'spare']})
+    # slow is the better backend, but can only take one call at a time
+    router._stats['slow'].latency = 0.001
+    router._stats['spare'].latency = 10.0
+    gateway = LLMGateway(router, limiter=ConcurrencyLimiter(timeout=0.05))
+    answers = []
+    thread = threading.Thread(
+        target=lambda: answers.append(gateway.complete('first', '', 'hi', cache=False)))
+    thread.start()
+    while not gateway.limiter.in_progress():
+        pass
+    assert gateway.complete('second', '', 'hi', cache=False) == 'spare'
+    thread.join()
+    assert answers == ['slow']
+    assert gateway.limiter.in_progress() == {}
+
+
+def test_stream():
+    broken = LocalBackend('broken', error_rate=1.0)
+    good = LocalBackend('good', reply='a longer answer, in pieces')
+    router = LLMRouter([broken, good])
+    router._stats['broken'].latency = 0.001
+    router._stats['good'].latency = 1.0
+    gateway = LLMGateway(router, backoff=0)
+    # Retried on another backend, as nothing came back
+    pieces = list(gateway.stream('default', '', 'hi'))
+    assert len(pieces) > 1 and ''.join(pieces) == 'a longer answer, in pieces'
+    assert list(gateway.stream('default', '', 'hi')) == ['a longer answer, in pieces']
+    assert router.stats()['good']['outstanding'] == 0
+
+    # Leaving a stream early releases the backend, without counting as a failure
+    stream = gateway.stream('default', '', 'again')
+    next(stream)
+    stream.close()
+    assert router.stats()['good'] == dict(router.stats()['good'], outstanding=0, error_rate=0)
+    assert gateway.limiter.in_progress() == {}
+
+
+def test_calls_to_a_given_backend():
+    router = LLMRouter([LocalBackend('routed', reply='routed')])
+    gateway = LLMGateway(router)
+    given = LocalBackend('given', reply='given')
+    assert gateway.complete('default', '', 'hi', backend=given) == 'given'
+    assert gateway.complete('default', '', 'hi') == 'routed'
+    assert 'given' not in router.stats()
@@ -0,0 +1,91 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import pytest
+import requests
+
+from ai.agents.llm_providers import (
+    ChatCompletionsBackend, HttpPool, completion_text, create_backend, is_client_error)
+from ai.perf import cassettes
+from ai.perf.cassettes import Cassette
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    cassette = Cassette(str(tmp_path / 'llm.jsonl'), 'record')
+    yield cassette
+    cassettes.use(None)
+
+
+def _replay(cassette, backend, payload, content):
+    key = cassettes.request_key(backend.kind, 'POST', backend.url, payload)
+    cassette.record(backend.kind, key, 'POST', backend.url, 200, {}, content, 0.1)
+    cassettes.use(Cassette(cassette.path, 'replay', latency_scale=0))
+
+
+def test_payloads():
+    backend = create_backend({'name': 'cudo', 'kind': 'cudo', 'url': 'http://cudo/chat/'})
+    payload = backend.payload('Be brief.', 'hi', 100)
+    # CuDo takes the system prompt with the search options
+    assert payload['messages'] == [{'role': 'user', 'content': 'hi'}]
+    assert payload['athena_options']['system_prompt'] == 'Be brief.'
+    assert payload['athena_options']['llm_server'] == 'tgi'
+    payload = ChatCompletionsBackend('tgi', 'http://tgi/').payload('Be brief.', 'hi', 1)
+    assert payload['messages'] == [{'role': 'system', 'content': 'Be brief.'},
+                                   {'role': 'user', 'content': 'hi'}]
+    assert 'athena_options' not in payload
+
+
+@pytest.mark.parametrize('data', [
+    {'choices': [{'message': {'content': 'text'}}]},
+    [{'choices': [{'message': {'content': 'text'}}]}],
+    {'choices': [{'text': 'text'}]},
+    {'message': {'content': 'text'}},
+    {'answer': 'text'},
+    {'data': {'response': 'text'}},
+])
+def test_completion_text(data):
+    assert completion_text(data) == 'text'
+
+
+def test_completion_without_text():
+    with pytest.raises(ValueError, match='no text'):
+        completion_text({'usage': {}})
+
+
+def test_client_errors():
+    def http_error(status):
+        response = requests.Response()
+        response.status_code = status
+        return requests.HTTPError(response=response)
+
+    assert is_client_error(http_error(400))
+    assert not is_client_error(http_error(429))
+    assert not is_client_error(http_error(503))
+    assert not is_client_error(ConnectionError())
+    throttled = Exception()
+    throttled.response = {'Error': {'Code': 'ThrottlingException'},
+                          'ResponseMetadata': {'HTTPStatusCode': 400}}
+    assert not is_client_error(throttled)
+
+
+def test_complete_and_stream(cassette):
+    backend = ChatCompletionsBackend('tgi', 'http://tgi/v1/chat/completions')
+    _replay(cassette, backend, backend.payload('', 'hi', 10),
+            b'{"choices": [{"message": {"content": "Hello there"}}]}')
+    assert backend.complete('', 'hi', 10) == 'Hello there'
+
+    cassette = Cassette(cassette.path, 'record')
+    _replay(cassette, backend, backend.payload('', 'hi', 10, stream=True),
+            b'data: {"choices": [{"delta": {"content": "Hello"}}]}\n\n'
+            b'data: {"choices": [{"delta": {"content": " there"}}]}\n\n'
+            b'data: [DONE]\n\n')
+    assert list(backend.stream('', 'hi', 10)) == ['Hello', ' there']
+
+
+def test_pool_shares_connections():
+    pool = HttpPool(maxsize=4)
+    with pool.session() as first, pool.session() as second:
+        assert first is not second
+        assert first.get_adapter('https://x') is second.get_adapter('https://x')
+    pool.configure(8)
+    with pool.session() as third:
+        assert third is not first and third.get_adapter('https://x')._pool_maxsize == 8
@@ -0,0 +1,103 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import pytest
+
+from ai.agents.llm_gateway import LLMGateway, LLMUnavailable, ResponseCache
+from ai.agents.llm_providers import LocalBackend, create_backend
+from ai.agents.llm_router import LLMRouter
+
+
+def gateway(router):
+    # Each call tried on two backends at most, without a cache
+    return LLMGateway(router, attempts=2, backoff=0, cache=ResponseCache(size=0))
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_calls_go_to_the_fastest_backend():
+    router = LLMRouter([LocalBackend('fast', latency=0.001), LocalBackend('slow', latency=0.02)])
+    llm = gateway(router)
+    for _ in range(20):
+        assert llm.complete('default', 'Return JSON.', 'hi') == '{}'
+    stats = router.stats()
+    # Once tried, the slow one is left alone
+    assert stats['slow']['requests'] <= 1
+    assert stats['fast']['requests'] >= 19
+    assert stats['fast']['outstanding'] == stats['slow']['outstanding'] == 0
+
+
+def test_routes_use_their_backends():
+    router = LLMRouter([LocalBackend('a', reply='a'), LocalBackend('b', reply='b')],
+                       routes={'default': ['a'], 'wizard': ['b']})
+    llm = gateway(router)
+    assert llm.complete('wizard', '', 'hi') == 'b'
+    assert llm.complete('ciq_intent', '', 'hi') == 'a'
+    with pytest.raises(ValueError, match='unknown backends c'):
+        router.configure(router.backends.values(), {'wizard': ['c']})
+
+
+def test_failing_backends_are_ejected_then_let_back_in():
+    clock = Clock()
+    broken = LocalBackend('broken', error_rate=1.0)
+    router = LLMRouter([broken, LocalBackend('spare', reply='spare')], clock=clock)
+    llm = gateway(router)
+    # broken looks much faster, so it is tried until ejected
+    router._stats['broken'].latency = 0.001
+    router._stats['spare'].latency = 10.0
+    for _ in range(3):
+        assert llm.complete('default', '', 'hi') == 'spare'
+    assert router.stats()['broken']['ejected']
+    assert llm.complete('default', '', 'hi') == 'spare'
+    assert router.stats()['broken']['requests'] == 3
+
+    # Back in after 10 seconds, but one failure ejects it again, for twice as long
+    clock.now += 10
+    assert llm.complete('default', '', 'hi') == 'spare'
+    assert router.stats()['broken']['requests'] == 4
+    assert router._stats['broken'].ejected_until == clock.now + 20
+
+    # Recovered: back in slowly, then on equal terms
+    broken.error_rate = 0.0
+    broken.reply = 'fixed'
+    clock.now += 20
+    router._stats['broken'].latency = 1.0
+    assert llm.complete('default', '', 'hi') == 'spare'  # 1s, penalized tenfold
+    clock.now += 30
+    assert llm.complete('default', '', 'hi') == 'fixed'
+
+
+def test_all_backends_failing():
+    router = LLMRouter([LocalBackend('a', error_rate=1.0), LocalBackend('b', error_rate=1.0),
+                        LocalBackend('c', error_rate=1.0)])
+    llm = gateway(router)
+    with pytest.raises(LLMUnavailable, match='tried'):
+        llm.complete('default', '', 'hi')
+    # Two attempts per call
+    assert sum(stats['requests'] for stats in router.stats().values()) == 2
+    for _ in range(10):
+        with pytest.raises(LLMUnavailable):
+            llm.complete('default', '', 'hi')
+    # All ejected, but still tried
+    assert all(stats['ejected'] for stats in router.stats().values())
+    assert sum(stats['requests'] for stats in router.stats().values()) == 22
+
+
+def test_reconfiguring_keeps_the_stats_of_unchanged_backends():
+    routes = {'a': ['a'], 'b': ['b']}
+    router = LLMRouter([LocalBackend('a'), LocalBackend('b')], routes)
+    llm = gateway(router)
+    llm.complete('a', '', 'hi')
+    llm.complete('b', '', 'hi')
+    router.configure([create_backend({'name': 'a', 'kind': 'local'}),
+                      create_backend({'name': 'b', 'kind': 'local', 'latency': 0.5})], routes)
+    assert router.stats()['a']['requests'] == 1
+    assert router.stats()['b']['requests'] == 0
+    with pytest.raises(ValueError, match='unknown kind'):
+        create_backend({'name': 'x', 'kind': 'gpt'})
+    with pytest.raises(ValueError, match='LLM backend x'):
+        create_backend({'name': 'x', 'kind': 'local', 'colour': 'red'})
@@ -0,0 +1,41 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import pytest
+
+from ai.perf.bench import BENCHMARKS, Skip, blueprint, compare, measure, run
+
+
+@pytest.mark.parametrize('name', sorted(BENCHMARKS))
+def test_benchmarks_run(name):
+    try:
+        func = BENCHMARKS[name]()
+    except Skip as e:
+        pytest.skip(str(e))
+    try:
+        func()
+    finally:
+        getattr(func, 'cleanup', lambda: None)()
+
+
+def test_synthetic_blueprints():
+    compiled = blueprint('synthetic-500')
+    assert len(compiled.params) == 500
+    assert compiled.ciq_schema['global.section0.param0'] == 'What is parameter 0? (e.g., value-0)'
+
+
+def test_measure():
+    calls = []
+    result = measure(lambda: calls.append(1), repeat=3, min_time=0.001)
+    assert result['repeat'] == 3
+    assert result['min'] <= result['median'] <= result['max']
+    assert len(calls) >= result['loops'] * 3
+
+
+def test_compare():
+    base = run(['models.default_wl_properties'], repeat=2, min_time=0.001)
+    assert base['skipped'] == {}
+    new = {'benchmarks': {name: dict(result, median=result['median'] * 1.5)
+                          for name, result in base['benchmarks'].items()}}
+    assert compare(base, base) == {'slower': [], 'faster': []}
+    changes = compare(base, new, threshold=10)
+    assert len(changes['slower']) == 1 and '(+50.0%)' in changes['slower'][0]
+    assert compare(new, base, threshold=10)['faster']
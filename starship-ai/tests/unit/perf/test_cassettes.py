@@ -0,0 +1,112 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import asyncio
+import io
+import json
+
+import httpx
+import pytest
+import requests
+from botocore.response import StreamingBody
+
+from ai.agents.ciq_agent.cudo_client import CudoAPIClient
+from ai.perf import cassettes
+from ai.perf.cassettes import Cassette, CassetteError
+
+
+@pytest.fixture(autouse=True)
+def no_cassette():
+    yield
+    cassettes.use(None)
+
+
+def _response(status, body):
+    response = requests.Response()
+    response.status_code = status
+    response.headers['Content-Type'] = 'application/json'
+    response.headers['Set-Cookie'] = 'secret'
+    response._content = json.dumps(body).encode('utf-8')
+    return response
+
+
+def _fail():
+    raise AssertionError("replays must not call the upstream")
+
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / 'cudo.jsonl')
+    cassettes.use(Cassette(path, 'record'))
+    url = 'http://lab:8080/generator/chat/'
+    for answer in ('first', 'second'):
+        response = cassettes.requests_call('cudo', 'POST', url, {'q': 'hi', 'n': 1},
+                                           lambda: _response(200, {'answer': answer}))
+        assert response.json() == {'answer': answer}
+    cassettes.requests_call('cudo', 'POST', url, {'q': 'bye'}, lambda: _response(503, {}))
+
+    cassette = Cassette(path, 'replay', latency_scale=0)
+    assert len(cassette) == 3
+    cassettes.use(cassette)
+    # The key ignores the host and the order of the body's keys; same requests cycle in order
+    other_host = 'http://127.0.0.1:9101/generator/chat/'
+    answers = [cassettes.requests_call('cudo', 'POST', other_host, {'n': 1, 'q': 'hi'},
+                                       _fail).json()['answer'] for _ in range(3)]
+    assert answers == ['first', 'second', 'first']
+    replayed = cassettes.requests_call('cudo', 'POST', url, {'q': 'bye'}, _fail)
+    assert replayed.status_code == 503
+    assert dict(replayed.headers) == {'content-type': 'application/json'}
+    with pytest.raises(requests.exceptions.ConnectionError):
+        cassettes.requests_call('cudo', 'POST', url, {'q': 'unknown'}, _fail)
+
+
+def test_httpx(tmp_path):
+    path = str(tmp_path / 'endpoints.jsonl')
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={'id': 7}))
+
+    async def send():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get('http://ep/items', params={'page': 2})
+
+    async def call(send):
+        return await cassettes.httpx_call('infra', 'GET', 'http://ep/items', None, {'page': 2},
+                                          send)
+
+    cassettes.use(Cassette(path, 'record'))
+    assert asyncio.run(call(send)).json() == {'id': 7}
+    cassettes.use(Cassette(path, 'replay', latency_scale=0))
+    assert asyncio.run(call(_fail)).json() == {'id': 7}
+
+
+def test_bedrock(tmp_path):
+    path = str(tmp_path / 'bedrock.jsonl')
+    body = json.dumps({'messages': [{'role': 'user', 'content': 'ping'}]})
+    content = b'{"content": [{"text": "pong"}]}'
+
+    def invoke():
+        return {'body': StreamingBody(io.BytesIO(content), len(content)),
+                'ResponseMetadata': {'HTTPStatusCode': 200, 'RetryAttempts': 0}}
+
+    cassettes.use(Cassette(path, 'record'))
+    assert cassettes.bedrock_call('model', body, invoke)['body'].read() == content
+    cassettes.use(Cassette(path, 'replay', latency_scale=0))
+    assert cassettes.bedrock_call('model', body, _fail)['body'].read() == content
+
+
+def test_clients_replay(tmp_path):
+    client = CudoAPIClient(base_url='http://lab/generator/chat/', max_retries=0)
+    payload = client._build_payload('What is CMM?')
+    cassette = Cassette(str(tmp_path / 'cudo.jsonl'), 'record')
+    key = cassettes.request_key('cudo', 'POST', client.base_url, payload)
+    cassette.record('cudo', key, 'POST', client.base_url, 200, {},
+                    b'{"choices": [{"message": {"content": "A core network function."}}]}', 0.2)
+    cassettes.use(Cassette(cassette.path, 'replay', latency_scale=0))
+    response = client.query('What is CMM?')
+    assert response.success and response.content == 'A core network function.'
+
+
+def test_bad_cassettes(tmp_path):
+    with pytest.raises(CassetteError):
+        Cassette(str(tmp_path / 'missing.jsonl'))
+    (tmp_path / 'other.jsonl').write_text('{"not": "a cassette"}\n')
+    with pytest.raises(CassetteError):
+        Cassette(str(tmp_path / 'other.jsonl'), 'record')
+    with pytest.raises(CassetteError):
+        Cassette(str(tmp_path / 'x.jsonl'), 'rewind')
@@ -0,0 +1,41 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ai.perf.fakes import Latency, Upstream, bedrock_app, cudo_app
+
+
+def test_latency_distributions():
+    rng = random.Random(1)
+    assert Latency.parse('fixed:250').sample(rng) == 0.25
+    assert all(0.02 <= Latency.parse('uniform:20,80').sample(rng) <= 0.08 for _ in range(100))
+    samples = sorted(Latency.parse('lognormal:200,0.5').sample(rng) for _ in range(1001))
+    assert 0.17 < samples[500] < 0.23
+    assert str(Latency.parse('exponential:100')) == 'exponential:100'
+    for spec in ('gamma:1', 'uniform:20', 'fixed:-1', 'fixed:x'):
+        with pytest.raises(ValueError):
+            Latency.parse(spec)
+
+
+def test_fake_cudo():
+    upstream = Upstream(Latency.parse('fixed:0'))
+    client = TestClient(cudo_app(upstream))
+    response = client.post('/generator/generator/v2/chat/',
+                           json={'messages': [{'role': 'user', 'content': 'What is ALMS?'}]})
+    assert 'What is ALMS?' in response.json()['choices'][0]['message']['content']
+
+    upstream.error_rate = 1.0
+    assert client.post('/generator/generator/v2/chat/', json={}).status_code == 503
+    assert client.get('/stats').json()['requests'] == 2
+    assert client.get('/stats').json()['errors'] == 1
+
+
+def test_fake_bedrock():
+    client = TestClient(bedrock_app(Upstream(Latency.parse('fixed:0'))))
+    response = client.post('/model/anthropic.claude:0/invoke',
+                           json={'system': 'Return only the JSON object', 'messages': []})
+    assert response.json()['content'][0]['text'] == '{}'
+    response = client.post('/model/anthropic.claude:0/invoke', json={'system': 'Be helpful'})
+    assert response.json()['content'][0]['text'].startswith('(fake anthropic.claude:0)')
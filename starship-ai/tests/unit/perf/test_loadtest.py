@@ -0,0 +1,100 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Header, Response
+
+from ai.perf.loadtest import Scenario, ScenarioError, bundled, compare, percentile, run
+
+
+def _app():
+    app = FastAPI()
+    sessions = {}
+
+    @app.post('/chat')
+    async def chat(body: dict):
+        session_id = body.get('session_id') or f"s{len(sessions)}"
+        answers = sessions.setdefault(session_id, [])
+        if body['input'] == 'fail':
+            return Response(status_code=500)
+        if 'session_id' in body:
+            answers.append(body['input'])
+        return {'session_id': session_id, 'is_complete': len(answers) >= 3}
+
+    @app.get('/session/{session_id}')
+    async def session(session_id: str, if_none_match: str = Header(None)):
+        if if_none_match == '"v1"':
+            return Response(status_code=304)
+        return Response(content=','.join(sessions[session_id]), headers={'ETag': '"v1"'})
+
+    return app, sessions
+
+
+SCENARIO = {
+    'name': 'test',
+    'vars': {'answers': ['a', 'b']},
+    'steps': [
+        {'name': 'start', 'method': 'POST', 'path': '/chat', 'json': {'input': 'hi'},
+         'save': {'session_id': 'session_id'}},
+        {'name': 'answer', 'method': 'POST', 'path': '/chat',
+         'json': {'input': '{value}', 'session_id': '{session_id}'}, 'values': 'answers',
+         'repeat': 10, 'until': 'is_complete'},
+        {'name': 'fetch', 'path': '/session/{session_id}', 'conditional': True, 'repeat': 2},
+    ],
+}
+
+
+def test_scenario_run():
+    app, sessions = _app()
+    transport = httpx.ASGITransport(app=app)
+    report = asyncio.run(run(Scenario(SCENARIO), 'http://test', users=2, duration=0.3,
+                             transport=transport))
+    assert report['errors'] == 0
+    steps = report['steps']
+    # Repeating stops once the session is complete
+    assert steps['answer']['requests'] <= 3 * steps['start']['requests']
+    assert max(len(answers) for answers in sessions.values()) == 3
+    # Values are taken in turn
+    assert all(answers[i] != answers[i + 1]
+               for answers in sessions.values() for i in range(len(answers) - 1))
+    assert set(steps['fetch']['outcomes']) == {'200', '304'}
+    latency = report['latency_ms']
+    assert latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max']
+    assert report['throughput'] > 0
+
+
+def test_failures_end_the_iteration():
+    app, _ = _app()
+    scenario = Scenario({'steps': [
+        {'name': 'bad', 'method': 'POST', 'path': '/chat', 'json': {'input': 'fail'}},
+        {'name': 'never', 'path': '/session/x'}]})
+    report = asyncio.run(run(scenario, 'http://test', users=1, duration=0.1,
+                             transport=httpx.ASGITransport(app=app)))
+    assert report['errors'] == report['requests'] > 0
+    assert report['steps']['bad']['failures'] == {'500': report['requests']}
+    assert 'never' not in report['steps']
+
+
+def test_bundled_scenarios_load():
+    assert {'ciq_conversation', 'wizard_chat', 'payload_polling', 'cudo_chat'} <= set(bundled())
+    for name in bundled():
+        assert Scenario.load(name).steps
+    with pytest.raises(ScenarioError):
+        Scenario({'steps': [{'name': 'x', 'path': '/x', 'values': 'missing'}]})
+
+
+def test_percentiles_and_compare():
+    values = list(range(1, 101))
+    assert (percentile(values, 50), percentile(values, 99), percentile([], 50)) == (50, 99, 0.0)
+
+    def report(throughput, p95, errors=0):
+        summary = {'requests': 100, 'errors': errors, 'throughput': throughput,
+                   'latency_ms': {'p50': 10.0, 'p95': p95, 'p99': 50.0}}
+        return {**summary, 'steps': {'chat': dict(summary)}}
+
+    assert compare(report(100, 20), report(95, 21)) == []
+    regressions = compare(report(100, 20), report(80, 30, errors=1))
+    assert 'chat throughput: 100 -> 80 (-20.0%)' in regressions
+    assert '(total) p95: 20 -> 30 (+50.0%)' in regressions
+    assert '(total) error rate: 0.00% -> 1.00%' in regressions
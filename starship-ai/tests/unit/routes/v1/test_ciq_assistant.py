@@ -0,0 +1,111 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ai.agents.ciq_agent import ciq_agent, session_manager
+from ai.agents.ciq_agent.blueprint_registry import blueprint_registry
+from ai.routes.v1 import ciq_assistant
+
+app = FastAPI()
+app.include_router(ciq_assistant.router)
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def completed_session():
+    session_id = session_manager.create_session()
+    session = session_manager.get_session(session_id)
+    for param in sorted(session.missing_params):
+        session.collect_parameter(param, 'value')
+    session.set_final_yaml(ciq_agent._generate_final_yaml(session))
+    yield session
+    session_manager.delete_session(session_id)
+
+
+def test_chat_sends_yaml_hash_instead_of_yaml(client, completed_session):
+    body = {'input': 'regenerate', 'session_id': completed_session.session_id}
+    response = client.post('/ciq/chat', json=body).json()
+    assert response['final_yaml'] is None
+    assert response['yaml_hash'] == completed_session.yaml_hash
+    # Regenerating the same content does not bump the version
+    assert response['yaml_version'] == 1
+
+    legacy = client.post('/ciq/chat', json={**body, 'include_final_yaml': True}).json()
+    assert legacy['final_yaml'] == completed_session.final_yaml
+
+
+def test_get_yaml_honours_if_none_match(client, completed_session):
+    url = f'/ciq/session/{completed_session.session_id}/yaml'
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.text == completed_session.final_yaml
+    assert response.headers['etag'] == f'"{completed_session.yaml_hash}"'
+    assert response.headers['x-yaml-version'] == '1'
+
+    assert client.get(url, headers={'If-None-Match': response.headers['etag']}).status_code == 304
+
+    completed_session.collected_values['global.timezone'] = 'UTC'
+    completed_session.set_final_yaml(ciq_agent._generate_final_yaml(completed_session))
+    changed = client.get(url, headers={'If-None-Match': response.headers['etag']})
+    assert changed.status_code == 200
+    assert changed.headers['x-yaml-version'] == '2'
+
+
+def test_yaml_is_rendered_in_the_background(client, completed_session):
+    session_id = completed_session.session_id
+    final_yaml, completed_session.final_yaml = completed_session.final_yaml, None
+    assert client.get(f'/ciq/session/{session_id}/yaml').status_code == 404
+    response = client.post(f'/ciq/session/{session_id}/yaml?wait=false')
+    assert response.status_code == 202
+    job = response.json()
+    assert job['session_id'] == session_id
+    assert response.headers['location'].endswith(f"/ciq/jobs/{job['job_id']}")
+
+    ciq_agent.render_jobs.get(job['job_id']).future.result(5)
+    status = client.get(f"/ciq/jobs/{job['job_id']}").json()
+    assert status['status'] == 'done'
+    assert completed_session.final_yaml == final_yaml
+    assert status['yaml_hash'] == completed_session.yaml_hash
+    assert client.get('/ciq/jobs/nope').status_code == 404
+
+    # The chat turn asking for a regeneration starts a job and returns without waiting for it
+    body = {'input': 'regenerate', 'session_id': session_id}
+    response = client.post('/ciq/chat', json=body).json()
+    assert response['yaml_job'] not in (None, job['job_id'])
+    ciq_agent.render_jobs.get(response['yaml_job']).future.result(5)
+
+    generated = client.post(f'/ciq/session/{session_id}/yaml').json()
+    assert generated['yaml_content'] == completed_session.final_yaml
+    assert generated['job_id'] == response['yaml_job']
+
+
+def test_yaml_callback_must_be_allowed(client, completed_session):
+    completed_session.final_yaml = None
+    url = f'/ciq/session/{completed_session.session_id}/yaml'
+    response = client.post(url, params={'callback_url': 'http://10.0.0.1/hook'})
+    assert response.status_code == 400
+
+
+def test_get_yaml_unknown_session(client):
+    assert client.get('/ciq/session/nope/yaml').status_code == 404
+
+
+def test_chat_rejects_another_blueprint_for_a_session(client, completed_session):
+    product, version = completed_session.blueprint
+    body = {'input': 'regenerate', 'session_id': completed_session.session_id}
+    assert client.post('/ciq/chat', json={**body, 'product': product}).status_code == 200
+    response = client.post('/ciq/chat', json={**body, 'product': product, 'version': 'x.y'})
+    assert response.status_code == 409
+
+
+def test_session_renders_the_blueprint_it_was_created_with(completed_session, mocker):
+    # A blueprint reloaded after the session was created is not used by it
+    mocker.patch.object(blueprint_registry, 'get', side_effect=AssertionError('reloaded'))
+    assert ciq_agent._generate_final_yaml(completed_session) == completed_session.final_yaml
+    assert completed_session.get_progress()['blueprint']['sha256'] == \
+        completed_session.compiled.sha256
@@ -0,0 +1,104 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from ai import config as nwac_config
+from ai.agents.ciq_agent import ciq_agent, session_manager
+from ai.agents.ciq_agent.prefetch import Prefetcher
+from ai.routes.v1 import ciq_socket
+
+app = FastAPI()
+app.include_router(ciq_socket.router)
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def intents(monkeypatch):
+    # Answers are values, anything ending with ? a question for CuDo
+    monkeypatch.setattr(ciq_agent, '_classify_intent', lambda text, param:
+                        'tech_query' if text.endswith('?') else 'param_answer')
+    monkeypatch.setattr('ai.agents.ciq_agent.cudo_client.stream_cudo_api',
+                        lambda query: iter(['It is ', 'the mobile ', 'country code.']))
+    monkeypatch.setattr(ciq_agent, 'prefetcher', Prefetcher(concurrency=0))
+
+
+def receive_until(ws, kind):
+    events = []
+    while not events or events[-1]['type'] != kind:
+        events.append(ws.receive_json())
+    return events
+
+
+def test_chat_over_a_socket(client, intents):
+    with client.websocket_connect('/ciq/chat/ws') as ws:
+        session = ws.receive_json()
+        assert session['type'] == 'session'
+        session_id = session['session_id']
+        assert session['progress']['collected_count'] == 0
+
+        ws.send_json({'type': 'message', 'input': 'eth0'})
+        events = receive_until(ws, 'message')
+        assert events[-1]['response'].startswith("Great! I've recorded that value.")
+        assert ''.join(e['text'] for e in events if e['type'] == 'token') == \
+            events[-1]['response']
+        progress = ws.receive_json()
+        assert progress['type'] == 'progress' and progress['collected_count'] == 1
+
+        # CuDo's answer is streamed as it comes
+        ws.send_json({'type': 'message', 'input': 'how do I pick one?'})
+        events = receive_until(ws, 'message')
+        tokens = [e['text'] for e in events if e['type'] == 'token']
+        assert tokens[:4] == ["Here's what I found:\n\n", 'It is ', 'the mobile ',
+                              'country code.']
+        assert ''.join(tokens) == events[-1]['response']
+        receive_until(ws, 'progress')
+
+        ws.send_json({'type': 'ping'})
+        assert ws.receive_json() == {'type': 'pong'}
+        ws.send_text('not json')
+        assert ws.receive_json()['type'] == 'error'
+        ws.send_json({'type': 'message', 'input': 'x' * 20000})
+        assert 'over' in ws.receive_json()['detail']
+    session_manager.delete_session(session_id)
+
+
+def test_yaml_ready_is_pushed(client, intents):
+    session_id = session_manager.create_session()
+    session = session_manager.get_session(session_id)
+    for param in sorted(session.missing_params)[:-1]:
+        session.collect_parameter(param, 'value')
+    with client.websocket_connect(f'/ciq/chat/ws?session_id={session_id}') as ws:
+        assert ws.receive_json()['session_id'] == session_id
+        ws.send_json({'type': 'message', 'input': 'UTC'})
+        message = receive_until(ws, 'message')[-1]
+        assert message['is_complete'] and message['yaml_job']
+        ready = receive_until(ws, 'yaml_ready')[-1]
+        assert ready['job_id'] == message['yaml_job']
+        assert ready['status'] == 'done'
+        assert ready['yaml_hash'] == session.yaml_hash
+    session_manager.delete_session(session_id)
+
+
+def test_connections_are_limited(client, monkeypatch):
+    config = nwac_config.NWaCConfig()
+    config.ciq_ws_max_connections = 0
+    monkeypatch.setattr(ciq_socket, 'get_config', lambda: config)
+    with pytest.raises(WebSocketDisconnect) as e:
+        with client.websocket_connect('/ciq/chat/ws') as ws:
+            ws.receive_json()
+    assert e.value.code == ciq_socket.TRY_AGAIN_LATER
+
+
+def test_session_pinned_to_another_blueprint(client):
+    session_id = session_manager.create_session()
+    with pytest.raises(WebSocketDisconnect) as e:
+        with client.websocket_connect(f'/ciq/chat/ws?session_id={session_id}&version=x.y') as ws:
+            ws.receive_json()
+    assert e.value.code == ciq_socket.POLICY_VIOLATION
+    session_manager.delete_session(session_id)
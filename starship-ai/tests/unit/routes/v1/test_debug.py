@@ -0,0 +1,55 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ai.config import get_config
+from ai.profiler import PROFILER, Profile
+from ai.routes.v1 import debug
+from ai.tracing import TRACES
+
+
+def test_recent_traces(monkeypatch):
+    app = FastAPI()
+    app.include_router(debug.router)
+    client = TestClient(app)
+    monkeypatch.setattr(get_config(), 'trace_debug_endpoint', False)
+    assert client.get('/debug/traces').status_code == 404
+
+    monkeypatch.setattr(get_config(), 'trace_debug_endpoint', True)
+    monkeypatch.setattr(TRACES, '_traces', TRACES._traces.__class__(maxlen=10))
+    TRACES.add({'name': 'request', 'duration_ms': 5.0})
+    TRACES.add({'name': 'request', 'duration_ms': 50.0})
+    response = client.get('/debug/traces', params={'min_ms': 10})
+    assert response.status_code == 200
+    assert response.json() == {'traces': [{'name': 'request', 'duration_ms': 50.0}]}
+
+
+def test_cpu_profile(monkeypatch):
+    app = FastAPI()
+    app.include_router(debug.router)
+    client = TestClient(app)
+    monkeypatch.setattr(get_config(), 'profiler_endpoint', False)
+    assert client.get('/debug/profile').status_code == 404
+
+    monkeypatch.setattr(get_config(), 'profiler_endpoint', True)
+    monkeypatch.setattr(get_config(), 'dev', False)
+    # Not served without a token outside dev mode
+    assert client.get('/debug/profile').status_code == 403
+    monkeypatch.setattr(get_config(), 'profiler_token', 's3cret')
+    monkeypatch.setattr(get_config(), 'profiler_max_seconds', 5)
+    assert client.get('/debug/profile').status_code == 403
+
+    calls = []
+
+    def run(seconds, interval, per_request, include_idle):
+        calls.append((seconds, interval, per_request, include_idle))
+        return Profile({'GET /chat;handle (ciq_core:10)': 3}, 5, seconds, 0.01)
+
+    monkeypatch.setattr(PROFILER, 'run', run)
+    response = client.get('/debug/profile', params={'seconds': 30, 'interval_ms': 20},
+                          headers={'X-Profiler-Token': 's3cret'})
+    assert response.status_code == 200
+    assert response.text == 'GET /chat;handle (ciq_core:10) 3\n'
+    assert response.headers['x-profile-samples'] == '5'
+    # Capped at profiler_max_seconds
+    assert calls == [(5.0, 0.02, False, False)]
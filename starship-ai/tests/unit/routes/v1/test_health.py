@@ -4,6 +4,7 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
 from ai.routes.v1.health import router
+from ai.warmup import READINESS, ComponentStatus
 
 app = FastAPI()
 app.include_router(router)
@@ -19,3 +20,23 @@ def test_ok_health(client):
     assert response.status_code == 200  # Check if endpoint is reachable
     data = response.json()
     assert data["status"] == "ok"
+
+
+def test_ready(client, monkeypatch):
+    monkeypatch.setattr(READINESS, 'finished', False)
+    monkeypatch.setattr(READINESS, 'components', {})
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming_up"
+
+    monkeypatch.setattr(READINESS, 'finished', True)
+    READINESS.components = {
+        'blueprints': ComponentStatus(required=True, status='ok', duration_ms=12.5),
+        'cudo': ComponentStatus(required=False, status='failed', detail='timed out'),
+    }
+    response = client.get("/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "degraded"
+    assert data["components"]["blueprints"]["duration_ms"] == 12.5
+    assert data["components"]["cudo"]["detail"] == "timed out"
@@ -0,0 +1,44 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from ai.routes.v1 import health, metrics
+from ai.routes.v1.common import TimedRoute
+
+
+def test_metrics():
+    app = FastAPI()
+    app.include_router(health.router)
+    app.include_router(metrics.router)
+    client = TestClient(app)
+    assert client.get('/health').status_code == 200
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert ('starship_http_request_duration_seconds_count'
+            '{route="/health",method="GET",status="200"}') in response.text
+    assert 'starship_http_requests_in_flight{route="/health"} 0' in response.text
+    assert '# TYPE starship_ciq_sessions gauge' in response.text
+
+
+class Item(BaseModel):
+    name: str
+
+
+def test_handled_errors_are_recorded_with_their_status():
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.post('/items')
+    async def create_item(item: Item):
+        return item
+
+    app = FastAPI()
+    app.include_router(router)
+    app.include_router(metrics.router)
+    client = TestClient(app)
+    assert client.post('/items', json={}).status_code == 422
+
+    assert ('starship_http_request_duration_seconds_count'
+            '{route="/items",method="POST",status="422"} 1') in client.get('/metrics').text
@@ -0,0 +1,61 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ai.routes.v1 import ciq_assistant, wlcluster_assistant
+from ai.routes.v1.common import PAYLOAD_CACHE, etag_matches
+
+app = FastAPI()
+app.include_router(wlcluster_assistant.router)
+app.include_router(ciq_assistant.router)
+
+
+@pytest.fixture
+def client():
+    PAYLOAD_CACHE.clear()
+    return TestClient(app)
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+
+
+def test_payload_is_revalidated_with_etag(client, mocker):
+    build = mocker.spy(wlcluster_assistant, 'default_wl_properties')
+    first = client.post('/workload-cluster/payload', json={'question': 'x'})
+    assert first.status_code == 200
+    etag = first.headers['etag']
+    assert first.json()['properties']['oam']['x-displayName'] == 'OAM'
+
+    second = client.post('/workload-cluster/payload', json={'question': 'x'})
+    assert second.headers['etag'] == etag
+    assert second.content == first.content
+
+    not_modified = client.post('/workload-cluster/payload', json={'question': 'x'},
+                               headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b''
+    # Built once, served three times
+    assert build.call_count == 1
+
+
+def test_payload_changes_with_values(client, mocker):
+    etag = client.post('/workload-cluster/payload', json={'question': 'x'}).headers['etag']
+    mocker.patch.dict(wlcluster_assistant.WLCL_VALUES_STATE, {'oam': '10.0.0.0/24'})
+    changed = client.post('/workload-cluster/payload', json={'question': 'x'},
+                          headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['etag'] != etag
+    assert changed.json()['properties']['oam']['x-value'] == '10.0.0.0/24'
+
+
+def test_ciq_payload(client):
+    response = client.post('/ciq/payload', json={'input': 'schema'})
+    assert response.status_code == 200
+    assert 'etag' in response.headers
+    assert response.json()['properties']['alms_type']['x-value'] == ''
@@ -0,0 +1,84 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from ai.admission import AdmissionController, AdmissionMiddleware, GradientLimit
+
+
+def test_limit_follows_latency():
+    limit = GradientLimit(initial=10, min_limit=2, max_limit=50)
+    for _ in range(20):
+        limit.update(1.0, in_flight=int(limit.limit))
+    grown = limit.limit
+    assert grown > 20
+    # Twice the usual latency is tolerated, more than that shrinks the limit
+    assert limit.update(2.0, in_flight=int(grown)) >= grown
+    for _ in range(20):
+        limit.update(8.0, in_flight=int(limit.limit))
+    assert limit.limit < grown / 2
+    # Failures back off; a mostly idle class keeps its limit
+    shrunk = limit.limit
+    assert limit.update(1.0, in_flight=1, failed=True) == pytest.approx(shrunk * 0.9)
+    assert limit.update(1.0, in_flight=1) == pytest.approx(shrunk * 0.9)
+    for _ in range(100):
+        limit.update(100.0, in_flight=50, failed=True)
+    assert limit.limit == 2
+
+
+def _app(controller):
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.post('/chat')
+    async def chat():
+        await release.wait()
+        return {'ok': True}
+
+    @app.get('/chat/payload')
+    async def payload():
+        return {'schema': {}}
+
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return app, release
+
+
+@pytest.mark.asyncio
+async def test_requests_over_the_limit_are_queued_then_shed():
+    controller = AdmissionController({'chat': ['/chat']}, initial_limit=1, min_limit=1,
+                                     max_limit=1, max_queue=1, queue_timeout=5)
+    app, release = _app(controller)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        first = asyncio.create_task(client.post('/chat'))
+        second = asyncio.create_task(client.post('/chat'))
+        await asyncio.sleep(0.05)
+        assert controller.stats()['chat']['in_flight'] == 1
+        assert controller.stats()['chat']['queued'] == 1
+
+        shed = await client.post('/chat')
+        assert shed.status_code == 503
+        assert int(shed.headers['Retry-After']) >= 1
+        # Routes outside the classes are never held back
+        assert (await client.get('/chat/payload')).status_code == 200
+
+        release.set()
+        assert [r.status_code for r in await asyncio.gather(first, second)] == [200, 200]
+    assert controller.stats()['chat']['in_flight'] == 0
+
+
+@pytest.mark.asyncio
+async def test_waiting_times_out():
+    controller = AdmissionController({'chat': ['/chat']}, initial_limit=1, min_limit=1,
+                                     max_limit=1, max_queue=5, queue_timeout=0.05)
+    app, release = _app(controller)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        first = asyncio.create_task(client.post('/chat'))
+        await asyncio.sleep(0.01)
+        assert (await client.post('/chat')).status_code == 503
+        assert controller.stats()['chat']['queued'] == 0
+        release.set()
+        assert (await first).status_code == 200
@@ -0,0 +1,24 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+from fastapi import FastAPI
+from fastapi.exceptions import RequestValidationError
+from fastapi.testclient import TestClient
+
+from ai.app import validation_exception_handler
+from ai.models.v1.ciqchat import CIQChatRequest
+
+
+def test_validation_errors():
+    app = FastAPI()
+    app.add_exception_handler(RequestValidationError, validation_exception_handler)
+
+    @app.post('/chat')
+    async def chat(request: CIQChatRequest):
+        return {}
+
+    response = TestClient(app).post('/chat', json={'session_id': 3})
+    assert response.status_code == 422
+    assert response.json() == {
+        'error': 'failed to validate request body',
+        'count': '2',
+        'messages': [{'path': 'body -> input', 'message': 'Field required'},
+                     {'path': 'body -> session_id', 'message': 'Input should be a valid string'}]}
@@ -0,0 +1,92 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from ai.compression import CompressionMiddleware, negotiate
+
+BIG = 'key: value\n' * 500
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=1024, cache_size=4)
+
+
+@app.get('/big')
+async def big():
+    return PlainTextResponse(BIG, headers={'ETag': '"v1"'})
+
+
+@app.post('/big')
+async def big_post():
+    return PlainTextResponse(BIG)
+
+
+@app.get('/small')
+async def small():
+    return PlainTextResponse('tiny')
+
+
+@app.get('/stream')
+async def stream():
+    async def chunks():
+        for _ in range(3):
+            yield BIG
+    return StreamingResponse(chunks(), media_type='text/plain')
+
+
+@app.get('/events')
+async def events():
+    return Response(BIG, media_type='text/event-stream')
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_negotiate():
+    assert negotiate('gzip, deflate', ['zstd', 'gzip']) == 'gzip'
+    assert negotiate('gzip;q=0.5, zstd', ['zstd', 'gzip']) == 'zstd'
+    assert negotiate('zstd;q=0.1, gzip;q=0.9', ['zstd', 'gzip']) == 'gzip'
+    assert negotiate('*', ['zstd', 'gzip']) == 'zstd'
+    assert negotiate('gzip;q=0', ['gzip']) is None
+    assert negotiate('', ['gzip']) is None
+    assert negotiate('identity', ['gzip']) is None
+
+
+def test_large_bodies_are_compressed(client):
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+    assert int(response.headers['content-length']) < len(BIG) / 10
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert response.headers['etag'] == 'W/"v1"'
+    assert response.text == BIG
+
+
+def test_uncompressed_when_not_worth_it(client):
+    assert 'content-encoding' not in client.get('/small').headers
+    identity = client.get('/big', headers={'Accept-Encoding': ''})
+    assert 'content-encoding' not in identity.headers
+    # The body still depends on Accept-Encoding, so caches must not serve it to gzip clients
+    assert identity.headers['vary'] == 'Accept-Encoding'
+    assert identity.text == BIG
+    streamed = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in streamed.headers
+    assert streamed.text == BIG * 3
+    assert 'content-encoding' not in client.get('/events').headers
+
+
+def test_compressed_bodies_are_cached(mocker):
+    middleware = CompressionMiddleware(None, cache_size=4)
+    gzip_compress = mocker.Mock(side_effect=middleware.compressors['gzip'])
+    middleware.compressors = {'gzip': gzip_compress}
+    start = {'headers': [(b'etag', b'"v1"')]}
+    first = middleware._compress('gzip', BIG.encode(), start, 'GET')
+    assert middleware._compress('gzip', BIG.encode(), start, 'GET') is first
+    # Without an ETag, GETs are cached by content but other methods are not
+    middleware._compress('gzip', BIG.encode(), {'headers': []}, 'GET')
+    middleware._compress('gzip', BIG.encode(), {'headers': []}, 'GET')
+    middleware._compress('gzip', BIG.encode(), {'headers': []}, 'POST')
+    middleware._compress('gzip', BIG.encode(), {'headers': []}, 'POST')
+    assert gzip_compress.call_count == 4
@@ -0,0 +1,91 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import asyncio
+
+import pytest
+
+from ai.fairqueue import FairQueue
+
+
+async def _run(queue, calls, exclusive=False):
+    """Queue the (flow, name) calls behind a call holding every slot; return the order run."""
+    order = []
+    hold = asyncio.Event()
+
+    async def holder():
+        async with queue.turn('holder'):
+            await hold.wait()
+
+    async def call(flow, name):
+        async with queue.turn(flow, exclusive=exclusive):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    holding = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    tasks = []
+    for flow, name in calls:
+        tasks.append(asyncio.create_task(call(flow, name)))
+        await asyncio.sleep(0)
+    hold.set()
+    await asyncio.gather(holding, *tasks)
+    assert queue.busy == 0 and queue.queued == 0
+    return order
+
+
+@pytest.mark.asyncio
+async def test_flows_take_turns():
+    order = await _run(FairQueue(slots=1),
+                       [('a', 'a1'), ('a', 'a2'), ('a', 'a3'), ('b', 'b1'), ('b', 'b2')])
+    assert order == ['a1', 'b1', 'a2', 'b2', 'a3']
+
+
+@pytest.mark.asyncio
+async def test_weights():
+    queue = FairQueue(slots=1, weights={'heavy': 2})
+    order = await _run(queue, [('heavy', f'h{i}') for i in range(4)] +
+                       [('light', f'l{i}') for i in range(2)])
+    assert order == ['h0', 'l0', 'h1', 'h2', 'l1', 'h3']
+
+
+@pytest.mark.asyncio
+async def test_exclusive_flows_run_one_call_at_a_time():
+    queue = FairQueue(slots=4)
+    running, most = 0, 0
+
+    async def call():
+        nonlocal running, most
+        async with queue.turn('session:s1', exclusive=True):
+            running += 1
+            most = max(most, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(call() for _ in range(3)))
+    assert most == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_calls_give_up_their_turn():
+    queue = FairQueue(slots=1)
+    hold = asyncio.Event()
+
+    async def holder():
+        async with queue.turn('a'):
+            await hold.wait()
+
+    async def waiter():
+        async with queue.turn('b'):
+            pass
+
+    holding = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(waiter())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    hold.set()
+    await holding
+    assert queue.busy == 0
+    async with queue.turn('c'):
+        assert queue.busy == 1
@@ -0,0 +1,79 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import json
+import logging
+import threading
+
+from ai.logs import AccessJsonFormatter, JsonFormatter, LogQueue, SamplingFilter
+
+
+def _record(msg, *args, name='nwac', level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None, func='handle')
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = []
+
+    def emit(self, record):
+        self.records.append(self.format(record))
+        self.threads.append(threading.current_thread().name)
+
+
+def test_messages_are_escaped():
+    record = _record('said "%s"\nthen left', 'hi')
+    record.correlation_id = 'abc'
+    line = json.loads(JsonFormatter(detailed=True).format(record))
+    assert line['msg'] == 'said "hi"\nthen left'
+    assert line['from'] == 'nwac.test_logs.handle'
+    assert line['correlation_id'] == 'abc'
+
+
+def test_access_records():
+    record = _record('%s - "%s %s HTTP/%s" %d', '10.0.0.1:4321', 'GET', '/x?q="', '1.1', 404,
+                     name='uvicorn.access')
+    line = json.loads(AccessJsonFormatter().format(record))
+    assert line['src'] == '10.0.0.1:4321'
+    assert line['req'] == 'GET /x?q=" HTTP/1.1'
+    assert line['status'] == '404 Not Found'
+
+
+def test_sampling():
+    sampling = SamplingFilter(rate=0.25)
+    kept = [sampling.filter(_record('request')) for _ in range(8)]
+    assert kept == [True, False, False, False, True, False, False, False]
+    assert sampling.filter(_record('oops', level=logging.ERROR))
+
+    limited = SamplingFilter(per_second=3)
+    records = [_record('request') for _ in range(10)]
+    assert sum(limited.filter(record) for record in records) == 3
+    warning = _record('slow', level=logging.WARNING)
+    assert limited.filter(warning)
+    assert warning.dropped == 7
+
+
+def test_queue_writes_in_the_background():
+    logger = logging.getLogger('test_logs.queue')
+    logger.propagate = False
+    target = _Collect()
+    target.setFormatter(JsonFormatter())
+    logger.handlers = [target]
+    log_queue = LogQueue()
+    log_queue.attach('test_logs.queue')
+    log_queue.start()
+    try:
+        body = {'state': 'before'}
+        logger.warning('body: %s, count: %d', body, 1)
+        body['state'] = 'after'
+        logger.warning('count: %d', 2)
+    finally:
+        log_queue.stop()
+    messages = [json.loads(record)['msg'] for record in target.records]
+    # Mutable arguments are merged right away, the others when the record is written
+    assert messages == ["body: {'state': 'before'}, count: 1", 'count: 2']
+    assert target.threads == ['nwac-log', 'nwac-log']
+
+    # Once stopped, records are written directly
+    logger.warning('direct')
+    assert target.threads[-1] == threading.current_thread().name
@@ -0,0 +1,89 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from ai.metrics import Counter, Gauge, Histogram, Registry, upstream_call
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_exposition(registry):
+    requests = Counter('requests_total', 'Requests.', ('route',), registry=registry)
+    in_flight = Gauge('in_flight', 'In flight.', registry=registry)
+    latency = Histogram('latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0),
+                        registry=registry)
+    requests.inc('/a "b"')
+    in_flight.inc()
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, '/a')
+
+    text = registry.exposition()
+    assert '# TYPE requests_total counter\nrequests_total{route="/a \\"b\\""} 1\n' in text
+    assert 'in_flight 1\n' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2\n' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3\n' in text
+    assert 'latency_seconds_sum{route="/a"} 5.55\n' in text
+    assert 'latency_seconds_count{route="/a"} 3\n' in text
+
+
+def test_threads_record_into_their_own_shards(registry):
+    counter = Counter('hits_total', 'Hits.', registry=registry)
+
+    def hit():
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=hit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.collect() == {(): 4000}
+
+
+def test_upstream_call(registry, monkeypatch):
+    from ai import metrics
+
+    latency = Histogram('upstream_seconds', 'Upstream.', ('upstream', 'target', 'outcome'),
+                        registry=registry)
+    monkeypatch.setattr(metrics, 'UPSTREAM_REQUEST_DURATION', latency)
+    with upstream_call('cudo', 'chat') as call:
+        call.outcome = '503'
+    with pytest.raises(RuntimeError):
+        with upstream_call('cudo', 'chat'):
+            raise RuntimeError()
+    assert set(latency.collect()) == {('cudo', 'chat', '503'), ('cudo', 'chat', 'error')}
+
+
+def test_workers_are_summed(registry, tmp_path):
+    counter = Counter('jobs_total', 'Jobs.', registry=registry)
+    gauge = Gauge('busy', 'Busy.', registry=registry)
+    counter.inc(amount=2)
+    gauge.inc()
+    registry.directory = str(tmp_path)
+    registry.write_snapshot()
+    assert os.listdir(tmp_path) == [f'{os.getpid()}.json']
+
+    # Another worker that is still running, one that has exited and one that stopped writing
+    other = {'jobs_total': {'kind': 'counter', 'values': [[[], 3]]},
+             'busy': {'kind': 'gauge', 'values': [[[], 1]]}}
+    (tmp_path / '1.json').write_text(json.dumps(other))
+    (tmp_path / '999999999.json').write_text(json.dumps(other))
+    (tmp_path / f'{os.getppid()}.json').write_text(json.dumps(other))
+    stale = time.time() - registry.expiry - 1
+    os.utime(tmp_path / f'{os.getppid()}.json', (stale, stale))
+    totals = registry.collect()
+    assert totals['jobs_total'] == {(): 5}
+    assert totals['busy'] == {(): 2}
+    # Gone and stale workers' snapshots are cleaned up, and so is ours on shutdown
+    assert sorted(os.listdir(tmp_path)) == sorted(['1.json', f'{os.getpid()}.json'])
+    registry.remove_snapshot()
+    assert os.listdir(tmp_path) == ['1.json']
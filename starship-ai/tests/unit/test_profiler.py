@@ -0,0 +1,78 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ai import tracing
+from ai.profiler import Profiler, ProfilerBusy
+from ai.tracing import TraceBuffer, TracingMiddleware
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _serve_request(started):
+    async def app(scope, receive, send):
+        started.set()
+        _spin(0.5)
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def send(message):
+        pass
+
+    middleware = TracingMiddleware(app, traces=TraceBuffer(1))
+    asyncio.run(middleware({'type': 'http', 'method': 'GET', 'path': '/chat'}, None, send))
+
+
+def test_samples_are_attributed_to_requests():
+    started = threading.Event()
+    thread = threading.Thread(target=_serve_request, args=(started,))
+    thread.start()
+    started.wait()
+    profile = Profiler().run(0.2, interval=0.005)
+    thread.join()
+
+    assert profile.samples > 0
+    assert 0.0 < profile.overhead < 0.5
+    request_stacks = [stack for stack in profile.stacks if stack.startswith('GET /chat;')]
+    assert request_stacks
+    # The request's own frames, without the server's frames above it
+    assert all('_serve_request' not in stack for stack in request_stacks)
+    assert any(stack.split(';')[-1].startswith('_spin (test_profiler:')
+               for stack in request_stacks)
+    line = profile.collapsed().splitlines()[0]
+    assert line.rsplit(' ', 1)[1].isdigit()
+    # Finished requests are no longer registered
+    assert tracing._ACTIVE_REQUESTS == {}
+
+
+def test_idle_threads_are_left_out():
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait, name='idle-worker')
+    thread.start()
+    try:
+        profile = Profiler().run(0.05)
+        assert not any(stack.startswith('idle-worker;') for stack in profile.stacks)
+        profile = Profiler().run(0.05, include_idle=True)
+        assert any(stack.startswith('idle-worker;') for stack in profile.stacks)
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_one_profile_at_a_time():
+    profiler = Profiler()
+    thread = threading.Thread(target=profiler.run, args=(0.3,))
+    thread.start()
+    while not profiler.busy:
+        time.sleep(0.001)
+    with pytest.raises(ProfilerBusy):
+        profiler.run(0.01)
+    thread.join()
+    assert not profiler.busy
@@ -0,0 +1,93 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import asyncio
+import sqlite3
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from ai.metrics import RATE_LIMITED
+from ai.ratelimit import (
+    RateLimiter, RateLimitMiddleware, SqliteTokenBuckets, TokenBuckets, client_identity,
+    current_client)
+
+
+@pytest.mark.parametrize('buckets', ['memory', 'sqlite'])
+def test_token_buckets(buckets, tmp_path):
+    if buckets == 'memory':
+        first = second = TokenBuckets()
+    else:
+        # Two processes sharing a database share the buckets
+        first = SqliteTokenBuckets(str(tmp_path / 'buckets.db'))
+        second = SqliteTokenBuckets(str(tmp_path / 'buckets.db'))
+    assert first.take('a', rate=2, burst=2, now=100) == 0
+    assert second.take('a', rate=2, burst=2, now=100) == 0
+    assert first.take('a', rate=2, burst=2, now=100) == pytest.approx(0.5)
+    assert second.take('b', rate=2, burst=2, now=100) == 0
+    # Refilled at rate tokens a second, up to burst
+    assert second.take('a', rate=2, burst=2, now=100.5) == 0
+    assert first.take('a', rate=2, burst=2, now=100.5) == pytest.approx(0.5)
+    assert first.take('a', rate=2, burst=2, now=200) == 0
+    assert first.take('a', rate=2, burst=2, now=200) == 0
+    assert first.take('a', rate=2, burst=2, now=200) > 0
+    first.close()
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_database_lock_does_not_block_the_loop(tmp_path):
+    buckets = SqliteTokenBuckets(str(tmp_path / 'buckets.db'))
+    # Another process holds the write lock
+    other = sqlite3.connect(str(tmp_path / 'buckets.db'), isolation_level=None)
+    other.execute('BEGIN IMMEDIATE')
+    take = asyncio.create_task(buckets.take_async('a', rate=2, burst=2))
+    started = time.monotonic()
+    await asyncio.sleep(0.05)
+    assert time.monotonic() - started < 0.5
+    assert not take.done()
+    other.execute('COMMIT')
+    assert await take == 0
+    other.close()
+    buckets.close()
+
+
+def test_client_identity():
+    scope = {'path': '/v1/ciq/session/s1/yaml', 'client': ('10.0.0.1', 4321),
+             'headers': [(b'x-api-key', b'secret')]}
+    assert client_identity(scope, ['api_key', 'ip']).startswith('key:')
+    assert 'secret' not in client_identity(scope, ['api_key'])
+    assert client_identity(scope, ['session', 'ip']) == 'session:s1'
+    assert client_identity(scope, ['ip']) == 'ip:10.0.0.1'
+    assert client_identity({'path': '/', 'headers': []}, ['api_key', 'ip']) == 'anonymous'
+    with pytest.raises(ValueError):
+        RateLimiter().configure({}, ['cookie'])
+
+
+@pytest.mark.asyncio
+async def test_requests_over_the_limit_are_refused():
+    limiter = RateLimiter()
+    limiter.configure({'chat': {'routes': ['/*/chat'], 'rate': 0.01, 'burst': 2}})
+    app = FastAPI()
+
+    @app.post('/v1/ciq/chat')
+    async def chat():
+        return {'client': current_client()}
+
+    @app.get('/v1/health')
+    async def health():
+        return {}
+
+    app.add_middleware(RateLimitMiddleware, prefix='/v1', limiter=limiter)
+    throttled = RATE_LIMITED.collect().get(('chat',), 0)
+    transport = httpx.ASGITransport(app=app, client=('10.0.0.1', 4321))
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        responses = [await client.post('/v1/ciq/chat') for _ in range(3)]
+        assert [r.status_code for r in responses] == [200, 200, 429]
+        assert responses[0].json() == {'client': 'ip:10.0.0.1'}
+        assert int(responses[2].headers['Retry-After']) > 1
+        assert RATE_LIMITED.collect()[('chat',)] == throttled + 1
+        # Other clients and other routes are not affected
+        other = await client.post('/v1/ciq/chat', headers={'X-API-Key': 'other'})
+        assert other.status_code == 200
+        assert (await client.get('/v1/health')).status_code == 200
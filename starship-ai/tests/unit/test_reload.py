@@ -0,0 +1,83 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import asyncio
+
+import pytest
+
+from ai import config as nwac_config
+from ai.agents.ciq_agent.blueprint_registry import BlueprintRegistry
+from ai.config import NWaCConfig, config_snapshot, get_config
+from ai.reload import FileWatcher, Reloader
+
+CONFIG_TEMPLATE = """
+default:
+  title: Starship
+  port: 5050
+  log_level: INFO
+  intent_list_timeout: {timeout}
+endpoints: []
+"""
+
+
+@pytest.fixture
+def config(tmp_path):
+    config_file = tmp_path / 'starship.yaml'
+    config_file.write_text(CONFIG_TEMPLATE.format(timeout=5))
+    config = NWaCConfig(config_file=str(config_file))
+    config.update_from_file()
+    original = nwac_config.CONFIG
+    nwac_config.set_config(config)
+    yield config
+    nwac_config.set_config(original)
+
+
+@pytest.fixture
+def reloader(config, tmp_path):
+    registry = BlueprintRegistry(tmp_path / 'blueprints', cache_dir=tmp_path / 'cache')
+    return Reloader(config, overrides={'port': 6060, 'config_file': 'ignored'}, registry=registry)
+
+
+@pytest.mark.asyncio
+async def test_reload_swaps_config_but_not_for_requests_in_flight(config, reloader):
+    with config_snapshot():
+        reloader.config_file.write_text(CONFIG_TEMPLATE.format(timeout=30))
+        await reloader.reload([reloader.config_file])
+        # A request that started before the reload keeps its config
+        assert get_config() is config
+    new = get_config()
+    assert new is not config
+    assert new.intent_list_timeout == 30
+    # Command line overrides still win over the file
+    assert new.port == 6060
+
+
+@pytest.mark.asyncio
+async def test_invalid_config_is_not_applied(config, reloader):
+    reloader.config_file.write_text("default:\n  no_such_setting: 1\n")
+    assert not await reloader.reload_config()
+    assert get_config() is config
+
+
+@pytest.mark.asyncio
+async def test_polling_watcher_reports_changed_files(tmp_path):
+    watched = tmp_path / 'watched.yaml'
+    watched.write_text('a: 1\n')
+    watcher = FileWatcher([watched, tmp_path / 'missing.yaml'], interval=0.01, use_inotify=False)
+    changes = watcher.changes()
+    pending = asyncio.ensure_future(changes.__anext__())
+    await asyncio.sleep(0.05)
+    watched.write_text('a: 22\n')
+    assert await asyncio.wait_for(pending, timeout=5) == [watched]
+    watcher.stop()
+    await changes.aclose()
+
+
+@pytest.mark.asyncio
+async def test_restart_only_changes_are_reported(config, reloader, mocker):
+    log = mocker.patch('ai.reload.LOG')
+    reloader.config_file.write_text(CONFIG_TEMPLATE.format(timeout=5).replace(
+        'default:\n', 'default:\n  trace_buffer_size: 7\n'))
+    assert await reloader.reload_config()
+    assert get_config().trace_buffer_size == 7
+    warned = [call.args[1] for call in log.warning.call_args_list]
+    # (port changes too, through the command line override)
+    assert warned == ['port', 'trace_buffer_size']
@@ -0,0 +1,20 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import os
+
+from ai.startup import FORBIDDEN_MODULES, format_report, profile_imports, total_seconds
+
+# Generous enough for a loaded CI runner; a regression that pulls the UI or the AWS SDK back
+# into the server roughly doubles the import time
+IMPORT_BUDGET_SECONDS = float(os.getenv('STARSHIP_IMPORT_BUDGET', '3.0'))
+
+
+def test_server_import_is_lean():
+    timings = profile_imports()
+    imported = {t.module.split('.')[0] for t in timings}
+    assert imported.isdisjoint(FORBIDDEN_MODULES), format_report(timings)
+
+
+def test_server_import_time_budget():
+    # Best of two, so a cold disk cache does not count against the budget
+    timings = min((profile_imports() for _ in range(2)), key=total_seconds)
+    assert total_seconds(timings) < IMPORT_BUDGET_SECONDS, format_report(timings)
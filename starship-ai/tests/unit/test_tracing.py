@@ -0,0 +1,89 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ai.tracing import TraceBuffer, TracingMiddleware, span
+
+
+def _work():
+    with span('yaml_render', params=3):
+        pass
+
+
+def _app(traces, slow_request_ms=10000.0, keep_all=True):
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware, slow_request_ms=slow_request_ms, traces=traces,
+                       keep_all=keep_all, probe_paths=['/health'])
+
+    @app.get('/health')
+    async def health():
+        return {'ok': True}
+
+    @app.get('/chat')
+    async def chat():
+        with span('session'):
+            pass
+        with span('cudo', target='chat'):
+            await asyncio.to_thread(_work)
+        with span('cudo', target='chat'):
+            pass
+        return {'ok': True}
+
+    return app
+
+
+def test_spans_and_server_timing():
+    traces = TraceBuffer(2)
+    client = TestClient(_app(traces))
+    response = client.get('/chat')
+    assert response.status_code == 200
+    names = [entry.split(';')[0] for entry in response.headers['server-timing'].split(', ')]
+    # Repeated stages (e.g. retried calls) are added up
+    assert names == ['session', 'cudo', 'yaml_render', 'total']
+
+    trace = traces.recent()[0]
+    assert trace['attributes'] == {'method': 'GET', 'path': '/chat', 'status': 200}
+    session, first, second = trace['children']
+    assert first['children'][0]['attributes'] == {'params': 3}  # followed into the thread
+    assert second['start_ms'] >= first['start_ms'] + first['duration_ms']
+
+    for _ in range(3):
+        client.get('/chat')
+    assert len(traces.recent()) == 2
+
+
+def test_slow_requests_are_logged(mocker):
+    log = mocker.patch('ai.tracing.LOG')
+    client = TestClient(_app(TraceBuffer(), slow_request_ms=0))
+    client.get('/chat')
+    message = log.warning.call_args[0][0] % log.warning.call_args[0][1:]
+    assert message.startswith('slow request: GET /chat took')
+    assert '"yaml_render"' in message
+
+
+def test_only_slow_traces_are_kept_by_default(mocker):
+    traces = TraceBuffer()
+    config = mocker.Mock(trace_debug_endpoint=False, dev=False)
+    mocker.patch('ai.tracing.get_config', return_value=config)
+    TestClient(_app(traces, keep_all=None)).get('/chat')
+    assert traces.recent() == []
+
+    mocker.patch('ai.tracing.LOG')
+    client = TestClient(_app(traces, slow_request_ms=0, keep_all=None))
+    client.get('/chat')
+    client.get('/health')
+    assert [t['attributes']['path'] for t in traces.recent()] == ['/chat']
+
+
+def test_probes_are_not_kept():
+    traces = TraceBuffer()
+    response = TestClient(_app(traces)).get('/health')
+    assert 'server-timing' in response.headers
+    assert traces.recent() == []
+
+
+def test_span_outside_a_request():
+    with span('intent') as trace:
+        assert trace is None
@@ -0,0 +1,42 @@
+#  Copyright (c) 2025 Nokia - Nokia Proprietary Internal Use Only - All Rights Reserved.
+import time
+
+import pytest
+
+from ai.config import NWaCConfig
+from ai.warmup import Component, Readiness
+
+
+def _slow(config):
+    time.sleep(1)
+
+
+def _broken(config):
+    raise RuntimeError('no credentials')
+
+
+@pytest.mark.asyncio
+async def test_warm_up():
+    config = NWaCConfig()
+    config.warmup_timeout = 0.2
+    readiness = Readiness()
+    assert not readiness.ready
+
+    await readiness.warm_up(config, [Component('a', lambda c: 'fine'),
+                                     Component('b', _broken, required=False)])
+    assert readiness.state == 'degraded' and readiness.ready
+    report = readiness.report()
+    assert report['components']['a'] == {'status': 'ok', 'required': True,
+                                         'duration_ms': report['components']['a']['duration_ms'],
+                                         'detail': 'fine'}
+    assert 'no credentials' in report['components']['b']['detail']
+
+    await readiness.warm_up(config, [Component('a', _slow)])
+    assert readiness.state == 'not_ready'
+    assert 'timed out' in readiness.report()['components']['a']['detail']
+
+
+def test_warmup_disabled():
+    readiness = Readiness()
+    readiness.skip()
+    assert readiness.state == 'ready'